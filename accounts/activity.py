@@ -0,0 +1,144 @@
+"""
+تتبع نشاط المستخدمين بالكتابة المؤجلة
+
+يُسجل آخر نشاط ومعلومات الأجهزة في الذاكرة المؤقتة، ويُسجل المستخدم في قائمة
+الانتظار مرة واحدة على الأكثر كل ``WRITE_INTERVAL`` ثانية. تُكتب القائمة دورياً
+بـ ``bulk_update`` (جملة ``UPDATE ... CASE`` واحدة لكل دفعة) بدلاً من
+``User.save()`` الكامل في كل طلب.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+DEFAULT_WRITE_INTERVAL = 60
+PENDING_TIMEOUT = 60 * 60 * 24
+
+
+def get_write_interval():
+    return getattr(settings, "ACTIVITY_SETTINGS", {}).get(
+        "WRITE_INTERVAL", DEFAULT_WRITE_INTERVAL
+    )
+
+
+class ActivityTracker:
+    """تتبع آخر نشاط وأجهزة المستخدمين مع دمج الكتابات"""
+
+    KEY_PREFIX = "user_activity"
+    BATCH_SIZE = 500
+
+    @classmethod
+    def last_activity_key(cls, user_id):
+        return f"{cls.KEY_PREFIX}:last:{user_id}"
+
+    @classmethod
+    def devices_key(cls, user_id):
+        return f"{cls.KEY_PREFIX}:devices:{user_id}"
+
+    @classmethod
+    def _mark_pending(cls, user_id):
+        """تسجيل المستخدم للكتابة مرة واحدة في كل فترة كتابة"""
+        if not cache.add(
+            f"{cls.KEY_PREFIX}:throttle:{user_id}", True, get_write_interval()
+        ):
+            return
+        # قائمة انتظار مرقمة: incr ذري ثم مفتاح لكل موقع
+        sequence_key = f"{cls.KEY_PREFIX}:sequence"
+        cache.add(sequence_key, 0, None)
+        position = cache.incr(sequence_key)
+        cache.set(f"{cls.KEY_PREFIX}:pending:{position}", user_id, PENDING_TIMEOUT)
+
+    @classmethod
+    def touch(cls, user, now=None):
+        """تسجيل نشاط المستخدم في الذاكرة المؤقتة"""
+        now = now or timezone.now()
+        cache.set(cls.last_activity_key(user.pk), now, PENDING_TIMEOUT)
+        cls._mark_pending(user.pk)
+        return now
+
+    @classmethod
+    def add_device(cls, user, device_info):
+        """إضافة معلومات جهاز إلى أجهزة المستخدم المنتظرة للكتابة"""
+        device_id = device_info.get("device_id")
+        if not device_id:
+            return None
+        key = cls.devices_key(user.pk)
+        devices = cache.get(key) or {}
+        devices[device_id] = device_info
+        cache.set(key, devices, PENDING_TIMEOUT)
+        cls._mark_pending(user.pk)
+        return devices
+
+    @classmethod
+    def get_devices(cls, user):
+        """أجهزة المستخدم المخزنة مع الأجهزة التي لم تُكتب بعد"""
+        devices = dict(user.device_info or {})
+        devices.update(cache.get(cls.devices_key(user.pk)) or {})
+        return devices
+
+    @classmethod
+    def pending_user_ids(cls):
+        """المستخدمون المنتظرون منذ آخر كتابة"""
+        sequence = cache.get(f"{cls.KEY_PREFIX}:sequence") or 0
+        flushed = cache.get(f"{cls.KEY_PREFIX}:flushed") or 0
+        if sequence <= flushed:
+            return sequence, set()
+
+        keys = [
+            f"{cls.KEY_PREFIX}:pending:{position}"
+            for position in range(flushed + 1, sequence + 1)
+        ]
+        user_ids = set()
+        for start in range(0, len(keys), cls.BATCH_SIZE):
+            batch = keys[start : start + cls.BATCH_SIZE]
+            user_ids.update(cache.get_many(batch).values())
+        return sequence, user_ids
+
+    @classmethod
+    def flush(cls):
+        """كتابة النشاط المنتظر إلى قاعدة البيانات على دفعات"""
+        sequence, user_ids = cls.pending_user_ids()
+        if not user_ids:
+            cache.set(f"{cls.KEY_PREFIX}:flushed", sequence, None)
+            return 0
+
+        user_model = get_user_model()
+        user_ids = sorted(user_ids)
+        written = 0
+        for start in range(0, len(user_ids), cls.BATCH_SIZE):
+            chunk = user_ids[start : start + cls.BATCH_SIZE]
+            activity = cache.get_many([cls.last_activity_key(pk) for pk in chunk])
+            device_keys = {cls.devices_key(pk): pk for pk in chunk}
+            pending_devices = cache.get_many(list(device_keys))
+
+            stored_devices = {}
+            if pending_devices:
+                stored_devices = dict(
+                    user_model._default_manager.filter(
+                        pk__in=[device_keys[key] for key in pending_devices]
+                    ).values_list("pk", "device_info")
+                )
+
+            # قائمة لكل حقل حتى لا يُكتب إلا ما تغير فعلاً
+            updates = {"last_activity": [], "device_info": []}
+            for pk in chunk:
+                last_activity = activity.get(cls.last_activity_key(pk))
+                if last_activity is not None:
+                    updates["last_activity"].append(
+                        user_model(pk=pk, last_activity=last_activity)
+                    )
+                devices = pending_devices.get(cls.devices_key(pk))
+                if devices is not None and pk in stored_devices:
+                    merged = {**(stored_devices[pk] or {}), **devices}
+                    updates["device_info"].append(
+                        user_model(pk=pk, device_info=merged)
+                    )
+
+            for field, users in updates.items():
+                if users:
+                    user_model._default_manager.bulk_update(users, [field])
+            written += len({user.pk for users in updates.values() for user in users})
+
+        cache.set(f"{cls.KEY_PREFIX}:flushed", sequence, None)
+        return written
@@ -21,6 +21,25 @@ class Command(BaseCommand):
             action="store_true",
             help="توليد بطاقات لجميع المستخدمين",
         )
+        parser.add_argument(
+            "--output",
+            help="مجلد حفظ ملفي PDF و ZIP (الافتراضي: ID_CARDS_DIR)",
+        )
+        parser.add_argument(
+            "--layout",
+            choices=["sheet", "cards"],
+            help="أوراق A4 مجمعة للطباعة أو صفحة لكل بطاقة",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="عدد عمليات التوليد المتوازية",
+        )
+        parser.add_argument(
+            "--no-zip",
+            action="store_true",
+            help="عدم إنشاء أرشيف صور PNG",
+        )
 
     def handle(self, *args, **options):
         # تحديد المستخدمين
@@ -45,22 +64,36 @@ class Command(BaseCommand):
 
         self.stdout.write(f"جاري توليد {total} بطاقة تعريفية...")
 
+        def progress(done, total):
+            if done % 100 == 0 or done == total:
+                self.stdout.write(f"{done}/{total}")
+
         # توليد البطاقات
-        results = IDCardGenerator.generate_batch(users)
+        results = IDCardGenerator.generate_batch(
+            users.order_by("pk"),
+            output_dir=options["output"],
+            workers=options["workers"],
+            layout=options["layout"],
+            make_zip=not options["no_zip"],
+            progress=progress,
+        )
 
         # عرض النتائج
-        success = len([r for r in results if r["success"]])
-        failed = len([r for r in results if not r["success"]])
+        success = results["success"]
+        failed = results["failed"]
 
         self.stdout.write(
             self.style.SUCCESS(f"اكتمل التوليد: {success} نجاح, {failed} فشل")
         )
 
+        for key, label in (("pdf", "ملف الطباعة"), ("zip", "أرشيف الصور")):
+            if results[key]:
+                self.stdout.write(f"{label}: {results[key]}")
+
         # عرض الأخطاء إن وجدت
         if failed > 0:
             self.stdout.write("\nالأخطاء:")
-            for result in results:
-                if not result["success"]:
-                    self.stdout.write(
-                        self.style.ERROR(f"- {result['user']}: {result['error']}")
-                    )
+            for error in results["errors"]:
+                self.stdout.write(
+                    self.style.ERROR(f"- {error['user']}: {error['error']}")
+                )
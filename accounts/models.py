@@ -10,13 +10,15 @@ from datetime import timedelta
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from phonenumber_field.modelfields import PhoneNumberField
 
 from core.image_config import IMAGE_SETTINGS, LAZY_LOADING_SETTINGS
 from core.utils import get_cached_image_url, optimize_image
+from utils.image_pipeline import schedule_variants
 
 
 def validate_phone_number(value):
@@ -140,6 +142,9 @@ class User(AbstractUser):
             is_new or "profile_picture" in self.get_dirty_fields()
         ):
             optimize_image(self.profile_picture.path)
+            # المهمة تُجدول بعد تثبيت المعاملة فقط، ولا تُجدول عند التراجع
+            name = self.profile_picture.name
+            transaction.on_commit(lambda: schedule_variants(name))
 
     def get_profile_picture_url(self, size="medium"):
         if not self.profile_picture:
@@ -223,6 +228,12 @@ class User(AbstractUser):
         """الحصول على الدور بالصيغة المعروضة"""
         return self.get_role_display()
 
+    def get_role_permissions(self):
+        """الصلاحيات الفعلية للمستخدم (تُحسب مرة واحدة لكل طلب وتُخزن مؤقتاً)"""
+        from security.permissions import PermissionResolver
+
+        return PermissionResolver.get_permissions(self)
+
     def is_doctor(self):
         """التحقق مما إذا كان المستخدم طبيباً"""
         return self.role == self.Roles.DOCTOR
@@ -264,31 +275,44 @@ class User(AbstractUser):
         return timezone.now() < self.account_locked_until
 
     def increment_failed_login(self):
-        """زيادة عدد محاولات تسجيل الدخول الفاشلة"""
-        self.failed_login_attempts += 1
-        if self.failed_login_attempts >= 5:  # قفل الحساب بعد 5 محاولات فاشلة
-            self.account_locked_until = timezone.now() + timedelta(minutes=30)
-        self.save()
+        """زيادة عدد محاولات تسجيل الدخول الفاشلة (تحديث ذري)"""
+        # الطرف الأيمن يُقيّم بالقيم السابقة فيُقفل الحساب عند المحاولة الخامسة
+        User.objects.filter(pk=self.pk).update(
+            failed_login_attempts=F("failed_login_attempts") + 1,
+            account_locked_until=Case(
+                When(
+                    failed_login_attempts__gte=4,  # قفل الحساب بعد 5 محاولات فاشلة
+                    then=Value(timezone.now() + timedelta(minutes=30)),
+                ),
+                default=F("account_locked_until"),
+            ),
+        )
+        self.refresh_from_db(fields=["failed_login_attempts", "account_locked_until"])
 
     def reset_failed_login(self):
         """إعادة تعيين محاولات تسجيل الدخول الفاشلة"""
         self.failed_login_attempts = 0
         self.account_locked_until = None
-        self.save()
+        User.objects.filter(pk=self.pk).update(
+            failed_login_attempts=0, account_locked_until=None
+        )
 
     def update_last_activity(self):
-        """تحديث آخر نشاط للمستخدم"""
-        self.last_activity = timezone.now()
-        self.save()
+        """تحديث آخر نشاط للمستخدم (كتابة مؤجلة عبر الذاكرة المؤقتة)"""
+        from accounts.activity import ActivityTracker
+
+        self.last_activity = ActivityTracker.touch(self)
 
     def add_device_info(self, device_info):
-        """إضافة معلومات جهاز جديد"""
+        """إضافة معلومات جهاز جديد (كتابة مؤجلة عبر الذاكرة المؤقتة)"""
+        from accounts.activity import ActivityTracker
+
         if not isinstance(self.device_info, dict):
             self.device_info = {}
         device_id = device_info.get("device_id")
         if device_id:
             self.device_info[device_id] = device_info
-            self.save()
+            ActivityTracker.add_device(self, device_info)
 
     def get_recent_activities(self):
         """الحصول على النشاطات الأخيرة للمستخدم"""
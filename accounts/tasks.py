@@ -0,0 +1,13 @@
+"""
+مهام Celery لوحدة الحسابات
+"""
+
+from celery import shared_task
+
+
+@shared_task
+def flush_user_activity():
+    """كتابة آخر نشاط وأجهزة المستخدمين المنتظرة إلى قاعدة البيانات"""
+    from accounts.activity import ActivityTracker
+
+    return ActivityTracker.flush()
@@ -1,16 +1,49 @@
 """
 نظام توليد البطاقات التعريفية
+
+تُرسم الخلفية الثابتة وتُحمّل الخطوط ومولد الباركود مرة واحدة لكل مولد، وفي
+التوليد الجماعي مرة واحدة لكل عملية في مجمع العمليات. تُكتب البطاقات تباعاً إلى
+أرشيف ZIP من صور PNG وملف PDF جاهز للطباعة (صفحة لكل بطاقة أو أوراق مجمعة)
+دون الاحتفاظ بها جميعاً في الذاكرة.
 """
 
+import logging
+import multiprocessing
 import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from io import BytesIO
+from typing import NamedTuple
 
 import qrcode
+from barcode import Code128
+from barcode.writer import ImageWriter
 from django.conf import settings
 from PIL import Image, ImageDraw, ImageFont
 
-from utils.barcode_generator import BarcodeGenerator
+logger = logging.getLogger(__name__)
+
+CARD_SIZE = (1000, 600)
+CARD_MODE = "L"
+QR_MASK_PATTERN = 0
+# ورقة A4 بدقة 300 نقطة في البوصة
+A4_PAGE_SIZE = (2480, 3508)
+PRINT_RESOLUTION = 300.0
+
+DEFAULT_SETTINGS = {
+    "FONT_PATH": None,
+    "WORKERS": None,
+    # sheet: أوراق A4 مجمعة للطباعة، cards: صفحة لكل بطاقة
+    "LAYOUT": "sheet",
+    # أقصى حجم للصفحات المنتظرة في الذاكرة قبل إلحاقها بملف PDF
+    "PDF_BUFFER_BYTES": 64 * 1024 * 1024,
+}
+
+
+def get_id_card_setting(name):
+    return getattr(settings, "ID_CARD_SETTINGS", {}).get(name, DEFAULT_SETTINGS[name])
 
 
 class IDCardGenerationError(Exception):
@@ -19,84 +52,332 @@ class IDCardGenerationError(Exception):
     pass
 
 
+class CardData(NamedTuple):
+    """بيانات البطاقة المرسلة إلى عمليات التوليد (بدون كائنات النماذج)"""
+
+    user_id: int
+    username: str
+    full_name: str
+    email: str
+    role: str
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(
+            user.pk,
+            user.username,
+            user.get_full_name(),
+            user.email,
+            str(user.get_role()),
+        )
+
+
 class IDCardGenerator:
     """مولد البطاقات التعريفية"""
 
-    def __init__(self):
-        self.card_size = (1000, 600)  # حجم البطاقة
-        self.background_color = (255, 255, 255)  # لون الخلفية
-        self.text_color = (0, 0, 0)  # لون النص
+    def __init__(self, font_path=None):
+        self.card_size = CARD_SIZE  # حجم البطاقة
+        # البطاقة بالأبيض والأسود: تدرج رمادي أصغر وأسرع ترميزاً من RGB
+        self.mode = CARD_MODE
+        self.background_color = 255  # لون الخلفية
+        self.text_color = 0  # لون النص
+        self.issued_on = datetime.now().strftime("%Y-%m-%d")
+
+        if font_path is None:
+            font_path = get_id_card_setting("FONT_PATH")
+        self.title_font = self.load_font(font_path, 40)
+        self.text_font = self.load_font(font_path, 28)
+
+        self.barcode_writer = ImageWriter()
+        self.background = self.render_background()
 
+    @staticmethod
+    def load_font(font_path, size):
+        if font_path:
+            return ImageFont.truetype(font_path, size)
         # استخدام الخط الافتراضي
-        self.title_font = ImageFont.load_default()
-        self.text_font = ImageFont.load_default()
+        return ImageFont.load_default()
+
+    def render_background(self):
+        """رسم الأجزاء الثابتة من البطاقة مرة واحدة"""
+        background = Image.new(self.mode, self.card_size, self.background_color)
+        draw = ImageDraw.Draw(background)
+        title = "Doctor Syria - بطاقة تعريفية"
+        draw.text((50, 50), title, font=self.title_font, fill=self.text_color)
+        return background
+
+    def render(self, data):
+        """رسم بطاقة من بياناتها وإرجاعها كصورة"""
+        card = self.background.copy()
+        draw = ImageDraw.Draw(card)
+
+        # إضافة معلومات المستخدم
+        user_info = [
+            f"الاسم: {data.full_name}",
+            f"البريد الإلكتروني: {data.email}",
+            f"نوع المستخدم: {data.role}",
+            f"تاريخ الإنشاء: {self.issued_on}",
+        ]
+
+        y_position = 150
+        for info in user_info:
+            draw.text((50, y_position), info, font=self.text_font, fill=self.text_color)
+            y_position += 40
+
+        # إضافة الباركود
+        barcode_image = Code128(str(data.user_id), writer=self.barcode_writer).render()
+        card.paste(barcode_image.convert(self.mode), (50, y_position))
+
+        # إضافة QR code
+        # قناع ثابت بدل تجربة الأقنعة الثمانية (أغلى خطوة في توليد الرمز)
+        qr = qrcode.QRCode(box_size=6, border=2, mask_pattern=QR_MASK_PATTERN)
+        qr.add_data(f"https://doctor-syria.com/users/{data.user_id}")
+        qr.make(fit=True)
+        qr_image = qr.make_image(fill_color="black", back_color="white").get_image()
+        card.paste(
+            qr_image.convert(self.mode),
+            (self.card_size[0] - qr_image.width - 50, y_position),
+        )
+        return card
+
+    def render_png(self, data):
+        output = BytesIO()
+        self.render(data).save(output, format="PNG", compress_level=1)
+        return output.getvalue()
 
     def create_card(self, user):
         """
         إنشاء بطاقة تعريفية للمستخدم
         """
         try:
-            # إنشاء صورة جديدة
-            card = Image.new("RGB", self.card_size, self.background_color)
-            draw = ImageDraw.Draw(card)
-
-            # إضافة العنوان
-            title = "Doctor Syria - بطاقة تعريفية"
-            draw.text((50, 50), title, font=self.title_font, fill=self.text_color)
-
-            # إضافة معلومات المستخدم
-            user_info = [
-                f"الاسم: {user.get_full_name()}",
-                f"البريد الإلكتروني: {user.email}",
-                f"نوع المستخدم: {user.get_user_type_display()}",
-                f"تاريخ الإنشاء: {datetime.now().strftime('%Y-%m-%d')}",
-            ]
-
-            y_position = 150
-            for info in user_info:
-                draw.text(
-                    (50, y_position), info, font=self.text_font, fill=self.text_color
-                )
-                y_position += 40
-
-            # إضافة الباركود
-            barcode_generator = BarcodeGenerator()
-            barcode = barcode_generator.generate(str(user.id))
-            barcode_image = Image.open(BytesIO(barcode))
-            card.paste(barcode_image, (50, y_position))
-
-            # إضافة QR code
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(f"https://doctor-syria.com/users/{user.id}")
-            qr.make(fit=True)
-            qr_image = qr.make_image(fill_color="black", back_color="white")
-            card.paste(qr_image, (self.card_size[0] - 200, y_position))
-
-            # حفظ البطاقة
-            output = BytesIO()
-            card.save(output, format="PNG")
-            output.seek(0)
-            return output
-
+            return BytesIO(self.render_png(CardData.from_user(user)))
         except Exception as e:
             raise IDCardGenerationError(f"خطأ في إنشاء البطاقة التعريفية: {str(e)}")
 
     @staticmethod
-    def generate_batch(users):
+    def generate_batch(users, **options):
         """
         توليد بطاقات تعريفية لمجموعة من المستخدمين
         :param users: قائمة المستخدمين
-        :return: قائمة بالنتائج
+        :return: قاموس بعدد النجاح والفشل والأخطاء ومسارات الملفات الناتجة
         """
-        generator = IDCardGenerator()
-        results = {"success": 0, "failed": 0, "errors": []}
+        return IDCardBatch(**options).run(users)
+
+
+class CardSheet:
+    """توزيع البطاقات على ورقة طباعة في شبكة أعمدة وصفوف"""
+
+    def __init__(self, card_size, page_size=A4_PAGE_SIZE, margin=118, gap=24):
+        self.card_size = card_size
+        self.page_size = page_size
+        self.margin = margin
+        self.gap = gap
+        self.columns = (page_size[0] - 2 * margin + gap) // (card_size[0] + gap)
+        self.rows = (page_size[1] - 2 * margin + gap) // (card_size[1] + gap)
+        if self.columns < 1 or self.rows < 1:
+            raise ValueError("حجم البطاقة أكبر من ورقة الطباعة")
+
+    @property
+    def per_page(self):
+        return self.columns * self.rows
+
+    def position(self, index):
+        row, column = divmod(index % self.per_page, self.columns)
+        return (
+            self.margin + column * (self.card_size[0] + self.gap),
+            self.margin + row * (self.card_size[1] + self.gap),
+        )
+
+    def new_page(self):
+        return Image.new(CARD_MODE, self.page_size, 255)
+
+
+class PDFCardWriter:
+    """
+    كتابة البطاقات إلى ملف PDF على دفعات
 
+    تُجمع الصفحات حتى ``buffer_bytes`` ثم تُلحق بالملف (``append``) فلا تبقى
+    إلا دفعة واحدة في الذاكرة.
+    """
+
+    def __init__(self, path, sheet=None, buffer_bytes=None):
+        self.path = path
+        self.sheet = sheet
+        self.buffer_bytes = buffer_bytes or get_id_card_setting("PDF_BUFFER_BYTES")
+        self.pages = []
+        self.page = None
+        self.count = 0
+        self.started = False
+
+    def add(self, card):
+        if self.sheet is None:
+            self.add_page(card)
+        else:
+            if self.count % self.sheet.per_page == 0:
+                self.page = self.sheet.new_page()
+                self.add_page(self.page)
+            self.page.paste(card, self.sheet.position(self.count))
+        self.count += 1
+
+    def add_page(self, page):
+        # تُكتب الدفعة قبل إضافة صفحة جديدة حتى تكتمل الورقة الحالية
+        width, height = page.size
+        buffered = (len(self.pages) + 1) * width * height
+        if self.pages and buffered > self.buffer_bytes:
+            self.write()
+        self.pages.append(page)
+
+    def write(self):
+        if not self.pages:
+            return
+        first, *rest = self.pages
+        first.save(
+            self.path,
+            "PDF",
+            save_all=True,
+            append_images=rest,
+            append=self.started,
+            resolution=PRINT_RESOLUTION,
+        )
+        self.started = True
+        self.pages = []
+
+    def close(self):
+        self.write()
+
+
+_worker_generator = None
+
+
+def _init_worker(font_path):
+    global _worker_generator
+    _worker_generator = IDCardGenerator(font_path)
+
+
+def _render_chunk(chunk, generator=None):
+    """توليد دفعة بطاقات مع التقاط خطأ كل بطاقة على حدة"""
+    generator = generator or _worker_generator
+    results = []
+    for data in chunk:
+        try:
+            results.append((data, generator.render_png(data), None))
+        except Exception as e:
+            results.append((data, None, str(e)))
+    return results
+
+
+class IDCardBatch:
+    """توليد البطاقات التعريفية لمجموعة كبيرة من المستخدمين بالتوازي"""
+
+    def __init__(
+        self,
+        output_dir=None,
+        workers=None,
+        layout=None,
+        chunk_size=16,
+        make_pdf=True,
+        make_zip=True,
+        progress=None,
+    ):
+        self.output_dir = output_dir or settings.ID_CARDS_DIR
+        self.workers = (
+            workers
+            if workers is not None
+            else get_id_card_setting("WORKERS") or os.cpu_count() or 1
+        )
+        self.layout = layout or get_id_card_setting("LAYOUT")
+        if self.layout not in ("sheet", "cards"):
+            raise ValueError(f"تخطيط غير مدعوم: {self.layout}")
+        self.chunk_size = chunk_size
+        self.make_pdf = make_pdf
+        self.make_zip = make_zip
+        self.progress = progress
+        self.font_path = get_id_card_setting("FONT_PATH")
+
+    def iter_chunks(self, users):
+        chunk = []
         for user in users:
-            try:
-                generator.create_card(user)
-                results["success"] += 1
-            except Exception as e:
-                results["failed"] += 1
-                results["errors"].append({"user": user.username, "error": str(e)})
+            chunk.append(CardData.from_user(user))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def iter_cards(self, users):
+        """
+        توليد البطاقات وإرجاع (البيانات، PNG، الخطأ) بترتيب المستخدمين
+
+        لا يتجاوز عدد الدفعات المرسلة إلى المجمع ضعف عدد العمليات.
+        """
+        chunks = self.iter_chunks(users)
+        if self.workers <= 1:
+            generator = IDCardGenerator(self.font_path)
+            for chunk in chunks:
+                yield from _render_chunk(chunk, generator)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.font_path,),
+        ) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_render_chunk, chunk))
+                if len(pending) >= self.workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def run(self, users, name=None):
+        """توليد البطاقات وكتابتها إلى ملفي PDF و ZIP"""
+        if hasattr(users, "iterator"):
+            total = users.count()
+            users = users.iterator(chunk_size=2000)
+        else:
+            users = list(users)
+            total = len(users)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = name or f"id_cards_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        results = {"success": 0, "failed": 0, "errors": [], "pdf": None, "zip": None}
+
+        archive = pdf = None
+        if self.make_zip:
+            results["zip"] = os.path.join(self.output_dir, f"{name}.zip")
+            # صور PNG مضغوطة أصلاً فلا فائدة من ضغطها مجدداً
+            archive = zipfile.ZipFile(results["zip"], "w", zipfile.ZIP_STORED)
+        if self.make_pdf:
+            results["pdf"] = os.path.join(self.output_dir, f"{name}.pdf")
+            sheet = None
+            if self.layout == "sheet":
+                sheet = CardSheet(CARD_SIZE)
+            pdf = PDFCardWriter(results["pdf"], sheet)
+
+        try:
+            for data, png, error in self.iter_cards(users):
+                if error is None:
+                    results["success"] += 1
+                    if archive is not None:
+                        archive.writestr(f"id_card_{data.user_id}.png", png)
+                    if pdf is not None:
+                        pdf.add(Image.open(BytesIO(png)))
+                else:
+                    results["failed"] += 1
+                    results["errors"].append({"user": data.username, "error": error})
+                    logger.error(
+                        f"خطأ في إنشاء البطاقة التعريفية لـ {data.username}: {error}"
+                    )
+                if self.progress is not None:
+                    self.progress(results["success"] + results["failed"], total)
+        finally:
+            if archive is not None:
+                archive.close()
+            if pdf is not None:
+                pdf.close()
 
+        if pdf is not None and not pdf.started:
+            results["pdf"] = None
         return results
@@ -19,6 +19,7 @@ from django.utils.crypto import get_random_string
 from django.views.decorators.cache import cache_page
 from django.views.decorators.http import require_http_methods
 
+from .activity import ActivityTracker
 from .forms import (
     LoginForm,
     MedicalInformationForm,
@@ -289,7 +290,7 @@ def security_settings(request):
     """Display security settings process."""
     try:
         context = {
-            "devices": request.user.device_info,
+            "devices": ActivityTracker.get_devices(request.user),
             "last_login": request.user.last_login,
             "last_password_change": request.user.last_password_change,
             "two_factor_enabled": request.user.two_factor_enabled,
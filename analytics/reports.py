@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 from typing import Dict, List
 
-from django.db.models import Avg, Count
+from django.db.models import Avg, Count, Sum
 from django.utils import timezone
 
 
@@ -19,14 +19,15 @@ class AnalyticsService:
         from medical_records.models import PatientVisit
 
         from accounts.models import User
-        from appointments.models import Appointment
+        from core.models import AppointmentStats
 
         return {
             "total_patients": User.objects.filter(role="patient").count(),
             "total_doctors": User.objects.filter(role="doctor").count(),
-            "appointments": Appointment.objects.filter(
-                date__range=(start_date, end_date)
-            ).count(),
+            "appointments": AppointmentStats.objects.filter(
+                day__range=(start_date.date(), end_date.date())
+            ).aggregate(total=Sum("total_appointments"))["total"]
+            or 0,
             "visits": PatientVisit.objects.filter(
                 date__range=(start_date, end_date)
             ).count(),
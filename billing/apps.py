@@ -5,3 +5,6 @@ class BillingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'billing'
     verbose_name = 'الفواتير'
+
+    def ready(self):
+        import billing.documents
@@ -0,0 +1,28 @@
+"""
+مستندات PDF لتطبيق الفواتير
+"""
+
+from doctor_syria.core.documents import DocumentType, register
+
+from .models import Invoice
+from .serializers import InvoicePDFSerializer
+
+
+def invoice_fingerprint(invoice):
+    # عناصر الفاتورة بلا updated_at فتدخل قيمها في البصمة
+    items = invoice.items.order_by("pk").values_list(
+        "pk", "description", "quantity", "unit_price"
+    )
+    return [invoice._meta.label, invoice.pk, invoice.updated_at, list(items)]
+
+
+INVOICE = register(
+    DocumentType(
+        name="invoice",
+        model=Invoice,
+        template="billing/invoice_template.html",
+        context=lambda invoice: {"invoice": InvoicePDFSerializer(invoice).data},
+        filename=lambda invoice: f"invoice_{invoice.invoice_number}.pdf",
+        fingerprint=invoice_fingerprint,
+    )
+)
@@ -3,16 +3,15 @@ import tempfile
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
-from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, render
-from django.template.loader import render_to_string
 from django.utils import timezone
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-# تعطيل مؤقتاً
-# from weasyprint import HTML
 
+from doctor_syria.core.documents import DocumentRenderer
+
+from .documents import INVOICE
 from .models import (
     FaturaPayment,
     InsuranceClaim,
@@ -25,7 +24,6 @@ from .serializers import (
     InsuranceClaimSerializer,
     InsuranceProviderSerializer,
     InvoiceItemSerializer,
-    InvoicePDFSerializer,
     InvoiceSerializer,
     PaymentSerializer,
 )
@@ -92,23 +90,8 @@ class InvoiceViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["get"])
     def generate_pdf(self, request, pk=None):
-        """إنشاء PDF للفاتورة"""
-        invoice = self.get_object()
-        serializer = InvoicePDFSerializer(invoice)
-
-        # تحضير قالب HTML
-        html_string = render_to_string(
-            "billing/invoice_template.html", {"invoice": serializer.data}
-        )
-
-        # إرجاع HTML مؤقتاً بدلاً من PDF
-        response = HttpResponse(content_type="text/html")
-        response[
-            "Content-Disposition"
-        ] = f"inline; filename=invoice_{invoice.invoice_number}.html"
-        response.write(html_string)
-
-        return response
+        """PDF الفاتورة من التخزين، أو 202 أثناء توليده في الخلفية"""
+        return DocumentRenderer.response(INVOICE.name, self.get_object(), request)
 
 
 class PaymentViewSet(viewsets.ModelViewSet):
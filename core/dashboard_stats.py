@@ -0,0 +1,343 @@
+"""
+إحصائيات لوحات التحكم لكل مستأجر
+
+تُحسب العدادات بتجميع شرطي (``Count(filter=Q(...))``) باستعلام واحد لكل جدول
+يغطي جميع المستأجرين المطلوبين، وتُخزن كقواميس وصفوف مضغوطة بدلاً من كائنات
+النماذج. بين التحديثات الكاملة تُحدَّث العدادات تزايدياً من إشارات النماذج عبر
+مفاتيح فروقات منفصلة تُزاد بـ ``cache.incr`` الذري.
+
+إن لم يكن تطبيق المستأجرين (``saas_core``) مثبتاً تُحسب لقطة عامة واحدة لجميع
+البيانات بالمعرف ``GLOBAL_TENANT``.
+"""
+
+from datetime import timedelta
+from operator import attrgetter
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+TENANT_USER_MODEL = "saas_core.TenantUser"
+
+# معرف اللقطة العامة عند عدم تثبيت تطبيق المستأجرين
+GLOBAL_TENANT = 0
+
+
+def tenants_enabled():
+    try:
+        apps.get_model(TENANT_USER_MODEL)
+    except LookupError:
+        return False
+    return True
+
+
+class StatsTable:
+    """تعريف عدادات جدول واحد"""
+
+    def __init__(self, name, model, tenant_path, user_attr, counters, activity_field):
+        self.name = name
+        self.model = model
+        # المسار من الجدول إلى المستأجر عبر TenantUser
+        self.tenant_path = tenant_path
+        # معرّف المستخدم الذي يربط الكائن بالمستأجر
+        self.user_attr = attrgetter(user_attr)
+        # اسم العداد -> (دالة تبني Q من الوقت الحالي، شرط بايثون للتحديث التزايدي)
+        self.counters = counters
+        self.activity_field = activity_field
+
+    def get_model(self):
+        return apps.get_model(self.model)
+
+    def aggregate(self, tenant_ids, now):
+        """حساب عدادات المستأجرين باستعلام واحد"""
+        annotations = {
+            name: Count("pk", filter=build_q(now))
+            for name, (build_q, _) in self.counters.items()
+        }
+        manager = self.get_model()._default_manager
+        if not tenants_enabled():
+            if GLOBAL_TENANT not in tenant_ids:
+                return {}
+            return {GLOBAL_TENANT: manager.aggregate(**annotations)}
+        rows = (
+            manager.filter(**{f"{self.tenant_path}__in": tenant_ids})
+            .values(tenant_id=F(self.tenant_path))
+            .annotate(**annotations)
+            .order_by()
+        )
+        return {row.pop("tenant_id"): row for row in rows}
+
+    def matching_counters(self, instance, now):
+        """العدادات التي يدخل فيها الكائن (للتحديث التزايدي)"""
+        return [
+            name
+            for name, (_, predicate) in self.counters.items()
+            if predicate is not None and predicate(instance, now)
+        ]
+
+
+def _today(now):
+    return timezone.localdate(now)
+
+
+def _local_date(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def _created_within(days):
+    """شرط تزايدي لعداد نافذة زمنية على ``created_at``"""
+    return lambda obj, now: obj.created_at >= now - timedelta(days=days)
+
+
+STATS_TABLES = [
+    StatsTable(
+        name="patients",
+        model="patient_records.Patient",
+        tenant_path="user__tenantuser__tenant",
+        user_attr="user_id",
+        counters={
+            "total": (lambda now: Q(), lambda obj, now: True),
+            "active": (lambda now: Q(user__is_active=True), None),
+            "new_this_month": (
+                lambda now: Q(created_at__gte=now - timedelta(days=30)),
+                _created_within(30),
+            ),
+        },
+        activity_field="updated_at",
+    ),
+    StatsTable(
+        name="appointments",
+        model="appointments.Appointment",
+        tenant_path="doctor__user__tenantuser__tenant",
+        user_attr="doctor.user_id",
+        counters={
+            "total": (lambda now: Q(), lambda obj, now: True),
+            "today": (
+                lambda now: Q(appointment_date__date=_today(now)),
+                lambda obj, now: _local_date(obj.appointment_date) == _today(now),
+            ),
+            "pending": (
+                lambda now: Q(status="pending"),
+                lambda obj, now: obj.status == "pending",
+            ),
+            "completed_this_week": (
+                lambda now: Q(
+                    status="completed",
+                    appointment_date__date__gte=_today(now) - timedelta(days=7),
+                ),
+                None,
+            ),
+        },
+        activity_field="updated_at",
+    ),
+    StatsTable(
+        name="reports",
+        model="patient_records.MedicalReport",
+        tenant_path="doctor__tenantuser__tenant",
+        user_attr="doctor_id",
+        counters={
+            "total": (lambda now: Q(), lambda obj, now: True),
+            "this_week": (
+                lambda now: Q(created_at__gte=now - timedelta(days=7)),
+                _created_within(7),
+            ),
+        },
+        activity_field="updated_at",
+    ),
+]
+
+RECENT_REPORTS_LIMIT = 10
+
+
+class DashboardStatsService:
+    """خدمة إحصائيات لوحات التحكم لكل مستأجر"""
+
+    KEY_PREFIX = "dashboard_stats"
+    TIMEOUT = 60 * 60 * 6
+    USER_TENANTS_TIMEOUT = 60 * 60
+
+    @classmethod
+    def snapshot_key(cls, tenant_id):
+        return f"{cls.KEY_PREFIX}:{tenant_id}"
+
+    @classmethod
+    def delta_key(cls, tenant_id, table, counter):
+        return f"{cls.KEY_PREFIX}:{tenant_id}:delta:{table}:{counter}"
+
+    @classmethod
+    def delta_keys(cls, tenant_id):
+        return [
+            cls.delta_key(tenant_id, table.name, counter)
+            for table in STATS_TABLES
+            for counter, (_, predicate) in table.counters.items()
+            if predicate is not None
+        ]
+
+    @classmethod
+    def compute(cls, tenant_ids, now=None):
+        """حساب لقطات الإحصائيات لمجموعة من المستأجرين"""
+        now = now or timezone.now()
+        tenant_ids = list(tenant_ids)
+        snapshots = {
+            tenant_id: {"refreshed_at": now.timestamp()} for tenant_id in tenant_ids
+        }
+        if not tenant_ids:
+            return snapshots
+
+        for table in STATS_TABLES:
+            counts = table.aggregate(tenant_ids, now)
+            empty = dict.fromkeys(table.counters, 0)
+            for tenant_id, snapshot in snapshots.items():
+                snapshot[table.name] = counts.get(tenant_id, empty)
+
+        for tenant_id in tenant_ids:
+            snapshots[tenant_id]["recent_reports"] = cls.recent_reports(tenant_id)
+        return snapshots
+
+    @classmethod
+    def recent_reports(cls, tenant_id):
+        """أحدث التقارير كصفوف مضغوطة (id, title, patient_id, doctor_id, created_at)"""
+        reports = apps.get_model("patient_records.MedicalReport").objects.all()
+        if tenants_enabled():
+            reports = reports.filter(doctor__tenantuser__tenant=tenant_id)
+        rows = (
+            reports.order_by("-created_at")
+            .values_list("id", "title", "patient_id", "doctor_id", "created_at")[
+                :RECENT_REPORTS_LIMIT
+            ]
+        )
+        return [
+            (pk, title, patient_id, doctor_id, created_at.timestamp())
+            for pk, title, patient_id, doctor_id, created_at in rows
+        ]
+
+    @classmethod
+    def refresh(cls, tenant_ids, now=None):
+        """تحديث كامل لإحصائيات المستأجرين وطرح الفروقات التي شملتها اللقطة"""
+        tenant_ids = list(tenant_ids)
+        # تُقرأ الفروقات قبل الحساب فتكون مشمولة في اللقطة، وتُطرح قيمها
+        # بدلاً من حذف المفاتيح حتى لا تضيع الزيادات الواصلة أثناء الحساب
+        deltas = cache.get_many(
+            [key for tenant_id in tenant_ids for key in cls.delta_keys(tenant_id)]
+        )
+        snapshots = cls.compute(tenant_ids, now=now)
+        cache.set_many(
+            {cls.snapshot_key(tenant_id): s for tenant_id, s in snapshots.items()},
+            cls.TIMEOUT,
+        )
+        for key, value in deltas.items():
+            if not value:
+                continue
+            try:
+                cache.decr(key, value)
+            except ValueError:
+                # انتهت صلاحية المفتاح فلا شيء يُطرح منه
+                pass
+        return snapshots
+
+    @classmethod
+    def active_tenant_ids(cls, since):
+        """المستأجرون الذين لديهم نشاط منذ وقت معين"""
+        tenant_ids = set()
+        for table in STATS_TABLES:
+            tenant_ids.update(
+                table.get_model()
+                ._default_manager.filter(**{f"{table.activity_field}__gte": since})
+                .exclude(**{f"{table.tenant_path}__isnull": True})
+                .values_list(table.tenant_path, flat=True)
+                .distinct()
+            )
+        return tenant_ids
+
+    @classmethod
+    def refresh_active_tenants(cls, since=None):
+        """تحديث المستأجرين النشطين فقط مع المستأجرين غير المخزنين"""
+        now = timezone.now()
+        last_run_key = f"{cls.KEY_PREFIX}:last_run"
+        since = since or cache.get(last_run_key) or now - timedelta(days=1)
+        if not tenants_enabled():
+            cls.refresh([GLOBAL_TENANT], now=now)
+            cache.set(last_run_key, now, None)
+            return {GLOBAL_TENANT}
+
+        tenant_model = apps.get_model(TENANT_USER_MODEL)._meta.get_field(
+            "tenant"
+        ).related_model
+        all_ids = list(
+            tenant_model.objects.filter(is_active=True).values_list("id", flat=True)
+        )
+        cached = cache.get_many([cls.snapshot_key(tenant_id) for tenant_id in all_ids])
+        missing = {
+            tenant_id
+            for tenant_id in all_ids
+            if cls.snapshot_key(tenant_id) not in cached
+        }
+        tenant_ids = (cls.active_tenant_ids(since) & set(all_ids)) | missing
+
+        cls.refresh(tenant_ids, now=now)
+        cache.set(last_run_key, now, None)
+        return tenant_ids
+
+    @classmethod
+    def get_stats(cls, tenant_id):
+        """قراءة إحصائيات المستأجر مع دمج الفروقات التزايدية"""
+        snapshot_key = cls.snapshot_key(tenant_id)
+        delta_keys = cls.delta_keys(tenant_id)
+        values = cache.get_many([snapshot_key, *delta_keys])
+
+        snapshot = values.get(snapshot_key)
+        if snapshot is None:
+            return cls.refresh([tenant_id])[tenant_id]
+
+        stats = {
+            key: dict(value) if isinstance(value, dict) else value
+            for key, value in snapshot.items()
+        }
+        for table in STATS_TABLES:
+            for counter in table.counters:
+                delta = values.get(cls.delta_key(tenant_id, table.name, counter))
+                if delta:
+                    stats[table.name][counter] += delta
+        return stats
+
+    @classmethod
+    def tenant_ids_for_user(cls, user_id):
+        """المستأجرون المرتبطون بمستخدم (مخزنة مؤقتاً)"""
+        if not tenants_enabled():
+            return (GLOBAL_TENANT,)
+        key = f"{cls.KEY_PREFIX}:user_tenants:{user_id}"
+        tenant_ids = cache.get(key)
+        if tenant_ids is None:
+            tenant_ids = tuple(
+                apps.get_model(TENANT_USER_MODEL)
+                .objects.filter(user_id=user_id)
+                .values_list("tenant_id", flat=True)
+            )
+            cache.set(key, tenant_ids, cls.USER_TENANTS_TIMEOUT)
+        return tenant_ids
+
+    @classmethod
+    def apply_delta(cls, table, instance, step):
+        """تحديث العدادات تزايدياً عند إنشاء كائن أو حذفه"""
+        now = timezone.now()
+        counters = table.matching_counters(instance, now)
+        if not counters:
+            return
+
+        for tenant_id in cls.tenant_ids_for_user(table.user_attr(instance)):
+            # لا فائدة من الفروقات إذا لم تكن هناك لقطة مخزنة
+            if cache.get(cls.snapshot_key(tenant_id)) is None:
+                continue
+            for counter in counters:
+                key = cls.delta_key(tenant_id, table.name, counter)
+                cache.add(key, 0, cls.TIMEOUT)
+                cache.incr(key, step)
+
+
+def get_stats_table(model):
+    label = model._meta.label
+    for table in STATS_TABLES:
+        if table.model == label:
+            return table
+    return None
@@ -0,0 +1,321 @@
+"""
+الجداول المادية (Materialized Views) المُدارة من التطبيق
+
+تُعرَّف كل جدول مادي في بايثون كاستعلام تجميعي على نموذج مصدر، ثم يُنشأ عبر
+الترحيلات باستخدام العملية ``CreateMaterializedView``. على PostgreSQL يُنشأ
+``MATERIALIZED VIEW`` حقيقي ويُحدَّث بـ ``REFRESH ... CONCURRENTLY``، وعلى باقي
+القواعد (SQLite محلياً) يُحاكى بجدول ملخص يُحدَّث تزايدياً حسب الأيام المتأثرة.
+
+الأيام المتأثرة هي أيام الصفوف المعدلة منذ آخر تحديث، مضافاً إليها الأيام
+المسجلة في ``MaterializedViewDirtyBucket`` عبر الإشارات: اليوم القديم لصف نُقل
+إلى يوم آخر، ويوم الصف المحذوف.
+"""
+
+import time
+from datetime import datetime
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db import transaction
+from django.db.migrations.operations.base import Operation
+from django.db.models import CharField, Count, F, Q, Value
+from django.db.models.functions import Cast, Concat, TruncDate
+from django.utils import timezone
+
+KEY_COLUMN = "key"
+
+
+class MaterializedView:
+    """تعريف جدول مادي تجميعي على نموذج مصدر"""
+
+    def __init__(
+        self,
+        name,
+        model,
+        dimensions,
+        measures,
+        bucket=None,
+        changed_field=None,
+    ):
+        self.name = name
+        self.model = model
+        # الأبعاد: اسم العمود -> اسم حقل في النموذج أو تعبير
+        self.dimensions = dimensions
+        # المقاييس: اسم العمود -> تعبير تجميعي
+        self.measures = measures
+        # (عمود اليوم في الجدول المادي، حقل التاريخ في النموذج المصدر)
+        self.bucket = bucket
+        # حقل يُستخدم لاكتشاف الصفوف المعدلة منذ آخر تحديث
+        self.changed_field = changed_field
+
+    def __repr__(self):
+        return f"<MaterializedView {self.name}>"
+
+    @property
+    def supports_incremental(self):
+        return bool(self.bucket and self.changed_field)
+
+    def get_model(self):
+        return global_apps.get_model(self.model)
+
+    def bucket_of(self, instance):
+        """يوم الصف في الجدول المادي كما تحسبه ``TruncDate``"""
+        value = getattr(instance, self.bucket[1], None)
+        if not isinstance(value, datetime):
+            return value
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+    def mark_dirty(self, days):
+        """تسجيل أيام لإعادة حسابها في التحديث التزايدي القادم"""
+        from core.models import MaterializedViewDirtyBucket
+
+        MaterializedViewDirtyBucket.objects.bulk_create(
+            [
+                MaterializedViewDirtyBucket(view=self.name, day=day)
+                for day in {day for day in days if day is not None}
+            ],
+            ignore_conflicts=True,
+        )
+
+    def get_queryset(self):
+        """بناء الاستعلام التجميعي الذي يُعرّف الجدول"""
+        model = self.get_model()
+        expressions = {
+            name: value
+            for name, value in self.dimensions.items()
+            if not isinstance(value, str)
+        }
+        key_parts = []
+        for name in self.dimensions:
+            if key_parts:
+                key_parts.append(Value(":"))
+            key_parts.append(Cast(F(name), output_field=CharField()))
+        return (
+            model._default_manager.annotate(**expressions)
+            .annotate(**{KEY_COLUMN: Concat(*key_parts, output_field=CharField())})
+            .values(KEY_COLUMN, *self.dimensions)
+            .annotate(**self.measures)
+            .order_by()
+        )
+
+    def compile(self, queryset, connection):
+        """تحويل الاستعلام إلى SQL مع أسماء الأعمدة بترتيبها الفعلي"""
+        compiler = queryset.query.get_compiler(connection=connection)
+        sql, params = compiler.as_sql()
+        columns = [
+            alias or expression.target.column
+            for expression, _, alias in compiler.select
+        ]
+        return sql, params, columns
+
+    def is_emulated(self, connection):
+        """هل يُحاكى الجدول المادي بجدول ملخص عادي"""
+        emulate = getattr(settings, "MATERIALIZED_VIEWS_EMULATE", None)
+        if emulate is not None:
+            return emulate
+        return connection.vendor != "postgresql"
+
+    def create(self, connection):
+        """إنشاء الجدول المادي وتعبئته"""
+        qn = connection.ops.quote_name
+        sql, params, _ = self.compile(self.get_queryset(), connection)
+        kind = "TABLE" if self.is_emulated(connection) else "MATERIALIZED VIEW"
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE {kind} {qn(self.name)} AS {sql}", params)
+            # الفهرس الفريد مطلوب للتحديث المتزامن على PostgreSQL
+            cursor.execute(
+                f"CREATE UNIQUE INDEX {qn(self.name + '_key')} "
+                f"ON {qn(self.name)} ({qn(KEY_COLUMN)})"
+            )
+            if self.bucket:
+                cursor.execute(
+                    f"CREATE INDEX {qn(self.name + '_bucket')} "
+                    f"ON {qn(self.name)} ({qn(self.bucket[0])})"
+                )
+
+    def drop(self, connection):
+        """حذف الجدول المادي"""
+        kind = "TABLE" if self.is_emulated(connection) else "MATERIALIZED VIEW"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DROP {kind} IF EXISTS {connection.ops.quote_name(self.name)}"
+            )
+
+    def refresh(self, since=None, connection=None, concurrently=True):
+        """
+        تحديث الجدول المادي
+
+        يُعيد عدد الأيام المعاد حسابها عند التحديث التزايدي، أو ``None``
+        عند إعادة البناء الكامل.
+        """
+        from core.models import MaterializedViewDirtyBucket
+
+        connection = connection or default_connection
+        qn = connection.ops.quote_name
+        # الأيام المعلقة المقروءة الآن فقط تُحذف بعد التحديث
+        dirty = dict(
+            MaterializedViewDirtyBucket.objects.filter(view=self.name).values_list(
+                "pk", "day"
+            )
+        )
+        consumed = MaterializedViewDirtyBucket.objects.filter(pk__in=list(dirty))
+
+        if not self.is_emulated(connection):
+            mode = " CONCURRENTLY" if concurrently else ""
+            with connection.cursor() as cursor:
+                cursor.execute(f"REFRESH MATERIALIZED VIEW{mode} {qn(self.name)}")
+            consumed.delete()
+            return None
+
+        queryset = self.get_queryset()
+        buckets = None
+        if since is not None and self.supports_incremental:
+            source_field = self.bucket[1]
+            changed = (
+                self.get_model()
+                ._default_manager.filter(**{f"{self.changed_field}__gte": since})
+                .annotate(_bucket=TruncDate(source_field))
+                .values_list("_bucket", flat=True)
+                .distinct()
+            )
+            buckets = sorted(set(changed) | set(dirty.values()))
+            if not buckets:
+                return 0
+            queryset = queryset.filter(**{f"{source_field}__date__in": buckets})
+
+        sql, params, columns = self.compile(queryset, connection)
+        columns = ", ".join(qn(column) for column in columns)
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            if buckets is None:
+                cursor.execute(f"DELETE FROM {qn(self.name)}")
+            else:
+                placeholders = ", ".join(["%s"] * len(buckets))
+                cursor.execute(
+                    f"DELETE FROM {qn(self.name)} "
+                    f"WHERE {qn(self.bucket[0])} IN ({placeholders})",
+                    [connection.ops.adapt_datefield_value(b) for b in buckets],
+                )
+            cursor.execute(
+                f"INSERT INTO {qn(self.name)} ({columns}) {sql}", params
+            )
+            consumed.delete()
+        return None if buckets is None else len(buckets)
+
+
+_registry = {}
+
+
+def register(view):
+    """تسجيل تعريف جدول مادي"""
+    _registry[view.name] = view
+    return view
+
+
+def get_view(name):
+    return _registry[name]
+
+
+def get_views():
+    return list(_registry.values())
+
+
+def refresh_view(name, full=False, concurrently=True):
+    """تحديث جدول مادي وتسجيل وقت آخر تحديث"""
+    from core.models import MaterializedViewState
+
+    view = get_view(name)
+    state, _ = MaterializedViewState.objects.get_or_create(name=name)
+    since = None if full else state.last_refreshed_at
+
+    started_at = timezone.now()
+    started = time.monotonic()
+    buckets = view.refresh(since=since, concurrently=concurrently)
+
+    state.last_refreshed_at = started_at
+    state.last_duration = time.monotonic() - started
+    state.last_refresh_incremental = buckets is not None
+    state.save(
+        update_fields=[
+            "last_refreshed_at",
+            "last_duration",
+            "last_refresh_incremental",
+        ]
+    )
+    return state
+
+
+def refresh_all(full=False, concurrently=True):
+    """تحديث جميع الجداول المادية المسجلة"""
+    return [
+        refresh_view(view.name, full=full, concurrently=concurrently)
+        for view in get_views()
+    ]
+
+
+class CreateMaterializedView(Operation):
+    """عملية ترحيل لإنشاء جدول مادي مسجل"""
+
+    reduces_to_sql = False
+    reversible = True
+
+    def __init__(self, name):
+        self.name = name
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        # يُبنى التعريف من النماذج الحالية لأن التحديث اللاحق يستخدمها أيضاً
+        get_view(self.name).create(schema_editor.connection)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        get_view(self.name).drop(schema_editor.connection)
+
+    def describe(self):
+        return f"Create materialized view {self.name}"
+
+    @property
+    def migration_name_fragment(self):
+        return f"create_{self.name}"
+
+
+# تعريفات الجداول المادية
+
+APPOINTMENT_STATS = register(
+    MaterializedView(
+        name="mv_appointment_stats",
+        model="appointments.Appointment",
+        dimensions={
+            "doctor_id": "doctor_id",
+            "day": TruncDate("appointment_date"),
+        },
+        measures={
+            "total_appointments": Count("id"),
+            "completed_appointments": Count("id", filter=Q(status="completed")),
+            "cancelled_appointments": Count("id", filter=Q(status="cancelled")),
+            "pending_appointments": Count("id", filter=Q(status="pending")),
+        },
+        bucket=("day", "appointment_date"),
+        changed_field="updated_at",
+    )
+)
+
+PATIENT_METRICS = register(
+    MaterializedView(
+        name="mv_patient_metrics",
+        model="patient_records.MedicalVisit",
+        dimensions={
+            "patient_id": "patient_id",
+            "day": TruncDate("visit_date"),
+        },
+        measures={
+            "total_visits": Count("id"),
+            "emergency_visits": Count("id", filter=Q(visit_type="emergency")),
+            "follow_up_visits": Count("id", filter=Q(visit_type="follow_up")),
+            "distinct_doctors": Count("doctor_id", distinct=True),
+        },
+        bucket=("day", "visit_date"),
+        changed_field="created_at",
+    )
+)
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentStats',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('doctor_id', models.BigIntegerField(verbose_name='الطبيب')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('total_appointments', models.IntegerField(verbose_name='إجمالي المواعيد')),
+                ('completed_appointments', models.IntegerField(verbose_name='المواعيد المكتملة')),
+                ('cancelled_appointments', models.IntegerField(verbose_name='المواعيد الملغاة')),
+                ('pending_appointments', models.IntegerField(verbose_name='المواعيد المعلقة')),
+            ],
+            options={
+                'verbose_name': 'إحصائية مواعيد',
+                'verbose_name_plural': 'إحصائيات المواعيد',
+                'db_table': 'mv_appointment_stats',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PatientMetrics',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('patient_id', models.BigIntegerField(verbose_name='المريض')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('total_visits', models.IntegerField(verbose_name='إجمالي الزيارات')),
+                ('emergency_visits', models.IntegerField(verbose_name='زيارات الطوارئ')),
+                ('follow_up_visits', models.IntegerField(verbose_name='زيارات المتابعة')),
+                ('distinct_doctors', models.IntegerField(verbose_name='عدد الأطباء')),
+            ],
+            options={
+                'verbose_name': 'مؤشر مريض',
+                'verbose_name_plural': 'مؤشرات المرضى',
+                'db_table': 'mv_patient_metrics',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MaterializedViewState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='الاسم')),
+                ('last_refreshed_at', models.DateTimeField(blank=True, null=True, verbose_name='آخر تحديث')),
+                ('last_duration', models.FloatField(blank=True, null=True, verbose_name='مدة آخر تحديث (ثانية)')),
+                ('last_refresh_incremental', models.BooleanField(default=False, verbose_name='تحديث تزايدي')),
+            ],
+            options={
+                'verbose_name': 'حالة جدول مادي',
+                'verbose_name_plural': 'حالات الجداول المادية',
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from core.materialized_views import CreateMaterializedView
+
+
+class Migration(migrations.Migration):
+    """
+    إنشاء الجداول المادية المعرفة في core.materialized_views
+    """
+
+    dependencies = [
+        ("core", "0001_initial"),
+        ("appointments", "__first__"),
+        ("patient_records", "0002_followup_insurance_inventory_invoice_medicalvisit_and_more"),
+    ]
+
+    operations = [
+        CreateMaterializedView("mv_appointment_stats"),
+        CreateMaterializedView("mv_patient_metrics"),
+    ]
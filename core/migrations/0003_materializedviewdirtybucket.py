@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_materialized_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterializedViewDirtyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view', models.CharField(max_length=100, verbose_name='الجدول المادي')),
+                ('day', models.DateField(verbose_name='اليوم')),
+            ],
+            options={
+                'verbose_name': 'يوم معلق لجدول مادي',
+                'verbose_name_plural': 'أيام معلقة للجداول المادية',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='materializedviewdirtybucket',
+            constraint=models.UniqueConstraint(fields=('view', 'day'), name='unique_materialized_view_bucket'),
+        ),
+    ]
@@ -1,3 +1,94 @@
-from django.db import models
+from django.db import NotSupportedError, models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+
+class MaterializedViewState(models.Model):
+    """حالة تحديث الجداول المادية"""
+
+    name = models.CharField(max_length=100, unique=True, verbose_name=_("الاسم"))
+    last_refreshed_at = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("آخر تحديث")
+    )
+    last_duration = models.FloatField(
+        null=True, blank=True, verbose_name=_("مدة آخر تحديث (ثانية)")
+    )
+    last_refresh_incremental = models.BooleanField(
+        default=False, verbose_name=_("تحديث تزايدي")
+    )
+
+    class Meta:
+        verbose_name = _("حالة جدول مادي")
+        verbose_name_plural = _("حالات الجداول المادية")
+
+    def __str__(self):
+        return f"{self.name} - {self.last_refreshed_at}"
+
+
+class MaterializedViewDirtyBucket(models.Model):
+    """
+    يوم يحتاج إعادة حساب في جدول مادي، تكتبه الإشارات عند نقل صف مصدر إلى
+    يوم آخر أو حذفه لأن الحقل المعدل لا يدل على اليوم القديم
+    """
+
+    view = models.CharField(max_length=100, verbose_name=_("الجدول المادي"))
+    day = models.DateField(verbose_name=_("اليوم"))
+
+    class Meta:
+        verbose_name = _("يوم معلق لجدول مادي")
+        verbose_name_plural = _("أيام معلقة للجداول المادية")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["view", "day"], name="unique_materialized_view_bucket"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.view} - {self.day}"
+
+
+class MaterializedViewModel(models.Model):
+    """نموذج للقراءة فقط فوق جدول مادي"""
+
+    key = models.CharField(max_length=100, primary_key=True)
+
+    class Meta:
+        abstract = True
+        managed = False
+
+    def save(self, *args, **kwargs):
+        raise NotSupportedError(f"{self.__class__.__name__} للقراءة فقط")
+
+    def delete(self, *args, **kwargs):
+        raise NotSupportedError(f"{self.__class__.__name__} للقراءة فقط")
+
+
+class AppointmentStats(MaterializedViewModel):
+    """إحصائيات المواعيد اليومية لكل طبيب"""
+
+    doctor_id = models.BigIntegerField(verbose_name=_("الطبيب"))
+    day = models.DateField(verbose_name=_("اليوم"))
+    total_appointments = models.IntegerField(verbose_name=_("إجمالي المواعيد"))
+    completed_appointments = models.IntegerField(verbose_name=_("المواعيد المكتملة"))
+    cancelled_appointments = models.IntegerField(verbose_name=_("المواعيد الملغاة"))
+    pending_appointments = models.IntegerField(verbose_name=_("المواعيد المعلقة"))
+
+    class Meta(MaterializedViewModel.Meta):
+        db_table = "mv_appointment_stats"
+        verbose_name = _("إحصائية مواعيد")
+        verbose_name_plural = _("إحصائيات المواعيد")
+
+
+class PatientMetrics(MaterializedViewModel):
+    """مؤشرات الزيارات اليومية لكل مريض"""
+
+    patient_id = models.BigIntegerField(verbose_name=_("المريض"))
+    day = models.DateField(verbose_name=_("اليوم"))
+    total_visits = models.IntegerField(verbose_name=_("إجمالي الزيارات"))
+    emergency_visits = models.IntegerField(verbose_name=_("زيارات الطوارئ"))
+    follow_up_visits = models.IntegerField(verbose_name=_("زيارات المتابعة"))
+    distinct_doctors = models.IntegerField(verbose_name=_("عدد الأطباء"))
+
+    class Meta(MaterializedViewModel.Meta):
+        db_table = "mv_patient_metrics"
+        verbose_name = _("مؤشر مريض")
+        verbose_name_plural = _("مؤشرات المرضى")
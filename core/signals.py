@@ -0,0 +1,98 @@
+"""
+إشارات النظام الأساسي
+"""
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from core.dashboard_stats import STATS_TABLES, DashboardStatsService, get_stats_table
+from core.materialized_views import get_views
+
+
+def update_dashboard_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    """زيادة عدادات لوحة التحكم عند إنشاء كائن"""
+    if not created or raw:
+        return
+    table = get_stats_table(sender)
+    if table is not None:
+        DashboardStatsService.apply_delta(table, instance, 1)
+
+
+def update_dashboard_stats_on_delete(sender, instance, **kwargs):
+    """إنقاص عدادات لوحة التحكم عند حذف كائن"""
+    table = get_stats_table(sender)
+    if table is not None:
+        DashboardStatsService.apply_delta(table, instance, -1)
+
+
+for _table in STATS_TABLES:
+    post_save.connect(
+        update_dashboard_stats_on_save,
+        sender=_table.model,
+        dispatch_uid=f"dashboard_stats_save_{_table.name}",
+    )
+    post_delete.connect(
+        update_dashboard_stats_on_delete,
+        sender=_table.model,
+        dispatch_uid=f"dashboard_stats_delete_{_table.name}",
+    )
+
+
+def _bucketed_views(sender):
+    return [
+        view
+        for view in get_views()
+        if view.bucket and view.get_model() is sender
+    ]
+
+
+def remember_materialized_buckets(sender, instance, raw=False, **kwargs):
+    """حفظ أيام الصف قبل تعديله لإعادة حساب اليوم القديم إن نُقل"""
+    views = _bucketed_views(sender)
+    if raw or instance.pk is None or not views:
+        return
+    previous = sender._default_manager.filter(pk=instance.pk).first()
+    instance._materialized_buckets = {
+        view.name: view.bucket_of(previous) if previous else None for view in views
+    }
+
+
+def mark_materialized_buckets_on_save(sender, instance, created, raw=False, **kwargs):
+    """تعليم اليوم القديم والجديد للصف المعدل"""
+    if created or raw:
+        return
+    previous = getattr(instance, "_materialized_buckets", {})
+    for view in _bucketed_views(sender):
+        view.mark_dirty([previous.get(view.name), view.bucket_of(instance)])
+
+
+def mark_materialized_buckets_on_delete(sender, instance, **kwargs):
+    """تعليم يوم الصف المحذوف"""
+    for view in _bucketed_views(sender):
+        view.mark_dirty([view.bucket_of(instance)])
+
+
+def _bucketed_models():
+    for label in {view.model for view in get_views() if view.bucket}:
+        try:
+            yield apps.get_model(label)
+        except LookupError:
+            continue
+
+
+for _model in _bucketed_models():
+    pre_save.connect(
+        remember_materialized_buckets,
+        sender=_model,
+        dispatch_uid=f"materialized_views_pre_save_{_model._meta.label}",
+    )
+    post_save.connect(
+        mark_materialized_buckets_on_save,
+        sender=_model,
+        dispatch_uid=f"materialized_views_save_{_model._meta.label}",
+    )
+    post_delete.connect(
+        mark_materialized_buckets_on_delete,
+        sender=_model,
+        dispatch_uid=f"materialized_views_delete_{_model._meta.label}",
+    )
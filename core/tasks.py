@@ -5,17 +5,17 @@
 from datetime import timedelta
 
 from celery import shared_task
-from django.core.cache import cache
+from celery.signals import worker_process_init
 from django.db import connection
 from django.utils import timezone
 
 
 @shared_task
-def refresh_materialized_views():
-    """تحديث الجداول المؤقتة"""
-    with connection.cursor() as cursor:
-        cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_appointment_stats")
-        cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_patient_metrics")
+def refresh_materialized_views(full=False):
+    """تحديث الجداول المادية (تزايدياً ما لم يُطلب تحديث كامل)"""
+    from core.materialized_views import refresh_all
+
+    refresh_all(full=full)
 
 
 @shared_task
@@ -28,36 +28,10 @@ def cleanup_old_sessions():
 
 @shared_task
 def cache_common_queries():
-    """تخزين نتائج الاستعلامات الشائعة مؤقتاً"""
-    from core.models import Appointment, Patient
-    from reports.models import MedicalReport
-
-    # إحصائيات المرضى
-    patient_stats = {
-        "total": Patient.objects.count(),
-        "active": Patient.objects.filter(is_active=True).count(),
-        "new_this_month": Patient.objects.filter(
-            created_at__gte=timezone.now() - timedelta(days=30)
-        ).count(),
-    }
-    cache.set("patient_stats", patient_stats, timeout=3600)  # ساعة واحدة
-
-    # إحصائيات المواعيد
-    today = timezone.now().date()
-    appointment_stats = {
-        "today": Appointment.objects.filter(appointment_date__date=today).count(),
-        "pending": Appointment.objects.filter(status="pending").count(),
-        "completed_this_week": Appointment.objects.filter(
-            status="completed", appointment_date__gte=today - timedelta(days=7)
-        ).count(),
-    }
-    cache.set("appointment_stats", appointment_stats, timeout=1800)  # 30 دقيقة
-
-    # التقارير الأخيرة
-    recent_reports = MedicalReport.objects.select_related("patient", "doctor").order_by(
-        "-created_at"
-    )[:10]
-    cache.set("recent_reports", list(recent_reports), timeout=900)  # 15 دقيقة
+    """تحديث إحصائيات لوحات التحكم للمستأجرين النشطين"""
+    from core.dashboard_stats import DashboardStatsService
+
+    DashboardStatsService.refresh_active_tenants()
 
 
 @shared_task
@@ -96,17 +70,50 @@ def cleanup_old_notifications():
     ).delete()
 
 
+SEARCH_INDEXES = ["idx_patient_search", "idx_medical_report_diagnosis"]
+
+
 @shared_task
 def update_search_index():
     """تحديث فهرس البحث"""
+    if connection.vendor != "postgresql":
+        return
+
     with connection.cursor() as cursor:
-        # تحديث فهرس البحث النصي
+        # إعادة بناء فهارس البحث النصي الموجودة فقط
         cursor.execute(
-            """
-            REINDEX INDEX idx_patient_search;
-            REINDEX INDEX idx_medical_report_diagnosis;
-        """
+            "SELECT indexname FROM pg_indexes WHERE indexname = ANY(%s)",
+            [SEARCH_INDEXES],
         )
+        for (index_name,) in cursor.fetchall():
+            cursor.execute(f"REINDEX INDEX {connection.ops.quote_name(index_name)}")
+
+
+@shared_task
+def generate_image_variants(source_name):
+    """توليد مقاسات صورة وتسجيلها في بيان الصور"""
+    from utils.image_pipeline import ImagePipeline
+
+    ImagePipeline().process(source_name)
+
+
+@shared_task
+def render_document(name, object_id, key, user_id=None):
+    """توليد مستند PDF وحفظه في التخزين"""
+    from doctor_syria.core.documents import DocumentRenderer
+
+    return DocumentRenderer.render_job(name, object_id, key, user_id)
+
+
+@worker_process_init.connect
+def warm_document_renderer(**kwargs):
+    """تهيئة خطوط WeasyPrint وأوراق الأنماط مرة واحدة لكل عملية عامل"""
+    from doctor_syria.core.documents import warm
+
+    try:
+        warm()
+    except ImportError:
+        pass
 
 
 # جدولة المهام
@@ -114,13 +121,16 @@ def setup_periodic_tasks(sender, **kwargs):
     """إعداد المهام الدورية"""
     from celery.schedules import crontab
 
-    # تحديث الجداول المؤقتة كل ساعة
+    # تحديث الجداول المادية تزايدياً كل ساعة وكاملاً يومياً
     sender.add_periodic_task(crontab(minute=0), refresh_materialized_views.s())
+    sender.add_periodic_task(
+        crontab(hour=2, minute=30), refresh_materialized_views.s(full=True)
+    )
 
     # تنظيف الجلسات القديمة يومياً
     sender.add_periodic_task(crontab(hour=2, minute=0), cleanup_old_sessions.s())
 
-    # تخزين الاستعلامات الشائعة كل 30 دقيقة
+    # تحديث إحصائيات لوحات التحكم للمستأجرين النشطين كل 30 دقيقة
     sender.add_periodic_task(30 * 60, cache_common_queries.s())
 
     # تحسين قاعدة البيانات أسبوعياً
@@ -133,3 +143,13 @@ def setup_periodic_tasks(sender, **kwargs):
 
     # تحديث فهرس البحث يومياً
     sender.add_periodic_task(crontab(hour=4, minute=0), update_search_index.s())
+
+    # إعادة إدخال سجلات التدقيق المحفوظة على القرص كل 10 دقائق
+    from security.tasks import replay_audit_spill
+
+    sender.add_periodic_task(10 * 60, replay_audit_spill.s())
+
+    # كتابة نشاط المستخدمين المؤجل كل دقيقة
+    from accounts.tasks import flush_user_activity
+
+    sender.add_periodic_task(60, flush_user_activity.s())
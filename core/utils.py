@@ -2,10 +2,6 @@
 Utility functions for optimizing image and file loading
 """
 
-import os
-
-from django.conf import settings
-from django.core.cache import cache
 from PIL import Image
 
 
@@ -35,54 +31,26 @@ def optimize_image(image_path, quality=85):
 
 def get_cached_image_url(image_field, size="medium"):
     """
-    الحصول على رابط الصورة المخزنة مؤقتاً
+    الحصول على رابط الصورة المصغرة من بيان الصور دون الوصول إلى نظام الملفات
     """
-    if not image_field:
-        return None
-
-    cache_key = f"image_url_{image_field.name}_{size}"
-    cached_url = cache.get(cache_key)
+    from utils.image_pipeline import get_variant_url
 
-    if cached_url:
-        return cached_url
-
-    # إنشاء نسخة مصغرة إذا لم تكن موجودة
-    try:
-        img_url = create_thumbnail(image_field, size)
-        cache.set(cache_key, img_url, timeout=settings.CACHE_TTL)
-        return img_url
-    except Exception as e:
-        print(f"Error creating thumbnail: {str(e)}")
-        return image_field.url
+    return get_variant_url(image_field, size)
 
 
 def create_thumbnail(image_field, size="medium"):
     """
-    إنشاء نسخة مصغرة من الصورة
+    إنشاء النسخ المصغرة من الصورة (جميع المقاسات من فك ترميز واحد)
     """
-    sizes = {"small": (100, 100), "medium": (300, 300), "large": (600, 600)}
+    from utils.image_pipeline import ImagePipeline
 
-    if size not in sizes:
-        size = "medium"
+    if not image_field:
+        return None
 
     try:
-        img = Image.open(image_field.path)
-        output_size = sizes[size]
-        img.thumbnail(output_size)
-
-        # إنشاء مسار للنسخة المصغرة
-        filename = os.path.basename(image_field.name)
-        thumbnail_name = f"thumb_{size}_{filename}"
-        thumbnail_path = os.path.join(settings.MEDIA_ROOT, "thumbnails", thumbnail_name)
-
-        # التأكد من وجود مجلد النسخ المصغرة
-        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
-
-        # حفظ النسخة المصغرة
-        img.save(thumbnail_path, quality=85, optimize=True)
-
-        # إرجاع الرابط النسبي
-        return os.path.join(settings.MEDIA_URL, "thumbnails", thumbnail_name)
+        entry = ImagePipeline().process(image_field.name)
+        variants = entry["variants"]
+        return variants.get(size) or variants["medium"]
     except Exception as e:
         print(f"Error in create_thumbnail: {str(e)}")
         return image_field.url
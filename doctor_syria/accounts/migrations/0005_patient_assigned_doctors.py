@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0004_alter_user_options_alter_user_managers_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patient",
+            name="assigned_doctors",
+            field=models.ManyToManyField(
+                blank=True, related_name="assigned_patients", to="accounts.doctor"
+            ),
+        ),
+    ]
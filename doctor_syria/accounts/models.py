@@ -298,6 +298,9 @@ class Patient(models.Model):
     blood_type = models.CharField(max_length=5, blank=True)
     allergies = models.TextField(blank=True)
     chronic_diseases = models.TextField(blank=True)
+    assigned_doctors = models.ManyToManyField(
+        Doctor, blank=True, related_name="assigned_patients"
+    )
 
     def __str__(self):
         return self.user.get_full_name()
@@ -7,6 +7,10 @@ from django.urls import reverse_lazy
 from django.views.generic import CreateView, DetailView, View
 from PIL import Image
 
+from medical_records.access import RecordAccessIndex
+from medical_records.models import MedicalRecord
+from medical_records.symptoms import SymptomIndex
+
 from .models import AIAnalysis, DrugInteraction, ImageAnalysis
 
 
@@ -27,11 +31,28 @@ class AIAnalysisCreateView(LoginRequiredMixin, CreateView):
     def perform_ai_analysis(self, input_data):
         # This is a placeholder for actual AI analysis
         # In a real implementation, we would load a trained model and use it
-        return {
+        results = {
             "prediction": "Sample prediction",
             "confidence": 0.95,
             "recommendations": ["Recommendation 1", "Recommendation 2"],
         }
+        symptoms = input_data.get("symptoms") if isinstance(input_data, dict) else None
+        if symptoms:
+            # الحالات السابقة المشابهة من السجلات التي يحق للمستخدم رؤيتها
+            results["similar_cases"] = SymptomIndex.similar(
+                symptoms, records=self.permitted_records()
+            )
+        return results
+
+    def permitted_records(self):
+        user = self.request.user
+        if hasattr(user, "doctor"):
+            return RecordAccessIndex.filter_queryset(
+                MedicalRecord.objects.all(), user.doctor
+            )
+        elif hasattr(user, "patient"):
+            return MedicalRecord.objects.filter(patient=user.patient)
+        return MedicalRecord.objects.none()
 
 
 class ImageAnalysisCreateView(LoginRequiredMixin, CreateView):
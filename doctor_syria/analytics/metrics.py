@@ -0,0 +1,205 @@
+"""
+محرك مقاييس لوحة التحكم
+
+تُحسب عدادات كل جدول باستعلام تجميع واحد (``Count`` مع ``filter``)، وتُنفذ
+استعلامات الجداول المختلفة بالتوازي على مجموعة خيوط. تُخزن اللقطة المجمعة
+مؤقتاً لمدة قصيرة ويُحدّثها طلب واحد فقط عند انتهائها (بينما تُخدم اللقطة
+السابقة للبقية)، وتُحفظ اللقطات الأخيرة بإصداراتها حتى يجلب العميل التغييرات
+منذ آخر لقطة لديه فقط.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from appointments.models import Appointment
+from laboratory.models import LabTest, TestRequest
+from pharmacy.models import Medicine
+from users.models import Doctor, Patient
+
+DEFAULT_SETTINGS = {
+    # مدة صلاحية اللقطة قبل إعادة حسابها (ثوان)
+    "CACHE_TTL": 30,
+    # مدة الاحتفاظ باللقطات السابقة لحساب الفروق
+    "HISTORY_TTL": 60 * 30,
+    "LOCK_TIMEOUT": 15,
+    "WORKERS": 4,
+}
+
+
+def get_dashboard_setting(name):
+    return getattr(settings, "ANALYTICS_DASHBOARD_SETTINGS", {}).get(
+        name, DEFAULT_SETTINGS[name]
+    )
+
+
+def count_where(queryset, **counters):
+    """عدة عدادات على استعلام واحد؛ القيمة None تعني عدّ جميع الصفوف"""
+    return queryset.aggregate(
+        **{
+            name: Count("pk", filter=condition) if condition is not None else Count("pk")
+            for name, condition in counters.items()
+        }
+    )
+
+
+def run_concurrently(jobs, workers=None):
+    """تنفيذ دوال مستقلة بالتوازي وإرجاع نتائجها بأسمائها"""
+
+    def run(job):
+        try:
+            return job()
+        finally:
+            # لكل خيط اتصاله بقاعدة البيانات
+            connections.close_all()
+
+    workers = workers or get_dashboard_setting("WORKERS")
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        futures = {name: executor.submit(run, job) for name, job in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+class MetricSource(NamedTuple):
+    section: str
+    model: type
+    # دالة تأخذ الوقت الحالي وتُرجع {اسم العداد: شرط أو None}
+    counters: Callable
+
+
+DASHBOARD_SOURCES = (
+    MetricSource(
+        "users",
+        Patient,
+        lambda now: {
+            "total_patients": None,
+            "new_patients": Q(created_at__gte=now - timedelta(days=30)),
+        },
+    ),
+    MetricSource("users", Doctor, lambda now: {"total_doctors": None}),
+    MetricSource(
+        "appointments",
+        Appointment,
+        lambda now: {
+            "total": None,
+            "pending": Q(status="pending"),
+            "today": Q(date=now.date()),
+        },
+    ),
+    MetricSource("laboratory", LabTest, lambda now: {"total_tests": None}),
+    MetricSource("laboratory", TestRequest, lambda now: {"pending_tests": Q(status="pending")}),
+    MetricSource(
+        "pharmacy",
+        Medicine,
+        lambda now: {
+            "total_medicines": None,
+            "low_stock": Q(quantity__lte=F("minimum_stock")),
+        },
+    ),
+)
+
+
+def diff(old, new):
+    """المقاييس التي تغيرت قيمها بين لقطتين، مجمعة بالأقسام"""
+    changes = {}
+    for section, values in new.items():
+        previous = old.get(section, {})
+        changed = {
+            name: value
+            for name, value in values.items()
+            if name not in previous or previous[name] != value
+        }
+        if changed:
+            changes[section] = changed
+    return changes
+
+
+class DashboardMetrics:
+    """لقطات مقاييس لوحة التحكم المخزنة مؤقتاً"""
+
+    CACHE_KEY = "analytics_dashboard"
+    sources = DASHBOARD_SOURCES
+
+    @classmethod
+    def version_key(cls, version):
+        return f"{cls.CACHE_KEY}:v:{version}"
+
+    @classmethod
+    def compute(cls):
+        now = timezone.now()
+        jobs = {
+            index: (
+                lambda source=source: count_where(
+                    source.model._default_manager.all(), **source.counters(now)
+                )
+            )
+            for index, source in enumerate(cls.sources)
+        }
+        results = run_concurrently(jobs)
+        metrics = {}
+        for index, source in enumerate(cls.sources):
+            metrics.setdefault(source.section, {}).update(results[index])
+        return metrics
+
+    @classmethod
+    def refresh(cls):
+        """حساب لقطة جديدة وتخزينها"""
+        snapshot = {
+            # إصدار متزايد بالمللي ثانية يكفي لترتيب اللقطات
+            "version": int(time.time() * 1000),
+            "generated_at": timezone.now().isoformat(),
+            "metrics": cls.compute(),
+        }
+        snapshot["expires"] = time.time() + get_dashboard_setting("CACHE_TTL")
+        history_ttl = get_dashboard_setting("HISTORY_TTL")
+        cache.set(cls.version_key(snapshot["version"]), snapshot["metrics"], history_ttl)
+        cache.set(cls.CACHE_KEY, snapshot, history_ttl)
+        return snapshot
+
+    @classmethod
+    def snapshot(cls):
+        """
+        اللقطة الحالية؛ عند انتهاء صلاحيتها يحسبها طلب واحد بينما تُرجع
+        اللقطة السابقة لباقي الطلبات
+        """
+        snapshot = cache.get(cls.CACHE_KEY)
+        if snapshot is not None and snapshot["expires"] > time.time():
+            return snapshot
+
+        lock_key = f"{cls.CACHE_KEY}:lock"
+        lock_timeout = get_dashboard_setting("LOCK_TIMEOUT")
+        if cache.add(lock_key, True, lock_timeout):
+            try:
+                return cls.refresh()
+            finally:
+                cache.delete(lock_key)
+        if snapshot is not None:
+            return snapshot
+
+        # لا لقطة سابقة: انتظار الطلب الذي يحسبها
+        deadline = time.time() + lock_timeout
+        while time.time() < deadline:
+            time.sleep(0.05)
+            snapshot = cache.get(cls.CACHE_KEY)
+            if snapshot is not None:
+                return snapshot
+        return cls.refresh()
+
+    @classmethod
+    def delta(cls, since):
+        """التغييرات منذ الإصدار ``since``، أو اللقطة كاملة إن لم يعد متاحاً"""
+        snapshot = cls.snapshot()
+        response = {
+            "version": snapshot["version"],
+            "generated_at": snapshot["generated_at"],
+        }
+        previous = cache.get(cls.version_key(since)) if since is not None else None
+        if previous is None:
+            return {**response, "full": True, "changes": snapshot["metrics"]}
+        return {**response, "full": False, "changes": diff(previous, snapshot["metrics"])}
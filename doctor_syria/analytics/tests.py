@@ -0,0 +1,92 @@
+import time
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.test import TestCase, override_settings
+
+from accounts.models import User
+
+from analytics.metrics import DashboardMetrics, count_where, diff
+
+
+class CountWhereTests(TestCase):
+    def test_counters_share_one_query(self):
+        for index, user_type in enumerate(["doctor", "doctor", "patient"]):
+            User.objects.create(email=f"user{index}@example.com", user_type=user_type)
+
+        with self.assertNumQueries(1):
+            counts = count_where(
+                User.objects.all(),
+                total=None,
+                doctors=Q(user_type="doctor"),
+                labs=Q(user_type="lab"),
+            )
+        self.assertEqual(counts, {"total": 3, "doctors": 2, "labs": 0})
+
+
+class FakeMetrics(DashboardMetrics):
+    CACHE_KEY = "test_dashboard"
+    values = {}
+    computed = 0
+
+    @classmethod
+    def compute(cls):
+        cls.computed += 1
+        return {section: dict(counters) for section, counters in cls.values.items()}
+
+
+@override_settings(ANALYTICS_DASHBOARD_SETTINGS={"CACHE_TTL": 60})
+class DashboardMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        FakeMetrics.computed = 0
+        FakeMetrics.values = {
+            "users": {"total_patients": 10, "total_doctors": 2},
+            "appointments": {"pending": 4},
+        }
+
+    def expire(self):
+        snapshot = cache.get(FakeMetrics.CACHE_KEY)
+        snapshot["expires"] = time.time() - 1
+        cache.set(FakeMetrics.CACHE_KEY, snapshot)
+
+    def test_snapshot_is_cached_until_it_expires(self):
+        first = FakeMetrics.snapshot()
+        self.assertEqual(FakeMetrics.snapshot(), first)
+        self.assertEqual(FakeMetrics.computed, 1)
+
+        self.expire()
+        FakeMetrics.values["appointments"]["pending"] = 5
+        refreshed = FakeMetrics.snapshot()
+        self.assertEqual(FakeMetrics.computed, 2)
+        self.assertEqual(refreshed["metrics"]["appointments"]["pending"], 5)
+
+    def test_only_lock_holder_recomputes_expired_snapshot(self):
+        stale = FakeMetrics.snapshot()
+        self.expire()
+        # طلب آخر يحسب اللقطة الآن
+        cache.add(f"{FakeMetrics.CACHE_KEY}:lock", True)
+
+        self.assertEqual(FakeMetrics.snapshot()["version"], stale["version"])
+        self.assertEqual(FakeMetrics.computed, 1)
+
+    def test_delta_returns_changed_counters_since_version(self):
+        first = FakeMetrics.refresh()
+        time.sleep(0.002)
+        FakeMetrics.values["users"]["total_patients"] = 11
+        second = FakeMetrics.refresh()
+
+        delta = FakeMetrics.delta(first["version"])
+        self.assertEqual(delta["version"], second["version"])
+        self.assertFalse(delta["full"])
+        self.assertEqual(delta["changes"], {"users": {"total_patients": 11}})
+
+        unknown = FakeMetrics.delta(1)
+        self.assertTrue(unknown["full"])
+        self.assertEqual(unknown["changes"], second["metrics"])
+
+    def test_diff_reports_new_and_changed_values(self):
+        self.assertEqual(
+            diff({"a": {"x": 1, "y": 2}}, {"a": {"x": 1, "y": 3}, "b": {"z": 0}}),
+            {"a": {"y": 3}, "b": {"z": 0}},
+        )
@@ -7,11 +7,12 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from appointments.models import Appointment
-from laboratory.models import LabTest, TestRequest
+from laboratory.models import TestRequest
 from medical_records.models import MedicalRecord, Prescription
 from pharmacy.models import Medicine, Order
 from users.models import User, Doctor, Patient
 
+from .metrics import DashboardMetrics
 from .serializers import (
     AppointmentAnalyticsSerializer,
     LabAnalyticsSerializer,
@@ -27,53 +28,25 @@ class DashboardViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated, IsAdminOrAnalyst]
 
     def list(self, request):
-        """إحصائيات عامة للوحة التحكم"""
-        today = timezone.now()
-        last_month = today - timedelta(days=30)
-        
-        # إحصائيات المستخدمين
-        total_patients = Patient.objects.count()
-        total_doctors = Doctor.objects.count()
-        new_patients = Patient.objects.filter(created_at__gte=last_month).count()
-        
-        # إحصائيات المواعيد
-        total_appointments = Appointment.objects.count()
-        pending_appointments = Appointment.objects.filter(status='pending').count()
-        today_appointments = Appointment.objects.filter(
-            date=today.date()
-        ).count()
-        
-        # إحصائيات المختبر
-        total_tests = LabTest.objects.count()
-        pending_tests = TestRequest.objects.filter(status='pending').count()
-        
-        # إحصائيات الصيدلية
-        total_medicines = Medicine.objects.count()
-        low_stock_medicines = Medicine.objects.filter(
-            quantity__lte=F('minimum_stock')
-        ).count()
-        
+        """إحصائيات عامة للوحة التحكم من اللقطة المخزنة مؤقتاً"""
+        snapshot = DashboardMetrics.snapshot()
         return Response({
-            'users': {
-                'total_patients': total_patients,
-                'total_doctors': total_doctors,
-                'new_patients': new_patients
-            },
-            'appointments': {
-                'total': total_appointments,
-                'pending': pending_appointments,
-                'today': today_appointments
-            },
-            'laboratory': {
-                'total_tests': total_tests,
-                'pending_tests': pending_tests
-            },
-            'pharmacy': {
-                'total_medicines': total_medicines,
-                'low_stock': low_stock_medicines
-            }
+            **snapshot['metrics'],
+            'version': snapshot['version'],
+            'generated_at': snapshot['generated_at']
         })
 
+    @action(detail=False)
+    def delta(self, request):
+        """المقاييس التي تغيرت منذ إصدار اللقطة ``since`` لدى العميل"""
+        since = request.query_params.get('since')
+        if since is not None and not since.isdigit():
+            return Response(
+                {'error': 'إصدار اللقطة غير صالح'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(DashboardMetrics.delta(int(since) if since else None))
+
 
 class AppointmentAnalyticsViewSet(viewsets.ViewSet):
     """ViewSet لتحليلات المواعيد"""
@@ -0,0 +1,261 @@
+"""
+توليد مستندات PDF في الخلفية مع تخزينها حسب محتواها
+
+يُحسب لكل مستند مفتاح من بصمة مصادره (``updated_at`` عادةً) وإصدار القالب،
+فيُخدم الطلب المتكرر مباشرة من التخزين دون إعادة التوليد، وتُولّد المستندات
+الجديدة في مهمة Celery بإعدادات خطوط وأوراق أنماط WeasyPrint مهيأة مرة واحدة
+لكل عامل. يُعرف انتهاء التوليد بإعادة الطلب (202 حتى الجاهزية) أو بإشعار
+WebSocket لمجموعة المستخدم.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+from typing import Callable, NamedTuple, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse
+from django.template.loader import render_to_string
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "ASYNC": True,
+    "STORAGE_DIR": "documents",
+    # يُرفع عند تغيير قوالب المستندات أو أنماطها لإبطال النسخ المخزنة
+    "TEMPLATE_VERSION": "1",
+    "STATUS_TIMEOUT": 60 * 60,
+    "STYLESHEETS": [],
+    "BASE_URL": None,
+    "NOTIFY_GROUP": "user_{user_id}_notifications",
+}
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+
+def get_document_setting(name):
+    return getattr(settings, "DOCUMENT_RENDERING_SETTINGS", {}).get(
+        name, DEFAULT_SETTINGS[name]
+    )
+
+
+def updated_at_fingerprint(obj):
+    return [obj._meta.label, obj.pk, getattr(obj, "updated_at", None)]
+
+
+class DocumentType(NamedTuple):
+    name: str
+    model: type
+    template: str
+    # دالة تُرجع سياق القالب للكائن
+    context: Callable
+    filename: Callable
+    # قيم تتغير كلما تغير محتوى المستند
+    fingerprint: Callable = updated_at_fingerprint
+    version: str = "1"
+    stylesheets: Tuple[str, ...] = ()
+
+
+DOCUMENT_TYPES = {}
+
+
+def register(document_type):
+    DOCUMENT_TYPES[document_type.name] = document_type
+    return document_type
+
+
+@functools.lru_cache(maxsize=None)
+def font_config():
+    try:
+        from weasyprint.text.fonts import FontConfiguration
+    except ImportError:
+        from weasyprint.fonts import FontConfiguration
+    return FontConfiguration()
+
+
+@functools.lru_cache(maxsize=None)
+def load_stylesheets(paths):
+    from weasyprint import CSS
+
+    return tuple(CSS(filename=path, font_config=font_config()) for path in paths)
+
+
+def stylesheet_paths(document_type=None):
+    extra = document_type.stylesheets if document_type else ()
+    return (*get_document_setting("STYLESHEETS"), *extra)
+
+
+def warm():
+    """تهيئة الخطوط وأوراق الأنماط مسبقاً (عند بدء عامل Celery)"""
+    load_stylesheets(stylesheet_paths())
+    for document_type in DOCUMENT_TYPES.values():
+        load_stylesheets(stylesheet_paths(document_type))
+
+
+def write_pdf(html, paths=None):
+    """تحويل HTML إلى PDF بالإعدادات المهيأة"""
+    from weasyprint import HTML
+
+    paths = stylesheet_paths() if paths is None else tuple(paths)
+    return HTML(string=html, base_url=get_document_setting("BASE_URL")).write_pdf(
+        stylesheets=list(load_stylesheets(paths)), font_config=font_config()
+    )
+
+
+class DocumentRenderer:
+    """طلب المستندات وتوليدها وخدمتها من التخزين"""
+
+    STATUS_PREFIX = "document_status"
+
+    @classmethod
+    def get_type(cls, name):
+        try:
+            return DOCUMENT_TYPES[name]
+        except KeyError:
+            raise ValueError(f"نوع مستند غير معروف: {name}") from None
+
+    @classmethod
+    def key(cls, document_type, obj):
+        payload = json.dumps(
+            [
+                document_type.name,
+                document_type.version,
+                get_document_setting("TEMPLATE_VERSION"),
+                document_type.fingerprint(obj),
+            ],
+            cls=DjangoJSONEncoder,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @classmethod
+    def path(cls, document_type, key):
+        directory = get_document_setting("STORAGE_DIR")
+        return f"{directory}/{document_type.name}/{key}.pdf"
+
+    @classmethod
+    def status_key(cls, key):
+        return f"{cls.STATUS_PREFIX}:{key}"
+
+    @classmethod
+    def describe(cls, document_type, obj, key, state):
+        return {
+            "status": state,
+            "key": key,
+            "document_type": document_type.name,
+            "object_id": obj.pk,
+            "filename": document_type.filename(obj),
+        }
+
+    @classmethod
+    def request(cls, name, obj, user_id=None):
+        """
+        حالة المستند بعد طلبه: ``ready`` إن كان مخزناً، وإلا تُجدول مهمة
+        توليد واحدة (تُتجاهل الطلبات المكررة أثناء التوليد)
+        """
+        document_type = cls.get_type(name)
+        key = cls.key(document_type, obj)
+        if default_storage.exists(cls.path(document_type, key)):
+            return cls.describe(document_type, obj, key, READY)
+
+        if not get_document_setting("ASYNC"):
+            cls.render(document_type, obj, key)
+            return cls.describe(document_type, obj, key, READY)
+
+        from core.tasks import render_document
+
+        timeout = get_document_setting("STATUS_TIMEOUT")
+        state = {"status": PENDING}
+        if not cache.add(cls.status_key(key), state, timeout):
+            state = cache.get(cls.status_key(key)) or state
+            if state["status"] != FAILED:
+                return cls.describe(document_type, obj, key, state["status"])
+            # إعادة المحاولة بعد فشل سابق
+            state = {"status": PENDING}
+            cache.set(cls.status_key(key), state, timeout)
+        render_document.delay(name, obj.pk, key, user_id)
+        return cls.describe(document_type, obj, key, PENDING)
+
+    @classmethod
+    def render(cls, document_type, obj, key=None):
+        """توليد المستند وحفظه في التخزين، ويُرجع مساره"""
+        key = key or cls.key(document_type, obj)
+        path = cls.path(document_type, key)
+        if not default_storage.exists(path):
+            html = render_to_string(document_type.template, document_type.context(obj))
+            pdf = write_pdf(html, stylesheet_paths(document_type))
+            saved = default_storage.save(path, ContentFile(pdf))
+            if saved != path:
+                # عاملان ولّدا المستند نفسه في آن واحد
+                default_storage.delete(saved)
+        cache.set(
+            cls.status_key(key),
+            {"status": READY},
+            get_document_setting("STATUS_TIMEOUT"),
+        )
+        return path
+
+    @classmethod
+    def render_job(cls, name, object_id, key, user_id=None):
+        """جسم مهمة التوليد: التوليد ثم إشعار المستخدم بالنتيجة"""
+        document_type = cls.get_type(name)
+        obj = document_type.model._default_manager.get(pk=object_id)
+        try:
+            cls.render(document_type, obj, key)
+            state = READY
+        except Exception:
+            logger.exception("فشل توليد المستند %s/%s", name, object_id)
+            cache.set(
+                cls.status_key(key),
+                {"status": FAILED},
+                get_document_setting("STATUS_TIMEOUT"),
+            )
+            state = FAILED
+        if user_id is not None:
+            cls.notify(user_id, cls.describe(document_type, obj, key, state))
+        return state
+
+    @classmethod
+    def read(cls, name, obj):
+        """محتوى المستند (يُولّد عند غيابه، للاستخدام داخل المهام)"""
+        document_type = cls.get_type(name)
+        with default_storage.open(cls.render(document_type, obj)) as document:
+            return document.read()
+
+    @classmethod
+    def notify(cls, user_id, document):
+        try:
+            from asgiref.sync import async_to_sync
+            from channels.layers import get_channel_layer
+        except ImportError:
+            return
+        layer = get_channel_layer()
+        if layer is None:
+            return
+        group = get_document_setting("NOTIFY_GROUP").format(user_id=user_id)
+        async_to_sync(layer.group_send)(
+            group,
+            {"type": "notification", "message": {"event": "document", **document}},
+        )
+
+    @classmethod
+    def response(cls, name, obj, request):
+        """ملف المستند إن كان جاهزاً، وإلا 202 بحالة التوليد لإعادة الطلب لاحقاً"""
+        document = cls.request(name, obj, user_id=request.user.pk)
+        if document["status"] != READY:
+            return Response(document, status=status.HTTP_202_ACCEPTED)
+        document_type = cls.get_type(name)
+        return FileResponse(
+            default_storage.open(cls.path(document_type, document["key"])),
+            as_attachment=True,
+            filename=document["filename"],
+            content_type="application/pdf",
+        )
@@ -0,0 +1,206 @@
+"""
+تحسين استعلامات ViewSets من حقول المسلسل
+
+تُمشى حقول المسلسل ومصادرها مرة واحدة لكل صنف مسلسل (عند تعريف الـ ViewSet
+إن كان ذلك ممكناً) لاستخراج مسارات ``select_related`` و``prefetch_related``
+والأعمدة اللازمة لـ ``only()``، ثم تُطبق تلقائياً على ناتج ``get_queryset``
+فيبقى عدد الاستعلامات ثابتاً مهما كان حجم الصفحة.
+"""
+
+import functools
+import re
+from typing import NamedTuple, Optional, Tuple
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import permissions, serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+DISPLAY_METHOD = re.compile(r"get_(\w+)_display")
+
+
+def join(path, name):
+    return f"{path}{LOOKUP_SEP}{name}" if path else name
+
+
+class QueryPlan(NamedTuple):
+    model: type
+    select_related: Tuple[str, ...]
+    prefetch_related: Tuple[str, ...]
+    # None يعني تحميل جميع أعمدة النموذج الأساسي
+    only: Optional[Tuple[str, ...]]
+
+    def apply(self, queryset, restrict_columns=True):
+        if queryset.model is not self.model:
+            return queryset
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if restrict_columns and self.only is not None:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+class PlanBuilder:
+    """جمع مسارات العلاقات والأعمدة أثناء المشي على حقول المسلسل"""
+
+    def __init__(self):
+        self.select = set()
+        self.prefetch = set()
+        self.columns = set()
+        # مسارات تحتاج جميع أعمدتها (خصائص أو دوال غير معروفة)
+        self.full = set()
+
+    def walk(self, serializer, model, path="", prefetching=False):
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            if field.source == "*":
+                if isinstance(field, serializers.BaseSerializer):
+                    self.walk(nested(field), model, path, prefetching)
+                else:
+                    self.full.add(path)
+                continue
+            self.follow(field, model, path, prefetching)
+
+    def relation(self, model, attr):
+        try:
+            return model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            if attr.endswith("_set"):
+                # مُوصل العلاقة العكسية دون related_name
+                try:
+                    return model._meta.get_field(attr[: -len("_set")])
+                except FieldDoesNotExist:
+                    pass
+            return None
+
+    def follow(self, field, model, path, prefetching):
+        attrs = field.source_attrs
+        for index, attr in enumerate(attrs):
+            last = index == len(attrs) - 1
+            model_field = self.relation(model, attr)
+
+            if model_field is None:
+                display = DISPLAY_METHOD.fullmatch(attr)
+                if display and self.relation(model, display.group(1)) is not None:
+                    self.add_column(path, display.group(1), prefetching)
+                else:
+                    self.full.add(path)
+                return
+
+            if not model_field.is_relation:
+                self.add_column(path, attr, prefetching)
+                return
+
+            related_path = join(path, attr)
+            many = model_field.many_to_many or model_field.one_to_many
+
+            if last and isinstance(field, ManyRelatedField):
+                self.prefetch.add(related_path)
+                return
+            if last and pk_only(field) and model_field.concrete and not many:
+                # PrimaryKeyRelatedField يقرأ عمود المفتاح فقط دون ربط
+                self.add_column(path, attr, prefetching)
+                return
+
+            if prefetching or many:
+                self.prefetch.add(related_path)
+                prefetching = True
+            else:
+                self.select.add(related_path)
+                # العلاقة المربوطة لا يجوز تأجيلها في only()
+                self.add_column(path, attr, prefetching)
+
+            model = model_field.related_model
+            path = related_path
+            if last:
+                if isinstance(field, serializers.BaseSerializer):
+                    self.walk(nested(field), model, path, prefetching)
+                else:
+                    self.full.add(path)
+
+    def add_column(self, path, name, prefetching):
+        # الاستعلامات المجلوبة مسبقاً تُحمّل كاملة
+        if not prefetching:
+            self.columns.add(join(path, name))
+
+    def only(self):
+        if "" in self.full:
+            return None
+
+        def covered(column):
+            return any(
+                column.startswith(join(path, "")) for path in self.full if path
+            )
+
+        return tuple(sorted(column for column in self.columns if not covered(column)))
+
+
+def nested(field):
+    return field.child if isinstance(field, serializers.ListSerializer) else field
+
+
+def pk_only(field):
+    return (
+        isinstance(field, RelatedField)
+        and hasattr(field, "use_pk_only_optimization")
+        and field.use_pk_only_optimization()
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def query_plan(serializer_class):
+    """خطة الاستعلام لصنف مسلسل (تُحسب مرة واحدة)، أو None لغير مسلسلات النماذج"""
+    model = getattr(getattr(serializer_class, "Meta", None), "model", None)
+    if model is None:
+        return None
+    builder = PlanBuilder()
+    builder.walk(serializer_class(), model)
+    return QueryPlan(
+        model,
+        tuple(sorted(builder.select)),
+        tuple(sorted(builder.prefetch)),
+        builder.only(),
+    )
+
+
+def optimized(get_queryset):
+    @functools.wraps(get_queryset)
+    def wrapper(self, *args, **kwargs):
+        return self.optimize_queryset(get_queryset(self, *args, **kwargs))
+
+    wrapper.optimized = True
+    return wrapper
+
+
+class OptimizedQuerysetMixin:
+    """
+    تطبيق خطة الاستعلام المستخرجة من المسلسل على ``get_queryset`` تلقائياً
+
+    يُغلّف ``get_queryset`` المعرّف في الصنف الفرعي نفسه، فلا حاجة لاستدعاء
+    ``super()``. تُقصر الأعمدة بـ ``only()`` في الطلبات الآمنة فقط حتى لا
+    تتأثر عمليات الحفظ بالحقول المؤجلة.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        get_queryset = cls.__dict__.get("get_queryset")
+        if get_queryset is not None and not getattr(get_queryset, "optimized", False):
+            cls.get_queryset = optimized(get_queryset)
+        serializer_class = cls.__dict__.get("serializer_class")
+        if serializer_class is not None and apps.ready:
+            query_plan(serializer_class)
+
+    def get_queryset(self):
+        return self.optimize_queryset(super().get_queryset())
+
+    def optimize_queryset(self, queryset):
+        plan = query_plan(self.get_serializer_class())
+        if plan is None:
+            return queryset
+        request = getattr(self, "request", None)
+        safe = request is not None and request.method in permissions.SAFE_METHODS
+        return plan.apply(queryset, restrict_columns=safe)
@@ -0,0 +1,312 @@
+"""
+ترقيم بمفاتيح الترتيب (keyset) للقوائم الكبيرة
+
+تُحدد الصفحة بقيم حقول الترتيب في آخر صف مع المفتاح الأساسي لكسر التعادل،
+فيُجلب كل صفحة باستعلام ``WHERE (الترتيب، pk) بعد المؤشر LIMIT n`` يستخدم فهرس
+الترتيب مهما كان عمق الصفحة، بدل ``OFFSET`` الذي يمسح كل الصفوف السابقة. المؤشر
+نص مبهم (JSON بترميز base64)، والعدد الكلي اختياري وتقديري: من إحصائيات مخطط
+PostgreSQL أو عدّ مخزن مؤقتاً في باقي قواعد البيانات.
+
+يُشترط ألا تكون حقول الترتيب فارغة (NULL)، وأن يكون الاستعلام استعلام كائنات
+بلا تجميع: ``values()`` أو ``annotate`` بدالة تجميع يغيّران ``GROUP BY`` عند إضافة
+حقول المؤشر.
+"""
+
+import base64
+import hashlib
+import json
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.query import ModelIterable
+from django.http import Http404
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+DEFAULT_SETTINGS = {
+    "PAGE_SIZE": 20,
+    "MAX_PAGE_SIZE": 100,
+    "COUNT_CACHE_TIMEOUT": 60 * 5,
+}
+
+
+def get_pagination_setting(name):
+    return getattr(settings, "KEYSET_PAGINATION_SETTINGS", {}).get(
+        name, DEFAULT_SETTINGS[name]
+    )
+
+
+def encode_cursor(values, reverse=False):
+    payload = json.dumps({"v": values, "r": reverse}, cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """فك المؤشر إلى (القيم، اتجاه الرجوع)، أو ValueError إن كان تالفاً"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return list(payload["v"]), bool(payload["r"])
+    except (TypeError, ValueError, KeyError, AttributeError) as e:
+        raise ValueError("مؤشر غير صالح") from e
+
+
+def ordering_keys(queryset, ordering=None):
+    """حقول الترتيب كـ [(المسار، تنازلي)] مع المفتاح الأساسي في آخرها"""
+    ordering = (
+        ordering or queryset.query.order_by or queryset.model._meta.ordering or []
+    )
+    pk_names = {"pk", queryset.model._meta.pk.name}
+    keys = []
+    for item in ordering:
+        if not isinstance(item, str):
+            raise TypeError("الترتيب بالتعابير غير مدعوم في ترقيم المفاتيح")
+        name = item.lstrip("-")
+        keys.append(("pk" if name in pk_names else name, item.startswith("-")))
+    if not any(name == "pk" for name, _ in keys):
+        keys.append(("pk", keys[-1][1] if keys else False))
+    return keys
+
+
+def after(keys, values, reverse):
+    """شرط الصفوف التالية للمؤشر في اتجاه القراءة"""
+    clauses = []
+    for index, (name, descending) in enumerate(keys):
+        lookup = "lt" if descending != reverse else "gt"
+        equal = {path: value for (path, _), value in zip(keys[:index], values)}
+        clauses.append(Q(**equal, **{f"{name}__{lookup}": values[index]}))
+    # حد على العمود الأول يتيح للمخطط مسح مدى من الفهرس
+    first, descending = keys[0]
+    bound = Q(**{f"{first}__{'lte' if descending != reverse else 'gte'}": values[0]})
+    return bound & reduce(operator.or_, clauses)
+
+
+class CountEstimator:
+    """عدّ تقديري سريع لاستعلام"""
+
+    KEY_PREFIX = "keyset_count"
+
+    @classmethod
+    def estimate(cls, queryset):
+        queryset = queryset.order_by()
+        if connections[queryset.db].vendor == "postgresql":
+            estimate = cls.planner_estimate(queryset)
+            if estimate is not None:
+                return estimate
+        return cls.cached_count(queryset)
+
+    @classmethod
+    def planner_estimate(cls, queryset):
+        """تقدير عدد الصفوف من إحصائيات مخطط PostgreSQL"""
+        with connections[queryset.db].cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                # -1 للجداول التي لم تُحلل بعد
+                return row[0] if row and row[0] >= 0 else None
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @classmethod
+    def cached_count(cls, queryset):
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+        return cache.get_or_set(
+            f"{cls.KEY_PREFIX}:{queryset.db}:{digest}",
+            queryset.count,
+            get_pagination_setting("COUNT_CACHE_TIMEOUT"),
+        )
+
+
+class KeysetPage:
+    """صفحة مرقمة بالمفاتيح بواجهة قريبة من ``django.core.paginator.Page``"""
+
+    def __init__(self, queryset, object_list, next_cursor, previous_cursor):
+        self.queryset = queryset
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @cached_property
+    def estimated_count(self):
+        """العدد الكلي التقديري (يُحسب عند طلبه فقط)"""
+        return CountEstimator.estimate(self.queryset)
+
+
+class KeysetPaginator:
+    """جلب صفحة من استعلام مرتب بمؤشر مفاتيح"""
+
+    def __init__(self, queryset, page_size, ordering=None):
+        if (
+            not issubclass(queryset._iterable_class, ModelIterable)
+            or queryset.query.group_by is not None
+        ):
+            raise TypeError("ترقيم المفاتيح يتطلب استعلام كائنات بلا تجميع")
+        self.queryset = queryset
+        self.page_size = page_size
+        self.keys = ordering_keys(queryset, ordering)
+
+    def page(self, cursor=None):
+        values, reverse = decode_cursor(cursor) if cursor else (None, False)
+        if values is not None and len(values) != len(self.keys):
+            raise ValueError("مؤشر غير صالح")
+
+        aliases = [f"keyset_{index}" for index in range(len(self.keys))]
+        queryset = self.queryset.annotate(
+            **{alias: F(name) for alias, (name, _) in zip(aliases, self.keys)}
+        ).order_by(
+            *(
+                f"-{name}" if descending != reverse else name
+                for name, descending in self.keys
+            )
+        )
+        if values is not None:
+            try:
+                queryset = queryset.filter(after(self.keys, values, reverse))
+            except ValidationError as e:
+                # قيم لا تناسب حقول الترتيب في مؤشر معدّل
+                raise ValueError("مؤشر غير صالح") from e
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        def position(row, backwards):
+            return encode_cursor([getattr(row, alias) for alias in aliases], backwards)
+
+        next_cursor = previous_cursor = None
+        if rows:
+            # الرجوع من صفحة يعني وجود صفحة بعدها، والتقدم يعني وجود صفحة قبلها
+            if has_more or reverse:
+                next_cursor = position(rows[-1], False)
+            if (has_more and reverse) or (values is not None and not reverse):
+                previous_cursor = position(rows[0], True)
+        return KeysetPage(self.queryset, rows, next_cursor, previous_cursor)
+
+
+def page_size_from(value, default):
+    try:
+        size = int(value) if value else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, get_pagination_setting("MAX_PAGE_SIZE")))
+
+
+class KeysetPagination(BasePagination):
+    """
+    ترقيم DRF بمؤشر المفاتيح
+
+    يُؤخذ الترتيب من ``keyset_ordering`` في الـ View أو من ترتيب الاستعلام،
+    ويُرجع العدد التقديري فقط عند ``?count=1``.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    count_query_param = "count"
+    page_size = None
+    ordering = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = page_size_from(
+            request.query_params.get(self.page_size_query_param),
+            self.page_size or get_pagination_setting("PAGE_SIZE"),
+        )
+        ordering = getattr(view, "keyset_ordering", None) or self.ordering
+        try:
+            self.page = KeysetPaginator(queryset, page_size, ordering).page(
+                request.query_params.get(self.cursor_query_param)
+            )
+        except ValueError as e:
+            raise NotFound(str(e)) from e
+        return self.page.object_list
+
+    def link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        body = {
+            "next": self.link(self.page.next_cursor),
+            "previous": self.link(self.page.previous_cursor),
+        }
+        if self.request.query_params.get(self.count_query_param) in ("1", "true"):
+            body["count"] = self.page.estimated_count
+            body["count_is_estimate"] = True
+        body["results"] = data
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {"type": "integer"},
+                "results": schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """
+    ترقيم المفاتيح لـ ``ListView``
+
+    يضع في السياق ``page_obj`` من نوع ``KeysetPage`` (المؤشران
+    ``next_cursor`` و``previous_cursor``، و``estimated_count`` عند الحاجة)،
+    و``paginator`` فارغاً لأن أرقام الصفحات غير معروفة.
+    """
+
+    cursor_kwarg = "cursor"
+    keyset_ordering = None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_ordering)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except ValueError as e:
+            raise Http404(str(e)) from e
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get("page_obj")
+        if page is not None:
+            query = self.request.GET.copy()
+            query.pop(self.cursor_kwarg, None)
+            context["cursor_query"] = query.urlencode()
+        return context
@@ -0,0 +1,34 @@
+"""
+أدوات مساعدة للاختبارات
+"""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def count_queries(func, *args, **kwargs):
+    """عدد الاستعلامات المنفذة أثناء استدعاء الدالة مع نصوصها"""
+    with CaptureQueriesContext(connection) as context:
+        func(*args, **kwargs)
+    return len(context.captured_queries), [
+        query["sql"] for query in context.captured_queries
+    ]
+
+
+def assert_constant_queries(func, sizes=(1, 10, 50)):
+    """
+    التحقق من ثبات عدد الاستعلامات مهما كان حجم الصفحة
+
+    ``func(size)`` ينفذ الطلب بحجم الصفحة المعطى، وتُرجع الدالة العدد الثابت.
+    """
+    counts = {}
+    statements = {}
+    for size in sizes:
+        counts[size], statements[size] = count_queries(func, size)
+    if len(set(counts.values())) > 1:
+        largest = max(sizes)
+        raise AssertionError(
+            f"عدد الاستعلامات يتغير مع حجم الصفحة: {counts}\n"
+            + "\n".join(statements[largest])
+        )
+    return counts[sizes[0]]
@@ -0,0 +1,424 @@
+"""
+محرك إرسال الإسعاف وتوجيه طلبات الطوارئ
+
+فهرس مكاني في الذاكرة (شبكة خلايا بدرجات ثابتة على غرار geohash) لسيارات
+الإسعاف ومراكز الطوارئ النشطة. يُبحث عن أقرب k بتوسيع حلقات الخلايا حول
+الموقع حتى يتأكد أنه لا توجد خلية أبعد يمكن أن تحوي نقطة أقرب، مع ترشيح
+التوفر الحي: سيارة إسعاف متاحة وصلها تحديث موقع حديث، ومركز فيه أسرّة متاحة.
+
+لا يعتمد البحث على PostGIS: تكفي إحداثيات النقاط (GEOS أو (خط العرض، خط
+الطول)). يحفظ ``DispatchEngine.ping`` موقع السيارة وتوفرها في
+``AmbulancePosition`` ويرفع إصداراً في الذاكرة المؤقتة، فتعيد كل عملية بناء
+فهرس السيارات من الجدول عند تغير الإصدار (صف لكل سيارة). ويُعاد تحميل فهرس
+المراكز بالطريقة نفسها عند تعديل المراكز أو الأسرّة.
+"""
+
+import heapq
+import math
+import threading
+import time
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+DEFAULT_SETTINGS = {
+    # حجم الخلية بالدرجات (0.02 ≈ 2.2 كم)
+    "CELL_DEGREES": 0.02,
+    "MAX_RADIUS_KM": 100,
+    # تُستبعد سيارات الإسعاف التي لم يصل تحديث موقعها منذ هذه المدة (ثوان)
+    "STALE_AFTER": 120,
+    "NEAREST": 5,
+}
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# حالات الإرسال التي تشغل سيارة الإسعاف
+ACTIVE_DISPATCH = ("assigned", "en_route", "arrived", "returning")
+
+
+def get_dispatch_setting(name):
+    return getattr(settings, "EMERGENCY_DISPATCH_SETTINGS", {}).get(
+        name, DEFAULT_SETTINGS[name]
+    )
+
+
+def coordinates(location):
+    """(خط العرض، خط الطول) من نقطة GEOS أو زوج أو قاموس"""
+    if hasattr(location, "x") and hasattr(location, "y"):
+        return float(location.y), float(location.x)
+    if isinstance(location, dict):
+        return float(location["lat"]), float(location.get("lng", location.get("lon")))
+    lat, lon = location
+    return float(lat), float(lon)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """المسافة بالكيلومترات على سطح الأرض"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """فهرس نقاط بمفاتيح في شبكة خلايا ثابتة الحجم"""
+
+    def __init__(self, cell_degrees=DEFAULT_SETTINGS["CELL_DEGREES"]):
+        self.cell = cell_degrees
+        self.cells = defaultdict(set)
+        # المفتاح -> (خط العرض، خط الطول، الخلية)
+        self.points = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, key):
+        return key in self.points
+
+    def cell_of(self, lat, lon):
+        return math.floor(lat / self.cell), math.floor(lon / self.cell)
+
+    def update(self, key, lat, lon):
+        cell = self.cell_of(lat, lon)
+        with self.lock:
+            previous = self.points.get(key)
+            if previous is not None and previous[2] != cell:
+                self.discard(key, previous[2])
+            self.points[key] = (lat, lon, cell)
+            self.cells[cell].add(key)
+
+    def remove(self, key):
+        with self.lock:
+            previous = self.points.pop(key, None)
+            if previous is not None:
+                self.discard(key, previous[2])
+
+    def discard(self, key, cell):
+        members = self.cells[cell]
+        members.discard(key)
+        if not members:
+            del self.cells[cell]
+
+    def ring(self, origin, radius):
+        """الخلايا على بعد ``radius`` خلية بالضبط من خلية الأصل"""
+        row, column = origin
+        if radius == 0:
+            yield origin
+            return
+        for offset in range(-radius, radius + 1):
+            yield row - radius, column + offset
+            yield row + radius, column + offset
+        for offset in range(-radius + 1, radius):
+            yield row + offset, column - radius
+            yield row + offset, column + radius
+
+    def clearance(self, lat, radius):
+        """
+        أقل مسافة (كم) من الموقع إلى أي نقطة خارج الحلقات حتى ``radius``
+        """
+        # عرض الخلية يضيق مع خط العرض فيُؤخذ عند أبعد خط عرض في الحلقات
+        edge = min(abs(lat) + (radius + 1) * self.cell, 90.0)
+        width = max(math.cos(math.radians(edge)), 0.0)
+        return radius * self.cell * KM_PER_DEGREE * width
+
+    def nearest(self, lat, lon, k=1, max_km=None, accept=None):
+        """
+        أقرب ``k`` مفاتيح ``[(المسافة، المفتاح)]`` مرتبة، مع ``accept(key)``
+        اختيارية لترشيح المفاتيح
+        """
+        origin = self.cell_of(lat, lon)
+        found = []
+        visited = 0
+        radius = 0
+        with self.lock:
+            while visited < len(self.points):
+                # نقاط الحلقة الحالية أبعد من مدى الحلقات السابقة
+                if max_km is not None and radius:
+                    if self.clearance(lat, radius - 1) > max_km:
+                        break
+                for cell in self.ring(origin, radius):
+                    members = self.cells.get(cell)
+                    if not members:
+                        continue
+                    visited += len(members)
+                    for key in members:
+                        if accept is not None and not accept(key):
+                            continue
+                        point_lat, point_lon, _ = self.points[key]
+                        distance = haversine(lat, lon, point_lat, point_lon)
+                        if max_km is not None and distance > max_km:
+                            continue
+                        # كومة عظمى بحجم k (المسافة بالسالب)
+                        if len(found) < k:
+                            heapq.heappush(found, (-distance, key))
+                        elif distance < -found[0][0]:
+                            heapq.heapreplace(found, (-distance, key))
+                if len(found) == k and -found[0][0] <= self.clearance(lat, radius):
+                    break
+                radius += 1
+        return sorted((-distance, key) for distance, key in found)
+
+
+class CenterInfo(NamedTuple):
+    id: int
+    name: str
+    trauma_level: int
+    capacity: int
+    occupancy: int
+    available_beds: int
+    specialties: list
+
+
+class Candidate(NamedTuple):
+    id: int
+    distance_km: float
+    latitude: float
+    longitude: float
+    # CenterInfo للمراكز، وحالة التوفر لسيارات الإسعاف
+    info: object
+
+
+class CenterIndex:
+    """مراكز الطوارئ النشطة مع عدد الأسرّة المتاحة في كل منها"""
+
+    def __init__(self, cell_degrees):
+        from .models import EmergencyCenter
+
+        self.grid = GridIndex(cell_degrees)
+        self.info = {}
+        centers = (
+            EmergencyCenter.objects.filter(is_active=True)
+            .select_related("hospital")
+            .annotate(
+                available_beds=Count(
+                    "emergencybed", filter=Q(emergencybed__status="available")
+                )
+            )
+        )
+        for center in centers:
+            self.grid.update(center.pk, *coordinates(center.location))
+            self.info[center.pk] = CenterInfo(
+                center.pk,
+                center.hospital.name,
+                center.trauma_level,
+                center.capacity,
+                center.current_occupancy,
+                center.available_beds,
+                center.specialties_available,
+            )
+
+
+class AmbulanceState:
+    __slots__ = ("available", "seen")
+
+    def __init__(self, available, seen):
+        self.available = available
+        self.seen = seen
+
+
+class DispatchEngine:
+    """البحث عن أقرب الموارد وتعيينها لطلبات الطوارئ"""
+
+    VERSION_KEY = "emergency_center_index_version"
+    AMBULANCES_VERSION_KEY = "emergency_ambulance_index_version"
+    _centers = None
+    _version = None
+    _ambulances = None
+    _ambulances_version = None
+    _states = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def invalidate_centers(cls):
+        # إصدار مشترك حتى يُعاد تحميل المراكز في جميع العمليات
+        cache.set(cls.VERSION_KEY, time.time_ns(), None)
+        cls._centers = None
+
+    @classmethod
+    def centers(cls):
+        version = cache.get(cls.VERSION_KEY)
+        if cls._centers is None or version != cls._version:
+            cls._centers = CenterIndex(get_dispatch_setting("CELL_DEGREES"))
+            cls._version = version
+        return cls._centers
+
+    @classmethod
+    def invalidate_ambulances(cls):
+        cache.set(cls.AMBULANCES_VERSION_KEY, time.time_ns(), None)
+        cls._ambulances = None
+
+    @classmethod
+    def ambulances(cls):
+        """فهرس السيارات في العملية الحالية، يُعاد بناؤه عند تغير الإصدار"""
+        version = cache.get(cls.AMBULANCES_VERSION_KEY)
+        with cls._lock:
+            if cls._ambulances is None or version != cls._ambulances_version:
+                cls._ambulances, cls._states = cls.load_ambulances()
+                cls._ambulances_version = version
+            return cls._ambulances
+
+    @classmethod
+    def load_ambulances(cls):
+        from .models import AmbulancePosition
+
+        grid = GridIndex(get_dispatch_setting("CELL_DEGREES"))
+        states = {}
+        for ambulance_id, lat, lon, available, seen_at in (
+            AmbulancePosition.objects.values_list(
+                "ambulance_id", "latitude", "longitude", "available", "seen_at"
+            )
+        ):
+            grid.update(ambulance_id, lat, lon)
+            states[ambulance_id] = AmbulanceState(available, seen_at.timestamp())
+        return grid, states
+
+    @classmethod
+    def ping(cls, ambulance_id, location, available=None):
+        """
+        تحديث موقع سيارة إسعاف؛ ``available=None`` يُبقي حالة التوفر
+        السابقة (متاحة لسيارة جديدة)
+        """
+        from .models import AmbulancePosition
+
+        lat, lon = coordinates(location)
+        fields = {"latitude": lat, "longitude": lon, "seen_at": timezone.now()}
+        if available is not None:
+            fields["available"] = available
+        position, _ = AmbulancePosition.objects.update_or_create(
+            ambulance_id=ambulance_id, defaults=fields
+        )
+        transaction.on_commit(cls.invalidate_ambulances)
+        if not position.available:
+            cls.track(ambulance_id, lat, lon)
+        return AmbulanceState(position.available, position.seen_at.timestamp())
+
+    @classmethod
+    def track(cls, ambulance_id, lat, lon):
+        """حفظ الموقع الحالي في عملية الإرسال الجارية للسيارة"""
+        from django.contrib.gis.geos import Point
+
+        from .models import AmbulanceDispatch
+
+        AmbulanceDispatch.objects.filter(
+            ambulance_id=ambulance_id, status__in=ACTIVE_DISPATCH
+        ).update(current_location=Point(lon, lat, srid=4326))
+
+    @classmethod
+    def set_available(cls, ambulance_id, available):
+        from .models import AmbulancePosition
+
+        if AmbulancePosition.objects.filter(ambulance_id=ambulance_id).update(
+            available=available
+        ):
+            transaction.on_commit(cls.invalidate_ambulances)
+
+    @classmethod
+    def remove_ambulance(cls, ambulance_id):
+        from .models import AmbulancePosition
+
+        AmbulancePosition.objects.filter(ambulance_id=ambulance_id).delete()
+        transaction.on_commit(cls.invalidate_ambulances)
+
+    @classmethod
+    def is_dispatchable(cls, ambulance_id):
+        state = cls._states.get(ambulance_id)
+        if state is None or not state.available:
+            return False
+        return time.time() - state.seen <= get_dispatch_setting("STALE_AFTER")
+
+    @classmethod
+    def candidates(cls, grid, location, k, max_km, accept, info):
+        lat, lon = coordinates(location)
+        if max_km is None:
+            max_km = get_dispatch_setting("MAX_RADIUS_KM")
+        results = []
+        for distance, key in grid.nearest(
+            lat, lon, k or get_dispatch_setting("NEAREST"), max_km, accept
+        ):
+            point_lat, point_lon, _ = grid.points[key]
+            results.append(
+                Candidate(key, round(distance, 3), point_lat, point_lon, info(key))
+            )
+        return results
+
+    @classmethod
+    def nearest_ambulances(cls, location, k=None, max_km=None):
+        """أقرب سيارات الإسعاف المتاحة ذات المواقع الحديثة"""
+        return cls.candidates(
+            cls.ambulances(),
+            location,
+            k,
+            max_km,
+            cls.is_dispatchable,
+            lambda key: {"available": True},
+        )
+
+    @classmethod
+    def nearest_centers(cls, location, k=None, max_km=None, min_beds=1, specialty=None):
+        """أقرب مراكز الطوارئ النشطة التي فيها ``min_beds`` أسرّة متاحة"""
+        index = cls.centers()
+
+        def accept(key):
+            center = index.info[key]
+            if center.available_beds < min_beds:
+                return False
+            return specialty is None or specialty in center.specialties
+
+        return cls.candidates(index.grid, location, k, max_km, accept, index.info.get)
+
+    @classmethod
+    def assign(cls, emergency_request, specialty=None):
+        """
+        تعيين أقرب مركز فيه سرير متاح وأقرب سيارة إسعاف متاحة للطلب،
+        ويُرجع (المركز، سيارة الإسعاف) كمرشحين أو None لما تعذر تعيينه
+        """
+        from .models import AmbulanceDispatch
+
+        location = emergency_request.location
+        centers = cls.nearest_centers(location, k=1, specialty=specialty)
+        center = centers[0] if centers else None
+
+        ambulance = None
+        with transaction.atomic():
+            for candidate in cls.nearest_ambulances(location):
+                try:
+                    with transaction.atomic():
+                        AmbulanceDispatch.objects.create(
+                            emergency_request=emergency_request,
+                            ambulance_id=candidate.id,
+                            current_location=cls.point(candidate),
+                        )
+                except IntegrityError:
+                    # أرسلتها عملية أخرى قبل وصول تحديث حالتها هنا، والقيد
+                    # الجزئي على الإرسالات النشطة يمنع إرسالها مرتين
+                    cls.set_available(candidate.id, False)
+                    continue
+                # تعود متاحة عند انتهاء الإرسال (emergency.signals)
+                cls.set_available(candidate.id, False)
+                ambulance = candidate
+                break
+
+            update_fields = ["updated_at"]
+            if center is not None:
+                emergency_request.assigned_center_id = center.id
+                update_fields.append("assigned_center")
+            if ambulance is not None:
+                emergency_request.status = "dispatched"
+                update_fields.append("status")
+            emergency_request.save(update_fields=update_fields)
+        return center, ambulance
+
+    @staticmethod
+    def point(candidate):
+        from django.contrib.gis.geos import Point
+
+        return Point(candidate.longitude, candidate.latitude, srid=4326)
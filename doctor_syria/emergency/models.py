@@ -4,6 +4,8 @@ from django.db import models
 
 from accounts.models import Ambulance, Doctor, Hospital, Patient
 
+from .dispatch import ACTIVE_DISPATCH
+
 
 class EmergencyCenter(models.Model):
     """مركز الطوارئ"""
@@ -90,6 +92,33 @@ class AmbulanceDispatch(models.Model):
     def __str__(self):
         return f"إرسال سيارة إسعاف {self.ambulance.number} لطلب {self.emergency_request.id}"
 
+    class Meta:
+        constraints = [
+            # لا تُرسل سيارة الإسعاف إلى طلبين في الوقت نفسه
+            models.UniqueConstraint(
+                fields=["ambulance"],
+                condition=models.Q(status__in=ACTIVE_DISPATCH),
+                name="unique_active_ambulance_dispatch",
+            ),
+        ]
+
+
+class AmbulancePosition(models.Model):
+    """
+    آخر موقع وحالة توفر لسيارة إسعاف، مشتركة بين جميع العمليات
+
+    تُعرَّف السيارة بمعرفها فقط دون مفتاح أجنبي، فيُسجَّل موقعها من أول تحديث.
+    """
+
+    ambulance_id = models.PositiveIntegerField(primary_key=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    available = models.BooleanField(default=True)
+    seen_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"موقع سيارة إسعاف {self.ambulance_id}"
+
 
 class EmergencyAssessment(models.Model):
     """تقييم حالة الطوارئ"""
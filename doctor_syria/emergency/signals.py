@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .dispatch import ACTIVE_DISPATCH, DispatchEngine
+from .models import AmbulanceDispatch, EmergencyBed, EmergencyCenter
+
+
+@receiver(post_save, sender=EmergencyCenter)
+@receiver(post_delete, sender=EmergencyCenter)
+@receiver(post_save, sender=EmergencyBed)
+@receiver(post_delete, sender=EmergencyBed)
+def invalidate_center_index(sender, **kwargs):
+    """
+    إعادة تحميل فهرس المراكز عند تعديل المراكز أو حالة الأسرّة
+    """
+    DispatchEngine.invalidate_centers()
+
+
+@receiver(post_save, sender=AmbulanceDispatch)
+def update_ambulance_availability(
+    sender, instance, created=False, raw=False, **kwargs
+):
+    """
+    تعود سيارة الإسعاف متاحة في الفهرس عند انتهاء الإرسال أو إلغائه
+
+    الإرسال الجديد يحجز السيارة في ``DispatchEngine.assign``.
+    """
+    if raw or created:
+        return
+    DispatchEngine.set_available(
+        instance.ambulance_id, instance.status not in ACTIVE_DISPATCH
+    )
@@ -0,0 +1,94 @@
+import random
+
+from django.test import SimpleTestCase
+
+from emergency.dispatch import GridIndex, haversine
+
+DAMASCUS = (33.5138, 36.2765)
+
+
+class GridIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.rng = random.Random(7)
+        self.grid = GridIndex(cell_degrees=0.02)
+        self.points = {}
+        for key in range(500):
+            lat = DAMASCUS[0] + self.rng.uniform(-1, 1)
+            lon = DAMASCUS[1] + self.rng.uniform(-1, 1)
+            self.points[key] = (lat, lon)
+            self.grid.update(key, lat, lon)
+
+    def brute_force(self, lat, lon, k, max_km=None, accept=None):
+        distances = sorted(
+            (haversine(lat, lon, *point), key)
+            for key, point in self.points.items()
+            if accept is None or accept(key)
+        )
+        if max_km is not None:
+            distances = [item for item in distances if item[0] <= max_km]
+        return distances[:k]
+
+    def assertSameResults(self, found, expected):
+        self.assertEqual([key for _, key in found], [key for _, key in expected])
+        for (distance, _), (expected_distance, _) in zip(found, expected):
+            self.assertAlmostEqual(distance, expected_distance)
+
+    def test_nearest_matches_brute_force(self):
+        for _ in range(50):
+            lat = DAMASCUS[0] + self.rng.uniform(-1.2, 1.2)
+            lon = DAMASCUS[1] + self.rng.uniform(-1.2, 1.2)
+            for k in (1, 5):
+                self.assertSameResults(
+                    self.grid.nearest(lat, lon, k), self.brute_force(lat, lon, k)
+                )
+
+    def test_nearest_far_from_all_points(self):
+        lat, lon = DAMASCUS[0] + 3, DAMASCUS[1]
+        self.assertSameResults(
+            self.grid.nearest(lat, lon, 3), self.brute_force(lat, lon, 3)
+        )
+
+    def test_max_km_and_accept_filter_results(self):
+        def accept(key):
+            return key % 3 == 0
+
+        found = self.grid.nearest(*DAMASCUS, k=20, max_km=15, accept=accept)
+
+        self.assertSameResults(
+            found, self.brute_force(*DAMASCUS, 20, max_km=15, accept=accept)
+        )
+        self.assertTrue(all(distance <= 15 for distance, _ in found))
+
+    def test_fewer_points_than_k(self):
+        grid = GridIndex()
+        grid.update("a", *DAMASCUS)
+        self.assertEqual(grid.nearest(*DAMASCUS, k=3), [(0.0, "a")])
+        self.assertEqual(GridIndex().nearest(*DAMASCUS, k=3), [])
+
+    def test_update_moves_point_between_cells(self):
+        grid = GridIndex(cell_degrees=0.02)
+        grid.update("a", *DAMASCUS)
+        old_cell = grid.cell_of(*DAMASCUS)
+        grid.update("a", DAMASCUS[0] + 0.5, DAMASCUS[1])
+
+        self.assertNotIn(old_cell, grid.cells)
+        self.assertEqual(len(grid), 1)
+        ((distance, key),) = grid.nearest(DAMASCUS[0] + 0.5, DAMASCUS[1])
+        self.assertEqual((round(distance, 6), key), (0.0, "a"))
+
+    def test_remove(self):
+        self.grid.remove(0)
+        self.grid.remove("missing")
+
+        self.assertNotIn(0, self.grid)
+        self.assertEqual(len(self.grid), 499)
+        found = self.grid.nearest(*self.points[0], k=1)
+        self.assertNotEqual(found[0][1], 0)
+
+    def test_ring_cells_are_at_exact_radius(self):
+        grid = GridIndex()
+        for radius in range(4):
+            cells = list(grid.ring((0, 0), radius))
+            self.assertEqual(len(cells), len(set(cells)))
+            self.assertEqual(len(cells), max(1, 8 * radius))
+            self.assertTrue(all(max(abs(r), abs(c)) == radius for r, c in cells))
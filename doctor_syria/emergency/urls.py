@@ -0,0 +1,14 @@
+from django.urls import include, path
+from rest_framework import routers
+
+from . import views
+
+app_name = "emergency"
+
+router = routers.DefaultRouter()
+router.register(r"ambulances", views.AmbulanceViewSet, basename="ambulance")
+router.register(r"requests", views.EmergencyRequestViewSet, basename="request")
+
+urlpatterns = [
+    path("api/", include(router.urls)),
+]
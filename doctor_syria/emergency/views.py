@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .dispatch import DispatchEngine, coordinates
+from .models import EmergencyRequest
+
+
+class IsDispatcher(permissions.BasePermission):
+    """طاقم المستشفيات والإدارة فقط يحدّثون المواقع ويرسلون السيارات"""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user and user.is_authenticated and (user.is_staff or user.is_hospital)
+        )
+
+
+def candidate_data(candidate):
+    if candidate is None:
+        return None
+    return {
+        "id": candidate.id,
+        "distance_km": candidate.distance_km,
+        "latitude": candidate.latitude,
+        "longitude": candidate.longitude,
+    }
+
+
+class AmbulanceViewSet(viewsets.ViewSet):
+    """تحديث مواقع سيارات الإسعاف وتوفرها"""
+
+    permission_classes = [IsDispatcher]
+    lookup_value_regex = r"\d+"
+
+    @action(detail=True, methods=["post"])
+    def ping(self, request, pk=None):
+        """الموقع الحالي: {"lat": ..., "lng": ..., "available": اختياري}"""
+        available = request.data.get("available")
+        if available is not None and not isinstance(available, bool):
+            return Response(
+                {"error": "حالة التوفر يجب أن تكون قيمة منطقية"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            location = coordinates(request.data)
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {"error": "يجب إرسال خط العرض وخط الطول"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        state = DispatchEngine.ping(int(pk), location, available)
+        return Response({"available": state.available, "seen": state.seen})
+
+
+class EmergencyRequestViewSet(viewsets.ViewSet):
+    """تعيين أقرب مركز وسيارة إسعاف لطلب طوارئ"""
+
+    permission_classes = [IsDispatcher]
+    lookup_value_regex = r"\d+"
+
+    @action(detail=True, methods=["post"])
+    def assign(self, request, pk=None):
+        specialty = request.data.get("specialty") or None
+        with transaction.atomic():
+            # قفل الطلب حتى لا يُعيَّن مرتين بطلبين متزامنين
+            emergency_request = get_object_or_404(
+                EmergencyRequest.objects.select_for_update(), pk=pk
+            )
+            if emergency_request.status != "pending":
+                return Response(
+                    {"error": "تمت معالجة الطلب مسبقاً"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            center, ambulance = DispatchEngine.assign(emergency_request, specialty)
+        return Response(
+            {
+                "status": emergency_request.status,
+                "center": candidate_data(center),
+                "ambulance": candidate_data(ambulance),
+            }
+        )
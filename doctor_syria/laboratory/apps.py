@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LaboratoryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "laboratory"
+
+    def ready(self):
+        import laboratory.signals
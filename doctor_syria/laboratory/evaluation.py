@@ -0,0 +1,258 @@
+"""
+تقييم نتائج التحاليل مقابل المعدلات الطبيعية
+
+تُجمّع جميع المعدلات الطبيعية مرة واحدة في فهرس مجالات داخل الذاكرة لكل
+معيار: مصفوفات NumPy للحدود (الطبيعية والحرجة) ولشروط الجنس والعمر والحالة.
+تُقيّم دفعة النتائج كاملة بمقارنات مصفوفات: يُختار لكل قيمة أخص مجال ينطبق
+على المريض، ثم تُحدد القيم غير الطبيعية والحرجة دفعة واحدة. يُبطل الفهرس في
+جميع العمليات عند تعديل المعدلات أو المعايير عبر إصدار في الذاكرة المؤقتة.
+
+صيغة ``TestResult.results``: ``{"اسم المعيار أو معرفه": قيمة أو {"value": قيمة}}``
+مع مفتاح اختياري ``condition`` لحالة المريض (مثل الحمل).
+"""
+
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ReferenceRange, TestParameter, TestResult
+
+CONDITION_KEY = "condition"
+
+# قيم الجنس في المعدلات نص حر فتُوحّد إلى رموز المستخدم
+GENDER_ALIASES = {
+    "m": "M",
+    "male": "M",
+    "ذكر": "M",
+    "f": "F",
+    "female": "F",
+    "أنثى": "F",
+    "انثى": "F",
+}
+
+
+def normalize_gender(value):
+    value = (value or "").strip()
+    return GENDER_ALIASES.get(value.lower(), value.upper())
+
+
+def normalize_condition(value):
+    return (value or "").strip().lower()
+
+
+def bound(value, default):
+    return float(value) if value is not None else default
+
+
+def numeric(value):
+    if isinstance(value, dict):
+        value = value.get("value")
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def finite(value):
+    return float(value) if np.isfinite(value) else None
+
+
+def age_on(birth_date, day):
+    if birth_date is None:
+        return np.nan
+    before_birthday = (day.month, day.day) < (birth_date.month, birth_date.day)
+    return day.year - birth_date.year - before_birthday
+
+
+class ParameterRanges:
+    """مجالات معيار واحد كمصفوفات متوازية"""
+
+    def __init__(self, rows):
+        def column(name, convert, *args):
+            return np.array([convert(row[name], *args) for row in rows])
+
+        self.gender = column("gender", normalize_gender)
+        self.condition = column("condition", normalize_condition)
+        self.min_age = column("min_age", bound, -np.inf)
+        self.max_age = column("max_age", bound, np.inf)
+        self.low = column("min_value", bound, -np.inf)
+        self.high = column("max_value", bound, np.inf)
+        self.critical_low = column("critical_low", bound, -np.inf)
+        self.critical_high = column("critical_high", bound, np.inf)
+        # المجال الأخص يغلب: الحالة ثم الجنس ثم العمر
+        self.specificity = (
+            (self.condition != "") * 4
+            + (self.gender != "") * 2
+            + (np.isfinite(self.min_age) | np.isfinite(self.max_age))
+        )
+
+    def select(self, genders, ages, conditions):
+        """فهرس المجال المطبق لكل قيمة، أو -1 إن لم ينطبق أي مجال"""
+        ages = ages[:, None]
+        # العمر المجهول (NaN) لا يطابق إلا المجالات غير المقيدة بالعمر
+        unbounded = ~np.isfinite(self.min_age) & ~np.isfinite(self.max_age)
+        age_ok = ((ages >= self.min_age) & (ages <= self.max_age)) | (
+            np.isnan(ages) & unbounded
+        )
+        matches = (
+            age_ok
+            & ((self.gender == "") | (self.gender == genders[:, None]))
+            & ((self.condition == "") | (self.condition == conditions[:, None]))
+        )
+        scores = np.where(matches, self.specificity, -1)
+        chosen = scores.argmax(axis=1)
+        return np.where(scores.max(axis=1) >= 0, chosen, -1)
+
+
+class RangeIndex:
+    """فهرس المجالات لجميع المعايير مع أسماء المعايير لكل تحليل"""
+
+    def __init__(self):
+        rows = defaultdict(list)
+        for row in ReferenceRange.objects.values(
+            "parameter_id",
+            "gender",
+            "condition",
+            "min_age",
+            "max_age",
+            "min_value",
+            "max_value",
+            "critical_low",
+            "critical_high",
+        ):
+            rows[row["parameter_id"]].append(row)
+        self.ranges = {pk: ParameterRanges(items) for pk, items in rows.items()}
+
+        self.parameters = {}
+        self.names = {}
+        for pk, test_id, name, unit in TestParameter.objects.values_list(
+            "pk", "test_id", "name", "unit"
+        ):
+            self.parameters[pk] = (name, unit)
+            self.names[(test_id, name.strip().lower())] = pk
+
+    def resolve(self, test_ids, key):
+        """معرف المعيار من اسمه أو معرفه ضمن تحاليل الطلب"""
+        key = str(key).strip()
+        if key.isdigit() and int(key) in self.parameters:
+            return int(key)
+        for test_id in test_ids:
+            pk = self.names.get((test_id, key.lower()))
+            if pk is not None:
+                return pk
+        return None
+
+
+class ResultEvaluator:
+    """تقييم دفعات نتائج التحاليل"""
+
+    VERSION_KEY = "reference_range_index_version"
+    _index = None
+    _version = None
+
+    @classmethod
+    def invalidate(cls):
+        # إصدار مشترك حتى تُبطل نسخ الفهرس في جميع العمليات
+        cache.set(cls.VERSION_KEY, time.time_ns(), None)
+        cls._index = None
+
+    @classmethod
+    def index(cls):
+        version = cache.get(cls.VERSION_KEY)
+        if cls._index is None or version != cls._version:
+            cls._index = RangeIndex()
+            cls._version = version
+        return cls._index
+
+    @classmethod
+    def apply(cls, results):
+        """
+        ضبط ``is_normal`` و``is_critical`` و``critical_values`` لدفعة نتائج
+        في الذاكرة (دون حفظ)، ويُرجع النتائج التي قُيّمت
+        """
+        index = cls.index()
+        today = timezone.localdate()
+        entries = defaultdict(list)
+        for position, result in enumerate(results):
+            request = result.test_request
+            patient = request.patient
+            test_ids = [test.pk for test in request.tests.all()]
+            values = result.results if isinstance(result.results, dict) else {}
+            condition = normalize_condition(values.get(CONDITION_KEY))
+            day = timezone.localdate(result.result_date) if result.result_date else today
+            age = age_on(patient.date_of_birth or patient.user.birth_date, day)
+            gender = normalize_gender(patient.user.gender)
+            for key, raw in values.items():
+                if key == CONDITION_KEY:
+                    continue
+                parameter = index.resolve(test_ids, key)
+                value = numeric(raw)
+                if parameter in index.ranges and value is not None:
+                    entries[parameter].append(
+                        (position, key, value, gender, age, condition)
+                    )
+
+        abnormal = np.zeros(len(results), dtype=bool)
+        evaluated = np.zeros(len(results), dtype=bool)
+        critical = [{} for _ in results]
+        for parameter, rows in entries.items():
+            ranges = index.ranges[parameter]
+            positions, keys, values, genders, ages, conditions = zip(*rows)
+            positions = np.array(positions)
+            values = np.array(values)
+            chosen = ranges.select(
+                np.array(genders), np.array(ages, dtype=float), np.array(conditions)
+            )
+            found = chosen >= 0
+            if not found.any():
+                continue
+            positions, values, chosen = positions[found], values[found], chosen[found]
+            keys = np.array(keys, dtype=object)[found]
+
+            low, high = ranges.low[chosen], ranges.high[chosen]
+            out_of_range = (values < low) | (values > high)
+            is_critical = (values < ranges.critical_low[chosen]) | (
+                values > ranges.critical_high[chosen]
+            )
+            evaluated[positions] = True
+            np.logical_or.at(abnormal, positions, out_of_range | is_critical)
+
+            unit = index.parameters[parameter][1]
+            for row in np.flatnonzero(is_critical):
+                critical[positions[row]][keys[row]] = {
+                    "value": float(values[row]),
+                    "low": finite(ranges.critical_low[chosen[row]]),
+                    "high": finite(ranges.critical_high[chosen[row]]),
+                    "unit": unit,
+                }
+
+        changed = []
+        for position, result in enumerate(results):
+            if not evaluated[position]:
+                continue
+            result.is_normal = not abnormal[position]
+            result.is_critical = bool(critical[position])
+            result.critical_values = critical[position] or None
+            changed.append(result)
+        return changed
+
+    @classmethod
+    def evaluate(cls, queryset):
+        """تقييم نتائج محفوظة وحفظ الأعلام بتحديث جماعي"""
+        results = list(
+            queryset.select_related("test_request__patient__user").prefetch_related(
+                "test_request__tests"
+            )
+        )
+        changed = cls.apply(results)
+        with transaction.atomic():
+            TestResult.objects.bulk_update(
+                changed, ["is_normal", "is_critical", "critical_values"], batch_size=500
+            )
+        return changed
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("laboratory", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="referencerange",
+            name="critical_low",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=10,
+                null=True,
+                verbose_name="الحد الحرج الأدنى",
+            ),
+        ),
+        migrations.AddField(
+            model_name="referencerange",
+            name="critical_high",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=10,
+                null=True,
+                verbose_name="الحد الحرج الأعلى",
+            ),
+        ),
+    ]
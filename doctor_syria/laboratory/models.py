@@ -133,6 +133,12 @@ class ReferenceRange(models.Model):
     max_value = models.DecimalField(
         _("القيمة القصوى"), max_digits=10, decimal_places=2, null=True, blank=True
     )
+    critical_low = models.DecimalField(
+        _("الحد الحرج الأدنى"), max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    critical_high = models.DecimalField(
+        _("الحد الحرج الأعلى"), max_digits=10, decimal_places=2, null=True, blank=True
+    )
     gender = models.CharField(_("الجنس"), max_length=20, null=True, blank=True)
     min_age = models.PositiveIntegerField(_("العمر الأدنى"), null=True, blank=True)
     max_age = models.PositiveIntegerField(_("العمر الأقصى"), null=True, blank=True)
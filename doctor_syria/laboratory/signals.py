@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .evaluation import ResultEvaluator
+from .models import ReferenceRange, TestParameter, TestResult
+
+
+@receiver(post_save, sender=ReferenceRange)
+@receiver(post_delete, sender=ReferenceRange)
+@receiver(post_save, sender=TestParameter)
+@receiver(post_delete, sender=TestParameter)
+def invalidate_range_index(sender, **kwargs):
+    """
+    إبطال فهرس المعدلات الطبيعية عند تعديلها
+    """
+    ResultEvaluator.invalidate()
+
+
+@receiver(pre_save, sender=TestResult)
+def evaluate_result(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    تقييم النتيجة مقابل المعدلات الطبيعية قبل حفظها
+    """
+    if raw:
+        return
+    if update_fields is not None and "results" not in update_fields:
+        return
+    ResultEvaluator.apply([instance])
@@ -1,3 +1,150 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from types import SimpleNamespace
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from laboratory.evaluation import ParameterRanges, ResultEvaluator
+from laboratory.models import LabTest, ReferenceRange, TestCategory, TestParameter
+
+
+def range_row(**fields):
+    row = {
+        "gender": None,
+        "condition": "",
+        "min_age": None,
+        "max_age": None,
+        "min_value": None,
+        "max_value": None,
+        "critical_low": None,
+        "critical_high": None,
+    }
+    row.update(fields)
+    return row
+
+
+class ParameterRangesTests(SimpleTestCase):
+    def setUp(self):
+        self.ranges = ParameterRanges(
+            [
+                range_row(min_value=70, max_value=110),
+                range_row(gender="أنثى", min_value=65, max_value=105),
+                range_row(max_age=12, min_value=60, max_value=100),
+                range_row(
+                    gender="F", condition="Pregnancy", min_value=60, max_value=95
+                ),
+            ]
+        )
+
+    def select(self, *patients):
+        genders, ages, conditions = zip(*patients)
+        return list(
+            self.ranges.select(
+                np.array(genders), np.array(ages, dtype=float), np.array(conditions)
+            )
+        )
+
+    def test_most_specific_matching_range_wins(self):
+        self.assertEqual(
+            self.select(
+                ("M", 30, ""),
+                ("F", 30, ""),
+                ("M", 5, ""),
+                ("F", 25, "pregnancy"),
+                ("M", 25, "pregnancy"),
+            ),
+            [0, 1, 2, 3, 0],
+        )
+
+    def test_unknown_age_skips_age_bounded_ranges(self):
+        self.assertEqual(self.select(("M", np.nan, ""), ("F", np.nan, "")), [0, 1])
+
+    def test_no_matching_range(self):
+        ranges = ParameterRanges([range_row(gender="F", min_value=1, max_value=2)])
+        chosen = ranges.select(np.array(["M"]), np.array([40.0]), np.array([""]))
+        self.assertEqual(list(chosen), [-1])
+
+
+class ResultEvaluatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        ResultEvaluator.invalidate()
+        category = TestCategory.objects.create(name="كيمياء", description="")
+        self.test = LabTest.objects.create(
+            name="سكر الدم",
+            code="GLU",
+            category=category,
+            description="",
+            preparation_instructions="",
+            sample_type="blood",
+            sample_volume="2ml",
+            processing_time=timedelta(hours=1),
+            price=10,
+        )
+        self.glucose = TestParameter.objects.create(
+            test=self.test, name="Glucose", parameter_type="numeric", unit="mg/dL"
+        )
+        ReferenceRange.objects.create(
+            parameter=self.glucose,
+            min_value=70,
+            max_value=110,
+            critical_low=40,
+            critical_high=400,
+        )
+
+    def result(self, values, gender="M", birth_date=date(1990, 1, 1)):
+        patient = SimpleNamespace(
+            date_of_birth=birth_date,
+            user=SimpleNamespace(gender=gender, birth_date=None),
+        )
+        request = SimpleNamespace(
+            patient=patient, tests=SimpleNamespace(all=lambda: [self.test])
+        )
+        return SimpleNamespace(test_request=request, results=values, result_date=None)
+
+    def test_flags_abnormal_and_critical_values(self):
+        normal = self.result({"Glucose": 90})
+        high = self.result({"glucose": {"value": "150"}})
+        critical = self.result({str(self.glucose.pk): 30})
+        unknown = self.result({"Potassium": 9, "Glucose": "positive"})
+
+        changed = ResultEvaluator.apply([normal, high, critical, unknown])
+
+        self.assertEqual(changed, [normal, high, critical])
+        self.assertEqual(
+            [(r.is_normal, r.is_critical) for r in changed],
+            [(True, False), (False, False), (False, True)],
+        )
+        self.assertEqual(
+            critical.critical_values,
+            {
+                str(self.glucose.pk): {
+                    "value": 30.0,
+                    "low": 40.0,
+                    "high": 400.0,
+                    "unit": "mg/dL",
+                }
+            },
+        )
+        self.assertIsNone(high.critical_values)
+
+    def test_index_is_rebuilt_after_ranges_change(self):
+        index = ResultEvaluator.index()
+        self.assertIs(ResultEvaluator.index(), index)
+
+        ReferenceRange.objects.create(
+            parameter=self.glucose, gender="F", min_value=60, max_value=100
+        )
+        self.assertIsNot(ResultEvaluator.index(), index)
+
+        result = self.result({"Glucose": 105}, gender="F")
+        ResultEvaluator.apply([result])
+        self.assertFalse(result.is_normal)
+
+    def test_version_change_from_another_process_rebuilds_index(self):
+        index = ResultEvaluator.index()
+        # عملية أخرى عدّلت المعدلات: الإصدار المشترك تغير والنسخة المحلية باقية
+        cache.set(ResultEvaluator.VERSION_KEY, "other-process", None)
+
+        self.assertIsNot(ResultEvaluator.index(), index)
@@ -8,6 +8,9 @@ from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from analytics.metrics import count_where
+
+from .evaluation import ResultEvaluator
 from .models import (
     LabTest,
     ReferenceRange,
@@ -203,6 +206,25 @@ class TestResultViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @action(detail=False, methods=['post'])
+    def evaluate(self, request):
+        """إعادة تقييم دفعة نتائج مقابل المعدلات الطبيعية"""
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            return Response(
+                {'error': 'يجب تحديد قائمة معرفات النتائج'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        evaluated = ResultEvaluator.evaluate(self.get_queryset().filter(pk__in=ids))
+        return Response({
+            'evaluated': len(evaluated),
+            'abnormal': [result.pk for result in evaluated if not result.is_normal],
+            'critical': {
+                result.pk: result.critical_values
+                for result in evaluated if result.is_critical
+            }
+        })
+
 
 class SampleCollectionViewSet(viewsets.ModelViewSet):
     """ViewSet لجمع العينات مع وظائف متقدمة للتتبع"""
@@ -313,35 +335,39 @@ class LaboratoryViewSet(viewsets.ModelViewSet):
         
         laboratory = request.user.laboratory
         today = timezone.now().date()
-        
-        # إحصائيات اليوم
+        week_ago = today - timedelta(days=7)
+
+        # عدادات كل جدول باستعلام واحد، بالتتابع على اتصال الطلب نفسه
+        counts = {
+            'requests': count_where(
+                TestRequest.objects.filter(
+                    laboratory=laboratory,
+                    requested_date__date=today
+                ),
+                total_requests=None
+            ),
+            'results': count_where(
+                TestResult.objects.filter(
+                    test_request__laboratory=laboratory,
+                    result_date__gte=week_ago
+                ),
+                completed_tests=Q(result_date__date=today),
+                critical_results=Q(result_date__date=today, is_critical=True),
+                weekly_tests=None
+            ),
+            'samples': count_where(
+                SampleCollection.objects.filter(test_request__laboratory=laboratory),
+                pending_samples=Q(status='pending')
+            ),
+        }
+        weekly_tests = counts['results'].pop('weekly_tests')
         today_stats = {
-            'total_requests': TestRequest.objects.filter(
-                laboratory=laboratory,
-                requested_date__date=today
-            ).count(),
-            'completed_tests': TestResult.objects.filter(
-                test_request__laboratory=laboratory,
-                result_date__date=today
-            ).count(),
-            'pending_samples': SampleCollection.objects.filter(
-                test_request__laboratory=laboratory,
-                status='pending'
-            ).count(),
-            'critical_results': TestResult.objects.filter(
-                test_request__laboratory=laboratory,
-                result_date__date=today,
-                is_critical=True
-            ).count()
+            'total_requests': counts['requests']['total_requests'],
+            'completed_tests': counts['results']['completed_tests'],
+            'pending_samples': counts['samples']['pending_samples'],
+            'critical_results': counts['results']['critical_results']
         }
         
-        # إحصائيات الأسبوع
-        week_ago = today - timedelta(days=7)
-        weekly_tests = TestResult.objects.filter(
-            test_request__laboratory=laboratory,
-            result_date__gte=week_ago
-        ).count()
-        
         return Response({
             'today': today_stats,
             'weekly_tests': weekly_tests,
@@ -0,0 +1,110 @@
+"""
+فهرس الوصول إلى السجلات الطبية
+
+يحتفظ جدول ``RecordAccess`` بصف (الطبيب، المريض، المصدر) لكل طبيب يحق له رؤية
+سجلات مريض: كاتب السجل، والأطباء المعالجون، والأطباء الذين شورك السجل معهم.
+يُعاد بناء صفوف المريض كاملة عند أي تغيير (عدد صفوفه صغير) فيبقى الفهرس
+مطابقاً للمصادر دون عدّادات مرجعية.
+"""
+
+from accounts.models import Patient
+
+from .models import MedicalRecord, RecordAccess
+
+
+class RecordAccessIndex:
+    """بناء فهرس الوصول واستخدامه في فلترة قوائم الطبيب"""
+
+    BATCH_SIZE = 500
+
+    @classmethod
+    def expected(cls, patient_ids):
+        """صفوف الفهرس المستحقة للمرضى من مصادرها الأصلية"""
+        authors = MedicalRecord.objects.filter(patient_id__in=patient_ids).values_list(
+            "doctor_id", "patient_id"
+        )
+        assigned = Patient.assigned_doctors.through.objects.filter(
+            patient_id__in=patient_ids
+        ).values_list("doctor_id", "patient_id")
+        shared = MedicalRecord.shared_with.through.objects.filter(
+            medicalrecord__patient_id__in=patient_ids
+        ).values_list("doctor_id", "medicalrecord__patient_id")
+
+        rows = set()
+        for source, pairs in (
+            (RecordAccess.Source.AUTHOR, authors),
+            (RecordAccess.Source.ASSIGNED, assigned),
+            (RecordAccess.Source.SHARED, shared),
+        ):
+            rows.update(
+                (doctor_id, patient_id, source.value)
+                for doctor_id, patient_id in pairs
+                if doctor_id is not None
+            )
+        return rows
+
+    @classmethod
+    def rebuild(cls, patient_ids):
+        """مزامنة صفوف الفهرس لمرضى محددين مع مصادرها"""
+        patient_ids = list(set(patient_ids))
+        if not patient_ids:
+            return 0, 0
+
+        expected = cls.expected(patient_ids)
+        existing = {
+            (doctor_id, patient_id, source): pk
+            for pk, doctor_id, patient_id, source in RecordAccess.objects.filter(
+                patient_id__in=patient_ids
+            ).values_list("pk", "doctor_id", "patient_id", "source")
+        }
+
+        stale = [pk for row, pk in existing.items() if row not in expected]
+        if stale:
+            RecordAccess.objects.filter(pk__in=stale).delete()
+        missing = [
+            RecordAccess(doctor_id=doctor_id, patient_id=patient_id, source=source)
+            for doctor_id, patient_id, source in expected - existing.keys()
+        ]
+        if missing:
+            RecordAccess.objects.bulk_create(missing, ignore_conflicts=True)
+        return len(missing), len(stale)
+
+    @classmethod
+    def rebuild_all(cls):
+        """إعادة بناء الفهرس لجميع المرضى على دفعات"""
+        patient_ids = Patient.objects.order_by("pk").values_list("pk", flat=True)
+        created = deleted = 0
+        batch = []
+        for patient_id in patient_ids.iterator(chunk_size=cls.BATCH_SIZE):
+            batch.append(patient_id)
+            if len(batch) >= cls.BATCH_SIZE:
+                added, removed = cls.rebuild(batch)
+                created, deleted, batch = created + added, deleted + removed, []
+        added, removed = cls.rebuild(batch)
+        return created + added, deleted + removed
+
+    @classmethod
+    def patients_for(cls, doctor, sources=None):
+        """استعلام فرعي بمعرفات المرضى الذين يراهم الطبيب"""
+        access = RecordAccess.objects.filter(doctor=doctor)
+        if sources is not None:
+            access = access.filter(source__in=sources)
+        return access.values("patient_id")
+
+    @classmethod
+    def filter_queryset(cls, queryset, doctor, sources=None):
+        """
+        قصر الاستعلام على مرضى الطبيب
+
+        ``patient_id IN (SELECT ...)`` شبه ربط على فهرس الوصول فلا يتكرر أي صف
+        ولا حاجة إلى ``DISTINCT``.
+        """
+        return queryset.filter(patient_id__in=cls.patients_for(doctor, sources))
+
+    @classmethod
+    def patients_from_index(cls, doctor_id, source):
+        return list(
+            RecordAccess.objects.filter(doctor_id=doctor_id, source=source).values_list(
+                "patient_id", flat=True
+            )
+        )
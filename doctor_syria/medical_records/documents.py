@@ -0,0 +1,35 @@
+"""
+مستندات PDF للسجلات الطبية
+"""
+
+from django.db.models import Count, Max
+
+from doctor_syria.core.documents import DocumentType, register
+
+from .models import MedicalRecord
+
+
+def record_context(record):
+    return {
+        "record": record,
+        "prescriptions": list(record.prescriptions.order_by("created_at")),
+    }
+
+
+def record_fingerprint(record):
+    prescriptions = record.prescriptions.aggregate(
+        count=Count("pk"), updated=Max("updated_at")
+    )
+    return [record._meta.label, record.pk, record.updated_at, prescriptions]
+
+
+MEDICAL_RECORD = register(
+    DocumentType(
+        name="medical_record",
+        model=MedicalRecord,
+        template="medical_records/record_pdf.html",
+        context=record_context,
+        filename=lambda record: f"medical_record_{record.pk}.pdf",
+        fingerprint=record_fingerprint,
+    )
+)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from medical_records.access import RecordAccessIndex
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء فهرس الوصول إلى السجلات الطبية من مصادره"
+
+    def handle(self, *args, **options):
+        created, deleted = RecordAccessIndex.rebuild_all()
+        self.stdout.write(
+            self.style.SUCCESS(f"تم تحديث الفهرس: {created} إضافة, {deleted} حذف")
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from medical_records.statistics import RecordStatistics
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء تجميعات إحصائيات السجلات الطبية من مصادرها"
+
+    def handle(self, *args, **options):
+        written = RecordStatistics.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"تم بناء {written} صف إحصائي"))
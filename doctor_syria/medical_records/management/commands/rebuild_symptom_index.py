@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from medical_records.symptoms import SymptomIndex
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء فهرس الأعراض للسجلات الطبية"
+
+    def handle(self, *args, **options):
+        written = SymptomIndex.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"تم فهرسة {written} رمز عرض"))
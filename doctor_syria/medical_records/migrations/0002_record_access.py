@@ -0,0 +1,93 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_record_access(apps, schema_editor):
+    MedicalRecord = apps.get_model("medical_records", "MedicalRecord")
+    RecordAccess = apps.get_model("medical_records", "RecordAccess")
+    RecordAccess.objects.bulk_create(
+        [
+            RecordAccess(doctor_id=doctor_id, patient_id=patient_id, source="author")
+            for doctor_id, patient_id in MedicalRecord.objects.values_list(
+                "doctor_id", "patient_id"
+            ).distinct()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0005_patient_assigned_doctors"),
+        ("medical_records", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="medicalrecord",
+            name="shared_with",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="shared_records",
+                to="accounts.doctor",
+                verbose_name="مشارك مع",
+            ),
+        ),
+        migrations.CreateModel(
+            name="RecordAccess",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("author", "كاتب السجل"),
+                            ("assigned", "طبيب معالج"),
+                            ("shared", "مشاركة"),
+                        ],
+                        max_length=10,
+                        verbose_name="المصدر",
+                    ),
+                ),
+                (
+                    "doctor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="record_access",
+                        to="accounts.doctor",
+                        verbose_name="الطبيب",
+                    ),
+                ),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="record_access",
+                        to="accounts.patient",
+                        verbose_name="المريض",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "صلاحية وصول لسجل",
+                "verbose_name_plural": "صلاحيات الوصول للسجلات",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("doctor", "source", "patient"),
+                        name="unique_record_access",
+                    )
+                ],
+            },
+        ),
+        # الأطباء المعالجون والمشاركات جديدة، فالسجلات القائمة لها كاتبها فقط
+        migrations.RunPython(build_record_access, migrations.RunPython.noop),
+    ]
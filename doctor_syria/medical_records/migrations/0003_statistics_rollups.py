@@ -0,0 +1,105 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0005_patient_assigned_doctors"),
+        ("medical_records", "0002_record_access"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecordDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="اليوم")),
+                (
+                    "severity",
+                    models.CharField(max_length=10, verbose_name="مستوى الخطورة"),
+                ),
+                (
+                    "record_type",
+                    models.CharField(max_length=20, verbose_name="نوع السجل"),
+                ),
+                (
+                    "total",
+                    models.PositiveIntegerField(default=0, verbose_name="العدد"),
+                ),
+                (
+                    "doctor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="record_stats",
+                        to="accounts.doctor",
+                        verbose_name="الطبيب",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "إحصائية سجلات يومية",
+                "verbose_name_plural": "إحصائيات السجلات اليومية",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("doctor", "day", "severity", "record_type"),
+                        name="unique_record_daily_stat",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="NameDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="اليوم")),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("diagnosis", "تشخيص"), ("treatment", "علاج")],
+                        max_length=10,
+                        verbose_name="النوع",
+                    ),
+                ),
+                ("name", models.CharField(max_length=200, verbose_name="الاسم")),
+                (
+                    "total",
+                    models.PositiveIntegerField(default=0, verbose_name="العدد"),
+                ),
+                (
+                    "doctor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="name_stats",
+                        to="accounts.doctor",
+                        verbose_name="الطبيب",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "إحصائية أسماء يومية",
+                "verbose_name_plural": "إحصائيات الأسماء اليومية",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("doctor", "kind", "day", "name"),
+                        name="unique_name_daily_stat",
+                    )
+                ],
+            },
+        ),
+    ]
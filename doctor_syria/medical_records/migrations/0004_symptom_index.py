@@ -0,0 +1,44 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("medical_records", "0003_statistics_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SymptomTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(max_length=64, verbose_name="الرمز")),
+                (
+                    "record",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="symptom_terms",
+                        to="medical_records.medicalrecord",
+                        verbose_name="السجل الطبي",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "رمز عرض",
+                "verbose_name_plural": "فهرس الأعراض",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("token", "record"), name="unique_symptom_term"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("medical_records", "0004_symptom_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="medicalrecord",
+            index=models.Index(fields=["-date", "-id"], name="record_date_keyset"),
+        ),
+        migrations.AddIndex(
+            model_name="medicalrecord",
+            index=models.Index(
+                fields=["doctor", "-date", "-id"], name="record_doctor_keyset"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="medicalrecord",
+            index=models.Index(
+                fields=["patient", "-date", "-id"], name="record_patient_keyset"
+            ),
+        ),
+    ]
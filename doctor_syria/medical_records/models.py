@@ -67,11 +67,27 @@ class MedicalRecord(TimestampMixin, SoftDeleteMixin, AuditMixin):
     attachments = models.FileField(
         _("المرفقات"), upload_to="medical_records/", null=True, blank=True
     )
+    shared_with = models.ManyToManyField(
+        Doctor,
+        blank=True,
+        related_name="shared_records",
+        verbose_name=_("مشارك مع"),
+    )
 
     class Meta:
         verbose_name = _("سجل طبي")
         verbose_name_plural = _("السجلات الطبية")
         ordering = ["-date"]
+        # فهارس الترتيب الافتراضي مع المفتاح لترقيم القوائم بالمؤشرات
+        indexes = [
+            models.Index(fields=["-date", "-id"], name="record_date_keyset"),
+            models.Index(
+                fields=["doctor", "-date", "-id"], name="record_doctor_keyset"
+            ),
+            models.Index(
+                fields=["patient", "-date", "-id"], name="record_patient_keyset"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.patient.user.get_full_name()} - {self.get_record_type_display()} - {self.date}"
@@ -83,6 +99,143 @@ class MedicalRecord(TimestampMixin, SoftDeleteMixin, AuditMixin):
         return round(float(self.weight) / (height_m * height_m), 2)
 
 
+class RecordAccess(models.Model):
+    """
+    فهرس الوصول إلى السجلات: أي طبيب يرى سجلات أي مريض ومصدر ذلك
+
+    جدول مشتق يُحدّث بالإشارات عند تغيير كاتب السجل أو الأطباء المعالجين أو
+    المشاركة، فتُفلتر قوائم الطبيب باستعلام فرعي واحد على الفهرس بدل OR عبر
+    علاقة متعدد-لمتعدد مع DISTINCT.
+    """
+
+    class Source(models.TextChoices):
+        AUTHOR = "author", _("كاتب السجل")
+        ASSIGNED = "assigned", _("طبيب معالج")
+        SHARED = "shared", _("مشاركة")
+
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        related_name="record_access",
+        verbose_name=_("الطبيب"),
+    )
+    patient = models.ForeignKey(
+        Patient,
+        on_delete=models.CASCADE,
+        related_name="record_access",
+        verbose_name=_("المريض"),
+    )
+    source = models.CharField(_("المصدر"), max_length=10, choices=Source.choices)
+
+    class Meta:
+        verbose_name = _("صلاحية وصول لسجل")
+        verbose_name_plural = _("صلاحيات الوصول للسجلات")
+        constraints = [
+            # الفهرس (doctor, source, patient) يغطي استعلام قائمة الطبيب بالكامل
+            models.UniqueConstraint(
+                fields=["doctor", "source", "patient"], name="unique_record_access"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.doctor} - {self.patient} ({self.get_source_display()})"
+
+
+class RecordDailyStat(models.Model):
+    """
+    عدد السجلات اليومي لكل طبيب حسب الخطورة ونوع السجل
+
+    جدول تجميع يُعاد حساب خلايا (الطبيب، اليوم) المتأثرة عند كل كتابة، فتُجاب
+    الإحصائيات لأي فترة بجمع صفوف قليلة بدل تجميع السجلات نفسها.
+    """
+
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        related_name="record_stats",
+        verbose_name=_("الطبيب"),
+    )
+    day = models.DateField(_("اليوم"))
+    severity = models.CharField(_("مستوى الخطورة"), max_length=10)
+    record_type = models.CharField(_("نوع السجل"), max_length=20)
+    total = models.PositiveIntegerField(_("العدد"), default=0)
+
+    class Meta:
+        verbose_name = _("إحصائية سجلات يومية")
+        verbose_name_plural = _("إحصائيات السجلات اليومية")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["doctor", "day", "severity", "record_type"],
+                name="unique_record_daily_stat",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.doctor} - {self.day} ({self.total})"
+
+
+class NameDailyStat(models.Model):
+    """عدد التشخيصات أو العلاجات اليومي لكل طبيب حسب الاسم"""
+
+    class Kind(models.TextChoices):
+        DIAGNOSIS = "diagnosis", _("تشخيص")
+        TREATMENT = "treatment", _("علاج")
+
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        related_name="name_stats",
+        verbose_name=_("الطبيب"),
+    )
+    day = models.DateField(_("اليوم"))
+    kind = models.CharField(_("النوع"), max_length=10, choices=Kind.choices)
+    name = models.CharField(_("الاسم"), max_length=200)
+    total = models.PositiveIntegerField(_("العدد"), default=0)
+
+    class Meta:
+        verbose_name = _("إحصائية أسماء يومية")
+        verbose_name_plural = _("إحصائيات الأسماء اليومية")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["doctor", "kind", "day", "name"],
+                name="unique_name_daily_stat",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.doctor} - {self.name} ({self.total})"
+
+
+class SymptomTerm(models.Model):
+    """
+    فهرس مقلوب من رموز الأعراض الموحدة إلى السجلات الطبية
+
+    يُحدّث عند تغيير نصوص السجل، ويُبحث فيه بمطابقة الرموز بدل ``LIKE`` على
+    الملاحظات.
+    """
+
+    token = models.CharField(_("الرمز"), max_length=64)
+    record = models.ForeignKey(
+        MedicalRecord,
+        on_delete=models.CASCADE,
+        related_name="symptom_terms",
+        verbose_name=_("السجل الطبي"),
+    )
+
+    class Meta:
+        verbose_name = _("رمز عرض")
+        verbose_name_plural = _("فهرس الأعراض")
+        constraints = [
+            # العمود الأول (token) يخدم البحث، والقيد يمنع تكرار الرمز للسجل
+            models.UniqueConstraint(
+                fields=["token", "record"], name="unique_symptom_term"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.token} - {self.record_id}"
+
+
 class VitalSigns(models.Model):
     """المؤشرات الحيوية"""
 
@@ -0,0 +1,123 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Patient
+
+from .access import RecordAccessIndex
+from .models import MedicalRecord, RecordAccess
+from .statistics import NAME_SOURCES, RECORD_SOURCE, RecordStatistics
+from .symptoms import INDEXED_FIELDS, SymptomIndex
+from .timeline import TIMELINE_SOURCES, TimelineCache
+
+
+@receiver(post_save, sender=MedicalRecord)
+@receiver(post_delete, sender=MedicalRecord)
+def update_author_access(sender, instance, update_fields=None, **kwargs):
+    """
+    تحديث فهرس الوصول عند تغيير كاتب السجل
+    """
+    if update_fields is not None and not {"doctor", "patient"} & set(update_fields):
+        return
+    RecordAccessIndex.rebuild([instance.patient_id])
+
+
+@receiver(post_save, sender=MedicalRecord)
+def update_symptom_index(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    تحديث رموز الأعراض عند تغيير نصوص السجل
+    """
+    if raw:
+        return
+    if update_fields is not None and not set(INDEXED_FIELDS) & set(update_fields):
+        return
+    SymptomIndex.update(instance)
+
+
+def changed_patients(instance, reverse, pk_set, source, patients_of):
+    """المرضى المتأثرون بتغيير علاقة متعدد-لمتعدد"""
+    if not reverse:
+        return patients_of([instance.pk])
+    if pk_set is None:
+        # clear() من جهة الطبيب لا يمرر العناصر، فتُؤخذ من الفهرس نفسه
+        return RecordAccessIndex.patients_from_index(instance.pk, source)
+    return patients_of(pk_set)
+
+
+@receiver(m2m_changed, sender=Patient.assigned_doctors.through)
+def update_assigned_access(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    تحديث فهرس الوصول عند تعيين الأطباء المعالجين أو إزالتهم
+    """
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    patient_ids = changed_patients(
+        instance, reverse, pk_set, RecordAccess.Source.ASSIGNED, list
+    )
+    RecordAccessIndex.rebuild(patient_ids)
+
+
+@receiver(m2m_changed, sender=MedicalRecord.shared_with.through)
+def update_shared_access(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    تحديث فهرس الوصول عند مشاركة السجل أو إلغاء مشاركته
+    """
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    patient_ids = changed_patients(
+        instance,
+        reverse,
+        pk_set,
+        RecordAccess.Source.SHARED,
+        lambda record_ids: MedicalRecord.objects.filter(pk__in=record_ids).values_list(
+            "patient_id", flat=True
+        ),
+    )
+    RecordAccessIndex.rebuild(patient_ids)
+
+
+def invalidate_timeline(sender, instance, **kwargs):
+    """
+    إهمال صفحات الخط الزمني المخزنة للمريض عند تغيير أي من مصادرها
+    """
+    source = TIMELINE_MODELS[sender]
+    TimelineCache.invalidate(source.patient_id_for(instance))
+
+
+TIMELINE_MODELS = {source.model: source for source in TIMELINE_SOURCES}
+for model in TIMELINE_MODELS:
+    post_save.connect(invalidate_timeline, sender=model)
+    post_delete.connect(invalidate_timeline, sender=model)
+
+
+def remember_statistics_bucket(sender, instance, raw=False, **kwargs):
+    """
+    حفظ خلية الصف قبل تعديله لإعادة حسابها إن تغير اليوم أو الطبيب
+    """
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._statistics_bucket = STATISTICS_MODELS[sender].stored_bucket(instance.pk)
+
+
+def update_statistics(sender, instance, raw=False, **kwargs):
+    """
+    إعادة حساب خلايا الإحصائيات المتأثرة بكتابة صف أو حذفه
+    """
+    if raw:
+        return
+    source = STATISTICS_MODELS[sender]
+    previous = getattr(instance, "_statistics_bucket", None)
+    current = source.bucket_for(instance)
+    buckets = {previous, current}
+    if sender is MedicalRecord and previous and current and previous[0] != current[0]:
+        # الوصفات تُنسب إلى طبيب السجل فتنتقل معه
+        buckets |= RecordStatistics.prescription_buckets(
+            instance.pk, (previous[0], current[0])
+        )
+    RecordStatistics.rebuild(buckets)
+
+
+STATISTICS_MODELS = {source.model: source for source in [RECORD_SOURCE, *NAME_SOURCES]}
+for model in STATISTICS_MODELS:
+    pre_save.connect(remember_statistics_bucket, sender=model)
+    post_save.connect(update_statistics, sender=model)
+    post_delete.connect(update_statistics, sender=model)
@@ -0,0 +1,251 @@
+"""
+تجميعات إحصائيات السجلات الطبية
+
+تُحفظ أعداد يومية لكل طبيب في ``RecordDailyStat`` (حسب الخطورة ونوع السجل)
+و``NameDailyStat`` (أسماء التشخيصات والعلاجات). عند كتابة أي صف مصدر تُعاد
+حساب خلايا (الطبيب، اليوم) المتأثرة فقط من مصادرها، كما يفعل فهرس الوصول،
+فتبقى التجميعات مطابقة دون عدّادات تراكمية قابلة للانحراف.
+"""
+
+import operator
+from functools import reduce
+from typing import NamedTuple, Optional
+
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from accounts.models import Doctor
+
+from .models import (
+    ChronicCondition,
+    MedicalRecord,
+    NameDailyStat,
+    Prescription,
+    RecordDailyStat,
+)
+
+TOP_NAMES = 10
+
+
+class StatisticSource(NamedTuple):
+    model: type
+    doctor_path: str
+    date_field: str
+    name_field: Optional[str] = None
+    kind: Optional[str] = None
+
+    @property
+    def is_datetime(self):
+        field = self.model._meta.get_field(self.date_field)
+        return isinstance(field, models.DateTimeField)
+
+    def day(self):
+        """تعبير اليوم في SQL (بالمنطقة الزمنية الحالية للحقول الزمنية)"""
+        return TruncDate(self.date_field) if self.is_datetime else F(self.date_field)
+
+    def bucket(self, doctor_id, value):
+        if doctor_id is None or value is None:
+            return None
+        if self.is_datetime:
+            value = timezone.localdate(value)
+        return doctor_id, value
+
+    def bucket_for(self, instance):
+        """خلية (الطبيب، اليوم) لصف من هذا المصدر"""
+        *path, last = self.doctor_path.split("__")
+        related = instance
+        for name in path:
+            related = getattr(related, name)
+        return self.bucket(
+            getattr(related, f"{last}_id"), getattr(instance, self.date_field)
+        )
+
+    def stored_bucket(self, pk):
+        """خلية الصف كما هي محفوظة في قاعدة البيانات قبل تعديله"""
+        row = (
+            self.model._default_manager.filter(pk=pk)
+            .values_list(self.doctor_path, self.date_field)
+            .first()
+        )
+        return self.bucket(*row) if row else None
+
+    def buckets_scope(self, buckets):
+        lookup = f"{self.date_field}__date" if self.is_datetime else self.date_field
+        return reduce(
+            operator.or_,
+            (
+                Q(**{self.doctor_path: doctor_id, lookup: day})
+                for doctor_id, day in buckets
+            ),
+        )
+
+    def doctors_scope(self, doctor_ids):
+        return Q(**{f"{self.doctor_path}__in": doctor_ids})
+
+    def counts(self, scope, *fields, **expressions):
+        return (
+            self.model._default_manager.filter(scope)
+            .values(
+                *fields,
+                stat_doctor=F(self.doctor_path),
+                stat_day=self.day(),
+                **expressions,
+            )
+            .annotate(stat_count=Count("pk"))
+            .order_by()
+        )
+
+
+RECORD_SOURCE = StatisticSource(MedicalRecord, "doctor", "date")
+
+NAME_SOURCES = [
+    StatisticSource(
+        ChronicCondition,
+        "treating_doctor",
+        "diagnosis_date",
+        "condition_name",
+        NameDailyStat.Kind.DIAGNOSIS,
+    ),
+    StatisticSource(
+        Prescription,
+        "medical_record__doctor",
+        "created_at",
+        "medicine_name",
+        NameDailyStat.Kind.TREATMENT,
+    ),
+]
+
+
+class RecordStatistics:
+    """صيانة تجميعات الإحصائيات والإجابة منها"""
+
+    BATCH_SIZE = 200
+
+    @classmethod
+    def _replace(cls, doctor_ids, stats_scope, source_scope):
+        """استبدال صفوف التجميع في النطاق بأعداد محسوبة من المصادر"""
+        with transaction.atomic():
+            # قفل الأطباء يمنع إعادتي بناء متزامنتين لنفس الخلايا
+            list(
+                Doctor.objects.select_for_update()
+                .filter(pk__in=doctor_ids)
+                .values_list("pk", flat=True)
+            )
+            records = [
+                RecordDailyStat(
+                    doctor_id=row["stat_doctor"],
+                    day=row["stat_day"],
+                    severity=row["severity"],
+                    record_type=row["record_type"],
+                    total=row["stat_count"],
+                )
+                for row in RECORD_SOURCE.counts(
+                    source_scope(RECORD_SOURCE), "severity", "record_type"
+                )
+            ]
+            names = [
+                NameDailyStat(
+                    doctor_id=row["stat_doctor"],
+                    day=row["stat_day"],
+                    kind=source.kind,
+                    name=row["stat_name"],
+                    total=row["stat_count"],
+                )
+                for source in NAME_SOURCES
+                for row in source.counts(
+                    source_scope(source), stat_name=F(source.name_field)
+                )
+                if row["stat_doctor"] is not None
+            ]
+            RecordDailyStat.objects.filter(stats_scope).delete()
+            NameDailyStat.objects.filter(stats_scope).delete()
+            RecordDailyStat.objects.bulk_create(records, batch_size=1000)
+            NameDailyStat.objects.bulk_create(names, batch_size=1000)
+        return len(records) + len(names)
+
+    @classmethod
+    def rebuild(cls, buckets):
+        """إعادة حساب خلايا (الطبيب، اليوم) محددة"""
+        buckets = {bucket for bucket in buckets if bucket is not None}
+        if not buckets:
+            return 0
+        stats_scope = reduce(
+            operator.or_,
+            (Q(doctor_id=doctor_id, day=day) for doctor_id, day in buckets),
+        )
+        return cls._replace(
+            {doctor_id for doctor_id, _ in buckets},
+            stats_scope,
+            lambda source: source.buckets_scope(buckets),
+        )
+
+    @classmethod
+    def rebuild_all(cls):
+        """إعادة بناء التجميعات كاملة على دفعات من الأطباء"""
+        doctor_ids = list(Doctor.objects.order_by("pk").values_list("pk", flat=True))
+        written = 0
+        for start in range(0, len(doctor_ids), cls.BATCH_SIZE):
+            batch = doctor_ids[start : start + cls.BATCH_SIZE]
+            written += cls._replace(
+                batch,
+                Q(doctor_id__in=batch),
+                lambda source: source.doctors_scope(batch),
+            )
+        return written
+
+    @classmethod
+    def prescription_buckets(cls, record_id, doctor_ids):
+        """خلايا وصفات السجل لعدة أطباء (عند نقل السجل إلى طبيب آخر)"""
+        source = NAME_SOURCES[1]
+        days = (
+            Prescription.objects.filter(medical_record_id=record_id)
+            .annotate(stat_day=source.day())
+            .values_list("stat_day", flat=True)
+            .distinct()
+        )
+        return {(doctor_id, day) for day in days for doctor_id in doctor_ids}
+
+    @classmethod
+    def summary(cls, doctor, start=None, end=None):
+        """إحصائيات الطبيب لفترة من التجميعات (بحدود شاملة)"""
+        period = Q(doctor=doctor)
+        if start is not None:
+            period &= Q(day__gte=start)
+        if end is not None:
+            period &= Q(day__lte=end)
+
+        records = RecordDailyStat.objects.filter(period)
+        by_severity = list(
+            records.values("severity").annotate(count=Sum("total")).order_by("severity")
+        )
+        by_record_type = list(
+            records.values("record_type")
+            .annotate(count=Sum("total"))
+            .order_by("record_type")
+        )
+        by_month = [
+            {"month": row["month"].strftime("%Y-%m"), "count": row["count"]}
+            for row in records.annotate(month=TruncMonth("day"))
+            .values("month")
+            .annotate(count=Sum("total"))
+            .order_by("month")
+        ]
+
+        def top_names(kind):
+            return list(
+                NameDailyStat.objects.filter(period, kind=kind)
+                .values("name")
+                .annotate(count=Sum("total"))
+                .order_by("-count", "name")[:TOP_NAMES]
+            )
+
+        return {
+            "total_records": sum(row["count"] for row in by_severity),
+            "by_severity": by_severity,
+            "by_record_type": by_record_type,
+            "by_month": by_month,
+            "common_diagnoses": top_names(NameDailyStat.Kind.DIAGNOSIS),
+            "common_treatments": top_names(NameDailyStat.Kind.TREATMENT),
+        }
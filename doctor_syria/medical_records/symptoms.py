@@ -0,0 +1,247 @@
+"""
+فهرس الأعراض المقلوب للسجلات الطبية
+
+تُوحّد نصوص السجل (العنوان والوصف والملاحظات) إلى رموز: تُزال التشكيلات
+وتُوحّد أشكال الألف والتاء المربوطة وأداة التعريف، ثم تُطابق العبارات مع قاموس
+مرادفات عربي وإنجليزي فيصبح "حمى" و"سخونة" و"fever" رمزاً واحداً. تُحفظ
+الرموز في ``SymptomTerm`` ويُرتب البحث بعدد الرموز المتطابقة.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+
+from .models import MedicalRecord, SymptomTerm
+
+# الحقول النصية المفهرسة من السجل
+INDEXED_FIELDS = ("title", "description", "notes")
+
+MIN_TOKEN_LENGTH = 3
+MAX_TOKEN_LENGTH = 64
+
+DEFAULT_SYNONYMS = {
+    "fever": ["fever", "pyrexia", "حمى", "حرارة", "سخونة", "ارتفاع الحرارة"],
+    "cough": ["cough", "coughing", "سعال", "كحة"],
+    "headache": ["headache", "headaches", "صداع", "الم الراس", "وجع الراس"],
+    "shortness_of_breath": [
+        "shortness of breath",
+        "dyspnea",
+        "breathlessness",
+        "ضيق تنفس",
+        "ضيق النفس",
+        "صعوبة التنفس",
+    ],
+    "chest_pain": ["chest pain", "الم الصدر", "الم في الصدر"],
+    "nausea": ["nausea", "غثيان"],
+    "vomiting": ["vomiting", "قيء", "استفراغ"],
+    "diarrhea": ["diarrhea", "diarrhoea", "اسهال"],
+    "fatigue": ["fatigue", "tiredness", "exhaustion", "تعب", "ارهاق", "اعياء"],
+    "dizziness": ["dizziness", "vertigo", "دوخة", "دوار"],
+    "abdominal_pain": ["abdominal pain", "stomach ache", "الم البطن", "مغص"],
+    "sore_throat": ["sore throat", "التهاب الحلق", "الم الحلق"],
+    "runny_nose": ["runny nose", "سيلان الانف", "رشح"],
+    "rash": ["rash", "skin rash", "طفح", "طفح جلدي"],
+    "joint_pain": ["joint pain", "arthralgia", "الم المفاصل"],
+    "back_pain": ["back pain", "الم الظهر"],
+    "insomnia": ["insomnia", "sleeplessness", "ارق"],
+    "loss_of_appetite": ["loss of appetite", "anorexia", "فقدان الشهية"],
+}
+
+ARABIC_MARKS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u0640]")
+WORD = re.compile(r"\w+")
+ARABIC_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+
+
+def normalize_word(word):
+    word = ARABIC_MARKS.sub("", word.lower())
+    word = re.sub("[أإآ]", "ا", word).replace("ة", "ه").replace("ى", "ي")
+    for prefix in ARABIC_PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+            return word[len(prefix) :]
+    return word
+
+
+STOPWORDS = frozenset(
+    normalize_word(word)
+    for word in (
+        "and", "the", "with", "for", "from", "has", "have", "was", "were", "not",
+        "في", "من", "على", "مع", "عن", "إلى", "أو", "منذ", "هذا", "هذه",
+    )
+)
+
+
+def normalize(text):
+    """كلمات النص موحدة بالترتيب"""
+    # تُزال التشكيلات أولاً لأن \w لا يطابقها فتنقسم الكلمة عندها
+    text = ARABIC_MARKS.sub("", text or "")
+    return [normalize_word(word) for word in WORD.findall(text)]
+
+
+def build_phrases(synonyms):
+    """قاموس من العبارة الموحدة (كصف كلمات) إلى الرمز القياسي"""
+    phrases = {}
+    for canonical, variants in synonyms.items():
+        for variant in [canonical.replace("_", " "), *variants]:
+            words = tuple(normalize(variant))
+            if words:
+                phrases[words] = canonical
+    return phrases
+
+
+_phrases = None
+
+
+def get_phrases():
+    global _phrases
+    if _phrases is None:
+        synonyms = {**DEFAULT_SYNONYMS, **getattr(settings, "SYMPTOM_SYNONYMS", {})}
+        _phrases = build_phrases(synonyms)
+    return _phrases
+
+
+def tokenize(text):
+    """
+    رموز النص: العبارات المعروفة برمزها القياسي وباقي الكلمات كما هي بعد التوحيد
+    """
+    phrases = get_phrases()
+    longest = max(map(len, phrases), default=1)
+    words = normalize(text)
+    tokens = set()
+    position = 0
+    while position < len(words):
+        for size in range(min(longest, len(words) - position), 0, -1):
+            phrase = words[position : position + size]
+            canonical = phrases.get(tuple(phrase))
+            if canonical is None and phrase[0].startswith("و"):
+                # واو العطف الملتصقة: "وكحة"، "وضيق النفس"
+                canonical = phrases.get((phrase[0][1:], *phrase[1:]))
+            if canonical is not None:
+                tokens.add(canonical)
+                position += size
+                break
+        else:
+            word = words[position]
+            if len(word) >= MIN_TOKEN_LENGTH and word not in STOPWORDS:
+                tokens.add(word[:MAX_TOKEN_LENGTH])
+            position += 1
+    return tokens
+
+
+def parse_query(values):
+    """رموز استعلام من قائمة أعراض أو نص واحد مفصول بفواصل"""
+    if isinstance(values, str):
+        values = values.split(",")
+    tokens = set()
+    for value in values:
+        tokens |= tokenize(value)
+    return tokens
+
+
+class SymptomIndex:
+    """صيانة فهرس الأعراض والبحث فيه"""
+
+    BATCH_SIZE = 500
+
+    @classmethod
+    def tokens_for(cls, record):
+        text = " ".join(getattr(record, name) or "" for name in INDEXED_FIELDS)
+        return tokenize(text)
+
+    @classmethod
+    def update(cls, record):
+        """مزامنة رموز سجل واحد مع نصوصه الحالية"""
+        expected = cls.tokens_for(record)
+        existing = dict(
+            SymptomTerm.objects.filter(record=record).values_list("token", "pk")
+        )
+        stale = [pk for token, pk in existing.items() if token not in expected]
+        if stale:
+            SymptomTerm.objects.filter(pk__in=stale).delete()
+        missing = expected - existing.keys()
+        if missing:
+            SymptomTerm.objects.bulk_create(
+                [SymptomTerm(token=token, record=record) for token in missing],
+                ignore_conflicts=True,
+            )
+        return len(missing), len(stale)
+
+    @classmethod
+    def rebuild_all(cls):
+        """إعادة بناء الفهرس لجميع السجلات"""
+        records = MedicalRecord.objects.order_by("pk").only("pk", *INDEXED_FIELDS)
+        terms = []
+        written = 0
+        with transaction.atomic():
+            SymptomTerm.objects.all().delete()
+            for record in records.iterator(chunk_size=cls.BATCH_SIZE):
+                terms.extend(
+                    SymptomTerm(token=token, record_id=record.pk)
+                    for token in cls.tokens_for(record)
+                )
+                if len(terms) >= cls.BATCH_SIZE:
+                    SymptomTerm.objects.bulk_create(terms)
+                    written, terms = written + len(terms), []
+            SymptomTerm.objects.bulk_create(terms)
+        return written + len(terms)
+
+    @classmethod
+    def search(cls, tokens, records=None, match_all=False, exclude=None):
+        """
+        معرفات السجلات المطابقة مع درجة التطابق (عدد الرموز المشتركة)
+
+        ``records`` استعلام يقصر النتائج على السجلات المسموحة، وتُرجع النتائج
+        كاستعلام ``values`` مرتب بالدرجة ثم بالأحدث حتى يمكن ترقيمه.
+        """
+        terms = SymptomTerm.objects.filter(token__in=tokens)
+        if records is not None:
+            terms = terms.filter(record__in=records.values("pk"))
+        if exclude is not None:
+            terms = terms.exclude(record_id=exclude)
+        matches = terms.values("record_id").annotate(
+            score=Count("pk"), date=Max("record__date")
+        )
+        if match_all:
+            matches = matches.filter(score=len(tokens))
+        return matches.order_by("-score", "-date", "-record_id")
+
+    @classmethod
+    def ranked(cls, tokens, records=None, match_all=False):
+        """
+        السجلات المطابقة مع درجتها في ``symptom_score``
+
+        الدرجة استعلام فرعي لكل سجل بدل التجميع، فيبقى الناتج استعلام سجلات
+        مرتباً بالدرجة ثم بالأحدث يقبل ترقيم المفاتيح.
+        """
+        terms = SymptomTerm.objects.filter(token__in=tokens)
+        score = (
+            terms.filter(record=OuterRef("pk"))
+            .order_by()
+            .values("record")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        if records is None:
+            records = MedicalRecord.objects.all()
+        matches = records.filter(pk__in=terms.values("record_id")).annotate(
+            symptom_score=Subquery(score)
+        )
+        if match_all:
+            matches = matches.filter(symptom_score=len(tokens))
+        return matches.order_by("-symptom_score", "-date", "-pk")
+
+    @classmethod
+    def similar(cls, text, records=None, exclude=None, limit=10):
+        """أقرب الحالات السابقة لنص أعراض مع نسبة التطابق"""
+        tokens = parse_query(text)
+        if not tokens:
+            return []
+        return [
+            {
+                "record_id": match["record_id"],
+                "score": match["score"],
+                "match_ratio": round(match["score"] / len(tokens), 2),
+            }
+            for match in cls.search(tokens, records, exclude=exclude)[:limit]
+        ]
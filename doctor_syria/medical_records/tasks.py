@@ -0,0 +1,18 @@
+"""
+مهام Celery للسجلات الطبية
+"""
+
+from celery import shared_task
+
+
+@shared_task
+def email_medical_report(record_id):
+    """إرسال تقرير PDF للسجل بالبريد (يُولّد التقرير عند غيابه من التخزين)"""
+    from doctor_syria.core.documents import DocumentRenderer
+
+    from .documents import MEDICAL_RECORD
+    from .models import MedicalRecord
+    from .utils import send_medical_report
+
+    record = MedicalRecord.objects.get(pk=record_id)
+    send_medical_report(record, DocumentRenderer.read(MEDICAL_RECORD.name, record))
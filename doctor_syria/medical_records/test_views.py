@@ -0,0 +1,27 @@
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.testing import assert_constant_queries
+
+from medical_records.tests import make_doctor, make_patient, make_record
+from medical_records.views import MedicalRecordViewSet
+
+
+class MedicalRecordViewSetQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = make_doctor("doctor")
+        for i in range(60):
+            record = make_record(make_patient(f"patient{i}"), cls.doctor)
+            record.shared_with.add(make_doctor(f"shared{i}"))
+
+    def list_records(self, size):
+        request = APIRequestFactory().get("/records/", {"page_size": size})
+        force_authenticate(request, user=self.doctor.user)
+        response = MedicalRecordViewSet.as_view({"get": "list"})(request)
+        response.render()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), size)
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        assert_constant_queries(self.list_records, sizes=(1, 10, 50))
@@ -0,0 +1,397 @@
+from datetime import date, datetime, timezone
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import Doctor, Patient, User
+
+from core.pagination import KeysetPaginator
+from medical_records.access import RecordAccessIndex
+from medical_records.choices import Severity
+from medical_records.models import (
+    ChronicCondition,
+    LabResult,
+    MedicalRecord,
+    NameDailyStat,
+    Prescription,
+    RecordAccess,
+    RecordDailyStat,
+)
+from medical_records.statistics import RecordStatistics
+from medical_records.symptoms import SymptomIndex, parse_query, tokenize
+from medical_records.timeline import Timeline, TimelineCache, decode_cursor
+
+
+def make_doctor(username):
+    user = User.objects.create(email=f"{username}@example.com", user_type="doctor")
+    return Doctor.objects.create(
+        user=user, specialization="باطنية", license_number=username, consultation_fee=0
+    )
+
+
+def make_patient(username):
+    """
+    معرف مريض جديد
+
+    الحقل ``Patient.allergies`` يحجبه ``related_name`` لنموذج ``Allergy`` فلا
+    يمكن إنشاء كائن المريض، فيُدرج صفه مباشرة وتُستخدم المعرفات في الاختبارات.
+    """
+    user = User.objects.create(email=f"{username}@example.com", user_type="patient")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {Patient._meta.db_table} "
+            "(user_id, blood_type, allergies, chronic_diseases) "
+            "VALUES (%s, '', '', '')",
+            [user.pk],
+        )
+    return Patient.objects.values_list("pk", flat=True).get(user=user)
+
+
+def make_record(patient_id, doctor, **fields):
+    defaults = {
+        "blood_type": "A+",
+        "height": 170,
+        "weight": 70,
+        "emergency_contact": "أحمد",
+        "emergency_phone": "0933000000",
+        "record_type": MedicalRecord._meta.get_field("record_type").choices[0][0],
+        "title": "زيارة",
+        "description": "فحص دوري",
+    }
+    defaults.update(fields)
+    return MedicalRecord.objects.create(
+        patient_id=patient_id, doctor=doctor, **defaults
+    )
+
+
+class RecordAccessIndexTests(TestCase):
+    def setUp(self):
+        self.author = make_doctor("author")
+        self.assigned = make_doctor("assigned")
+        self.shared = make_doctor("shared")
+        self.other = make_doctor("other")
+        self.patient = make_patient("patient")
+        self.record = make_record(self.patient, self.author)
+
+    def rows(self):
+        return set(
+            RecordAccess.objects.values_list("doctor_id", "patient_id", "source")
+        )
+
+    def test_signals_keep_index_in_sync_with_sources(self):
+        self.assigned.assigned_patients.add(self.patient)
+        self.record.shared_with.add(self.shared)
+
+        Source = RecordAccess.Source
+        self.assertEqual(
+            self.rows(),
+            {
+                (self.author.pk, self.patient, Source.AUTHOR),
+                (self.assigned.pk, self.patient, Source.ASSIGNED),
+                (self.shared.pk, self.patient, Source.SHARED),
+            },
+        )
+
+        self.record.shared_with.remove(self.shared)
+        self.assigned.assigned_patients.clear()
+        self.assertEqual(
+            self.rows(), {(self.author.pk, self.patient, Source.AUTHOR)}
+        )
+
+    def test_rebuild_repairs_stale_and_missing_rows(self):
+        RecordAccess.objects.all().delete()
+        RecordAccess.objects.create(
+            doctor=self.other,
+            patient_id=self.patient,
+            source=RecordAccess.Source.SHARED,
+        )
+
+        self.assertEqual(RecordAccessIndex.rebuild_all(), (1, 1))
+        self.assertEqual(RecordAccessIndex.rebuild([self.patient]), (0, 0))
+
+    def test_filter_queryset_returns_each_record_once(self):
+        # الطبيب كاتب السجل ومعالج ومشارك في آن واحد
+        self.author.assigned_patients.add(self.patient)
+        self.record.shared_with.add(self.author)
+        make_record(make_patient("stranger"), self.other)
+
+        records = RecordAccessIndex.filter_queryset(
+            MedicalRecord.objects.all(), self.author
+        )
+        self.assertEqual(list(records), [self.record])
+        self.assertFalse(
+            RecordAccessIndex.filter_queryset(
+                MedicalRecord.objects.all(), self.author, [RecordAccess.Source.SHARED]
+            ).exclude(pk=self.record.pk)
+        )
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.patient = make_patient("patient")
+        # أيام مشتركة بين المصدرين لاختبار كسر التعادل بالنوع والمعرف
+        for day in (1, 1, 2, 3, 3, 3):
+            self.lab_result(date(2024, 1, day))
+        for day in (1, 3, 4):
+            ChronicCondition.objects.create(
+                patient_id=self.patient,
+                condition_name="ضغط",
+                diagnosis_date=date(2024, 1, day),
+                severity="mild",
+                status="active",
+                treatment_plan="متابعة",
+            )
+
+    def lab_result(self, test_date):
+        return LabResult.objects.create(
+            patient_id=self.patient,
+            test_name="سكر",
+            test_date=test_date,
+            result_value="90",
+            normal_range="70-110",
+            is_normal=True,
+            lab_name="المخبر",
+        )
+
+    def entries(self, results):
+        return [(entry["date"], entry["type"], entry["id"]) for entry in results]
+
+    def test_cursor_pages_cover_the_merged_timeline_once(self):
+        timeline = Timeline(self.patient)
+        everything = self.entries(timeline.page(page_size=100)["results"])
+        self.assertEqual(len(everything), 9)
+        self.assertEqual(everything, sorted(everything, reverse=True))
+
+        walked, cursor = [], None
+        while True:
+            page = timeline.page(cursor, page_size=2)
+            walked += self.entries(page["results"])
+            cursor = page["next"]
+            if cursor is None:
+                break
+        self.assertEqual(walked, everything)
+
+    def test_tampered_cursor_is_rejected(self):
+        for cursor in ("not-base64!", "W10=", "WyJ4IiwgImEiLCAxXQ=="):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_cached_pages_are_invalidated_by_source_changes(self):
+        timeline = Timeline(self.patient)
+        first = TimelineCache.get_page(timeline, page_size=3)
+        with self.assertNumQueries(0):
+            self.assertEqual(TimelineCache.get_page(timeline, page_size=3), first)
+
+        newest = self.lab_result(date(2024, 2, 1))
+        page = TimelineCache.get_page(timeline, page_size=3)
+        self.assertEqual(page["results"][0]["id"], newest.pk)
+
+        newest.delete()
+        self.assertEqual(TimelineCache.get_page(timeline, page_size=3), first)
+
+
+class RecordStatisticsTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor("doctor")
+        self.other = make_doctor("other")
+        self.march = make_record(make_patient("first"), self.doctor, date=self.at(3, 5))
+        make_record(
+            make_patient("second"),
+            self.doctor,
+            date=self.at(3, 20),
+            severity=Severity.HIGH,
+        )
+        make_record(make_patient("third"), self.doctor, date=self.at(4, 2))
+        for name in ("سكري", "سكري", "ضغط"):
+            ChronicCondition.objects.create(
+                patient_id=self.march.patient_id,
+                condition_name=name,
+                diagnosis_date=date(2024, 3, 5),
+                severity="mild",
+                status="active",
+                treating_doctor=self.doctor,
+                treatment_plan="متابعة",
+            )
+        for _ in range(2):
+            Prescription.objects.create(
+                medical_record=self.march,
+                medicine_name="ميتفورمين",
+                dosage="500mg",
+                frequency="مرتين",
+                duration="شهر",
+            )
+
+    @staticmethod
+    def at(month, day):
+        return datetime(2024, month, day, 10, tzinfo=timezone.utc)
+
+    def test_summary_is_answered_from_rollups(self):
+        summary = RecordStatistics.summary(self.doctor)
+
+        self.assertEqual(summary["total_records"], 3)
+        self.assertEqual(
+            summary["by_severity"],
+            [
+                {"severity": Severity.HIGH, "count": 1},
+                {"severity": Severity.LOW, "count": 2},
+            ],
+        )
+        self.assertEqual(
+            summary["by_month"],
+            [{"month": "2024-03", "count": 2}, {"month": "2024-04", "count": 1}],
+        )
+        self.assertEqual(
+            summary["common_diagnoses"],
+            [{"name": "سكري", "count": 2}, {"name": "ضغط", "count": 1}],
+        )
+        self.assertEqual(
+            summary["common_treatments"], [{"name": "ميتفورمين", "count": 2}]
+        )
+
+        april = RecordStatistics.summary(self.doctor, start=date(2024, 4, 1))
+        self.assertEqual(april["total_records"], 1)
+        self.assertEqual(april["common_diagnoses"], [])
+
+    def test_moved_record_rebuilds_old_and_new_cells(self):
+        self.march.date = self.at(4, 2)
+        self.march.save()
+        self.assertEqual(
+            RecordStatistics.summary(self.doctor)["by_month"],
+            [{"month": "2024-03", "count": 1}, {"month": "2024-04", "count": 2}],
+        )
+
+        self.march.doctor = self.other
+        self.march.save()
+        self.assertEqual(RecordStatistics.summary(self.doctor)["total_records"], 2)
+        moved = RecordStatistics.summary(self.other)
+        self.assertEqual(moved["total_records"], 1)
+        # الوصفات تُنسب إلى طبيب السجل فتنتقل معه
+        self.assertEqual(
+            moved["common_treatments"], [{"name": "ميتفورمين", "count": 2}]
+        )
+        self.assertEqual(RecordStatistics.summary(self.doctor)["common_treatments"], [])
+
+    def test_rebuild_all_restores_rollups(self):
+        expected = RecordStatistics.summary(self.doctor)
+        RecordDailyStat.objects.all().delete()
+        NameDailyStat.objects.all().delete()
+
+        RecordStatistics.rebuild_all()
+
+        self.assertEqual(RecordStatistics.summary(self.doctor), expected)
+
+
+class SymptomIndexTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor("doctor")
+        self.other = make_doctor("other")
+        self.fever_cough = make_record(
+            make_patient("first"),
+            self.doctor,
+            title="حُمّى",
+            description="سخونة وكحة منذ يومين",
+            date=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        )
+        self.fever = make_record(
+            make_patient("second"),
+            self.doctor,
+            title="Fever",
+            description="pyrexia with headache",
+            date=datetime(2024, 2, 1, tzinfo=timezone.utc),
+        )
+        self.elsewhere = make_record(
+            make_patient("third"),
+            self.other,
+            title="حرارة",
+            description="سعال",
+        )
+
+    def test_tokenize_maps_synonyms_and_normalizes_arabic(self):
+        self.assertEqual(tokenize("حُمّى وكحة"), {"fever", "cough"})
+        self.assertEqual(tokenize("ارتفاع الحرارة"), {"fever"})
+        self.assertEqual(
+            tokenize("وضيق النفس مع الإرهاق"), {"shortness_of_breath", "fatigue"}
+        )
+        self.assertEqual(
+            tokenize("Shortness of breath and wheezing"),
+            {"shortness_of_breath", "wheezing"},
+        )
+        self.assertEqual(parse_query("fever, سعال"), {"fever", "cough"})
+
+    def test_search_ranks_by_matching_tokens_then_date(self):
+        matches = SymptomIndex.search({"fever", "cough"})
+
+        self.assertEqual(
+            [(match["record_id"], match["score"]) for match in matches],
+            [
+                (self.elsewhere.pk, 2),
+                (self.fever_cough.pk, 2),
+                (self.fever.pk, 1),
+            ],
+        )
+
+    def test_match_all_and_record_restriction(self):
+        permitted = MedicalRecord.objects.filter(doctor=self.doctor)
+
+        matches = SymptomIndex.search(
+            {"fever", "cough"}, records=permitted, match_all=True
+        )
+        self.assertEqual(
+            [match["record_id"] for match in matches], [self.fever_cough.pk]
+        )
+        self.assertEqual(
+            SymptomIndex.similar("حمى", records=permitted, exclude=self.fever.pk),
+            [{"record_id": self.fever_cough.pk, "score": 1, "match_ratio": 1.0}],
+        )
+
+    def test_ranked_records_page_by_score_then_date(self):
+        records = SymptomIndex.ranked({"fever", "cough"})
+
+        first = KeysetPaginator(records, 2).page()
+        second = KeysetPaginator(records, 2).page(first.next_cursor)
+        self.assertEqual(
+            [(record.pk, record.symptom_score) for record in [*first, *second]],
+            [(self.elsewhere.pk, 2), (self.fever_cough.pk, 2), (self.fever.pk, 1)],
+        )
+        self.assertFalse(second.has_next())
+        self.assertEqual(
+            list(SymptomIndex.ranked({"fever", "cough"}, match_all=True)),
+            [self.elsewhere, self.fever_cough],
+        )
+
+    def test_search_view_pages_permitted_records(self):
+        from medical_records.views import MedicalRecordViewSet
+
+        view = MedicalRecordViewSet.as_view({"get": "search_by_symptoms"})
+        # الـ View يصل إلى الطبيب عبر ``user.doctor``
+        user = self.doctor.user
+        user.doctor = self.doctor
+        url = "/records/search_by_symptoms/?symptoms=fever,cough&page_size=1"
+        seen = []
+        while url:
+            request = APIRequestFactory().get(url)
+            force_authenticate(request, user=user)
+            response = view(request)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(
+                (item["id"], item["symptom_score"])
+                for item in response.data["results"]
+            )
+            url = response.data["next"]
+
+        self.assertEqual(seen, [(self.fever_cough.pk, 2), (self.fever.pk, 1)])
+
+    def test_index_follows_record_edits(self):
+        self.fever.description = "nausea"
+        self.fever.save()
+
+        self.assertEqual(
+            [match["record_id"] for match in SymptomIndex.search({"headache"})], []
+        )
+        self.assertEqual(
+            [match["record_id"] for match in SymptomIndex.search({"nausea"})],
+            [self.fever.pk],
+        )
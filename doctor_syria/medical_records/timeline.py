@@ -0,0 +1,230 @@
+"""
+التسلسل الزمني للسجل الطبي وللمريض
+
+يُجلب كل مصدر بـ ``values()`` مرتباً تنازلياً حسب التاريخ في استعلام محدود
+بحجم الصفحة، ثم تُدمج المصادر دمجاً كسولاً بـ ``heapq.merge``. يُرقّم الخط
+الزمني بمؤشر (التاريخ، النوع، المعرف) بدل الإزاحة، وتُخزن الصفحات المولدة في
+الذاكرة المؤقتة برقم إصدار لكل مريض يُرفع عند تغيير أي صف في المصادر.
+"""
+
+import base64
+import heapq
+import json
+from datetime import datetime, time
+from datetime import timezone as dt_timezone
+from typing import NamedTuple, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import ChronicCondition, LabResult, Prescription
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class TimelineSource(NamedTuple):
+    type: str
+    model: type
+    date_field: str
+    patient_path: str
+    fields: Tuple[str, ...]
+    # المصادر المرتبطة بالسجل مباشرة تُفلتر به، والباقي بمريض السجل
+    record_path: Optional[str] = None
+
+    @property
+    def is_date(self):
+        field = self.model._meta.get_field(self.date_field)
+        return not isinstance(field, models.DateTimeField)
+
+    def timestamp(self, value):
+        """مفتاح الترتيب الموحد: التواريخ تُعامل كمنتصف الليل بتوقيت UTC"""
+        if self.is_date:
+            return datetime.combine(value, time.min, tzinfo=dt_timezone.utc)
+        return value
+
+    def lookups(self, timestamp):
+        """
+        شروط (أقل، يساوي، أقل أو يساوي) من المفتاح على الحقل نفسه
+
+        تُترجم المقارنة إلى الحقل الأصلي بدل تحويله في SQL حتى يبقى فهرس
+        التاريخ قابلاً للاستخدام.
+        """
+        field = self.date_field
+        if not self.is_date:
+            return (
+                Q(**{f"{field}__lt": timestamp}),
+                Q(**{field: timestamp}),
+                Q(**{f"{field}__lte": timestamp}),
+            )
+        timestamp = timestamp.astimezone(dt_timezone.utc)
+        day = timestamp.date()
+        if timestamp.time() == time.min:
+            return (
+                Q(**{f"{field}__lt": day}),
+                Q(**{field: day}),
+                Q(**{f"{field}__lte": day}),
+            )
+        # لا يساوي منتصف ليل أي يوم مفتاحاً بوقت غير صفري
+        return (
+            Q(**{f"{field}__lte": day}),
+            Q(pk__in=[]),
+            Q(**{f"{field}__lte": day}),
+        )
+
+    def patient_id_for(self, instance):
+        """معرف المريض لصف من هذا المصدر (لإبطال الذاكرة المؤقتة)"""
+        *path, last = self.patient_path.split("__")
+        for name in path:
+            instance = getattr(instance, name)
+        return getattr(instance, f"{last}_id")
+
+
+TIMELINE_SOURCES = [
+    TimelineSource(
+        "diagnosis",
+        ChronicCondition,
+        "diagnosis_date",
+        "patient",
+        ("condition_name", "severity", "status", "treating_doctor_id", "notes"),
+    ),
+    TimelineSource(
+        "treatment",
+        Prescription,
+        "created_at",
+        "medical_record__patient",
+        ("medicine_name", "dosage", "frequency", "duration", "instructions"),
+        record_path="medical_record",
+    ),
+    TimelineSource(
+        "lab_result",
+        LabResult,
+        "test_date",
+        "patient",
+        ("test_name", "result_value", "normal_range", "is_normal", "lab_name"),
+    ),
+]
+
+
+def encode_cursor(entry):
+    payload = [entry["date"].isoformat(), entry["type"], entry["id"]]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """فك المؤشر إلى (التاريخ، النوع، المعرف)، أو ValueError إن كان تالفاً"""
+    try:
+        timestamp, entry_type, entry_id = json.loads(base64.urlsafe_b64decode(cursor))
+        timestamp = parse_datetime(timestamp)
+    except (TypeError, ValueError) as e:
+        raise ValueError("مؤشر غير صالح") from e
+    if timestamp is None:
+        raise ValueError("مؤشر غير صالح")
+    return timestamp, str(entry_type), int(entry_id)
+
+
+def sort_key(entry):
+    return entry["date"], entry["type"], entry["id"]
+
+
+class Timeline:
+    """خط زمني مدمج لسجل طبي أو لجميع سجلات المريض"""
+
+    def __init__(self, patient_id, record_id=None, sources=None):
+        self.patient_id = patient_id
+        self.record_id = record_id
+        self.sources = sources or TIMELINE_SOURCES
+
+    @classmethod
+    def for_record(cls, record):
+        return cls(record.patient_id, record.pk)
+
+    def scope(self, source):
+        if self.record_id is not None and source.record_path:
+            return Q(**{source.record_path: self.record_id})
+        return Q(**{source.patient_path: self.patient_id})
+
+    @staticmethod
+    def after(source, cursor):
+        """الصفوف التي تلي المؤشر في الترتيب التنازلي لـ (التاريخ، النوع، المعرف)"""
+        timestamp, entry_type, entry_id = cursor
+        earlier, same, not_later = source.lookups(timestamp)
+        if source.type < entry_type:
+            return not_later
+        if source.type > entry_type:
+            return earlier
+        return earlier | (same & Q(pk__lt=entry_id))
+
+    def iter_source(self, source, cursor, limit):
+        queryset = source.model._default_manager.filter(self.scope(source))
+        if cursor is not None:
+            queryset = queryset.filter(self.after(source, cursor))
+        rows = queryset.order_by(f"-{source.date_field}", "-pk").values(
+            "pk", source.date_field, *source.fields
+        )[:limit]
+        for row in rows:
+            yield {
+                "date": source.timestamp(row.pop(source.date_field)),
+                "type": source.type,
+                "id": row.pop("pk"),
+                "data": row,
+            }
+
+    def page(self, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        """صفحة من الخط الزمني مع مؤشر الصفحة التالية"""
+        decoded = decode_cursor(cursor) if cursor else None
+        # صف إضافي من كل مصدر لمعرفة وجود صفحة تالية
+        merged = heapq.merge(
+            *(
+                self.iter_source(source, decoded, page_size + 1)
+                for source in self.sources
+            ),
+            key=sort_key,
+            reverse=True,
+        )
+        results = []
+        for entry in merged:
+            if len(results) == page_size:
+                return {"results": results, "next": encode_cursor(results[-1])}
+            results.append(entry)
+        return {"results": results, "next": None}
+
+
+class TimelineCache:
+    """تخزين صفحات الخط الزمني مؤقتاً بإصدار لكل مريض"""
+
+    KEY_PREFIX = "medical_timeline"
+    TIMEOUT = 60 * 60
+
+    @classmethod
+    def version_key(cls, patient_id):
+        return f"{cls.KEY_PREFIX}:version:{patient_id}"
+
+    @classmethod
+    def get_page(cls, timeline, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        version = cache.get_or_set(
+            cls.version_key(timeline.patient_id), 1, timeout=None
+        )
+        scope = (
+            f"record:{timeline.record_id}"
+            if timeline.record_id is not None
+            else f"patient:{timeline.patient_id}"
+        )
+        key = f"{cls.KEY_PREFIX}:{scope}:{version}:{page_size}:{cursor or ''}"
+        page = cache.get(key)
+        if page is None:
+            page = timeline.page(cursor, page_size)
+            cache.set(key, page, cls.TIMEOUT)
+        return page
+
+    @classmethod
+    def invalidate(cls, patient_id):
+        """إهمال جميع صفحات المريض وسجلاته برفع رقم الإصدار"""
+        key = cls.version_key(patient_id)
+        cache.add(key, 1, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
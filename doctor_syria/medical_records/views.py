@@ -1,19 +1,25 @@
 from datetime import datetime, timedelta
 
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, Q
+from django.db.models import Count
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from doctor_syria.core.documents import DocumentRenderer
+from core.optimization import OptimizedQuerysetMixin
+from core.pagination import KeysetPagination, KeysetPaginationMixin
 from notifications.utils import send_notification
 from users.models import Doctor, Patient
+from .access import RecordAccessIndex
+from .documents import MEDICAL_RECORD
 from .filters import (
     AllergyFilter,
     MedicalRecordFilter,
@@ -26,8 +32,6 @@ from .models import (
     PatientHistory,
     Vaccination,
     MedicalDocument,
-    Diagnosis,
-    Treatment,
     Prescription,
     LabResult
 )
@@ -45,18 +49,19 @@ from .serializers import (
     DiagnosisSerializer,
     TreatmentSerializer,
     PrescriptionSerializer,
-    LabResultSerializer,
     MedicalRecordDetailSerializer
 )
+from .statistics import RecordStatistics
+from .symptoms import SymptomIndex, parse_query
+from .tasks import email_medical_report
+from .timeline import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Timeline, TimelineCache
 from .utils import (
-    generate_pdf_report,
-    send_medical_report,
     analyze_medical_history,
     calculate_health_metrics
 )
 
 
-class RecordListView(LoginRequiredMixin, ListView):
+class RecordListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = MedicalRecord
     template_name = "medical_records/record_list.html"
     context_object_name = "records"
@@ -115,8 +120,9 @@ class RecordDeleteView(LoginRequiredMixin, DeleteView):
         return MedicalRecord.objects.filter(doctor=self.request.user.doctor)
 
 
-class MedicalRecordViewSet(viewsets.ModelViewSet):
+class MedicalRecordViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet للسجلات الطبية مع وظائف متقدمة للإدارة والتحليل"""
+    pagination_class = KeysetPagination
     permission_classes = [permissions.IsAuthenticated, IsPatientOrMedicalStaff]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = MedicalRecordFilter
@@ -135,10 +141,9 @@ class MedicalRecordViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         if hasattr(user, 'doctor'):
-            return MedicalRecord.objects.filter(
-                Q(doctor=user.doctor) | 
-                Q(patient__assigned_doctors=user.doctor)
-            ).distinct()
+            return RecordAccessIndex.filter_queryset(
+                MedicalRecord.objects.all(), user.doctor
+            )
         elif hasattr(user, 'patient'):
             return MedicalRecord.objects.filter(patient=user.patient)
         return MedicalRecord.objects.none()
@@ -202,107 +207,114 @@ class MedicalRecordViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def timeline_page(self, timeline):
+        try:
+            page_size = min(
+                int(self.request.query_params.get('page_size', DEFAULT_PAGE_SIZE)),
+                MAX_PAGE_SIZE
+            )
+            return Response(TimelineCache.get_page(
+                timeline, self.request.query_params.get('cursor'), max(page_size, 1)
+            ))
+        except ValueError:
+            return Response(
+                {'error': 'مؤشر أو حجم صفحة غير صالح'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
     @action(detail=True, methods=['get'])
     def timeline(self, request, pk=None):
-        """عرض التسلسل الزمني للسجل الطبي"""
+        """عرض التسلسل الزمني للسجل الطبي (ترقيم بالمؤشر)"""
         record = self.get_object()
-        timeline_data = []
-
-        # إضافة التشخيصات
-        for diagnosis in record.diagnoses.all():
-            timeline_data.append({
-                'date': diagnosis.date,
-                'type': 'diagnosis',
-                'data': DiagnosisSerializer(diagnosis).data
-            })
-
-        # إضافة العلاجات
-        for treatment in record.treatments.all():
-            timeline_data.append({
-                'date': treatment.date,
-                'type': 'treatment',
-                'data': TreatmentSerializer(treatment).data
-            })
-
-        # إضافة نتائج المختبر
-        for result in record.lab_results.all():
-            timeline_data.append({
-                'date': result.date,
-                'type': 'lab_result',
-                'data': LabResultSerializer(result).data
-            })
-
-        # ترتيب حسب التاريخ
-        timeline_data.sort(key=lambda x: x['date'], reverse=True)
-        return Response(timeline_data)
+        return self.timeline_page(Timeline.for_record(record))
+
+    @action(detail=False, methods=['get'])
+    def patient_timeline(self, request):
+        """التسلسل الزمني لجميع سجلات المريض"""
+        patient_id = request.query_params.get('patient_id', '')
+        if not patient_id.isdigit():
+            return Response(
+                {'error': 'يجب تحديد المريض'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not self.get_queryset().filter(patient_id=patient_id).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return self.timeline_page(Timeline(int(patient_id)))
 
     @action(detail=True, methods=['get'])
     def generate_report(self, request, pk=None):
-        """توليد تقرير PDF للسجل الطبي"""
+        """تقرير PDF للسجل الطبي من التخزين، أو 202 أثناء توليده في الخلفية"""
         record = self.get_object()
-        pdf = generate_pdf_report(record)
-        
+
         if request.query_params.get('send_email'):
-            send_medical_report(record, pdf)
-            return Response({'status': 'تم إرسال التقرير بنجاح'})
+            email_medical_report.delay(record.pk)
+            return Response(
+                {'status': 'سيُرسل التقرير بالبريد بعد توليده'},
+                status=status.HTTP_202_ACCEPTED
+            )
 
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="medical_record_{pk}.pdf"'
-        return response
+        return DocumentRenderer.response(MEDICAL_RECORD.name, record, request)
 
     @action(detail=False)
     def statistics(self, request):
-        """إحصائيات السجلات الطبية"""
-        queryset = self.get_queryset()
-        
-        # إحصائيات عامة
-        total = queryset.count()
-        by_severity = queryset.values('severity').annotate(count=Count('id'))
-        by_month = queryset.extra(
-            select={'month': "EXTRACT(month FROM date)"}
-        ).values('month').annotate(count=Count('id'))
-        
-        # تحليل التشخيصات
-        diagnoses = Diagnosis.objects.filter(record__in=queryset)
-        common_diagnoses = diagnoses.values('name').annotate(
-            count=Count('id')
-        ).order_by('-count')[:10]
-        
-        # تحليل العلاجات
-        treatments = Treatment.objects.filter(record__in=queryset)
-        common_treatments = treatments.values('name').annotate(
-            count=Count('id')
-        ).order_by('-count')[:10]
-        
-        return Response({
-            'total_records': total,
-            'by_severity': by_severity,
-            'by_month': by_month,
-            'common_diagnoses': common_diagnoses,
-            'common_treatments': common_treatments
-        })
+        """إحصائيات السجلات الطبية للطبيب من جداول التجميع"""
+        if not hasattr(request.user, 'doctor'):
+            return Response(
+                {'error': 'الإحصائيات متاحة للأطباء فقط'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        period = []
+        for name in ('start', 'end'):
+            value = request.query_params.get(name)
+            try:
+                day = parse_date(value) if value else None
+            except ValueError:
+                day = None
+            if value and day is None:
+                return Response(
+                    {'error': 'تاريخ غير صالح (YYYY-MM-DD)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            period.append(day)
+
+        return Response(RecordStatistics.summary(request.user.doctor, *period))
 
     @action(detail=False)
     def search_by_symptoms(self, request):
-        """البحث في السجلات حسب الأعراض"""
-        symptoms = request.query_params.get('symptoms', '').split(',')
-        if not symptoms:
+        """
+        البحث في السجلات حسب الأعراض عبر فهرس الأعراض
+
+        ``symptoms`` أعراض مفصولة بفواصل، و``match=all`` لاشتراط جميعها بدل
+        أي منها. النتائج مرتبة بعدد الأعراض المتطابقة ومرقمة.
+        """
+        tokens = parse_query(request.query_params.get('symptoms', ''))
+        if not tokens:
             return Response(
                 {'error': 'يجب تحديد الأعراض'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        queryset = self.get_queryset().filter(
-            Q(symptoms__name__in=symptoms) |
-            Q(notes__icontains=symptoms)
-        ).distinct()
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        records = SymptomIndex.ranked(
+            tokens,
+            records=self.get_queryset(),
+            match_all=request.query_params.get('match') == 'all'
+        )
+        page = self.paginate_queryset(records)
+        results = []
+        for record in (page if page is not None else records):
+            data = self.get_serializer(record).data
+            data['symptom_score'] = record.symptom_score
+            results.append(data)
+
+        if page is not None:
+            return self.get_paginated_response(results)
+        return Response(results)
 
 
-class PatientHistoryViewSet(viewsets.ModelViewSet):
+class PatientHistoryViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet لتاريخ المريض مع وظائف متقدمة للتحليل"""
+    pagination_class = KeysetPagination
     serializer_class = PatientHistorySerializer
     permission_classes = [permissions.IsAuthenticated, IsPatientOrMedicalStaff]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
@@ -312,10 +324,9 @@ class PatientHistoryViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         if hasattr(user, 'doctor'):
-            return PatientHistory.objects.filter(
-                Q(doctor=user.doctor) |
-                Q(patient__assigned_doctors=user.doctor)
-            ).distinct()
+            return RecordAccessIndex.filter_queryset(
+                PatientHistory.objects.all(), user.doctor
+            )
         elif hasattr(user, 'patient'):
             return PatientHistory.objects.filter(patient=user.patient)
         return PatientHistory.objects.none()
@@ -340,8 +351,9 @@ class PatientHistoryViewSet(viewsets.ModelViewSet):
         })
 
 
-class AllergyViewSet(viewsets.ModelViewSet):
+class AllergyViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet للحساسية مع وظائف متقدمة للإدارة"""
+    pagination_class = KeysetPagination
     serializer_class = AllergySerializer
     permission_classes = [permissions.IsAuthenticated, IsPatientOrMedicalStaff]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -352,10 +364,9 @@ class AllergyViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         if hasattr(user, 'doctor'):
-            return Allergy.objects.filter(
-                Q(doctor=user.doctor) |
-                Q(patient__assigned_doctors=user.doctor)
-            ).distinct()
+            return RecordAccessIndex.filter_queryset(
+                Allergy.objects.all(), user.doctor
+            )
         elif hasattr(user, 'patient'):
             return Allergy.objects.filter(patient=user.patient)
         return Allergy.objects.none()
@@ -387,8 +398,9 @@ class AllergyViewSet(viewsets.ModelViewSet):
         return Response(by_severity)
 
 
-class VaccinationViewSet(viewsets.ModelViewSet):
+class VaccinationViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet للتطعيمات مع وظائف متقدمة للإدارة"""
+    pagination_class = KeysetPagination
     serializer_class = VaccinationSerializer
     permission_classes = [permissions.IsAuthenticated, IsPatientOrMedicalStaff]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -399,10 +411,9 @@ class VaccinationViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         if hasattr(user, 'doctor'):
-            return Vaccination.objects.filter(
-                Q(doctor=user.doctor) |
-                Q(patient__assigned_doctors=user.doctor)
-            ).distinct()
+            return RecordAccessIndex.filter_queryset(
+                Vaccination.objects.all(), user.doctor
+            )
         elif hasattr(user, 'patient'):
             return Vaccination.objects.filter(patient=user.patient)
         return Vaccination.objects.none()
@@ -441,8 +452,9 @@ class VaccinationViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class MedicalDocumentViewSet(viewsets.ModelViewSet):
+class MedicalDocumentViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet للوثائق الطبية مع وظائف متقدمة للإدارة"""
+    pagination_class = KeysetPagination
     serializer_class = MedicalDocumentSerializer
     permission_classes = [permissions.IsAuthenticated, IsPatientOrMedicalStaff]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -453,10 +465,9 @@ class MedicalDocumentViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         if hasattr(user, 'doctor'):
-            return MedicalDocument.objects.filter(
-                Q(doctor=user.doctor) |
-                Q(patient__assigned_doctors=user.doctor)
-            ).distinct()
+            return RecordAccessIndex.filter_queryset(
+                MedicalDocument.objects.all(), user.doctor
+            )
         elif hasattr(user, 'patient'):
             return MedicalDocument.objects.filter(patient=user.patient)
         return MedicalDocument.objects.none()
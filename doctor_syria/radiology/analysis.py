@@ -0,0 +1,327 @@
+"""
+تشغيل تحليلات الذكاء الاصطناعي على صور الأشعة دفعياً
+
+تُجمع الصور المعلقة من جميع السلاسل (التي لا تحليل لها بإصدار الخوارزمية
+الحالي)؛ ما له نتيجة مخزنة مؤقتاً بمفتاح ``(image_uid, الإصدار)`` يُحفظ
+تحليله منها مباشرة، والباقي يُفك ويُطبّع في مجمع عمليات (أو خيوط داخل عمال
+Celery) إلى مصفوفات NumPy مكدسة بحجم الدفعة. يُشغّل النموذج على كل دفعة في
+العملية الرئيسية بينما تُفك الدفعات التالية، وتُحفظ النتائج بـ
+``bulk_create``. الصور التي يتعذر فكها يُحفظ لها تحليل بنتيجة خطأ فلا يُعاد
+فكها في كل تشغيل (يُحذف التحليل لإعادة المحاولة). يُرجع التشغيل تقريراً
+بالإنتاجية (صورة/ثانية) ومدد كل مرحلة.
+
+النماذج أصناف فرعية من ``AnalysisModel`` تُسجل بـ ``register`` أو بمسارها في
+``AI_ANALYSIS_SETTINGS["MODELS"]``.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db.models import Exists, OuterRef
+from django.utils.module_loading import import_string
+
+from .dicom import decode_batch
+from .models import AIAnalysis, Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "BATCH_SIZE": 32,
+    # عمليات فك الصور (None = عدد المعالجات)
+    "WORKERS": None,
+    # أقصى عدد صور في تشغيل واحد
+    "LIMIT": 5000,
+    # مدة تخزين النتائج في الذاكرة المؤقتة (None = بلا انتهاء)
+    "CACHE_TIMEOUT": None,
+    # مسارات أصناف نماذج إضافية
+    "MODELS": [],
+}
+
+# decode مجموع مدد الفك في عمليات المجمع، وwait انتظار العملية الرئيسية لها
+STAGES = ("select", "decode", "wait", "inference", "write")
+
+# نتيجة تحليل الصور التي تعذر فكها
+DECODE_ERROR = {"error": "decode_failed"}
+
+
+def get_analysis_setting(name):
+    return getattr(settings, "AI_ANALYSIS_SETTINGS", {}).get(
+        name, DEFAULT_SETTINGS[name]
+    )
+
+
+class AnalysisModel:
+    """
+    نموذج يعمل على المعالج: ``predict`` تأخذ مصفوفة ``(N, H, W)`` بقيم 0-1
+    وتُرجع لكل صورة ``(النتيجة، الثقة)``
+    """
+
+    name = None
+    version = "1"
+    input_size = 256
+
+    def predict(self, batch):
+        raise NotImplementedError
+
+
+class IntensityProfileModel(AnalysisModel):
+    """
+    ملف شدة الإضاءة لكل صورة: المتوسط والانحراف ونسبة المناطق الساطعة
+    والإنتروبيا، مع علامة على الصور منخفضة التباين
+    """
+
+    name = "intensity_profile"
+    version = "1"
+    input_size = 256
+    BINS = 32
+    BRIGHT = 0.9
+    LOW_CONTRAST = 0.05
+
+    def predict(self, batch):
+        flat = batch.reshape(len(batch), -1)
+        mean = flat.mean(axis=1)
+        std = flat.std(axis=1)
+        bright = (flat >= self.BRIGHT).mean(axis=1)
+        bins = np.minimum((flat * self.BINS).astype(np.int64), self.BINS - 1)
+        offsets = np.arange(len(batch))[:, None] * self.BINS
+        histogram = np.bincount(
+            (bins + offsets).ravel(), minlength=len(batch) * self.BINS
+        ).reshape(len(batch), self.BINS) / flat.shape[1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            entropy = np.abs(np.nansum(histogram * np.log2(histogram), axis=1))
+        return [
+            (
+                {
+                    "mean": round(float(mean[i]), 4),
+                    "std": round(float(std[i]), 4),
+                    "bright_fraction": round(float(bright[i]), 4),
+                    "entropy": round(float(entropy[i]), 4),
+                    "low_contrast": bool(std[i] < self.LOW_CONTRAST),
+                },
+                # الثقة تتناقص مع انخفاض التباين
+                float(min(1.0, std[i] / (self.LOW_CONTRAST * 4))),
+            )
+            for i in range(len(batch))
+        ]
+
+
+ANALYSIS_MODELS = {}
+
+
+def register(model_class):
+    ANALYSIS_MODELS[model_class.name] = model_class
+    return model_class
+
+
+register(IntensityProfileModel)
+
+
+def get_model(name):
+    for path in get_analysis_setting("MODELS"):
+        model_class = import_string(path)
+        ANALYSIS_MODELS.setdefault(model_class.name, model_class)
+    try:
+        return ANALYSIS_MODELS[name]()
+    except KeyError:
+        raise ValueError(f"خوارزمية تحليل غير معروفة: {name}") from None
+
+
+class BatchAnalysisRunner:
+    """تشغيل نموذج واحد على دفعات الصور المعلقة"""
+
+    CACHE_PREFIX = "ai_analysis"
+
+    def __init__(
+        self, model, batch_size=None, workers=None, storage=None, processes=None
+    ):
+        self.model = get_model(model) if isinstance(model, str) else model
+        self.batch_size = batch_size or get_analysis_setting("BATCH_SIZE")
+        self.workers = workers or get_analysis_setting("WORKERS")
+        self.storage = storage or default_storage
+        # العمليات الخفية (عمال Celery من نوع prefork) لا يجوز لها إنشاء عمليات
+        if processes is None:
+            processes = not multiprocessing.current_process().daemon
+        self.processes = processes
+
+    def cache_key(self, image_uid):
+        model = self.model
+        return f"{self.CACHE_PREFIX}:{model.name}:{model.version}:{image_uid}"
+
+    def pending(self, queryset=None, limit=None):
+        """الصور التي لا تحليل لها بإصدار النموذج، من جميع السلاسل"""
+        queryset = Image.objects.all() if queryset is None else queryset
+        analysed = AIAnalysis.objects.filter(
+            image=OuterRef("pk"),
+            algorithm_name=self.model.name,
+            algorithm_version=self.model.version,
+        )
+        return list(
+            queryset.filter(~Exists(analysed))
+            .only("pk", "image_uid", "file")
+            .order_by("series_id", "image_number")[
+                : limit or get_analysis_setting("LIMIT")
+            ]
+        )
+
+    def split_cached(self, images):
+        """(الصور التي تحتاج إلى فك، {الصورة: النتيجة المخزنة مؤقتاً})"""
+        cached = cache.get_many([self.cache_key(image.image_uid) for image in images])
+        remaining, found = [], {}
+        for image in images:
+            entry = cached.get(self.cache_key(image.image_uid))
+            if entry is None:
+                remaining.append(image)
+            else:
+                found[image] = entry
+        return remaining, found
+
+    def analysis(self, image, result, confidence, seconds):
+        return AIAnalysis(
+            image=image,
+            algorithm_name=self.model.name,
+            algorithm_version=self.model.version,
+            analysis_result=result,
+            confidence_score=min(1.0, max(0.0, confidence)),
+            processing_time=timedelta(seconds=seconds),
+        )
+
+    def restore(self, found):
+        """حفظ تحاليل الصور من نتائجها المخزنة مؤقتاً دون فكها"""
+        AIAnalysis.objects.bulk_create(
+            [
+                self.analysis(
+                    image, entry["result"], entry["confidence"], entry["seconds"]
+                )
+                for image, entry in found.items()
+            ]
+        )
+        return len(found)
+
+    def source(self, image):
+        """مسار الملف المحلي، أو محتواه لمخازن بلا مسارات"""
+        try:
+            return self.storage.path(image.file.name)
+        except NotImplementedError:
+            with self.storage.open(image.file.name, "rb") as handle:
+                return handle.read()
+
+    def batches(self, images):
+        for start in range(0, len(images), self.batch_size):
+            yield images[start : start + self.batch_size]
+
+    def run(self, queryset=None, limit=None):
+        """تحليل الصور المعلقة، ويُرجع تقرير الإنتاجية ومدد المراحل"""
+        timings = dict.fromkeys(STAGES, 0.0)
+        started = time.perf_counter()
+        images, found = self.split_cached(self.pending(queryset, limit))
+        timings["select"] = time.perf_counter() - started
+
+        written = time.perf_counter()
+        restored = self.restore(found) if found else 0
+        timings["write"] += time.perf_counter() - written
+
+        analysed = failed = 0
+        if images:
+            size = self.model.input_size
+            workers = self.workers or os.cpu_count() or 1
+            with self.executor(workers) as executor:
+                batches = self.batches(images)
+                # نافذة محدودة من الدفعات قيد الفك حتى لا تتكدس في الذاكرة
+                queue = deque(
+                    (chunk, self.submit(executor, chunk, size))
+                    for chunk in islice(batches, workers * 2)
+                )
+                while queue:
+                    chunk, future = queue.popleft()
+                    waited = time.perf_counter()
+                    pixels, errors, decode_seconds = future.result()
+                    timings["wait"] += time.perf_counter() - waited
+                    timings["decode"] += decode_seconds
+                    following = next(batches, None)
+                    if following is not None:
+                        queue.append(
+                            (following, self.submit(executor, following, size))
+                        )
+                    analysed += self.analyse(
+                        chunk, pixels, errors, decode_seconds, timings
+                    )
+                    failed += len(errors)
+
+        total = time.perf_counter() - started
+        return {
+            "algorithm": self.model.name,
+            "version": self.model.version,
+            "images": analysed,
+            "restored": restored,
+            "failed": failed,
+            "batch_size": self.batch_size,
+            "seconds": round(total, 3),
+            "images_per_second": round(analysed / total, 2) if total else 0.0,
+            "stages": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        }
+
+    def executor(self, workers):
+        if self.processes:
+            return ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return ThreadPoolExecutor(max_workers=workers)
+
+    def submit(self, executor, chunk, size):
+        return executor.submit(
+            decode_batch, [self.source(image) for image in chunk], size
+        )
+
+    def analyse(self, chunk, pixels, errors, decode_seconds, timings):
+        """
+        تشغيل النموذج على دفعة مفكوكة وحفظ نتائجها، ويُرجع عدد الصور المحللة
+        """
+        failed = [chunk[position] for position in errors]
+        for image in failed:
+            logger.error(f"تعذر فك الصورة {image.image_uid}")
+        images = [
+            image for position, image in enumerate(chunk) if position not in errors
+        ]
+
+        inference_seconds = 0.0
+        predictions = []
+        if images:
+            started = time.perf_counter()
+            predictions = self.model.predict(pixels)
+            inference_seconds = time.perf_counter() - started
+            timings["inference"] += inference_seconds
+
+        started = time.perf_counter()
+        # مدة المعالجة لكل صورة: نصيبها من فك الدفعة وتشغيل النموذج
+        seconds = (decode_seconds + inference_seconds) / len(chunk)
+        AIAnalysis.objects.bulk_create(
+            [
+                self.analysis(image, result, confidence, seconds)
+                for image, (result, confidence) in zip(images, predictions)
+            ]
+            + [self.analysis(image, DECODE_ERROR, 0.0, seconds) for image in failed]
+        )
+        cache.set_many(
+            {
+                self.cache_key(image.image_uid): {
+                    "result": result,
+                    "confidence": confidence,
+                    "seconds": seconds,
+                }
+                for image, (result, confidence) in zip(images, predictions)
+            },
+            get_analysis_setting("CACHE_TIMEOUT"),
+        )
+        timings["write"] += time.perf_counter() - started
+        return len(images)
@@ -0,0 +1,226 @@
+"""
+قراءة ملفات DICOM: الترويسات دون البكسل، والصور المصغرة ودفعات التحليل من
+بكسل مصغّر
+
+لا تعتمد الوحدة على نماذج Django حتى تُستورد في عمليات مجمعات المعالجة دون
+تهيئة المشروع.
+"""
+
+import time
+from datetime import datetime
+from io import BytesIO
+from typing import NamedTuple
+
+import numpy as np
+from django.utils import timezone
+
+DEFAULT_THUMBNAIL_QUALITY = 85
+
+# عناصر الترويسة المحفوظة في بيانات الصورة الوصفية
+METADATA_TAGS = (
+    "SOPClassUID",
+    "InstanceNumber",
+    "AcquisitionDateTime",
+    "ContentDate",
+    "ContentTime",
+    "Rows",
+    "Columns",
+    "NumberOfFrames",
+    "BitsAllocated",
+    "PhotometricInterpretation",
+    "PixelSpacing",
+    "SliceThickness",
+    "SliceLocation",
+    "ImagePositionPatient",
+    "ImageOrientationPatient",
+    "WindowCenter",
+    "WindowWidth",
+    "RescaleSlope",
+    "RescaleIntercept",
+    "KVP",
+    "Manufacturer",
+)
+
+
+def json_value(value):
+    """قيمة عنصر DICOM بصيغة قابلة للحفظ في JSONField"""
+    if isinstance(value, (list, tuple)) or type(value).__name__ == "MultiValue":
+        return [json_value(item) for item in value]
+    if isinstance(value, bytes):
+        return None
+    if isinstance(value, bool) or value is None:
+        return value
+    # DS وIS في pydicom أنواع فرعية من float وint
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    return str(value)
+
+
+def first_number(value, default=None):
+    """أول قيمة عددية (نافذة العرض قد تكون متعددة القيم)"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, (list, tuple)) or type(value).__name__ == "MultiValue":
+        value = value[0] if len(value) else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def dicom_datetime(date, time=""):
+    if not date:
+        return None
+    time = (time or "").split(".")[0].ljust(6, "0")[:6]
+    try:
+        moment = datetime.strptime(f"{date}{time}", "%Y%m%d%H%M%S")
+    except ValueError:
+        return None
+    return timezone.make_aware(moment)
+
+
+class DicomHeader(NamedTuple):
+    path: str
+    study_uid: str
+    series_uid: str
+    image_uid: str
+    series_number: int
+    image_number: int
+    modality: str
+    body_part: str
+    protocol: str
+    acquired_at: object
+    metadata: dict
+
+
+def read_header(path):
+    """ترويسة ملف DICOM دون بيانات البكسل، أو None لغير ملفات DICOM"""
+    import pydicom
+    from pydicom.errors import InvalidDicomError
+
+    try:
+        dataset = pydicom.dcmread(path, stop_before_pixels=True)
+    except (InvalidDicomError, OSError):
+        return None
+    if "SOPInstanceUID" not in dataset or "SeriesInstanceUID" not in dataset:
+        return None
+    return DicomHeader(
+        path=path,
+        study_uid=str(dataset.get("StudyInstanceUID", "")),
+        series_uid=str(dataset.SeriesInstanceUID),
+        image_uid=str(dataset.SOPInstanceUID),
+        series_number=int(dataset.get("SeriesNumber") or 0),
+        image_number=int(dataset.get("InstanceNumber") or 0),
+        modality=str(dataset.get("Modality", "")),
+        body_part=str(dataset.get("BodyPartExamined", "")),
+        protocol=str(
+            dataset.get("ProtocolName") or dataset.get("SeriesDescription", "")
+        ),
+        acquired_at=dicom_datetime(
+            dataset.get("AcquisitionDate") or dataset.get("StudyDate"),
+            dataset.get("AcquisitionTime") or dataset.get("StudyTime"),
+        ),
+        metadata={
+            tag: json_value(dataset.get(tag))
+            for tag in METADATA_TAGS
+            if dataset.get(tag) not in (None, "")
+        },
+    )
+
+
+def window(pixels, center=None, width=None):
+    """تحويل القيم إلى 0-255 بنافذة العرض أو بمئينات الصورة"""
+    if center is None or width is None or width <= 0:
+        low, high = np.percentile(pixels, (0.5, 99.5))
+    else:
+        low, high = center - width / 2, center + width / 2
+    if high <= low:
+        high = low + 1
+    scaled = (np.clip(pixels, low, high) - low) * (255.0 / (high - low))
+    return scaled.astype(np.uint8)
+
+
+def display_image(dataset, size):
+    """
+    صورة PIL للعرض من بكسل مصغّر بالتخطي (لا يقل عن ضعف ``size``)، بعد
+    إعادة القياس ونافذة العرض
+    """
+    from PIL import Image as PILImage
+
+    pixels = dataset.pixel_array
+    color = dataset.get("SamplesPerPixel", 1) > 1
+    if pixels.ndim == (4 if color else 3):
+        # متعدد الإطارات: الإطار الأوسط
+        pixels = pixels[len(pixels) // 2]
+
+    # تصغير بالتخطي قبل أي حساب حتى لا تُعالج المصفوفة الكاملة
+    step = max(1, max(pixels.shape[:2]) // (size * 2))
+    pixels = pixels[::step, ::step]
+
+    if color:
+        return PILImage.fromarray(window(pixels.astype(np.float32)), "RGB")
+    pixels = pixels.astype(np.float32) * first_number(
+        dataset.get("RescaleSlope"), 1.0
+    ) + first_number(dataset.get("RescaleIntercept"), 0.0)
+    pixels = window(
+        pixels,
+        first_number(dataset.get("WindowCenter")),
+        first_number(dataset.get("WindowWidth")),
+    )
+    if dataset.get("PhotometricInterpretation") == "MONOCHROME1":
+        pixels = 255 - pixels
+    return PILImage.fromarray(pixels, "L")
+
+
+def render_thumbnail(path, size, quality=DEFAULT_THUMBNAIL_QUALITY):
+    """
+    صورة JPEG مصغرة لملف DICOM؛ تُنفذ في عملية منفصلة وتُحمّل البكسل فيها فقط
+    """
+    import pydicom
+    from PIL import Image as PILImage
+
+    image = display_image(pydicom.dcmread(path), size)
+    image.thumbnail((size, size), PILImage.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def load_pixels(source, size):
+    """
+    مصفوفة float32 رمادية بأبعاد ``(size, size)`` وقيم 0-1 من ملف DICOM
+    أو صورة عادية؛ ``source`` مسار أو بايتات
+    """
+    import pydicom
+    from PIL import Image as PILImage
+    from pydicom.errors import InvalidDicomError
+
+    handle = BytesIO(source) if isinstance(source, bytes) else source
+    try:
+        image = display_image(pydicom.dcmread(handle), size)
+    except InvalidDicomError:
+        if isinstance(handle, BytesIO):
+            handle.seek(0)
+        image = PILImage.open(handle)
+    image = image.convert("L").resize((size, size), PILImage.BILINEAR)
+    return np.asarray(image, dtype=np.float32) / 255.0
+
+
+def decode_batch(sources, size):
+    """
+    فك دفعة صور إلى مصفوفة ``(N, size, size)`` مع مواضع ما تعذر فكه ومدة
+    الفك بالثواني
+    """
+    started = time.perf_counter()
+    arrays, failed = [], []
+    for position, source in enumerate(sources):
+        try:
+            arrays.append(load_pixels(source, size))
+        except Exception:
+            failed.append(position)
+    batch = (
+        np.stack(arrays) if arrays else np.empty((0, size, size), dtype=np.float32)
+    )
+    return batch, failed, time.perf_counter() - started
@@ -0,0 +1,240 @@
+"""
+استيراد دراسات DICOM
+
+تُقرأ ترويسات الملفات فقط (``stop_before_pixels``) على مجموعة خيوط لاستخراج
+معرفات الدراسة والسلاسل والصور وبياناتها الوصفية، ثم تُنشأ صفوف السلاسل
+والصور دفعة واحدة. لا تُحمّل بيانات البكسل إلا في مجمع عمليات توليد الصور
+المصغرة، حيث تُصغّر المصفوفة بالتخطي قبل ضبط نافذة العرض وتحويلها إلى JPEG.
+يُحسب عدد صور كل سلسلة باستعلام SQL واحد بعد الإدخال.
+
+المصدر مجلد محلي من ملفات DICOM (``DirectorySource``)؛ إعادة الاستيراد تتخطى
+الصور الموجودة بمعرفاتها.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .dicom import DEFAULT_THUMBNAIL_QUALITY, read_header, render_thumbnail
+from .models import Image, ImagingSeries, ImagingStudy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "THUMBNAIL_SIZE": 256,
+    "THUMBNAIL_QUALITY": DEFAULT_THUMBNAIL_QUALITY,
+    # عمليات توليد الصور المصغرة (None = عدد المعالجات)
+    "WORKERS": None,
+    # خيوط قراءة الترويسات ونسخ الملفات
+    "READ_THREADS": 8,
+    "BATCH_SIZE": 500,
+    "IMAGE_DIR": "medical_images",
+    "THUMBNAIL_DIR": "image_thumbnails",
+}
+
+
+def get_ingestion_setting(name):
+    return getattr(settings, "DICOM_INGESTION_SETTINGS", {}).get(
+        name, DEFAULT_SETTINGS[name]
+    )
+
+
+class DirectorySource:
+    """ملفات مجلد محلي (بما فيه المجلدات الفرعية)"""
+
+    def __init__(self, root):
+        if not os.path.isdir(root):
+            raise ValueError(f"المجلد غير موجود: {root}")
+        self.root = root
+
+    def __iter__(self):
+        for directory, _, names in os.walk(self.root):
+            for name in sorted(names):
+                if not name.startswith("."):
+                    yield os.path.join(directory, name)
+
+
+class StudyIngestor:
+    """استيراد دراسة تصوير من ملفات DICOM"""
+
+    def __init__(self, storage=None, workers=None, thumbnails=True):
+        self.storage = storage or default_storage
+        self.workers = workers or get_ingestion_setting("WORKERS")
+        self.thumbnails = thumbnails
+        self.batch_size = get_ingestion_setting("BATCH_SIZE")
+
+    def read_headers(self, source):
+        with ThreadPoolExecutor(get_ingestion_setting("READ_THREADS")) as executor:
+            return [header for header in executor.map(read_header, source) if header]
+
+    def get_study(self, study_uid, headers, appointment=None, performed_by=None):
+        study = ImagingStudy.objects.filter(study_uid=study_uid).first()
+        if study is not None:
+            return study
+        if appointment is None or performed_by is None:
+            raise ValueError(
+                f"الدراسة {study_uid} غير موجودة: يجب تحديد الموعد والمنفذ لإنشائها"
+            )
+        times = [header.acquired_at for header in headers if header.acquired_at]
+        now = timezone.now()
+        return ImagingStudy.objects.create(
+            appointment=appointment,
+            study_uid=study_uid,
+            performed_by=performed_by,
+            start_time=min(times, default=now),
+            end_time=max(times, default=now),
+        )
+
+    def ingest(self, source, appointment=None, performed_by=None):
+        """
+        استيراد ملفات المصدر لدراسة واحدة، ويُرجع إحصاءات الاستيراد
+        """
+        headers = self.read_headers(source)
+        studies = {header.study_uid for header in headers}
+        if not headers:
+            raise ValueError("لا توجد ملفات DICOM في المصدر")
+        if len(studies) > 1:
+            raise ValueError(f"المصدر يحوي أكثر من دراسة: {sorted(studies)}")
+
+        study = self.get_study(studies.pop(), headers, appointment, performed_by)
+        existing = set(
+            Image.objects.filter(
+                image_uid__in=[header.image_uid for header in headers]
+            ).values_list("image_uid", flat=True)
+        )
+        # ملف واحد لكل صورة حتى لو تكررت في المصدر
+        new = list({
+            header.image_uid: header
+            for header in headers
+            if header.image_uid not in existing
+        }.values())
+
+        with transaction.atomic():
+            series = self.create_series(study, new)
+            images = self.create_images(study, series, new)
+            self.update_counts(study)
+
+        thumbnails = 0
+        if self.thumbnails and images:
+            thumbnails = self.create_thumbnails(images, new)
+        return {
+            "study": study.study_uid,
+            "files": len(headers),
+            "skipped": len(headers) - len(new),
+            "series": len(series),
+            "images": len(images),
+            "thumbnails": thumbnails,
+        }
+
+    def create_series(self, study, headers):
+        """السلاسل بمعرفاتها، مع إنشاء الجديدة منها دفعة واحدة"""
+        by_uid = {}
+        for header in headers:
+            by_uid.setdefault(header.series_uid, header)
+        series = ImagingSeries.objects.in_bulk(list(by_uid), field_name="series_uid")
+        ImagingSeries.objects.bulk_create(
+            [
+                ImagingSeries(
+                    study=study,
+                    series_uid=uid,
+                    series_number=header.series_number,
+                    modality=header.modality,
+                    body_part=header.body_part,
+                    protocol=header.protocol,
+                    number_of_images=0,
+                )
+                for uid, header in by_uid.items()
+                if uid not in series
+            ],
+            batch_size=self.batch_size,
+        )
+        return ImagingSeries.objects.in_bulk(list(by_uid), field_name="series_uid")
+
+    def store_file(self, study, header):
+        directory = get_ingestion_setting("IMAGE_DIR")
+        name = (
+            f"{directory}/{study.study_uid}/{header.series_uid}/{header.image_uid}.dcm"
+        )
+        with open(header.path, "rb") as handle:
+            return self.storage.save(name, File(handle))
+
+    def create_images(self, study, series, headers):
+        with ThreadPoolExecutor(get_ingestion_setting("READ_THREADS")) as executor:
+            names = list(
+                executor.map(lambda header: self.store_file(study, header), headers)
+            )
+        images = [
+            Image(
+                series=series[header.series_uid],
+                image_uid=header.image_uid,
+                image_number=header.image_number,
+                file=name,
+                metadata=header.metadata,
+            )
+            for header, name in zip(headers, names)
+        ]
+        Image.objects.bulk_create(images, batch_size=self.batch_size)
+        # قواعد لا تُرجع المفاتيح من bulk_create
+        if images and images[0].pk is None:
+            images = list(
+                Image.objects.filter(
+                    image_uid__in=[image.image_uid for image in images]
+                )
+            )
+        return images
+
+    def update_counts(self, study):
+        """عدد صور كل سلسلة في الدراسة باستعلام تحديث واحد"""
+        counts = (
+            Image.objects.filter(series=OuterRef("pk"))
+            .order_by()
+            .values("series")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        ImagingSeries.objects.filter(study=study).update(
+            number_of_images=Coalesce(Subquery(counts), Value(0))
+        )
+
+    def create_thumbnails(self, images, headers):
+        """توليد الصور المصغرة بالتوازي وحفظها بتحديث جماعي"""
+        paths = {header.image_uid: header.path for header in headers}
+        size = get_ingestion_setting("THUMBNAIL_SIZE")
+        quality = get_ingestion_setting("THUMBNAIL_QUALITY")
+        directory = get_ingestion_setting("THUMBNAIL_DIR")
+
+        updated = []
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    render_thumbnail, paths[image.image_uid], size, quality
+                ): image
+                for image in images
+            }
+            for future, image in futures.items():
+                try:
+                    data = future.result()
+                except Exception as e:
+                    logger.error(
+                        f"خطأ في توليد الصورة المصغرة {image.image_uid}: {str(e)}"
+                    )
+                    continue
+                image.thumbnail = self.storage.save(
+                    f"{directory}/{image.image_uid}.jpg", ContentFile(data)
+                )
+                updated.append(image)
+        Image.objects.bulk_update(updated, ["thumbnail"], batch_size=self.batch_size)
+        return len(updated)
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from radiology.ingestion import DirectorySource, StudyIngestor
+from radiology.models import ImagingAppointment
+
+
+class Command(BaseCommand):
+    help = "استيراد دراسة تصوير من مجلد ملفات DICOM"
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument(
+            "--appointment", type=int, help="موعد التصوير عند إنشاء دراسة جديدة"
+        )
+        parser.add_argument(
+            "--performed-by", type=int, help="معرف المستخدم المنفذ للدراسة الجديدة"
+        )
+        parser.add_argument("--workers", type=int, help="عمليات توليد الصور المصغرة")
+        parser.add_argument(
+            "--no-thumbnails", action="store_true", help="تخطي توليد الصور المصغرة"
+        )
+
+    def handle(self, *args, **options):
+        appointment = performed_by = None
+        if options["appointment"]:
+            appointment = ImagingAppointment.objects.get(pk=options["appointment"])
+        if options["performed_by"]:
+            performed_by = get_user_model().objects.get(pk=options["performed_by"])
+
+        ingestor = StudyIngestor(
+            workers=options["workers"], thumbnails=not options["no_thumbnails"]
+        )
+        try:
+            stats = ingestor.ingest(
+                DirectorySource(options["directory"]), appointment, performed_by
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"الدراسة {stats['study']}: {stats['images']} صورة جديدة في "
+                f"{stats['series']} سلسلة، {stats['thumbnails']} صورة مصغرة، "
+                f"{stats['skipped']} ملف موجود مسبقاً"
+            )
+        )
@@ -0,0 +1,18 @@
+"""
+مهام Celery للأشعة
+"""
+
+from celery import shared_task
+
+
+@shared_task
+def run_ai_analysis(algorithm, limit=None):
+    """
+    تحليل صور الأشعة المعلقة بالخوارزمية دفعياً، ويُرجع تقرير التشغيل
+
+    تُفك الصور بخيوط داخل العامل: عمليات مجمع prefork لا يجوز لها إنشاء
+    عمليات فرعية
+    """
+    from .analysis import BatchAnalysisRunner
+
+    return BatchAnalysisRunner(algorithm, processes=False).run(limit=limit)
@@ -0,0 +1,257 @@
+import os
+import shutil
+import tempfile
+from datetime import date, time, timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, TestCase
+
+from medical_records.tests import make_doctor, make_patient
+from radiology.analysis import (
+    DECODE_ERROR,
+    BatchAnalysisRunner,
+    IntensityProfileModel,
+)
+from radiology.ingestion import DirectorySource, StudyIngestor
+from radiology.models import (
+    AIAnalysis,
+    Image,
+    ImagingAppointment,
+    ImagingSeries,
+    ImagingService,
+    RadiologyCenter,
+)
+
+STUDY_UID = "1.2.826.0.1.3680043.8.498.1"
+
+
+def write_dicom(path, image_uid, series_uid, study_uid=STUDY_UID, number=1):
+    """ملف DICOM صغير بصورة رمادية 16 بت"""
+    from pydicom.dataset import FileDataset, FileMetaDataset
+    from pydicom.uid import CTImageStorage, ExplicitVRLittleEndian
+
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = CTImageStorage
+    meta.MediaStorageSOPInstanceUID = image_uid
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    dataset = FileDataset(path, {}, file_meta=meta, preamble=b"\0" * 128)
+    dataset.SOPClassUID = CTImageStorage
+    dataset.SOPInstanceUID = image_uid
+    dataset.StudyInstanceUID = study_uid
+    dataset.SeriesInstanceUID = series_uid
+    dataset.SeriesNumber = int(series_uid.rsplit(".", 1)[-1])
+    dataset.InstanceNumber = number
+    dataset.Modality = "CT"
+    dataset.BodyPartExamined = "CHEST"
+    dataset.StudyDate = "20260101"
+    dataset.StudyTime = "101500"
+    dataset.Rows = dataset.Columns = 32
+    dataset.SamplesPerPixel = 1
+    dataset.PhotometricInterpretation = "MONOCHROME2"
+    dataset.BitsAllocated = dataset.BitsStored = 16
+    dataset.HighBit = 15
+    dataset.PixelRepresentation = 0
+    pixels = np.arange(32 * 32, dtype=np.uint16).reshape(32, 32) * number
+    dataset.PixelData = pixels.tobytes()
+    dataset.save_as(path, enforce_file_format=True)
+
+
+class StudyTestCase(TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.media)
+
+        doctor = make_doctor("radiologist")
+        center = RadiologyCenter.objects.create(
+            name="مركز", address="دمشق", phone="011", email="center@example.com"
+        )
+        service = ImagingService.objects.create(
+            center=center,
+            name="طبقي محوري",
+            modality="ct",
+            description="",
+            preparation_instructions="",
+            duration=timedelta(minutes=30),
+            price=100,
+        )
+        self.appointment = ImagingAppointment.objects.create(
+            patient_id=make_patient("patient"),
+            service=service,
+            referring_doctor=doctor,
+            appointment_date=date(2026, 1, 1),
+            appointment_time=time(10),
+            clinical_notes="",
+        )
+        self.performed_by = doctor.user
+
+    def write(self, name, image_uid, series_uid, **kwargs):
+        write_dicom(os.path.join(self.source, name), image_uid, series_uid, **kwargs)
+
+    def ingest(self, thumbnails=False):
+        ingestor = StudyIngestor(
+            storage=FileSystemStorage(location=self.media),
+            workers=1,
+            thumbnails=thumbnails,
+        )
+        return ingestor.ingest(
+            DirectorySource(self.source), self.appointment, self.performed_by
+        )
+
+
+class StudyIngestorTests(StudyTestCase):
+    def counts(self):
+        return dict(
+            ImagingSeries.objects.values_list("series_uid", "number_of_images")
+        )
+
+    def test_ingests_series_and_counts_images(self):
+        for number in range(1, 4):
+            self.write(
+                f"a{number}.dcm",
+                f"{STUDY_UID}.1.{number}",
+                f"{STUDY_UID}.1",
+                number=number,
+            )
+        self.write("b1.dcm", f"{STUDY_UID}.2.1", f"{STUDY_UID}.2")
+        # نسخة مكررة من صورة في المصدر، وملفات ليست DICOM
+        shutil.copy(
+            os.path.join(self.source, "a1.dcm"), os.path.join(self.source, "copy.dcm")
+        )
+        with open(os.path.join(self.source, "notes.txt"), "w") as handle:
+            handle.write("ليس DICOM")
+
+        report = self.ingest(thumbnails=True)
+
+        self.assertEqual(
+            report,
+            {
+                "study": STUDY_UID,
+                "files": 5,
+                "skipped": 1,
+                "series": 2,
+                "images": 4,
+                "thumbnails": 4,
+            },
+        )
+        self.assertEqual(self.counts(), {f"{STUDY_UID}.1": 3, f"{STUDY_UID}.2": 1})
+        image = Image.objects.get(image_uid=f"{STUDY_UID}.1.2")
+        self.assertEqual(image.image_number, 2)
+        self.assertEqual(image.metadata["Rows"], 32)
+        self.assertTrue(os.path.exists(os.path.join(self.media, image.file.name)))
+        self.assertTrue(image.thumbnail.name.endswith(".jpg"))
+
+    def test_reingest_skips_existing_images(self):
+        self.write("a1.dcm", f"{STUDY_UID}.1.1", f"{STUDY_UID}.1")
+        self.write("a2.dcm", f"{STUDY_UID}.1.2", f"{STUDY_UID}.1", number=2)
+        self.ingest()
+
+        self.write("a3.dcm", f"{STUDY_UID}.1.3", f"{STUDY_UID}.1", number=3)
+        self.write("b1.dcm", f"{STUDY_UID}.2.1", f"{STUDY_UID}.2")
+        report = self.ingest()
+
+        self.assertEqual((report["skipped"], report["images"]), (2, 2))
+        self.assertEqual(Image.objects.count(), 4)
+        self.assertEqual(self.counts(), {f"{STUDY_UID}.1": 3, f"{STUDY_UID}.2": 1})
+
+    def test_rejects_sources_with_several_studies_or_no_dicom(self):
+        with self.assertRaises(ValueError):
+            self.ingest()
+
+        self.write("a1.dcm", f"{STUDY_UID}.1.1", f"{STUDY_UID}.1")
+        self.write("x1.dcm", "1.2.3.1.1", "1.2.3.1", study_uid="1.2.3")
+        with self.assertRaises(ValueError):
+            self.ingest()
+        self.assertFalse(Image.objects.exists())
+
+
+class IntensityProfileModelTests(SimpleTestCase):
+    def test_flags_low_contrast_images(self):
+        flat = np.full((16, 16), 0.5, dtype=np.float32)
+        ramp = np.tile(np.linspace(0, 1, 16, dtype=np.float32), (16, 1))
+
+        (flat_result, flat_confidence), (ramp_result, ramp_confidence) = (
+            IntensityProfileModel().predict(np.stack([flat, ramp]))
+        )
+
+        self.assertTrue(flat_result["low_contrast"])
+        self.assertEqual((flat_result["std"], flat_confidence), (0.0, 0.0))
+        self.assertFalse(ramp_result["low_contrast"])
+        self.assertEqual(ramp_confidence, 1.0)
+        self.assertGreater(ramp_result["entropy"], flat_result["entropy"])
+
+
+class BatchAnalysisRunnerTests(StudyTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        for number in range(1, 4):
+            self.write(
+                f"a{number}.dcm",
+                f"{STUDY_UID}.1.{number}",
+                f"{STUDY_UID}.1",
+                number=number,
+            )
+        self.ingest()
+        self.storage = FileSystemStorage(location=self.media)
+
+    def run_analysis(self):
+        runner = BatchAnalysisRunner(
+            "intensity_profile",
+            batch_size=2,
+            workers=2,
+            storage=self.storage,
+            processes=False,
+        )
+        return runner.run()
+
+    def results(self):
+        return dict(
+            AIAnalysis.objects.values_list("image__image_uid", "analysis_result")
+        )
+
+    def test_analyses_pending_images_once(self):
+        report = self.run_analysis()
+
+        self.assertEqual(
+            (report["images"], report["restored"], report["failed"]), (3, 0, 0)
+        )
+        self.assertEqual(len(self.results()), 3)
+        self.assertEqual(self.run_analysis()["images"], 0)
+        self.assertEqual(AIAnalysis.objects.count(), 3)
+
+    def test_cached_results_are_written_without_decoding(self):
+        self.run_analysis()
+        results = self.results()
+        AIAnalysis.objects.all().delete()
+        # الملفات لم تعد متاحة: أي فك سيفشل
+        for image in Image.objects.all():
+            self.storage.delete(image.file.name)
+
+        report = self.run_analysis()
+
+        self.assertEqual(
+            (report["images"], report["restored"], report["failed"]), (0, 3, 0)
+        )
+        self.assertEqual(self.results(), results)
+
+    def test_decode_failures_are_recorded_and_not_retried(self):
+        image = Image.objects.get(image_uid=f"{STUDY_UID}.1.2")
+        image.file = self.storage.save("broken.dcm", ContentFile(b"not an image"))
+        image.save(update_fields=["file"])
+
+        with self.assertLogs("radiology.analysis", "ERROR"):
+            report = self.run_analysis()
+
+        self.assertEqual((report["images"], report["failed"]), (2, 1))
+        analysis = AIAnalysis.objects.get(image=image)
+        self.assertEqual(analysis.analysis_result, DECODE_ERROR)
+        self.assertEqual(analysis.confidence_score, 0.0)
+
+        report = self.run_analysis()
+        self.assertEqual((report["images"], report["failed"]), (0, 0))
@@ -121,13 +121,11 @@ def check_rate_limit(request: HttpRequest, limit: int = 100) -> bool:
         bool: True if within limit
     """
     ip = request.META.get("REMOTE_ADDR")
-    key = f"rate_limit_{ip}"
 
-    from django.core.cache import cache
+    from security.rate_limit import RateLimitPolicy, get_rate_limiter
 
-    count = cache.get(key, 0)
-
-    if count >= limit:
+    policy = RateLimitPolicy("ip", limit, 3600)
+    if not get_rate_limiter().hit(policy, f"ip:{ip}").allowed:
         log_security_event(
             request,
             "RATE_LIMIT_EXCEEDED",
@@ -136,7 +134,6 @@ def check_rate_limit(request: HttpRequest, limit: int = 100) -> bool:
         )
         return False
 
-    cache.set(key, count + 1, 3600)  # 1 hour expiry
     return True
 
 
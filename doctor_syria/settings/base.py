@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     'ai_diagnosis.apps.AiDiagnosisConfig',
     'analytics.apps.AnalyticsConfig',
     'monitoring.apps.MonitoringConfig',
+    'security.apps.SecurityConfig',
     'patient_records',
 ]
 
@@ -67,6 +68,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "security.rate_limit.RateLimitMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
@@ -133,6 +135,13 @@ IMAGEKIT_CACHEFILE_DIR = "CACHE/images"
 IMAGEKIT_SPEC_CACHEFILE_NAMER = "imagekit.cachefiles.namers.hash"
 IMAGEKIT_CACHE_BACKEND = "default"
 
+# مقاسات النسخ المصغرة المولدة من خط معالجة الصور
+IMAGE_THUMBNAIL_SIZES = {
+    "small": (100, 100),
+    "medium": (300, 300),
+    "large": (600, 600),
+}
+
 # إعدادات تحسين الأداء
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
@@ -176,6 +185,16 @@ ID_CARDS_DIR = os.path.join(MEDIA_ROOT, "id_cards")
 os.makedirs(BARCODE_DIR, exist_ok=True)
 os.makedirs(ID_CARDS_DIR, exist_ok=True)
 
+# إعدادات التوليد الجماعي للبطاقات التعريفية
+ID_CARD_SETTINGS = {
+    # خط TrueType يدعم العربية (الافتراضي: خط Pillow المدمج)
+    "FONT_PATH": None,
+    # عدد عمليات التوليد المتوازية (الافتراضي: عدد المعالجات)
+    "WORKERS": None,
+    # sheet: أوراق A4 مجمعة للطباعة، cards: صفحة لكل بطاقة
+    "LAYOUT": "sheet",
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -372,12 +391,136 @@ MONITORING_SETTINGS = {
     },
 }
 
+# إعدادات استقبال نتائج أجهزة المختبر (HL7 عبر MLLP)
+HL7_SETTINGS = {
+    "HOST": os.getenv("HL7_HOST", "0.0.0.0"),
+    "PORT": int(os.getenv("HL7_PORT", 2575)),
+    "CHARSET": "utf-8",
+    # عدد النتائج في كل دفعة إدخال
+    "BATCH_SIZE": 500,
+    # حقل المستخدم المطابق لمعرّف المريض في PID-3
+    "PATIENT_LOOKUP_FIELD": "barcode",
+}
+
+# إعدادات سجلات التدقيق (كتابة غير متزامنة على دفعات)
+AUDIT_SETTINGS = {
+    "ASYNC": True,
+    "QUEUE_SIZE": 10000,
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL": 1.0,
+    # الأحداث الحرجة تُحفظ هنا إذا امتلأ الطابور أو تعذرت الكتابة
+    "SPILL_DIR": os.path.join(BASE_DIR, "logs", "audit_spill"),
+    "CRITICAL_SEVERITIES": ("HIGH", "CRITICAL"),
+}
+
+# إعدادات تتبع نشاط المستخدمين
+ACTIVITY_SETTINGS = {
+    # أقل فترة (بالثواني) بين كتابتين لنشاط نفس المستخدم
+    "WRITE_INTERVAL": 60,
+}
+
+# صلاحيات كل دور (تُضاف إليها صلاحيات Django من المجموعات)
+ROLE_PERMISSIONS = {
+    "admin": ["all"],
+    "doctor": [
+        "view_patients",
+        "view_medical_records",
+        "edit_medical_records",
+        "write_prescriptions",
+        "view_lab_results",
+        "manage_appointments",
+    ],
+    "nurse": ["view_patients", "view_medical_records", "record_vitals"],
+    "pharmacist": ["view_prescriptions", "dispense_medications", "manage_inventory"],
+    "lab_technician": ["view_lab_requests", "enter_lab_results"],
+    "receptionist": ["view_patients", "manage_appointments"],
+    "patient": ["view_own_records"],
+}
+
+# لقطات مقاييس لوحة تحكم التحليلات
+ANALYTICS_DASHBOARD_SETTINGS = {
+    "CACHE_TTL": 30,
+    # مدة الاحتفاظ باللقطات السابقة لطلبات الفروق
+    "HISTORY_TTL": 60 * 30,
+    "LOCK_TIMEOUT": 15,
+    "WORKERS": 4,
+}
+
+# توليد مستندات PDF في الخلفية وتخزينها حسب محتواها
+DOCUMENT_RENDERING_SETTINGS = {
+    "ASYNC": True,
+    "STORAGE_DIR": "documents",
+    # يُرفع عند تغيير قوالب المستندات لإبطال النسخ المخزنة
+    "TEMPLATE_VERSION": "1",
+    "STATUS_TIMEOUT": 60 * 60,
+    # أوراق أنماط تُحمّل مرة واحدة لكل عامل وتُطبق على جميع المستندات
+    "STYLESHEETS": [],
+    "BASE_URL": str(BASE_DIR),
+}
+
+# ترقيم القوائم الكبيرة بالمؤشرات
+KEYSET_PAGINATION_SETTINGS = {
+    "PAGE_SIZE": 20,
+    "MAX_PAGE_SIZE": 100,
+    # مدة تخزين العدّ الكلي حين لا تتوفر تقديرات المخطط (ثوان)
+    "COUNT_CACHE_TIMEOUT": 60 * 5,
+}
+
+# كشف القراءات الحيوية الشاذة لجلسات الطب عن بُعد
+VITAL_STREAM_SETTINGS = {
+    "ASYNC": True,
+    # طابور يُشغّل بعملية عامل واحدة لأن حالة الكواشف في ذاكرتها
+    "QUEUE": "vital_stream",
+    "WINDOW": 64,
+    "MAX_PATIENTS": 50000,
+    "RATE_WINDOW": 60,  # ثوان
+    "EWMA_ALPHA": 0.1,
+    "Z_THRESHOLD": 4.0,
+    "WARMUP": 10,
+    "COOLDOWN": 300,  # ثوان
+}
+
+# فهرس إرسال الإسعاف ومراكز الطوارئ
+EMERGENCY_DISPATCH_SETTINGS = {
+    "CELL_DEGREES": 0.02,
+    "MAX_RADIUS_KM": 100,
+    # ثوان منذ آخر تحديث موقع قبل استبعاد سيارة الإسعاف
+    "STALE_AFTER": 120,
+    "NEAREST": 5,
+}
+
+# استيراد دراسات DICOM
+DICOM_INGESTION_SETTINGS = {
+    "THUMBNAIL_SIZE": 256,
+    "THUMBNAIL_QUALITY": 85,
+    # عمليات توليد الصور المصغرة (None = عدد المعالجات)
+    "WORKERS": None,
+    "READ_THREADS": 8,
+    "BATCH_SIZE": 500,
+}
+
+# تشغيل تحليلات الذكاء الاصطناعي على صور الأشعة دفعياً
+AI_ANALYSIS_SETTINGS = {
+    "BATCH_SIZE": 32,
+    # عمليات فك الصور (None = عدد المعالجات)
+    "WORKERS": None,
+    "LIMIT": 5000,
+    "CACHE_TIMEOUT": None,
+    # مسارات أصناف نماذج إضافية (radiology.analysis.AnalysisModel)
+    "MODELS": [],
+}
+
 # إعدادات النسخ الاحتياطي
 BACKUP_SETTINGS = {
     "BACKUP_DIR": os.path.join(BASE_DIR, "backups", "files"),
     "BACKUP_RETENTION_DAYS": 30,
     "COMPRESSION_ENABLED": True,
     "COMPRESSION_LEVEL": 6,
+    # النسخ المجزأ: عدد الصفوف في كل دفعة وعدد العمليات المتوازية
+    "CHUNK_SIZE": int(os.getenv("BACKUP_CHUNK_SIZE", 5000)),
+    "WORKERS": int(os.getenv("BACKUP_WORKERS", os.cpu_count() or 1)),
+    # حجم أجزاء الرفع المتعدد إلى S3 (بايت)
+    "PART_SIZE": 8 * 1024 * 1024,
     "BACKUP_TYPES": {
         "full": {
             "schedule": "weekly",
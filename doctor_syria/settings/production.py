@@ -35,6 +35,9 @@ SECURE_HSTS_SECONDS = 31536000
 SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 SECURE_HSTS_PRELOAD = True
 
+# التطبيق خلف nginx: عنوان العميل من آخر عنصر في X-Forwarded-For
+RATELIMIT_TRUSTED_PROXIES = int(os.getenv("RATELIMIT_TRUSTED_PROXIES", 1))
+
 # إعدادات التخزين المؤقت
 CACHES = {
     "default": {
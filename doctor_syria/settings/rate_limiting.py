@@ -6,6 +6,9 @@ RATELIMIT_ENABLE = True
 RATELIMIT_USE_CACHE = 'default'
 RATELIMIT_VIEW = True
 RATELIMIT_FAIL_OPEN = False
+# Reverse proxies in front of the app (nginx = 1). The client address is taken
+# from X-Forwarded-For only up to this many hops; 0 uses REMOTE_ADDR.
+RATELIMIT_TRUSTED_PROXIES = 0
 
 # Define rate limits for different views
 RATELIMIT_DEFAULT_LIMITS = {
@@ -41,6 +41,12 @@ CACHES = {
     }
 }
 
+# تعطيل تحديد معدل الطلبات في الاختبارات
+RATELIMIT_ENABLE = False
+
+# كتابة سجلات التدقيق مباشرة في الاختبارات
+AUDIT_SETTINGS = {**AUDIT_SETTINGS, "ASYNC": False}
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8000",
@@ -0,0 +1,372 @@
+"""
+كشف القراءات الحيوية الشاذة أثناء وصولها
+
+تمر كل قراءة بثلاثة كواشف على نافذة متحركة لكل مريض ومقياس: حدود ثابتة،
+ومعدل تغير (أكبر تأرجح خلال النافذة الزمنية)، وانحراف z عن متوسط أُسّي
+متحرك (EWMA). حالة كل مريض ومقياس حلقة ثابتة السعة من مصفوفتي NumPy
+(الأوقات int64 والقيم float32) مع متوسط وتباين EWMA، فالذاكرة محدودة لكل
+مريض، ويُستبعد الأقدم استخداماً عند تجاوز عدد المرضى الأقصى.
+
+الحالة في ذاكرة العملية: تُمرر القراءات إلى مهمة Celery على طابور مخصص
+(``VITAL_STREAM_SETTINGS["QUEUE"]``) يُشغّل بعملية واحدة تعالج جميع المرضى،
+وتُرسل التنبيهات عبر Channels إلى مجموعة إشعارات طبيب الجلسة.
+"""
+
+import functools
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+from django.conf import settings
+
+DEFAULT_SETTINGS = {
+    "ASYNC": True,
+    "QUEUE": "vital_stream",
+    # عدد القراءات الأخيرة المحفوظة لكل مريض ومقياس
+    "WINDOW": 64,
+    "MAX_PATIENTS": 50000,
+    # نافذة معدل التغير (ثوان)
+    "RATE_WINDOW": 60,
+    "EWMA_ALPHA": 0.1,
+    "Z_THRESHOLD": 4.0,
+    # عدد القراءات قبل تفعيل كاشف EWMA
+    "WARMUP": 10,
+    # أقل مدة (ثوان) بين تنبيهين من النوع نفسه للمريض والمقياس
+    "COOLDOWN": 300,
+    # (الحد الأدنى، الحد الأعلى) لكل مقياس، None يعني بلا حد
+    "THRESHOLDS": {
+        "heart_rate": (40, 140),
+        "pulse": (40, 140),
+        "spo2": (90, None),
+        "oxygen_saturation": (90, None),
+        "temperature": (35.0, 39.5),
+        "systolic": (80, 180),
+        "blood_pressure_systolic": (80, 180),
+        "diastolic": (50, 110),
+        "blood_pressure_diastolic": (50, 110),
+        "respiratory_rate": (8, 30),
+        "glucose": (54, 300),
+        "blood_sugar": (54, 300),
+    },
+    # أقصى تغير مقبول خلال نافذة معدل التغير لكل مقياس
+    "MAX_CHANGE": {
+        "heart_rate": 30,
+        "pulse": 30,
+        "spo2": 5,
+        "oxygen_saturation": 5,
+        "temperature": 1.0,
+        "systolic": 40,
+        "blood_pressure_systolic": 40,
+        "diastolic": 30,
+        "blood_pressure_diastolic": 30,
+        "respiratory_rate": 10,
+    },
+    "NOTIFY_GROUP": "user_{user_id}_notifications",
+}
+
+THRESHOLD = "threshold"
+RATE = "rate_of_change"
+EWMA = "ewma_zscore"
+
+
+def get_stream_setting(name):
+    return getattr(settings, "VITAL_STREAM_SETTINGS", {}).get(
+        name, DEFAULT_SETTINGS[name]
+    )
+
+
+class Alert(NamedTuple):
+    patient_id: int
+    metric: str
+    kind: str
+    # الوقت بالمللي ثانية
+    time: int
+    value: float
+    detail: dict
+
+    def as_message(self):
+        return {
+            "patient_id": self.patient_id,
+            "metric": self.metric,
+            "kind": self.kind,
+            "time": self.time,
+            "value": self.value,
+            **self.detail,
+        }
+
+
+class MetricState:
+    """حلقة القراءات الأخيرة مع حالة EWMA لمريض ومقياس واحد"""
+
+    __slots__ = ("times", "values", "head", "size", "mean", "var", "count", "alerted")
+
+    def __init__(self, capacity):
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self.head = 0
+        self.size = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+        # آخر وقت تنبيه لكل نوع
+        self.alerted = {}
+
+    @property
+    def last_time(self):
+        if not self.size:
+            return None
+        return int(self.times[self.head - 1])
+
+    def push(self, time, value):
+        self.times[self.head] = time
+        self.values[self.head] = value
+        self.head = (self.head + 1) % len(self.times)
+        self.size = min(self.size + 1, len(self.times))
+
+    def since(self, time):
+        """القيم المحفوظة منذ ``time``"""
+        values = self.values[: self.size]
+        return values[self.times[: self.size] >= time]
+
+    def nbytes(self):
+        return self.times.nbytes + self.values.nbytes
+
+
+class ThresholdDetector:
+    """قيمة خارج الحدود الثابتة للمقياس"""
+
+    kind = THRESHOLD
+
+    def __init__(self, limits):
+        self.limits = limits
+
+    def check(self, state, metric, time, value):
+        if metric not in self.limits:
+            return None
+        low, high = self.limits[metric]
+        if low is not None and value < low:
+            return {"limit": low, "direction": "low"}
+        if high is not None and value > high:
+            return {"limit": high, "direction": "high"}
+        return None
+
+
+class RateOfChangeDetector:
+    """تأرجح أكبر من الحد بين القيمة وقراءات النافذة الزمنية الأخيرة"""
+
+    kind = RATE
+
+    def __init__(self, max_change, window_ms):
+        self.max_change = max_change
+        self.window_ms = window_ms
+
+    def check(self, state, metric, time, value):
+        limit = self.max_change.get(metric)
+        if limit is None or not state.size:
+            return None
+        recent = state.since(time - self.window_ms)
+        if not len(recent):
+            return None
+        change = max(value - float(recent.min()), float(recent.max()) - value)
+        if change > limit:
+            return {"change": round(change, 3), "limit": limit}
+        return None
+
+
+class EwmaDetector:
+    """انحراف z عن المتوسط الأسّي المتحرك بعد فترة الإحماء"""
+
+    kind = EWMA
+
+    def __init__(self, alpha, threshold, warmup):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+
+    def check(self, state, metric, time, value):
+        if state.count < self.warmup or state.var <= 0:
+            return None
+        z = (value - state.mean) / state.var ** 0.5
+        if abs(z) > self.threshold:
+            return {"zscore": round(z, 2), "mean": round(state.mean, 3)}
+        return None
+
+    def update(self, state, value):
+        if not state.count:
+            state.mean = value
+        else:
+            diff = value - state.mean
+            increment = self.alpha * diff
+            state.mean += increment
+            state.var = (1 - self.alpha) * (state.var + diff * increment)
+        state.count += 1
+
+
+class AnomalyStream:
+    """حالة الكواشف لجميع المرضى في العملية الحالية"""
+
+    def __init__(
+        self,
+        window=DEFAULT_SETTINGS["WINDOW"],
+        max_patients=DEFAULT_SETTINGS["MAX_PATIENTS"],
+        thresholds=None,
+        max_change=None,
+        rate_window=DEFAULT_SETTINGS["RATE_WINDOW"],
+        alpha=DEFAULT_SETTINGS["EWMA_ALPHA"],
+        z_threshold=DEFAULT_SETTINGS["Z_THRESHOLD"],
+        warmup=DEFAULT_SETTINGS["WARMUP"],
+        cooldown=DEFAULT_SETTINGS["COOLDOWN"],
+    ):
+        self.window = window
+        self.max_patients = max_patients
+        self.cooldown_ms = cooldown * 1000
+        self.ewma = EwmaDetector(alpha, z_threshold, warmup)
+        self.detectors = (
+            ThresholdDetector(
+                DEFAULT_SETTINGS["THRESHOLDS"] if thresholds is None else thresholds
+            ),
+            RateOfChangeDetector(
+                DEFAULT_SETTINGS["MAX_CHANGE"] if max_change is None else max_change,
+                rate_window * 1000,
+            ),
+            self.ewma,
+        )
+        # المريض -> {المقياس: MetricState} بترتيب آخر استخدام
+        self.patients = OrderedDict()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            window=get_stream_setting("WINDOW"),
+            max_patients=get_stream_setting("MAX_PATIENTS"),
+            thresholds=get_stream_setting("THRESHOLDS"),
+            max_change=get_stream_setting("MAX_CHANGE"),
+            rate_window=get_stream_setting("RATE_WINDOW"),
+            alpha=get_stream_setting("EWMA_ALPHA"),
+            z_threshold=get_stream_setting("Z_THRESHOLD"),
+            warmup=get_stream_setting("WARMUP"),
+            cooldown=get_stream_setting("COOLDOWN"),
+        )
+
+    def state(self, patient_id, metric):
+        metrics = self.patients.get(patient_id)
+        if metrics is None:
+            while len(self.patients) >= self.max_patients:
+                # حذف حالات المريض الأقدم استخداماً
+                self.patients.popitem(last=False)
+            metrics = self.patients[patient_id] = {}
+        else:
+            self.patients.move_to_end(patient_id)
+        state = metrics.get(metric)
+        if state is None:
+            state = metrics[metric] = MetricState(self.window)
+        return state
+
+    def observe(self, patient_id, metric, time, value):
+        """تمرير قراءة واحدة عبر الكواشف وإرجاع التنبيهات الجديدة"""
+        state = self.state(patient_id, metric)
+        last_time = state.last_time
+        if last_time is not None and time < last_time:
+            # القراءات المتأخرة لا تُعيد ترتيب النافذة
+            return []
+
+        value = float(value)
+        alerts = []
+        for detector in self.detectors:
+            detail = detector.check(state, metric, time, value)
+            if detail is None:
+                continue
+            previous = state.alerted.get(detector.kind)
+            if previous is not None and time - previous < self.cooldown_ms:
+                continue
+            state.alerted[detector.kind] = time
+            alerts.append(Alert(patient_id, metric, detector.kind, time, value, detail))
+
+        state.push(time, value)
+        self.ewma.update(state, value)
+        return alerts
+
+    def observe_many(self, patient_id, points):
+        """``points``: ``[(الوقت بالمللي ثانية، {المقياس: القيمة})]``"""
+        alerts = []
+        for time, metrics in sorted(points, key=lambda point: point[0]):
+            for metric, value in metrics.items():
+                alerts.extend(self.observe(patient_id, metric, time, value))
+        return alerts
+
+    def nbytes(self):
+        """الذاكرة التقريبية لمصفوفات الحالات"""
+        return sum(
+            state.nbytes() for metrics in self.patients.values() for state in metrics.values()
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def get_stream():
+    """حالة الكواشف المشتركة لعملية العامل"""
+    return AnomalyStream.from_settings()
+
+
+def recipients(patient_id, session_id=None):
+    """(الجلسة، مستخدم الطبيب) للجلسة المحددة أو لجلسات المريض الجارية"""
+    from .models import TeleSession
+
+    sessions = TeleSession.objects.select_related("clinic__doctor")
+    if session_id is not None:
+        sessions = sessions.filter(pk=session_id)
+    else:
+        sessions = sessions.filter(patient_id=patient_id, status="in_progress")
+    return [(session.pk, session.clinic.doctor.user_id) for session in sessions]
+
+
+def notify(patient_id, alerts, session_id=None):
+    """إرسال التنبيهات إلى أطباء الجلسات عبر Channels"""
+    try:
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+    except ImportError:
+        return 0
+    layer = get_channel_layer()
+    if layer is None:
+        return 0
+    targets = recipients(patient_id, session_id)
+    for session, user_id in targets:
+        group = get_stream_setting("NOTIFY_GROUP").format(user_id=user_id)
+        async_to_sync(layer.group_send)(
+            group,
+            {
+                "type": "notification",
+                "message": {
+                    "event": "vital_alert",
+                    "session_id": session,
+                    "alerts": [alert.as_message() for alert in alerts],
+                },
+            },
+        )
+    return len(targets)
+
+
+def evaluate(patient_id, points, session_id=None):
+    """تقييم دفعة قراءات مريض في حالة العملية الحالية وإرسال تنبيهاتها"""
+    alerts = get_stream().observe_many(patient_id, points)
+    if alerts:
+        notify(patient_id, alerts, session_id)
+    return alerts
+
+
+def dispatch_readings(patient_id, points, session_id=None):
+    """
+    تمرير قراءات مريض إلى عامل الكشف؛ ``points`` بصيغة ``observe_many``
+    """
+    points = [(int(time), metrics) for time, metrics in points if metrics]
+    if not points:
+        return
+    if not get_stream_setting("ASYNC"):
+        evaluate(patient_id, points, session_id)
+        return
+
+    from .tasks import evaluate_vital_stream
+
+    evaluate_vital_stream.apply_async(
+        (patient_id, points, session_id), queue=get_stream_setting("QUEUE")
+    )
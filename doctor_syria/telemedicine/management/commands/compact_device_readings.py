@@ -0,0 +1,109 @@
+import math
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from telemedicine.models import DeviceReading, RemoteVitalSign
+from telemedicine.timeseries import TimeSeriesStore, device_series, session_series
+
+
+def is_numeric(value):
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
+
+
+def fully_numeric(value):
+    """هل تُمثَّل القيمة كاملة بنقاط السلسلة (رقم أو قاموس أرقام غير فارغ)"""
+    values = list(value.values()) if isinstance(value, dict) else [value]
+    return bool(values) and all(is_numeric(number) for number in values)
+
+
+def device_reading_lossless(row):
+    return row.is_normal and not row.notes and fully_numeric(row.reading_value)
+
+
+class Command(BaseCommand):
+    help = "نقل قراءات الأجهزة والقياسات عن بُعد إلى تخزين السلاسل الزمنية"
+
+    BATCH_SIZE = 5000
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delete",
+            action="store_true",
+            help="حذف الصفوف الأصلية التي مُثّلت كاملة في السلاسل بعد نقلها",
+        )
+
+    def handle(self, *args, **options):
+        sources = [
+            (
+                DeviceReading.objects.select_related("device"),
+                "reading_time",
+                "reading_value",
+                lambda row: device_series(row.device),
+                device_reading_lossless,
+            ),
+            (
+                RemoteVitalSign.objects.select_related("session"),
+                "measurement_time",
+                "value",
+                lambda row: session_series(row.session, row.device_id),
+                # ربط القياس بسجل العلامات الحيوية ونوع الجهاز لا يُخزّن في السلسلة
+                lambda row: False,
+            ),
+        ]
+        for queryset, time_field, value_field, series_of, lossless in sources:
+            written, kept = self.compact(
+                queryset,
+                time_field,
+                value_field,
+                series_of,
+                lossless if options["delete"] else None,
+            )
+            name = queryset.model.__name__
+            self.stdout.write(self.style.SUCCESS(f"{name}: نُقلت {written} نقطة"))
+            if options["delete"] and kept:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{name}: أُبقي {kept} صفاً لا تمثله السلاسل كاملة "
+                        "(قيم غير رقمية أو ملاحظات أو حالة غير طبيعية)"
+                    )
+                )
+
+    def compact(self, queryset, time_field, value_field, series_of, lossless):
+        written = kept = 0
+        batch = []
+        for row in queryset.order_by("pk").iterator(chunk_size=self.BATCH_SIZE):
+            batch.append(row)
+            if len(batch) >= self.BATCH_SIZE:
+                counts = self.flush(batch, time_field, value_field, series_of, lossless)
+                written, kept = written + counts[0], kept + counts[1]
+                batch = []
+        if batch:
+            counts = self.flush(batch, time_field, value_field, series_of, lossless)
+            written, kept = written + counts[0], kept + counts[1]
+        return written, kept
+
+    def flush(self, rows, time_field, value_field, series_of, lossless):
+        """
+        نقل دفعة إلى السلاسل وحذف ما مُثّل منها كاملاً إن طُلب (``lossless``)،
+        ويُرجع (عدد النقاط، عدد الصفوف المُبقاة)
+        """
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(series_of(row), []).append(
+                (getattr(row, time_field), getattr(row, value_field))
+            )
+        deletable = [row.pk for row in rows if lossless and lossless(row)]
+        with transaction.atomic():
+            written = sum(
+                TimeSeriesStore.ingest(series, readings)
+                for series, readings in grouped.items()
+            )
+            if deletable:
+                type(rows[0]).objects.filter(pk__in=deletable).delete()
+        kept = len(rows) - len(deletable) if lossless else 0
+        return written, kept
@@ -188,3 +188,69 @@ class TeleReport(models.Model):
 
     def __str__(self):
         return f"تقرير {self.report_type} - {self.session}"
+
+
+class ReadingChunk(models.Model):
+    """
+    كتلة عمودية لقراءات سلسلة زمنية واحدة خلال ساعة
+
+    تُخزن الأوقات كفروق متتالية بالمللي ثانية والقيم كمصفوفة float64،
+    وكلاهما مضغوط، مع ملخص يجيب عن التجميعات دون فك الكتلة.
+    """
+
+    series = models.CharField(max_length=150)
+    metric = models.CharField(max_length=50)
+    start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    first_time = models.DateTimeField()
+    last_time = models.DateTimeField()
+    min_value = models.FloatField()
+    max_value = models.FloatField()
+    sum_value = models.FloatField()
+    times = models.BinaryField()
+    values = models.BinaryField()
+
+    class Meta:
+        ordering = ["series", "metric", "start"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["series", "metric", "start"], name="unique_reading_chunk"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.series}/{self.metric} @ {self.start}"
+
+
+class ReadingRollup(models.Model):
+    """تجميعات القراءات بدقة دقيقة أو ساعة"""
+
+    RESOLUTIONS = [
+        ("1m", "دقيقة"),
+        ("1h", "ساعة"),
+    ]
+
+    series = models.CharField(max_length=150)
+    metric = models.CharField(max_length=50)
+    resolution = models.CharField(max_length=2, choices=RESOLUTIONS)
+    bucket = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    min_value = models.FloatField()
+    max_value = models.FloatField()
+    sum_value = models.FloatField()
+
+    class Meta:
+        ordering = ["series", "metric", "resolution", "bucket"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["series", "metric", "resolution", "bucket"],
+                name="unique_reading_rollup",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.series}/{self.metric} {self.resolution} @ {self.bucket}"
+
+    @property
+    def average(self):
+        return self.sum_value / self.count if self.count else None
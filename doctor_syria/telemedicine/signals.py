@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .anomaly import dispatch_readings
+from .models import DeviceReading, RemoteVitalSign
+from .timeseries import metrics_of, to_ms
+
+
+@receiver(post_save, sender=RemoteVitalSign)
+def stream_remote_vital_sign(sender, instance, created, raw=False, **kwargs):
+    """
+    تمرير القياس الجديد إلى كشف القراءات الشاذة بعد تثبيت المعاملة
+    """
+    if raw or not created:
+        return
+    patient_id = instance.session.patient_id
+    points = [(to_ms(instance.measurement_time), metrics_of(instance.value))]
+    transaction.on_commit(
+        lambda: dispatch_readings(patient_id, points, session_id=instance.session_id)
+    )
+
+
+@receiver(post_save, sender=DeviceReading)
+def stream_device_reading(sender, instance, created, raw=False, **kwargs):
+    """
+    تمرير قراءة الجهاز الجديدة إلى كشف القراءات الشاذة بعد تثبيت المعاملة
+    """
+    if raw or not created:
+        return
+    patient_id = instance.device.patient_id
+    points = [(to_ms(instance.reading_time), metrics_of(instance.reading_value))]
+    transaction.on_commit(lambda: dispatch_readings(patient_id, points))
@@ -0,0 +1,13 @@
+"""
+مهام Celery للطب عن بُعد
+"""
+
+from celery import shared_task
+
+
+@shared_task
+def evaluate_vital_stream(patient_id, points, session_id=None):
+    """تمرير دفعة قراءات مريض عبر كواشف النافذة المتحركة وإرسال التنبيهات"""
+    from .anomaly import evaluate
+
+    return len(evaluate(patient_id, points, session_id))
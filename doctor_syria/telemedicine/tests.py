@@ -0,0 +1,250 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+
+from medical_records.tests import make_doctor, make_patient, make_record
+from telemedicine.anomaly import EWMA, RATE, THRESHOLD, AnomalyStream
+from telemedicine.models import (
+    DeviceReading,
+    ReadingChunk,
+    SmartDevice,
+    TeleSession,
+    VirtualClinic,
+)
+from telemedicine.timeseries import TimeSeriesStore, device_series
+from telemedicine.views import DeviceReadingViewSet
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_device(patient_id, device_id="dev-1"):
+    return SmartDevice.objects.create(
+        patient_id=patient_id,
+        device_type=SmartDevice._meta.get_field("device_type").choices[0][0],
+        device_name="جهاز",
+        device_id=device_id,
+        manufacturer="-",
+        model_number="-",
+    )
+
+
+class DeviceAccessTests(TestCase):
+    def setUp(self):
+        self.patient = make_patient("patient")
+        self.device = make_device(self.patient)
+        self.doctor = make_doctor("doctor")
+
+    def retrieve(self, user):
+        request = APIRequestFactory().get("/devices/dev-1/")
+        force_authenticate(request, user=user)
+        view = DeviceReadingViewSet.as_view({"get": "retrieve"})
+        return view(request, device_id="dev-1").status_code
+
+    def open_session(self, status):
+        clinic = VirtualClinic.objects.create(
+            doctor=self.doctor, name="عيادة", description=""
+        )
+        return TeleSession.objects.create(
+            clinic=clinic,
+            patient_id=self.patient,
+            session_type="video",
+            status=status,
+            scheduled_start=START,
+            session_key=f"key-{status}",
+        )
+
+    def test_owner_can_read(self):
+        owner = User.objects.get(email="patient@example.com")
+        self.assertEqual(self.retrieve(owner), 200)
+
+    def test_unrelated_doctor_is_denied(self):
+        self.open_session("completed")
+        self.assertEqual(self.retrieve(self.doctor.user), 403)
+
+    def test_doctor_with_active_session_can_read(self):
+        self.open_session("in_progress")
+        self.assertEqual(self.retrieve(self.doctor.user), 200)
+
+    def test_doctor_with_record_access_can_read(self):
+        make_record(self.patient, self.doctor)
+        self.assertEqual(self.retrieve(self.doctor.user), 200)
+
+    def test_other_patient_is_denied(self):
+        make_patient("other")
+        other = User.objects.get(email="other@example.com")
+        self.assertEqual(self.retrieve(other), 403)
+
+
+class CompactDeviceReadingsTests(TestCase):
+    def setUp(self):
+        self.device = make_device(make_patient("patient"))
+
+    def reading(self, minutes, value, **fields):
+        return DeviceReading.objects.create(
+            device=self.device,
+            reading_time=START + timedelta(minutes=minutes),
+            reading_value=value,
+            **fields,
+        )
+
+    def compact(self, *args):
+        call_command("compact_device_readings", *args, stdout=StringIO())
+
+    def test_delete_keeps_rows_the_series_cannot_represent(self):
+        numeric = self.reading(0, {"systolic": 120, "diastolic": 80})
+        scalar = self.reading(1, 72)
+        text = self.reading(2, {"systolic": 118, "rhythm": "irregular"})
+        abnormal = self.reading(3, {"systolic": 190}, is_normal=False)
+        noted = self.reading(4, 70, notes="بعد الجهد")
+
+        self.compact("--delete")
+
+        self.assertEqual(
+            set(DeviceReading.objects.values_list("pk", flat=True)),
+            {text.pk, abnormal.pk, noted.pk},
+        )
+        self.assertFalse(
+            DeviceReading.objects.filter(pk__in=[numeric.pk, scalar.pk]).exists()
+        )
+        times, values = TimeSeriesStore.range(
+            device_series(self.device), "systolic", START, START + timedelta(hours=1)
+        )
+        self.assertEqual(list(values), [120.0, 118.0, 190.0])
+
+    def test_compacted_values_read_back_exactly(self):
+        self.reading(0, {"temperature": 37.2, "spo2": 97})
+        self.reading(1, 36.6)
+
+        self.compact("--delete")
+
+        self.assertFalse(DeviceReading.objects.exists())
+        readings = TimeSeriesStore.readings(
+            device_series(self.device), START, START + timedelta(hours=1)
+        )
+        self.assertEqual(
+            [reading.reading_value for reading in readings],
+            [{"value": 36.6}, {"temperature": 37.2, "spo2": 97.0}],
+        )
+
+    def test_without_delete_all_rows_are_kept(self):
+        self.reading(0, 72)
+        self.compact()
+
+        self.assertEqual(DeviceReading.objects.count(), 1)
+        self.assertTrue(ReadingChunk.objects.exists())
+
+
+def stream(**options):
+    defaults = {"thresholds": {}, "max_change": {}, "cooldown": 0}
+    defaults.update(options)
+    return AnomalyStream(**defaults)
+
+
+class AnomalyStreamTests(SimpleTestCase):
+    def kinds(self, alerts):
+        return [(alert.kind, alert.detail) for alert in alerts]
+
+    def test_threshold_detector(self):
+        detector = stream(thresholds={"heart_rate": (40, 140), "spo2": (90, None)})
+
+        self.assertEqual(detector.observe(1, "heart_rate", 0, 80), [])
+        self.assertEqual(
+            self.kinds(detector.observe(1, "heart_rate", 1000, 150)),
+            [(THRESHOLD, {"limit": 140, "direction": "high"})],
+        )
+        self.assertEqual(
+            self.kinds(detector.observe(1, "spo2", 2000, 85)),
+            [(THRESHOLD, {"limit": 90, "direction": "low"})],
+        )
+        self.assertEqual(detector.observe(1, "spo2", 3000, 100), [])
+        self.assertEqual(detector.observe(1, "unknown", 4000, 1e6), [])
+
+    def test_rate_of_change_detector_uses_time_window(self):
+        detector = stream(max_change={"heart_rate": 20}, rate_window=60)
+
+        detector.observe(1, "heart_rate", 0, 80)
+        self.assertEqual(
+            self.kinds(detector.observe(1, "heart_rate", 30_000, 105)),
+            [(RATE, {"change": 25.0, "limit": 20})],
+        )
+        # القراءتان السابقتان خارج نافذة الستين ثانية
+        self.assertEqual(detector.observe(1, "heart_rate", 100_000, 130), [])
+
+    def test_ewma_detector_waits_for_warmup(self):
+        detector = stream(warmup=10, z_threshold=4.0, alpha=0.1)
+
+        for i in range(9):
+            self.assertEqual(detector.observe(1, "glucose", i * 1000, 100 + i % 2), [])
+        self.assertEqual(detector.observe(1, "glucose", 9000, 100), [])
+        for i in range(10, 20):
+            detector.observe(1, "glucose", i * 1000, 100 + i % 2)
+
+        alerts = detector.observe(1, "glucose", 20_000, 130)
+        self.assertEqual([alert.kind for alert in alerts], [EWMA])
+        self.assertGreater(alerts[0].detail["zscore"], 4.0)
+
+    def test_cooldown_suppresses_repeated_alerts_of_same_kind(self):
+        detector = stream(
+            thresholds={"heart_rate": (40, 140)},
+            max_change={"heart_rate": 20},
+            cooldown=300,
+        )
+
+        self.assertEqual(len(detector.observe(1, "heart_rate", 0, 150)), 1)
+        # حد ثابت مكرر خلال فترة التهدئة، وتغير حاد من نوع آخر يُنبَّه عنه
+        self.assertEqual(
+            [a.kind for a in detector.observe(1, "heart_rate", 1000, 180)], [RATE]
+        )
+        self.assertEqual(detector.observe(1, "heart_rate", 2000, 150), [])
+        self.assertEqual(
+            [a.kind for a in detector.observe(1, "heart_rate", 300_000, 150)],
+            [THRESHOLD],
+        )
+        # لكل مريض فترة تهدئة مستقلة
+        self.assertEqual(len(detector.observe(2, "heart_rate", 2000, 150)), 1)
+
+    def test_least_recently_used_patient_is_evicted(self):
+        detector = stream(max_patients=2)
+
+        detector.observe(1, "heart_rate", 0, 80)
+        detector.observe(2, "heart_rate", 0, 80)
+        detector.observe(1, "heart_rate", 1000, 81)
+        detector.observe(3, "heart_rate", 0, 80)
+
+        self.assertEqual(list(detector.patients), [1, 3])
+        self.assertEqual(detector.patients[1]["heart_rate"].size, 2)
+        state = detector.patients[1]["heart_rate"]
+        self.assertEqual(detector.nbytes(), 2 * state.nbytes())
+
+    def test_window_keeps_most_recent_readings(self):
+        detector = stream(window=4)
+        for i in range(6):
+            detector.observe(1, "pulse", i * 1000, i)
+
+        state = detector.patients[1]["pulse"]
+        self.assertEqual(state.size, 4)
+        self.assertEqual(state.last_time, 5000)
+        self.assertEqual(sorted(state.since(0).tolist()), [2.0, 3.0, 4.0, 5.0])
+
+    def test_late_readings_are_ignored(self):
+        detector = stream(thresholds={"heart_rate": (40, 140)})
+        detector.observe(1, "heart_rate", 10_000, 80)
+
+        self.assertEqual(detector.observe(1, "heart_rate", 5000, 200), [])
+        state = detector.patients[1]["heart_rate"]
+        self.assertEqual((state.size, state.count, state.last_time), (1, 1, 10_000))
+
+    def test_observe_many_orders_points_by_time(self):
+        detector = stream(thresholds={"heart_rate": (40, 140)})
+
+        alerts = detector.observe_many(
+            1, [(2000, {"heart_rate": 150}), (1000, {"heart_rate": 80, "spo2": 97})]
+        )
+
+        self.assertEqual([(a.time, a.kind) for a in alerts], [(2000, THRESHOLD)])
+        self.assertEqual(detector.patients[1]["heart_rate"].size, 2)
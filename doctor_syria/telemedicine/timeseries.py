@@ -0,0 +1,335 @@
+"""
+تخزين قراءات الأجهزة المتصلة كسلاسل زمنية
+
+تُجمع القراءات في كتل عمودية لكل سلسلة ومقياس وساعة (``ReadingChunk``): الأوقات
+فروق متتالية بالمللي ثانية والقيم float64، مضغوطة بـ zlib. يُدمج كل إدخال
+دفعي مع الكتل الموجودة (مع استبدال القراءة المكررة لنفس اللحظة) وتُحدّث معه
+تجميعات الدقيقة والساعة (``ReadingRollup``). استعلامات المدى تقرأ الكتل
+المتقاطعة مع المدى فقط، والملخصات تستخدم ملخص الكتلة الكاملة دون فكها.
+
+السلسلة هي مصدر القراءات: ``device:<pk>`` لجهاز ذكي و
+``session:<pk>:<device_id>`` لقياسات جلسة عن بُعد. تُفكك القيم JSON إلى
+مقاييس رقمية (``{"spo2": 97, "pulse": 72}``) والقيمة المفردة تصبح ``value``.
+"""
+
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from typing import NamedTuple
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .anomaly import dispatch_readings
+from .models import ReadingChunk, ReadingRollup
+
+CHUNK_MS = 60 * 60 * 1000
+ROLLUP_MS = {"1m": 60 * 1000, "1h": CHUNK_MS}
+DEFAULT_METRIC = "value"
+
+
+def device_series(device):
+    return f"device:{device.pk}"
+
+
+def session_series(session, device_id):
+    return f"session:{session.pk}:{device_id}"
+
+
+def to_ms(moment):
+    if isinstance(moment, str):
+        moment = parse_datetime(moment)
+    if moment is None:
+        raise ValueError("وقت القراءة غير صالح")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return int(moment.timestamp() * 1000)
+
+
+def from_ms(ms):
+    return datetime.fromtimestamp(int(ms) / 1000, tz=dt_timezone.utc)
+
+
+def metrics_of(value):
+    """المقاييس الرقمية في قيمة القراءة"""
+    if isinstance(value, dict):
+        items = value.items()
+    else:
+        items = [(DEFAULT_METRIC, value)]
+    metrics = {}
+    for name, number in items:
+        if isinstance(number, bool):
+            continue
+        try:
+            metrics[str(name)] = float(number)
+        except (TypeError, ValueError):
+            continue
+    return metrics
+
+
+def encode_times(offsets):
+    deltas = np.diff(offsets, prepend=0).astype(np.int32)
+    return zlib.compress(deltas.tobytes())
+
+
+def decode_times(blob):
+    deltas = np.frombuffer(zlib.decompress(bytes(blob)), dtype=np.int32)
+    return np.cumsum(deltas, dtype=np.int64)
+
+
+def encode_values(values):
+    # float64 حتى تعود القيمة كما أُدخلت (37.2 لا 37.20000076293945) فيمكن حذف
+    # القراءات الأصلية بعد الضغط
+    return zlib.compress(values.astype(np.float64).tobytes())
+
+
+def decode_values(blob):
+    return np.frombuffer(zlib.decompress(bytes(blob)), dtype=np.float64).copy()
+
+
+def merge(times, values, new_times, new_values):
+    """دمج مرتب تُستبدل فيه القراءة السابقة لنفس اللحظة بالأحدث"""
+    times = np.concatenate([times, new_times])
+    values = np.concatenate([values, new_values])
+    order = np.argsort(times, kind="stable")
+    times, values = times[order], values[order]
+    keep = np.append(times[1:] != times[:-1], True)
+    return times[keep], values[keep]
+
+
+def bucket_stats(times, values, span):
+    """(بداية الدلو، العدد، الأدنى، الأعلى، المجموع) لكل دلو بطول span"""
+    buckets = times - times % span
+    starts = np.flatnonzero(np.append(True, buckets[1:] != buckets[:-1]))
+    return (
+        buckets[starts],
+        np.diff(np.append(starts, len(times))),
+        np.minimum.reduceat(values, starts),
+        np.maximum.reduceat(values, starts),
+        np.add.reduceat(values, starts),
+    )
+
+
+class SeriesReading(NamedTuple):
+    """قراءة مُعاد بناؤها بواجهة ``DeviceReading``"""
+
+    reading_time: datetime
+    reading_value: dict
+
+
+class TimeSeriesStore:
+    """إدخال القراءات دفعياً وقراءتها بالمدى"""
+
+    @classmethod
+    def ingest(cls, series, readings):
+        """
+        إدخال دفعة ``[(الوقت، القيمة)]`` لسلسلة واحدة، ويُرجع عدد النقاط
+        المُدخلة (لكل مقياس نقطة)
+        """
+        groups = defaultdict(lambda: ([], []))
+        for moment, value in readings:
+            ms = to_ms(moment)
+            for metric, number in metrics_of(value).items():
+                times, values = groups[(metric, ms - ms % CHUNK_MS)]
+                times.append(ms)
+                values.append(number)
+        if not groups:
+            return 0
+
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    cls.write(series, groups)
+                break
+            except IntegrityError:
+                # أنشأ إدخال متزامن الكتلة نفسها: إعادة المحاولة تدمج معها
+                if attempt:
+                    raise
+        return sum(len(times) for times, _ in groups.values())
+
+    @classmethod
+    def write(cls, series, groups):
+        starts = {start for _, start in groups}
+        existing = {
+            (chunk.metric, to_ms(chunk.start)): chunk
+            for chunk in ReadingChunk.objects.select_for_update().filter(
+                series=series,
+                metric__in={metric for metric, _ in groups},
+                start__in=[from_ms(start) for start in starts],
+            )
+        }
+
+        created, updated, rollups = [], [], []
+        for (metric, start), (new_times, new_values) in groups.items():
+            chunk = existing.get((metric, start))
+            new_times = np.array(new_times, dtype=np.int64) - start
+            new_values = np.array(new_values, dtype=float)
+            if chunk is None:
+                chunk = ReadingChunk(series=series, metric=metric, start=from_ms(start))
+                old_times, old_values = np.empty(0, np.int64), np.empty(0)
+                created.append(chunk)
+            else:
+                old_times = decode_times(chunk.times)
+                old_values = decode_values(chunk.values)
+                updated.append(chunk)
+            times, values = merge(old_times, old_values, new_times, new_values)
+
+            chunk.times = encode_times(times)
+            chunk.values = encode_values(values)
+            chunk.count = len(times)
+            chunk.first_time = from_ms(start + times[0])
+            chunk.last_time = from_ms(start + times[-1])
+            chunk.min_value = float(values.min())
+            chunk.max_value = float(values.max())
+            chunk.sum_value = float(values.sum())
+
+            for resolution, span in ROLLUP_MS.items():
+                for bucket, count, low, high, total in zip(
+                    *bucket_stats(times + start, values, span)
+                ):
+                    rollups.append(
+                        ReadingRollup(
+                            series=series,
+                            metric=metric,
+                            resolution=resolution,
+                            bucket=from_ms(bucket),
+                            count=int(count),
+                            min_value=float(low),
+                            max_value=float(high),
+                            sum_value=float(total),
+                        )
+                    )
+
+        ReadingChunk.objects.bulk_create(created)
+        ReadingChunk.objects.bulk_update(
+            updated,
+            [
+                "times", "values", "count", "first_time", "last_time",
+                "min_value", "max_value", "sum_value",
+            ],
+        )
+        # دلاء الكتل المتأثرة أعيد حسابها كاملة فيُستبدل ما سبق
+        ReadingRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=["series", "metric", "resolution", "bucket"],
+            update_fields=["count", "min_value", "max_value", "sum_value"],
+        )
+
+    @classmethod
+    def chunks(cls, series, start, end, metric=None):
+        """الكتل المتقاطعة مع المدى [start, end) فقط"""
+        first = to_ms(start)
+        chunks = ReadingChunk.objects.filter(
+            series=series,
+            start__gte=from_ms(first - first % CHUNK_MS),
+            start__lt=end,
+        )
+        if metric is not None:
+            chunks = chunks.filter(metric=metric)
+        return chunks
+
+    @classmethod
+    def points(cls, chunk, start_ms, end_ms):
+        offset = to_ms(chunk.start)
+        times = decode_times(chunk.times) + offset
+        values = decode_values(chunk.values)
+        inside = (times >= start_ms) & (times < end_ms)
+        return times[inside], values[inside]
+
+    @classmethod
+    def range(cls, series, metric, start, end):
+        """أوقات (مللي ثانية) وقيم مقياس واحد في المدى، مرتبة تصاعدياً"""
+        start_ms, end_ms = to_ms(start), to_ms(end)
+        parts = [
+            cls.points(chunk, start_ms, end_ms)
+            for chunk in cls.chunks(series, start, end, metric).order_by("start")
+        ]
+        if not parts:
+            return np.empty(0, np.int64), np.empty(0)
+        times, values = zip(*parts)
+        return np.concatenate(times), np.concatenate(values)
+
+    @classmethod
+    def readings(cls, series, start, end):
+        """القراءات في المدى بشكل ``DeviceReading`` (الأحدث أولاً)"""
+        start_ms, end_ms = to_ms(start), to_ms(end)
+        combined = defaultdict(dict)
+        for chunk in cls.chunks(series, start, end):
+            for ms, value in zip(*cls.points(chunk, start_ms, end_ms)):
+                combined[int(ms)][chunk.metric] = float(value)
+        return [
+            SeriesReading(from_ms(ms), combined[ms])
+            for ms in sorted(combined, reverse=True)
+        ]
+
+    @classmethod
+    def summary(cls, series, metric, start, end):
+        """
+        العدد والأدنى والأعلى والمتوسط في المدى؛ الكتل الواقعة بكاملها في
+        المدى تُلخّص من حقولها ولا تُفك إلا كتل الطرفين
+        """
+        start_ms, end_ms = to_ms(start), to_ms(end)
+        count, low, high, total = 0, np.inf, -np.inf, 0.0
+        for chunk in cls.chunks(series, start, end, metric).defer("times", "values"):
+            if to_ms(chunk.first_time) >= start_ms and to_ms(chunk.last_time) < end_ms:
+                parts = (chunk.count, chunk.min_value, chunk.max_value, chunk.sum_value)
+            else:
+                chunk.refresh_from_db(fields=["times", "values"])
+                _, values = cls.points(chunk, start_ms, end_ms)
+                if not len(values):
+                    continue
+                parts = (len(values), values.min(), values.max(), values.sum())
+            count += parts[0]
+            low, high, total = min(low, parts[1]), max(high, parts[2]), total + parts[3]
+        if not count:
+            return {"count": 0, "min": None, "max": None, "avg": None}
+        return {
+            "count": count,
+            "min": float(low),
+            "max": float(high),
+            "avg": float(total / count),
+        }
+
+    @classmethod
+    def rollups(cls, series, metric, start, end, resolution="1m"):
+        """تجميعات مسبقة الحساب في المدى"""
+        if resolution not in ROLLUP_MS:
+            raise ValueError(f"دقة غير مدعومة: {resolution}")
+        return ReadingRollup.objects.filter(
+            series=series,
+            metric=metric,
+            resolution=resolution,
+            bucket__gte=start,
+            bucket__lt=end,
+        ).order_by("bucket")
+
+
+def ingest_device_readings(device, readings):
+    """
+    إدخال دفعة قراءات جهاز ذكي ``[{"reading_time", "reading_value"}]``
+    وتمريرها إلى كشف القراءات الشاذة
+    """
+    readings = [(item["reading_time"], item["reading_value"]) for item in readings]
+    written = TimeSeriesStore.ingest(device_series(device), readings)
+    device.last_sync = timezone.now()
+    device.save(update_fields=["last_sync"])
+    dispatch_readings(
+        device.patient_id,
+        [(to_ms(moment), metrics_of(value)) for moment, value in readings],
+    )
+    return written
+
+
+def device_readings(device, start, end=None):
+    """بديل ``DeviceReading.objects.filter(device=...)`` لمدى زمني"""
+    return TimeSeriesStore.readings(device_series(device), start, end or timezone.now())
+
+
+def session_vital_signs(session, device_id, start, end=None):
+    """قياسات جلسة عن بُعد من جهاز واحد في مدى زمني"""
+    return TimeSeriesStore.readings(
+        session_series(session, device_id), start, end or timezone.now()
+    )
@@ -0,0 +1,13 @@
+from django.urls import include, path
+from rest_framework import routers
+
+from . import views
+
+app_name = "telemedicine"
+
+router = routers.DefaultRouter()
+router.register(r"devices", views.DeviceReadingViewSet, basename="device-readings")
+
+urlpatterns = [
+    path("api/", include(router.urls)),
+]
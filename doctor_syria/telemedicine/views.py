@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+from django.db.models import F
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from medical_records.access import RecordAccessIndex
+
+from .models import SmartDevice, TeleSession
+from .timeseries import (
+    ROLLUP_MS,
+    TimeSeriesStore,
+    device_readings,
+    device_series,
+    ingest_device_readings,
+)
+
+# أقصى عدد قراءات في دفعة إدخال واحدة
+MAX_BATCH_SIZE = 5000
+DEFAULT_WINDOW = timedelta(hours=1)
+
+
+class DeviceReadingViewSet(viewsets.ViewSet):
+    """إدخال قراءات الأجهزة الذكية دفعياً وقراءتها بالمدى الزمني"""
+
+    permission_classes = [permissions.IsAuthenticated]
+    lookup_field = "device_id"
+
+    ACTIVE_SESSION_STATUSES = ["scheduled", "in_progress"]
+
+    def get_device(self, device_id, owner_only=False):
+        device = get_object_or_404(
+            SmartDevice.objects.annotate(owner_id=F("patient__user_id")),
+            device_id=device_id,
+            is_active=True,
+        )
+        user = self.request.user
+        is_owner = device.owner_id == user.pk
+        if not is_owner and (owner_only or not self.treats(user, device.patient_id)):
+            self.permission_denied(self.request)
+        return device
+
+    def treats(self, user, patient_id):
+        """
+        هل المستخدم طبيب للمريض: له جلسة عن بُعد قائمة معه أو صف في فهرس
+        الوصول إلى السجلات الطبية
+        """
+        doctor = getattr(user, "doctor_profile", None)
+        if doctor is None:
+            return False
+        has_session = TeleSession.objects.filter(
+            clinic__doctor=doctor,
+            patient_id=patient_id,
+            status__in=self.ACTIVE_SESSION_STATUSES,
+        ).exists()
+        return (
+            has_session
+            or RecordAccessIndex.patients_for(doctor)
+            .filter(patient_id=patient_id)
+            .exists()
+        )
+
+    def get_window(self, request):
+        """المدى [start, end) من المعاملات، افتراضياً آخر ساعة"""
+        end = parse_datetime(request.query_params.get("end", "")) or timezone.now()
+        start = parse_datetime(request.query_params.get("start", ""))
+        return start or end - DEFAULT_WINDOW, end
+
+    def retrieve(self, request, device_id=None):
+        """القراءات في المدى بشكل DeviceReading (الأحدث أولاً)"""
+        device = self.get_device(device_id)
+        start, end = self.get_window(request)
+        return Response([
+            {"reading_time": reading.reading_time, "reading_value": reading.reading_value}
+            for reading in device_readings(device, start, end)
+        ])
+
+    @action(detail=True, methods=["post"])
+    def ingest(self, request, device_id=None):
+        """إدخال دفعة قراءات: [{"reading_time": ..., "reading_value": {...}}]"""
+        device = self.get_device(device_id, owner_only=True)
+        readings = request.data.get("readings")
+        if not isinstance(readings, list) or not readings:
+            return Response(
+                {"error": "يجب إرسال قائمة القراءات"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(readings) > MAX_BATCH_SIZE:
+            return Response(
+                {"error": f"الحد الأقصى للدفعة {MAX_BATCH_SIZE} قراءة"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            written = ingest_device_readings(device, readings)
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {"error": "صيغة القراءات غير صالحة"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({"points": written}, status=status.HTTP_201_CREATED)
+
+    @action(detail=True)
+    def rollups(self, request, device_id=None):
+        """تجميعات مقياس بدقة دقيقة أو ساعة مع ملخص المدى"""
+        device = self.get_device(device_id)
+        metric = request.query_params.get("metric")
+        resolution = request.query_params.get("resolution", "1m")
+        if not metric or resolution not in ROLLUP_MS:
+            return Response(
+                {"error": "يجب تحديد المقياس ودقة صالحة (1m أو 1h)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        start, end = self.get_window(request)
+        series = device_series(device)
+        buckets = TimeSeriesStore.rollups(series, metric, start, end, resolution)
+        return Response({
+            "summary": TimeSeriesStore.summary(series, metric, start, end),
+            "buckets": [
+                {
+                    "bucket": rollup.bucket,
+                    "count": rollup.count,
+                    "min": rollup.min_value,
+                    "max": rollup.max_value,
+                    "avg": rollup.average,
+                }
+                for rollup in buckets
+            ],
+        })
@@ -0,0 +1,270 @@
+"""
+استقبال نتائج أجهزة المختبر من رسائل HL7 وإدخالها على دفعات
+
+تُجمع نتائج OBX من رسائل ORU^R01 في الذاكرة، ثم تُحل معرّفات المرضى ورموز
+التحاليل باستعلام واحد لكل دفعة وتُدخل النتائج بـ ``bulk_create``. النتائج التي
+لا يُطابق مريضها أو تحليلها تُحفظ في ``UnmatchedLabResult`` في المعاملة نفسها.
+"""
+
+import logging
+import socketserver
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, close_old_connections, transaction
+
+from utils.hl7 import HL7Message, HL7ParseError, MLLPFrameBuffer, build_ack, frame
+
+from .models import LabResult, LabTest, UnmatchedLabResult
+
+logger = logging.getLogger(__name__)
+
+RESULT_MESSAGE_TYPES = {"ORU^R01", "OUL^R22"}
+
+# علامات الشذوذ في OBX-8 -> حالة النتيجة
+ABNORMAL_FLAG_STATUS = {
+    "": "normal",
+    "N": "normal",
+    "H": "abnormal",
+    "L": "abnormal",
+    "A": "abnormal",
+    "HH": "critical",
+    "LL": "critical",
+    "AA": "critical",
+    ">": "critical",
+    "<": "critical",
+}
+
+# حالات OBX-11 التي لا تحمل نتيجة صالحة
+SKIPPED_RESULT_STATUS = {"X", "D", "W"}
+
+
+def get_hl7_setting(name, default=None):
+    return getattr(settings, "HL7_SETTINGS", {}).get(name, default)
+
+
+class LabResultIngestor:
+    """تحويل رسائل HL7 إلى نتائج مخبرية وإدخالها على دفعات"""
+
+    def __init__(self, batch_size=None, lookup_field=None, created_by=None):
+        self.batch_size = batch_size or get_hl7_setting("BATCH_SIZE", 500)
+        self.lookup_field = lookup_field or get_hl7_setting(
+            "PATIENT_LOOKUP_FIELD", get_user_model().USERNAME_FIELD
+        )
+        self.created_by = created_by
+        self.value_length = LabResult._meta.get_field("value").max_length
+        # (معرّف المريض، رمز التحليل، القيمة، الحالة، الملاحظات، معرّف الرسالة)
+        self.pending = []
+        # رموز التحاليل ثابتة تقريباً فتُخزن طوال عمر المستقبِل
+        self._tests = {}
+        self.stats = Counter()
+
+    def add_message(self, message):
+        """إضافة نتائج رسالة إلى الدفعة الحالية، ويُعاد ``False`` إذا رُفضت"""
+        if message.message_type not in RESULT_MESSAGE_TYPES:
+            self.stats["ignored_messages"] += 1
+            return False
+
+        patient_key = None
+        current = None
+        for segment in message.iter_segments("PID", "OBX", "NTE"):
+            if segment.name == "PID":
+                patient_key = segment.component(3) or segment.component(2)
+                current = None
+            elif segment.name == "OBX":
+                current = self._add_observation(
+                    patient_key, segment, message.control_id
+                )
+            elif current is not None:
+                # ملاحظات NTE التالية لقطاع OBX تتبع نتيجته
+                note = segment.field(3).replace(message.encoding.repetition, "\n")
+                current[4].append(note)
+
+        self.stats["messages"] += 1
+        return True
+
+    def _add_observation(self, patient_key, segment, control_id):
+        code = segment.component(3)
+        value = segment.field(5)
+        if (
+            not patient_key
+            or not code
+            or not value
+            or segment.field(11) in SKIPPED_RESULT_STATUS
+        ):
+            self.stats["skipped"] += 1
+            return None
+
+        unit = segment.component(6)
+        if unit:
+            value = f"{value} {unit}"
+        status = ABNORMAL_FLAG_STATUS.get(segment.component(8), "abnormal")
+        row = [patient_key, code, value[: self.value_length], status, [], control_id]
+        self.pending.append(row)
+        return row
+
+    def _resolve_tests(self, codes):
+        missing = codes.difference(self._tests)
+        if missing:
+            self._tests.update(
+                LabTest.objects.filter(code__in=missing, is_active=True).values_list(
+                    "code", "pk"
+                )
+            )
+        return self._tests
+
+    def _resolve_patients(self, keys):
+        return dict(
+            get_user_model()
+            ._default_manager.filter(**{f"{self.lookup_field}__in": keys})
+            .values_list(self.lookup_field, "pk")
+        )
+
+    def flush(self):
+        """
+        إدخال الدفعة الحالية بـ bulk_create
+
+        لا تُفرغ الدفعة إلا بعد نجاح الإدخال، فيُعاد رفع خطأ قاعدة البيانات
+        وتبقى النتائج معلقة لمحاولة لاحقة.
+        """
+        if not self.pending:
+            return 0
+
+        rows = self.pending
+        patients = self._resolve_patients({row[0] for row in rows})
+        tests = self._resolve_tests({row[1] for row in rows})
+        created_by_id = self.created_by.pk if self.created_by else None
+
+        results, unmatched = [], []
+        for patient_key, code, value, status, notes, control_id in rows:
+            patient_id = patients.get(patient_key)
+            test_id = tests.get(code)
+            if patient_id is None or test_id is None:
+                unmatched.append(
+                    UnmatchedLabResult(
+                        patient_key=(patient_key or "")[:100],
+                        test_code=code[:100],
+                        value=value,
+                        status=status,
+                        notes="\n".join(notes),
+                        message_control_id=control_id[:100],
+                        reason="patient" if patient_id is None else "test",
+                    )
+                )
+                continue
+            results.append(
+                LabResult(
+                    patient_id=patient_id,
+                    test_id=test_id,
+                    value=value,
+                    status=status,
+                    notes="\n".join(notes),
+                    created_by_id=created_by_id,
+                )
+            )
+
+        with transaction.atomic():
+            LabResult.objects.bulk_create(results, batch_size=self.batch_size)
+            UnmatchedLabResult.objects.bulk_create(
+                unmatched, batch_size=self.batch_size
+            )
+        self.pending = []
+        if unmatched:
+            logger.warning(f"نتائج HL7 غير مطابقة محفوظة للمراجعة: {len(unmatched)}")
+        self.stats["results"] += len(results)
+        self.stats["unmatched"] += len(unmatched)
+        return len(results)
+
+    def discard(self):
+        """إسقاط الدفعة الحالية (بعد رفض رسائلها ليعيد الجهاز إرسالها)"""
+        discarded, self.pending = len(self.pending), []
+        return discarded
+
+    def ingest(self, messages):
+        """استقبال سلسلة رسائل وإدخالها على دفعات"""
+        for message in messages:
+            self.add_message(message)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+        self.flush()
+        return self.stats
+
+
+def iter_parsed(frames, charset="utf-8", stats=None):
+    """تحليل إطارات MLLP مع تخطي الرسائل غير الصالحة"""
+    for data in frames:
+        try:
+            yield HL7Message(data, charset=charset)
+        except HL7ParseError as e:
+            logger.warning(f"تخطي رسالة HL7: {str(e)}")
+            if stats is not None:
+                stats["invalid"] += 1
+
+
+class MLLPRequestHandler(socketserver.BaseRequestHandler):
+    """استقبال رسائل جهاز واحد عبر MLLP
+
+    رسائل كل قراءة من المقبس تُدخل دفعة واحدة، ولا يُرسل إقرار ``AA`` إلا بعد
+    تثبيت المعاملة؛ إذا فشل الإدخال يُرسل ``AE`` ليعيد الجهاز إرسالها. الأجهزة
+    التي ترسل عدة رسائل دون انتظار الإقرار تستفيد من الإدخال الدفعي.
+    """
+
+    def handle(self):
+        charset = self.server.charset
+        ingestor = LabResultIngestor(batch_size=self.server.batch_size)
+        frames = MLLPFrameBuffer()
+        try:
+            while True:
+                data = self.request.recv(64 * 1024)
+                if not data:
+                    break
+                messages = [
+                    message
+                    for message in map(self._parse, frames.feed(data))
+                    if message is not None
+                ]
+                if messages:
+                    self._receive(ingestor, messages, charset)
+        finally:
+            close_old_connections()
+            logger.info(
+                f"انتهى اتصال HL7 من {self.client_address}: {dict(ingestor.stats)}"
+            )
+
+    def _parse(self, data):
+        try:
+            return HL7Message(data, charset=self.server.charset)
+        except HL7ParseError as e:
+            logger.warning(f"تخطي رسالة HL7 من {self.client_address}: {str(e)}")
+            return None
+
+    def _receive(self, ingestor, messages, charset):
+        accepted = [ingestor.add_message(message) for message in messages]
+        try:
+            ingestor.flush()
+        except DatabaseError as e:
+            logger.error(f"خطأ في إدخال نتائج HL7 من {self.client_address}: {str(e)}")
+            ingestor.discard()
+            codes = ["AE"] * len(messages)
+        else:
+            codes = ["AA" if ok else "AR" for ok in accepted]
+        self.request.sendall(
+            b"".join(
+                frame(build_ack(message, code), charset)
+                for message, code in zip(messages, codes)
+            )
+        )
+
+
+class MLLPServer(socketserver.ThreadingTCPServer):
+    """خادم MLLP يستقبل نتائج الأجهزة (اتصال لكل خيط)"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address=None, batch_size=None):
+        address = address or (get_hl7_setting("HOST"), get_hl7_setting("PORT"))
+        self.batch_size = batch_size or get_hl7_setting("BATCH_SIZE", 500)
+        self.charset = get_hl7_setting("CHARSET", "utf-8")
+        super().__init__(address, MLLPRequestHandler)
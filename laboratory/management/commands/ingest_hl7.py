@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from laboratory.hl7_ingest import (
+    LabResultIngestor,
+    MLLPServer,
+    get_hl7_setting,
+    iter_parsed,
+)
+from utils.hl7 import iter_frames
+
+
+class Command(BaseCommand):
+    help = "استقبال نتائج أجهزة المختبر من رسائل HL7 (ملفات MLLP أو خادم MLLP)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="*", help="ملفات رسائل بإطارات MLLP")
+        parser.add_argument("--listen", action="store_true", help="تشغيل خادم MLLP")
+        parser.add_argument("--host", default=None)
+        parser.add_argument("--port", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options["listen"]:
+            address = (
+                options["host"] or get_hl7_setting("HOST"),
+                options["port"] or get_hl7_setting("PORT"),
+            )
+            server = MLLPServer(address, batch_size=options["batch_size"])
+            self.stdout.write(
+                f"جاري الاستماع لرسائل HL7 على {address[0]}:{address[1]}"
+            )
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+            return
+
+        ingestor = LabResultIngestor(batch_size=options["batch_size"])
+        charset = get_hl7_setting("CHARSET", "utf-8")
+        for path in options["files"]:
+            with open(path, "rb") as f:
+                messages = iter_parsed(iter_frames(f.read), charset, ingestor.stats)
+                ingestor.ingest(messages)
+
+        stats = ingestor.stats
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"اكتمل الاستقبال: {stats['messages']} رسالة, {stats['results']} نتيجة, "
+                f"{stats['skipped'] + stats['unmatched']} متخطاة, {stats['invalid']} غير صالحة"
+            )
+        )
@@ -76,3 +76,33 @@ class LabResult(models.Model):
 
     def __str__(self):
         return f"{self.test.name} - {self.patient} ({self.performed_at.date()})"
+
+
+class UnmatchedLabResult(models.Model):
+    """نتيجة واردة من جهاز لم يُطابق مريضها أو تحليلها، تُحفظ لمراجعتها"""
+
+    REASONS = [
+        ("patient", _("مريض غير معروف")),
+        ("test", _("تحليل غير معروف")),
+    ]
+
+    patient_key = models.CharField(_("معرّف المريض"), max_length=100)
+    test_code = models.CharField(_("رمز التحليل"), max_length=100)
+    value = models.CharField(_("النتيجة"), max_length=100)
+    status = models.CharField(
+        _("الحالة"), max_length=20, choices=LabResult.RESULT_STATUS
+    )
+    notes = models.TextField(_("ملاحظات"), blank=True)
+    message_control_id = models.CharField(
+        _("معرّف الرسالة"), max_length=100, blank=True
+    )
+    reason = models.CharField(_("السبب"), max_length=20, choices=REASONS)
+    received_at = models.DateTimeField(_("تاريخ الاستلام"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("نتيجة غير مطابقة")
+        verbose_name_plural = _("نتائج غير مطابقة")
+        ordering = ["-received_at"]
+
+    def __str__(self):
+        return f"{self.test_code} - {self.patient_key} ({self.reason})"
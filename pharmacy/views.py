@@ -14,6 +14,8 @@ from django.views.generic import (
     UpdateView,
 )
 
+from doctor_syria.core.pagination import KeysetPaginationMixin
+
 from .forms import (
     InventoryForm,
     InventorySearchForm,
@@ -40,7 +42,7 @@ class PharmacistRequiredMixin(UserPassesTestMixin):
 
 
 # Medicine Views
-class MedicineListView(LoginRequiredMixin, ListView):
+class MedicineListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Medicine
     template_name = "pharmacy/medicine_list.html"
     context_object_name = "medicines"
@@ -102,7 +104,7 @@ class MedicineDeleteView(PharmacistRequiredMixin, DeleteView):
 
 
 # Inventory Views
-class InventoryListView(LoginRequiredMixin, ListView):
+class InventoryListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Inventory
     template_name = "pharmacy/inventory_list.html"
     context_object_name = "inventory_items"
@@ -6,13 +6,15 @@ from datetime import datetime, timedelta
 
 import numpy as np
 import pandas as pd
-from django.db.models import Avg, Count, Max, Min
+from django.db.models import Avg, Max, Min, Sum
 from django.utils import timezone
 from scipy import stats
 from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
 
+from core.models import AppointmentStats
+
 from .models import HealthMetric, MedicalReport, TreatmentProgress
 
 
@@ -148,18 +150,21 @@ class AdvancedAnalytics:
         end_date = timezone.now()
         start_date = end_date - timedelta(days=90)  # 90 يوم للتحليل
 
+        # القراءة من الجدول المادي بدلاً من تجميع المواعيد مباشرة
         appointments = (
-            Appointment.objects.filter(date__range=(start_date, end_date))
-            .values("date")
-            .annotate(count=Count("id"))
+            AppointmentStats.objects.filter(
+                day__range=(start_date.date(), end_date.date())
+            )
+            .values("day")
+            .annotate(count=Sum("total_appointments"))
         )
 
         df = pd.DataFrame(appointments)
         if df.empty:
             return None
 
-        df["date"] = pd.to_datetime(df["date"])
-        df.set_index("date", inplace=True)
+        df["day"] = pd.to_datetime(df["day"])
+        df.set_index("day", inplace=True)
 
         # إكمال الأيام المفقودة بأصفار
         idx = pd.date_range(start_date, end_date)
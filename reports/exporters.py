@@ -10,7 +10,8 @@ from datetime import datetime
 import xlsxwriter
 from django.conf import settings
 from django.template.loader import render_to_string
-from weasyprint import HTML
+
+from doctor_syria.core.documents import write_pdf
 
 from .models import MedicalReport, StatisticalReport
 
@@ -59,11 +60,12 @@ class ReportExporter:
             },
         )
 
-        # إنشاء PDF
-        HTML(string=html_content).write_pdf(
-            output_file,
-            stylesheets=[os.path.join(settings.STATIC_ROOT, "css/report_pdf.css")],
+        # إنشاء PDF بإعدادات الخطوط والأنماط المهيأة مسبقاً
+        pdf = write_pdf(
+            html_content, [os.path.join(settings.STATIC_ROOT, "css/report_pdf.css")]
         )
+        with open(output_file, "wb") as pdf_file:
+            pdf_file.write(pdf)
 
         return output_file
 
@@ -7,7 +7,6 @@ from datetime import datetime
 import boto3
 import django
 from django.conf import settings
-from django.core.management import call_command
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "doctor_syria.settings.production")
 django.setup()
@@ -32,16 +31,16 @@ class BackupManager:
         if not os.path.exists(self.backup_dir):
             os.makedirs(self.backup_dir)
 
-    def backup_database(self):
-        """نسخ احتياطي لقاعدة البيانات"""
+    def backup_database(self, incremental=False):
+        """نسخ احتياطي مجزأ لقاعدة البيانات ورفعه إلى S3"""
+        from utils.backup import BackupError, BackupService
+
         print("جارٍ نسخ قاعدة البيانات...")
-        backup_file = os.path.join(self.backup_dir, f"db_backup_{self.timestamp}.json")
         try:
-            with open(backup_file, "w", encoding="utf-8") as f:
-                call_command("dumpdata", "--indent", "2", stdout=f)
-            print(f"✅ تم نسخ قاعدة البيانات إلى: {backup_file}")
-            return backup_file
-        except Exception as e:
+            manifest = BackupService().create_database_backup(incremental=incremental)
+            print(f"✅ تم نسخ قاعدة البيانات: {manifest['backup_id']}")
+            return manifest
+        except BackupError as e:
             print(f"❌ فشل نسخ قاعدة البيانات: {str(e)}")
             return None
 
@@ -93,14 +92,12 @@ class BackupManager:
                     except Exception as e:
                         print(f"❌ فشل حذف الملف: {filename} - {str(e)}")
 
-    def run_backup(self):
+    def run_backup(self, incremental=False):
         """تنفيذ عملية النسخ الاحتياطي الكاملة"""
         print("\n=== بدء عملية النسخ الاحتياطي ===\n")
 
-        # نسخ قاعدة البيانات
-        db_backup = self.backup_database()
-        if db_backup:
-            self.upload_to_s3(db_backup)
+        # نسخ قاعدة البيانات (يُرفع مباشرة على دفعات)
+        self.backup_database(incremental=incremental)
 
         # نسخ ملفات الوسائط
         media_backup = self.backup_media()
@@ -115,4 +112,4 @@ class BackupManager:
 
 if __name__ == "__main__":
     backup_manager = BackupManager()
-    backup_manager.run_backup()
+    backup_manager.run_backup(incremental="--incremental" in sys.argv)
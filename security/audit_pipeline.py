@@ -0,0 +1,333 @@
+"""
+خط كتابة سجلات التدقيق غير المتزامن
+
+تُضاف الأحداث إلى طابور محدود داخل العملية ويُفرغها خيط خلفي على دفعات بـ
+``bulk_create``. تُكتب الأحداث الحرجة إلى ملف NDJSON على القرص قبل إضافتها
+إلى الطابور ويُحذف الملف بعد حفظ دفعتها، فلا تضيع إذا امتلأ الطابور أو انتهت
+العملية قبل التفريغ. إذا فشلت الدفعة تُعاد كتابتها صفاً صفاً حتى لا يُسقطها حدث
+واحد معطوب. تُعاد قراءة الملفات المتبقية لاحقاً عبر ``replay_spill`` (مهمة
+Celery دورية)، وتُنقل الملفات التي تتعذر قراءتها أو إدخالها إلى مجلد عزل.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.core.validators import validate_ipv46_address
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from security.rate_limit import client_ip
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    # الكتابة من خيط خلفي، أو مباشرة في نفس الطلب عند تعطيله (الاختبارات)
+    "ASYNC": True,
+    "QUEUE_SIZE": 10000,
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL": 1.0,
+    "SPILL_DIR": None,
+    # عمر الملف (ثانية) قبل أن يعيد replay_spill إدخاله، حتى لا يُدخل حدثاً
+    # ما زال في طابور كاتب حي
+    "REPLAY_AFTER": 300,
+    "CRITICAL_SEVERITIES": ("HIGH", "CRITICAL"),
+}
+
+QUARANTINE_DIR = "quarantine"
+
+
+def get_audit_setting(name):
+    value = getattr(settings, "AUDIT_SETTINGS", {}).get(name, DEFAULT_SETTINGS[name])
+    if name == "SPILL_DIR" and value is None:
+        return os.path.join(settings.BASE_DIR, "logs", "audit_spill")
+    return value
+
+
+def get_audit_model():
+    from security.models import SecurityAudit
+
+    return SecurityAudit
+
+
+def build_event(action, request=None, user=None, severity="LOW", details=None):
+    """بناء حدث تدقيق كقاموس قابل للتسلسل"""
+    if user is None and request is not None:
+        request_user = getattr(request, "user", None)
+        if request_user is not None and request_user.is_authenticated:
+            user = request_user
+    # العنوان من الوكلاء الموثوقين فقط كما في محدد معدل الطلبات
+    ip_address = client_ip(request) if request is not None else None
+    return {
+        "user_id": user.pk if user is not None else None,
+        "action": action,
+        "timestamp": timezone.now(),
+        "ip_address": valid_ip(ip_address),
+        "severity": severity,
+        "details": details or {},
+    }
+
+
+def valid_ip(value):
+    """العنوان إن كان صالحاً لحقل ``GenericIPAddressField``، وإلا None"""
+    if not value:
+        return None
+    try:
+        validate_ipv46_address(value)
+    except ValidationError:
+        return None
+    return value
+
+
+class AuditWriter:
+    """كاتب سجلات التدقيق على دفعات من خيط خلفي"""
+
+    def __init__(
+        self, queue_size=None, batch_size=None, flush_interval=None, run_async=None
+    ):
+        self.run_async = (
+            get_audit_setting("ASYNC") if run_async is None else run_async
+        )
+        self.queue = queue.Queue(queue_size or get_audit_setting("QUEUE_SIZE"))
+        self.batch_size = batch_size or get_audit_setting("BATCH_SIZE")
+        self.flush_interval = flush_interval or get_audit_setting("FLUSH_INTERVAL")
+        self.critical = set(get_audit_setting("CRITICAL_SEVERITIES"))
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+
+    def is_critical(self, event):
+        return event["severity"] in self.critical
+
+    def enqueue(self, event):
+        """
+        إضافة حدث دون حجب الطلب
+
+        الحدث الحرج يُحفظ على القرص أولاً ويُحذف ملفه بعد كتابة دفعته.
+        """
+        if not self.run_async:
+            self.write([event])
+            return
+        path = spill([event]) if self.is_critical(event) else None
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait((event, path))
+        except queue.Full:
+            if path is None:
+                self.dropped += 1
+                logger.warning("طابور سجلات التدقيق ممتلئ: تم إسقاط حدث")
+
+    def _ensure_thread(self):
+        # يُعاد تشغيل الخيط بعد fork لأن الخيوط لا تنتقل إلى العملية الابنة
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="audit-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _drain(self, first=None):
+        batch = [] if first is None else [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self.write_queued(self._drain(first))
+            close_old_connections()
+
+    def write_queued(self, batch):
+        """كتابة دفعة من الطابور ثم حذف ملفات أحداثها الحرجة التي حُفظت"""
+        events = [event for event, _ in batch]
+        paths = [path for _, path in batch]
+        return self.write(events, paths)
+
+    def write(self, events, paths=None):
+        """
+        كتابة دفعة بـ bulk_create، وعند فشلها صفاً صفاً
+
+        ``paths`` ملفات القرص المقابلة للأحداث (أو None) تُحذف بعد حفظ حدثها،
+        أما الحدث الحرج الذي فشل ولا ملف له فيُحفظ على القرص.
+        """
+        if not events:
+            return 0
+        paths = paths or [None] * len(events)
+        model = get_audit_model()
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [model(**event) for event in events], batch_size=self.batch_size
+                )
+        except Exception as e:
+            logger.error(f"فشل كتابة دفعة سجلات التدقيق: {str(e)}")
+        else:
+            discard(paths)
+            return len(events)
+
+        written = 0
+        failed = []
+        for event, path in zip(events, paths):
+            try:
+                with transaction.atomic():
+                    model.objects.create(**event)
+            except Exception as e:
+                logger.error(f"فشل كتابة سجل التدقيق {event['action']}: {str(e)}")
+                if path is None:
+                    failed.append(event)
+                continue
+            discard([path])
+            written += 1
+        critical = [event for event in failed if self.is_critical(event)]
+        path = spill(critical)
+        if path is not None:
+            logger.warning(f"تم حفظ {len(critical)} حدث تدقيق على القرص: {path}")
+        self.dropped += len(failed) - len(critical)
+        return written
+
+    def flush(self):
+        """تفريغ الطابور بالكامل في الخيط الحالي"""
+        written = 0
+        while True:
+            batch = self._drain()
+            if not batch:
+                return written
+            written += self.write_queued(batch)
+
+    def close(self):
+        self._stopping.set()
+        self.flush()
+
+
+def spill(events):
+    """كتابة الأحداث إلى ملف على القرص لإعادة إدخالها لاحقاً"""
+    if not events:
+        return None
+    directory = get_audit_setting("SPILL_DIR")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"audit-{uuid.uuid4().hex}.ndjson")
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event, cls=DjangoJSONEncoder, ensure_ascii=False))
+            f.write("\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return path
+
+
+def discard(paths):
+    """حذف ملفات أحداث حُفظت في قاعدة البيانات"""
+    for path in paths:
+        if path is None:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # أعاد replay_spill إدخاله ونقله
+            pass
+
+
+def replay_spill(older_than=None):
+    """
+    إعادة إدخال الأحداث المحفوظة على القرص وحذف ملفاتها بعد النجاح
+
+    يُنقل الملف الذي تتعذر قراءته أو إدخاله إلى مجلد ``quarantine`` ويستمر
+    التشغيل مع بقية الملفات. تُتخطى الملفات الأحدث من ``older_than`` ثانية
+    لأنها قد تكون لأحداث ما زالت في طابور كاتب.
+    """
+    directory = get_audit_setting("SPILL_DIR")
+    if not os.path.isdir(directory):
+        return 0
+    if older_than is None:
+        older_than = get_audit_setting("REPLAY_AFTER")
+
+    model = get_audit_model()
+    cutoff = time.time() - older_than
+    restored = 0
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".ndjson"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+            with open(path, encoding="utf-8") as f:
+                events = [json.loads(line) for line in f if line.strip()]
+            for event in events:
+                event["timestamp"] = parse_datetime(event["timestamp"])
+                event["ip_address"] = valid_ip(event.get("ip_address"))
+            with transaction.atomic():
+                model.objects.bulk_create([model(**event) for event in events])
+        except FileNotFoundError:
+            # حذفه الكاتب بعد حفظ دفعته
+            continue
+        except Exception as e:
+            logger.error(f"تعذر إعادة إدخال سجلات التدقيق من {path}: {str(e)}")
+            quarantine(path)
+            continue
+        discard([path])
+        restored += len(events)
+    return restored
+
+
+def quarantine(path):
+    """نقل ملف معطوب إلى مجلد العزل لفحصه يدوياً"""
+    directory = os.path.join(os.path.dirname(path), QUARANTINE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    os.replace(path, os.path.join(directory, os.path.basename(path)))
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditWriter()
+                atexit.register(_writer.close)
+    return _writer
+
+
+def reset_audit_writer(setting, **kwargs):
+    global _writer
+    if setting == "AUDIT_SETTINGS" and _writer is not None:
+        _writer.close()
+        _writer = None
+
+
+setting_changed.connect(reset_audit_writer)
+
+
+def audit_event(action, request=None, user=None, severity="LOW", details=None):
+    """تسجيل حدث تدقيق عبر الطابور غير المتزامن"""
+    event = build_event(action, request, user, severity, details)
+    get_audit_writer().enqueue(event)
+    return event
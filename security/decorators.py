@@ -4,9 +4,12 @@ from django.core.exceptions import PermissionDenied
 from django.http import HttpResponseForbidden
 from django.utils.translation import gettext as _
 
+from .permissions import PermissionResolver, as_set
+
 
 def role_required(roles):
     """التحقق من دور المستخدم"""
+    roles_set = as_set(roles)
 
     def decorator(view_func):
         @wraps(view_func)
@@ -14,12 +17,7 @@ def role_required(roles):
             if not request.user.is_authenticated:
                 return HttpResponseForbidden(_("يجب تسجيل الدخول"))
 
-            if not isinstance(roles, (list, tuple)):
-                roles_list = [roles]
-            else:
-                roles_list = roles
-
-            if request.user.role not in roles_list:
+            if request.user.role not in roles_set:
                 raise PermissionDenied(_("ليس لديك صلاحية للوصول"))
 
             return view_func(request, *args, **kwargs)
@@ -30,7 +28,8 @@ def role_required(roles):
 
 
 def permission_required(permissions):
-    """التحقق من صلاحيات المستخدم"""
+    """التحقق من صلاحيات المستخدم (يكفي امتلاك إحداها)"""
+    required = as_set(permissions)
 
     def decorator(view_func):
         @wraps(view_func)
@@ -38,15 +37,8 @@ def permission_required(permissions):
             if not request.user.is_authenticated:
                 return HttpResponseForbidden(_("يجب تسجيل الدخول"))
 
-            if not isinstance(permissions, (list, tuple)):
-                permissions_list = [permissions]
-            else:
-                permissions_list = permissions
-
-            user_permissions = request.user.get_role_permissions()
-            if "all" not in user_permissions:
-                if not any(perm in user_permissions for perm in permissions_list):
-                    raise PermissionDenied(_("ليس لديك الصلاحيات المطلوبة"))
+            if not PermissionResolver.has_any(request.user, required):
+                raise PermissionDenied(_("ليس لديك الصلاحيات المطلوبة"))
 
             return view_func(request, *args, **kwargs)
 
@@ -75,16 +67,17 @@ def audit_log(action):
         def _wrapped_view(request, *args, **kwargs):
             response = view_func(request, *args, **kwargs)
 
-            from security.models import AuditLog
-
-            AuditLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
-                action=action,
-                ip_address=request.META.get("REMOTE_ADDR"),
-                user_agent=request.META.get("HTTP_USER_AGENT"),
-                path=request.path,
-                method=request.method,
-                status_code=response.status_code,
+            from security.audit_pipeline import audit_event
+
+            audit_event(
+                action,
+                request=request,
+                details={
+                    "path": request.path,
+                    "method": request.method,
+                    "status_code": response.status_code,
+                    "user_agent": request.META.get("HTTP_USER_AGENT"),
+                },
             )
 
             return response
@@ -92,3 +85,23 @@ def audit_log(action):
         return _wrapped_view
 
     return decorator
+
+
+def rate_limit(name):
+    """تطبيق حد معدل مسمى من RATELIMIT_DEFAULT_LIMITS على العرض"""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            from security.rate_limit import get_rate_limiter, limited_response
+
+            result = get_rate_limiter().hit_named(name, request)
+            if not result.allowed:
+                return limited_response(result)
+
+            response = view_func(request, *args, **kwargs)
+            return result.apply(response)
+
+        return _wrapped_view
+
+    return decorator
@@ -1,12 +1,17 @@
 import logging
 import re
-from datetime import timedelta
+import time
+from datetime import datetime
 from typing import Optional
 
 from django.conf import settings
-from django.core.cache import cache
 from django.http import HttpRequest, HttpResponse
-from django.utils import timezone
+
+from accounts.activity import ActivityTracker, get_write_interval
+
+from .audit_pipeline import audit_event
+from .rate_limit import get_rate_limiter, limited_response
+from .threat_scanner import ThreatScanner
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +21,15 @@ class SecurityMiddleware:
         self.get_response = get_response
         # تجميع التعبيرات النمطية للمسارات المستثناة
         self.exempt_urls = [re.compile(url) for url in settings.SECURITY_EXEMPT_URLS]
+        # محرك فحص التهديدات (تعبير نمطي واحد لجميع القواعد)
+        self.scanner = ThreatScanner()
 
     def __call__(self, request: HttpRequest) -> HttpResponse:
         # فحص الأمان قبل معالجة الطلب
         if not self.is_path_exempt(request.path):
             # فحص معدل الطلبات
             if not self.check_rate_limit(request):
-                return HttpResponse("تم تجاوز الحد المسموح من الطلبات", status=429)
+                return limited_response(request.rate_limit)
 
             # فحص محاولات الاختراق
             if self.detect_security_threats(request):
@@ -37,6 +44,8 @@ class SecurityMiddleware:
 
         # إضافة رؤوس الأمان
         self.add_security_headers(response)
+        if getattr(request, "rate_limit", None) is not None:
+            request.rate_limit.apply(response)
 
         return response
 
@@ -45,89 +54,15 @@ class SecurityMiddleware:
         return any(pattern.match(path) for pattern in self.exempt_urls)
 
     def check_rate_limit(self, request: HttpRequest) -> bool:
-        """التحقق من معدل الطلبات"""
-        client_ip = self.get_client_ip(request)
-        cache_key = f"rate_limit_{client_ip}"
-
-        requests = cache.get(cache_key, 0)
-        if requests >= settings.RATE_LIMIT_MAX_REQUESTS:
-            return False
-
-        cache.set(cache_key, requests + 1, settings.RATE_LIMIT_PERIOD)
-        return True
+        """التحقق من معدل الطلبات (نافذة منزلقة ذرية)"""
+        result = get_rate_limiter().check(request)
+        return result is None or result.allowed
 
     def detect_security_threats(self, request: HttpRequest) -> bool:
-        """اكتشاف التهديدات الأمنية المحتملة"""
-        # فحص محاولات SQL Injection
-        if self.detect_sql_injection(request):
-            return True
-
-        # فحص محاولات XSS
-        if self.detect_xss(request):
-            return True
-
-        # فحص محاولات Path Traversal
-        if self.detect_path_traversal(request):
-            return True
-
-        return False
-
-    def detect_sql_injection(self, request: HttpRequest) -> bool:
-        """اكتشاف محاولات SQL Injection"""
-        sql_patterns = [
-            r"(\s|^)(SELECT|INSERT|UPDATE|DELETE|DROP|UNION|ALTER)(\s|$)",
-            r"--",
-            r";.*?$",
-            r"/\*.*?\*/",
-        ]
-
-        for pattern in sql_patterns:
-            if self.check_pattern_in_request(request, pattern):
-                return True
-        return False
-
-    def detect_xss(self, request: HttpRequest) -> bool:
-        """اكتشاف محاولات XSS"""
-        xss_patterns = [
-            r"<script.*?>",
-            r"javascript:",
-            r"onerror=",
-            r"onload=",
-            r"eval\(",
-            r"document\.",
-        ]
-
-        for pattern in xss_patterns:
-            if self.check_pattern_in_request(request, pattern):
-                return True
-        return False
-
-    def detect_path_traversal(self, request: HttpRequest) -> bool:
-        """اكتشاف محاولات Path Traversal"""
-        path_patterns = [r"\.\.", r"%2e%2e", r"\.\./", r"/etc/passwd"]
-
-        for pattern in path_patterns:
-            if self.check_pattern_in_request(request, pattern):
-                return True
-        return False
-
-    def check_pattern_in_request(self, request: HttpRequest, pattern: str) -> bool:
-        """فحص وجود نمط في الطلب"""
-        # فحص المسار
-        if re.search(pattern, request.path, re.I):
-            return True
-
-        # فحص معلمات GET
-        for key, value in request.GET.items():
-            if re.search(pattern, str(value), re.I):
-                return True
-
-        # فحص معلمات POST
-        for key, value in request.POST.items():
-            if re.search(pattern, str(value), re.I):
-                return True
-
-        return False
+        """اكتشاف التهديدات الأمنية المحتملة (SQL Injection، XSS، Path Traversal)"""
+        match = self.scanner.scan(request)
+        request.security_threat = match
+        return match is not None
 
     def validate_session(self, request: HttpRequest) -> bool:
         """التحقق من صحة الجلسة"""
@@ -135,16 +70,20 @@ class SecurityMiddleware:
             return True
 
         session = request.session
-        if not session.get("last_activity"):
+        last_activity = session.get("last_activity")
+        if not last_activity:
             return False
+        if isinstance(last_activity, datetime):
+            last_activity = last_activity.timestamp()
 
-        last_activity = session["last_activity"]
-        if timezone.now() - last_activity > timedelta(
-            minutes=settings.SESSION_IDLE_TIMEOUT
-        ):
+        now = time.time()
+        if now - last_activity > settings.SESSION_IDLE_TIMEOUT * 60:
             return False
 
-        session["last_activity"] = timezone.now()
+        # تُكتب الجلسة ونشاط المستخدم مرة واحدة على الأكثر في كل فترة كتابة
+        if now - last_activity >= get_write_interval():
+            session["last_activity"] = now
+            ActivityTracker.touch(request.user)
         return True
 
     def add_security_headers(self, response: HttpResponse) -> None:
@@ -166,9 +105,11 @@ class SecurityMiddleware:
 
     def log_security_threat(self, request: HttpRequest) -> None:
         """تسجيل التهديد الأمني"""
+        threat = getattr(request, "security_threat", None)
         logger.warning(
             "تم اكتشاف تهديد أمني محتمل",
             extra={
+                "threat": threat._asdict() if threat else None,
                 "path": request.path,
                 "method": request.method,
                 "ip": self.get_client_ip(request),
@@ -179,8 +120,23 @@ class SecurityMiddleware:
                 ),
                 "data": {
                     "GET": dict(request.GET),
-                    "POST": dict(request.POST),
+                    "POST": (
+                        dict(request.POST)
+                        if self.scanner.should_scan_body(request)
+                        else {}
+                    ),
                     "headers": dict(request.headers),
                 },
             },
         )
+        audit_event(
+            "security_threat",
+            request=request,
+            severity="HIGH",
+            details={
+                "threat": threat._asdict() if threat else None,
+                "path": request.path,
+                "method": request.method,
+                "user_agent": request.META.get("HTTP_USER_AGENT"),
+            },
+        )
@@ -0,0 +1,115 @@
+"""
+حل صلاحيات المستخدمين مع التخزين المؤقت
+
+تُحسب الصلاحيات الفعلية للمستخدم (صلاحيات دوره من ``ROLE_PERMISSIONS`` مع
+صلاحيات Django من المجموعات والصلاحيات المباشرة) مرة واحدة كـ ``frozenset``
+وتُحفظ على كائن المستخدم طوال الطلب وفي الذاكرة المؤقتة بين الطلبات. يُحذف
+مدخل المستخدم عند تغيير دوره أو مجموعاته، ويُرفع رقم الإصدار العام عند تغيير
+صلاحيات المجموعات فتُهمل جميع المدخلات القديمة دفعة واحدة.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import permissions
+
+ALL_PERMISSIONS = "all"
+
+
+class PermissionResolver:
+    """حساب الصلاحيات الفعلية للمستخدم وتخزينها مؤقتاً"""
+
+    KEY_PREFIX = "user_permissions"
+    VERSION_KEY = f"{KEY_PREFIX}:version"
+    TIMEOUT = 60 * 60
+    # اسم السمة التي تُحفظ عليها الصلاحيات في كائن المستخدم
+    ATTRIBUTE = "_effective_permissions"
+
+    @classmethod
+    def cache_key(cls, user_id):
+        return f"{cls.KEY_PREFIX}:{user_id}"
+
+    @classmethod
+    def compute(cls, user):
+        """حساب الصلاحيات من قاعدة البيانات"""
+        role_permissions = getattr(settings, "ROLE_PERMISSIONS", {})
+        effective = set(role_permissions.get(user.role, ()))
+        if user.is_superuser:
+            effective.add(ALL_PERMISSIONS)
+        django_permissions = frozenset(user.get_all_permissions())
+        return frozenset(effective | django_permissions), django_permissions
+
+    @classmethod
+    def get_permissions(cls, user):
+        """الصلاحيات الفعلية للمستخدم (مرة واحدة لكل طلب)"""
+        if not user.is_authenticated:
+            return frozenset()
+        cached = getattr(user, cls.ATTRIBUTE, None)
+        if cached is not None:
+            return cached
+
+        key = cls.cache_key(user.pk)
+        # رحلة واحدة للمدخل ورقم الإصدار العام معاً
+        values = cache.get_many([key, cls.VERSION_KEY])
+        version = values.get(cls.VERSION_KEY, 0)
+        entry = values.get(key)
+        if entry is not None and entry[0] == version:
+            _, effective, django_permissions = entry
+            # تهيئة ذاكرة ModelBackend حتى لا يستعلم has_perm وقوالب perms
+            user._perm_cache = set(django_permissions)
+        else:
+            effective, django_permissions = cls.compute(user)
+            cache.set(key, (version, effective, django_permissions), cls.TIMEOUT)
+
+        setattr(user, cls.ATTRIBUTE, effective)
+        return effective
+
+    @classmethod
+    def has_any(cls, user, required):
+        """هل يملك المستخدم إحدى الصلاحيات المطلوبة"""
+        effective = cls.get_permissions(user)
+        return ALL_PERMISSIONS in effective or not effective.isdisjoint(required)
+
+    @classmethod
+    def invalidate(cls, *user_ids):
+        """حذف الصلاحيات المخزنة لمستخدمين محددين"""
+        cache.delete_many([cls.cache_key(user_id) for user_id in user_ids])
+
+    @classmethod
+    def invalidate_all(cls):
+        """إهمال صلاحيات جميع المستخدمين برفع رقم الإصدار"""
+        cache.add(cls.VERSION_KEY, 0, None)
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 1, None)
+
+
+def as_set(values):
+    if isinstance(values, str):
+        return frozenset([values])
+    return frozenset(values)
+
+
+class HasRolePermission(permissions.BasePermission):
+    """
+    التحقق من الدور والصلاحيات عبر نفس المسار المخزن مؤقتاً للمزخرفات
+
+    تُعرّف على العرض ``required_roles`` و/أو ``required_permissions``، ويمكن
+    أن تكون ``required_permissions`` قاموساً من اسم الإجراء إلى الصلاحيات.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+
+        roles = getattr(view, "required_roles", None)
+        if roles and user.role not in as_set(roles):
+            return False
+
+        required = getattr(view, "required_permissions", None)
+        if isinstance(required, dict):
+            required = required.get(getattr(view, "action", None))
+        if not required:
+            return True
+        return PermissionResolver.has_any(user, as_set(required))
@@ -0,0 +1,333 @@
+"""
+محدد معدل الطلبات بنافذة منزلقة
+
+يُقدر عدد الطلبات في النافذة المنزلقة من عدادين لنافذتين ثابتتين متتاليتين:
+``previous * (1 - elapsed / period) + current``. على Redis تُزاد النافذة الحالية
+وتُقرأ السابقة ذرياً بسكربت Lua واحد (رحلة واحدة إلى الذاكرة المؤقتة)، وعلى باقي
+الذاكرات المؤقتة (locmem محلياً) تُستخدم ``add`` و ``incr`` الذريتان.
+"""
+
+import logging
+import math
+import re
+import time
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpRequest, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+PERIOD_UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+SLIDING_WINDOW_SCRIPT = """
+local current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+local previous = redis.call('GET', KEYS[2])
+return {current, tonumber(previous) or 0}
+"""
+
+
+def parse_rate(rate):
+    """تحويل معدل مثل ``5/5m`` أو ``1000/h`` إلى (عدد الطلبات، الفترة بالثواني)"""
+    count, _, period = rate.partition("/")
+    match = re.fullmatch(r"(\d*)([smhd])", period.strip())
+    if not count.strip().isdigit() or not match:
+        raise ValueError(f"معدل غير صالح: {rate}")
+    multiplier = int(match.group(1) or 1)
+    return int(count), multiplier * PERIOD_UNITS[match.group(2)]
+
+
+def glob_to_regex(path):
+    """تحويل مسار بنمط ``/api/records/*`` إلى تعبير نمطي"""
+    return "^" + re.escape(path).replace(r"\*", ".*") + "$"
+
+
+def client_ip(request: HttpRequest, trusted_proxies=None) -> Optional[str]:
+    """
+    عنوان العميل: ``REMOTE_ADDR``، أو خلف ``RATELIMIT_TRUSTED_PROXIES`` وكيلاً
+    العنوان الذي أضافه أبعدها إلى ``X-Forwarded-For``
+
+    ما قبل ذلك في الترويسة يضعه العميل نفسه فلا يُوثق به.
+    """
+    if trusted_proxies is None:
+        trusted_proxies = getattr(settings, "RATELIMIT_TRUSTED_PROXIES", 0)
+    if trusted_proxies:
+        forwarded = [
+            address.strip()
+            for address in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")
+            if address.strip()
+        ]
+        if len(forwarded) >= trusted_proxies:
+            return forwarded[-trusted_proxies]
+    return request.META.get("REMOTE_ADDR")
+
+
+class RateLimitPolicy(NamedTuple):
+    name: str
+    limit: int
+    period: int
+    block: bool = True
+
+    @classmethod
+    def from_rate(cls, name, rate, block=True):
+        limit, period = parse_rate(rate)
+        return cls(name, limit, period, block)
+
+
+class RateLimitResult(NamedTuple):
+    policy: RateLimitPolicy
+    allowed: bool
+    remaining: int
+    reset: int
+
+    def headers(self, prefix=None):
+        prefix = prefix or getattr(
+            settings, "RATELIMIT_HEADER_PREFIX", "X-RateLimit"
+        )
+        headers = {
+            f"{prefix}-Limit": str(self.policy.limit),
+            f"{prefix}-Remaining": str(self.remaining),
+            f"{prefix}-Reset": str(self.reset),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.reset)
+        return headers
+
+    def apply(self, response: HttpResponse) -> HttpResponse:
+        for header, value in self.headers().items():
+            response[header] = value
+        return response
+
+
+class CacheBackend:
+    """عدادات النوافذ عبر ذاكرة Django المؤقتة (add و incr ذريتان)"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def hit(self, current_key, previous_key, ttl):
+        self.cache.add(current_key, 0, ttl)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # انتهت صلاحية المفتاح بين add و incr
+            self.cache.add(current_key, 1, ttl)
+            current = 1
+        return current, self.cache.get(previous_key, 0)
+
+
+class RedisBackend:
+    """عدادات النوافذ على Redis بسكربت Lua ذري (رحلة واحدة لكل طلب)"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.script = cache.client.get_client(write=True).register_script(
+            SLIDING_WINDOW_SCRIPT
+        )
+
+    def hit(self, current_key, previous_key, ttl):
+        keys = [self.cache.make_key(current_key), self.cache.make_key(previous_key)]
+        current, previous = self.script(keys=keys, args=[ttl])
+        return int(current), int(previous)
+
+
+def get_backend(alias=None):
+    cache = caches[alias or getattr(settings, "RATELIMIT_USE_CACHE", "default")]
+    if hasattr(getattr(cache, "client", None), "get_client"):
+        return RedisBackend(cache)
+    return CacheBackend(cache)
+
+
+class RateLimiter:
+    """تطبيق سياسات معدل الطلبات المعرفة في الإعدادات"""
+
+    KEY_PREFIX = "rl"
+
+    def __init__(self, backend=None):
+        self.backend = backend or get_backend()
+        self.fail_open = getattr(settings, "RATELIMIT_FAIL_OPEN", False)
+        # عدد الوكلاء العكسيين الموثوقين أمام التطبيق (0 = REMOTE_ADDR فقط)
+        self.trusted_proxies = getattr(settings, "RATELIMIT_TRUSTED_PROXIES", 0)
+        self.named = {
+            name: RateLimitPolicy.from_rate(name, rate)
+            for name, rate in getattr(
+                settings, "RATELIMIT_DEFAULT_LIMITS", {}
+            ).items()
+        }
+
+        groups = getattr(settings, "RATELIMIT_GROUPS", {})
+        self.groups = {
+            name: RateLimitPolicy.from_rate(
+                name, group["rate"], group.get("block", True)
+            )
+            for name, group in groups.items()
+        }
+        # جميع مسارات المجموعات في تعبير نمطي واحد، والمجموعة من رقم البديل
+        self.group_paths = [
+            (name, path) for name, group in groups.items() for path in group["paths"]
+        ]
+        self.group_pattern = (
+            re.compile(
+                "|".join(
+                    f"(?P<g{index}>{glob_to_regex(path)})"
+                    for index, (_, path) in enumerate(self.group_paths)
+                )
+            )
+            if self.group_paths
+            else None
+        )
+        exempt = getattr(settings, "RATELIMIT_EXEMPT_URLS", [])
+        self.exempt_pattern = re.compile("|".join(exempt)) if exempt else None
+
+    def is_exempt(self, path):
+        return bool(self.exempt_pattern and self.exempt_pattern.match(path))
+
+    def policy_for(self, request: HttpRequest) -> Optional[RateLimitPolicy]:
+        """السياسة المطبقة على الطلب: مجموعة مطابقة للمسار ثم حد واجهة API"""
+        if self.is_exempt(request.path):
+            return None
+        if self.group_pattern is not None:
+            match = self.group_pattern.match(request.path)
+            if match:
+                name, _ = self.group_paths[int(match.lastgroup[1:])]
+                return self.groups[name]
+        if request.path.startswith("/api/"):
+            name = "api" if self.user_id(request) is not None else "api-anon"
+            return self.named.get(name)
+        return None
+
+    def identity(self, request: HttpRequest) -> str:
+        user_id = self.user_id(request)
+        if user_id is not None:
+            return f"user:{user_id}"
+        return f"ip:{self.client_ip(request)}"
+
+    def user_id(self, request: HttpRequest):
+        """
+        معرف المستخدم من الجلسة، أو من رمز JWT في ترويسة ``Authorization``
+
+        مصادقة DRF تعمل داخل العرض بعد هذا الوسيط، فيُتحقق من الرمز هنا دون
+        استعلام عن المستخدم (يكفي المعرف الموقّع فيه).
+        """
+        if not hasattr(request, "_rate_limit_user_id"):
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                request._rate_limit_user_id = user.pk
+            else:
+                request._rate_limit_user_id = self.token_user_id(request)
+        return request._rate_limit_user_id
+
+    def token_user_id(self, request: HttpRequest):
+        try:
+            from rest_framework.exceptions import AuthenticationFailed
+            from rest_framework_simplejwt.authentication import JWTAuthentication
+            from rest_framework_simplejwt.settings import api_settings
+        except ImportError:
+            return None
+
+        authentication = JWTAuthentication()
+        header = authentication.get_header(request)
+        if not header:
+            return None
+        try:
+            raw_token = authentication.get_raw_token(header)
+            if raw_token is None:
+                return None
+            token = authentication.get_validated_token(raw_token)
+        except AuthenticationFailed:
+            return None
+        return token.get(api_settings.USER_ID_CLAIM)
+
+    def client_ip(self, request: HttpRequest) -> Optional[str]:
+        return client_ip(request, self.trusted_proxies)
+
+    def hit(
+        self, policy: RateLimitPolicy, identity: str, now=None
+    ) -> RateLimitResult:
+        """تسجيل طلب وحساب العدد التقديري في النافذة المنزلقة"""
+        now = time.time() if now is None else now
+        window, offset = divmod(now, policy.period)
+        window = int(window)
+        # وسم {...} يضمن وقوع المفتاحين في نفس الشريحة على Redis Cluster
+        base = f"{self.KEY_PREFIX}:{{{policy.name}:{identity}}}"
+        current_key = f"{base}:{window}"
+        previous_key = f"{base}:{window - 1}"
+
+        try:
+            current, previous = self.backend.hit(
+                current_key, previous_key, policy.period * 2
+            )
+        except Exception as e:
+            logger.error(f"خطأ في محدد معدل الطلبات: {str(e)}")
+            allowed = self.fail_open or not policy.block
+            return RateLimitResult(policy, allowed, 0, policy.period)
+
+        weight = 1 - offset / policy.period
+        estimated = previous * weight + current
+        allowed = estimated <= policy.limit or not policy.block
+        remaining = max(0, math.floor(policy.limit - estimated))
+        reset = math.ceil(policy.period - offset)
+        return RateLimitResult(policy, allowed, remaining, reset)
+
+    def hit_named(self, name: str, request: HttpRequest) -> RateLimitResult:
+        """تطبيق حد مسمى من ``RATELIMIT_DEFAULT_LIMITS`` على الطلب"""
+        return self.hit(self.named[name], self.identity(request))
+
+    def check(self, request: HttpRequest) -> Optional[RateLimitResult]:
+        """فحص الطلب مرة واحدة (تُحفظ النتيجة على الطلب)"""
+        if hasattr(request, "rate_limit"):
+            return request.rate_limit
+        result = None
+        if getattr(settings, "RATELIMIT_ENABLE", True):
+            policy = self.policy_for(request)
+            if policy is not None:
+                result = self.hit(policy, self.identity(request))
+        request.rate_limit = result
+        return result
+
+
+_limiter = None
+
+
+def get_rate_limiter():
+    """محدد المعدل المشترك (يُبنى مرة واحدة من الإعدادات)"""
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter()
+    return _limiter
+
+
+@receiver(setting_changed)
+def reset_rate_limiter(setting, **kwargs):
+    global _limiter
+    if setting.startswith("RATELIMIT_") or setting == "CACHES":
+        _limiter = None
+
+
+def limited_response(result: RateLimitResult) -> HttpResponse:
+    status = getattr(settings, "RATELIMIT_STATUS_CODE", 429)
+    response = HttpResponse("تم تجاوز الحد المسموح من الطلبات", status=status)
+    return result.apply(response)
+
+
+class RateLimitMiddleware:
+    """تطبيق مجموعات معدل الطلبات وإضافة رؤوس X-RateLimit"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        result = get_rate_limiter().check(request)
+        if result is not None and not result.allowed:
+            return limited_response(result)
+
+        response = self.get_response(request)
+        if result is not None:
+            result.apply(response)
+        return response
@@ -1,8 +1,11 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_delete, post_save
+from django.contrib.auth.models import Group
+from django.core.signals import setting_changed
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
-from .models import SecurityAudit
+from .audit_pipeline import audit_event
+from .permissions import PermissionResolver
 
 User = get_user_model()
 
@@ -11,9 +14,9 @@ User = get_user_model()
 def log_user_changes(sender, instance, created, **kwargs):
     """تسجيل التغييرات على حسابات المستخدمين"""
     action = "User Created" if created else "User Updated"
-    SecurityAudit.objects.create(
+    audit_event(
+        action,
         user=instance,
-        action=action,
         severity="MEDIUM",
         details={
             "username": instance.username,
@@ -26,11 +29,58 @@ def log_user_changes(sender, instance, created, **kwargs):
 @receiver(post_delete, sender=User)
 def log_user_deletion(sender, instance, **kwargs):
     """تسجيل حذف حسابات المستخدمين"""
-    SecurityAudit.objects.create(
-        action="User Deleted",
+    audit_event(
+        "User Deleted",
         severity="HIGH",
         details={
             "username": instance.username,
             "user_id": instance.id,
         },
     )
+
+
+# الحقول التي تؤثر في الصلاحيات الفعلية للمستخدم
+PERMISSION_FIELDS = {"role", "is_superuser", "is_active"}
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_permissions(sender, instance, created, update_fields, **kwargs):
+    """إهمال صلاحيات المستخدم المخزنة عند تغيير دوره"""
+    if created:
+        return
+    # حفظ آخر دخول أو نشاط لا يغير الصلاحيات
+    if update_fields is not None and not PERMISSION_FIELDS & set(update_fields):
+        return
+    PermissionResolver.invalidate(instance.pk)
+    instance.__dict__.pop(PermissionResolver.ATTRIBUTE, None)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_membership_permissions(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """إهمال صلاحيات المستخدمين عند تغيير مجموعاتهم أو صلاحياتهم المباشرة"""
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        PermissionResolver.invalidate(instance.pk)
+    elif pk_set:
+        PermissionResolver.invalidate(*pk_set)
+    else:
+        # group.user_set.clear() لا يمرر المستخدمين المتأثرين
+        PermissionResolver.invalidate_all()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver(post_delete, sender=Group)
+def invalidate_group_permissions(sender, **kwargs):
+    """إهمال صلاحيات الجميع عند تغيير صلاحيات المجموعات"""
+    if kwargs.get("action", "post_").startswith("post_"):
+        PermissionResolver.invalidate_all()
+
+
+@receiver(setting_changed)
+def invalidate_role_permissions(setting, **kwargs):
+    if setting == "ROLE_PERMISSIONS":
+        PermissionResolver.invalidate_all()
@@ -0,0 +1,13 @@
+"""
+مهام Celery لوحدة الأمان
+"""
+
+from celery import shared_task
+
+
+@shared_task
+def replay_audit_spill():
+    """إعادة إدخال سجلات التدقيق المحفوظة على القرص"""
+    from security.audit_pipeline import replay_spill
+
+    return replay_spill()
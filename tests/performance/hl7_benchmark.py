@@ -0,0 +1,126 @@
+"""Benchmark for the streaming HL7 parser and batched lab result ingestion.
+
+Generates a synthetic corpus of MLLP-framed ORU^R01 messages and compares the
+legacy split-into-dict parser against ``utils.hl7``. With ``--ingest`` the
+corpus is also written through ``LabResultIngestor`` inside a transaction
+that is rolled back (requires ``DJANGO_SETTINGS_MODULE``).
+
+Usage:
+    python tests/performance/hl7_benchmark.py --messages 20000 --observations 12
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from utils.hl7 import HL7Message, frame, iter_frames  # noqa: E402
+
+TEST_CODES = ["GLU", "HGB", "WBC", "PLT", "NA", "K", "CL", "CREA", "UREA", "ALT"]
+FLAGS = ["N", "N", "N", "H", "L", "HH"]
+
+
+def build_message(index, observations, rng):
+    segments = [
+        f"MSH|^~\\&|ANALYZER|LAB|HIS|HOSPITAL|20240101120000||ORU^R01|MSG{index}|P|2.5",
+        f"PID|1||PAT{index % 1000:05d}^^^HOSP^MR||DOE^JOHN||19800101|M",
+        f"OBR|1|ORD{index}||PANEL^Panel",
+    ]
+    for number in range(1, observations + 1):
+        code = TEST_CODES[number % len(TEST_CODES)]
+        value = f"{rng.uniform(1, 200):.2f}"
+        flag = rng.choice(FLAGS)
+        segments.append(
+            f"OBX|{number}|NM|{code}^{code} test^LN||{value}|mg/dL^^UCUM|"
+            f"1-100|{flag}|||F"
+        )
+        if number % 4 == 0:
+            segments.append(f"NTE|1||Repeated measurement {number}")
+    return "\r".join(segments)
+
+
+def build_corpus(messages, observations, seed=0):
+    rng = random.Random(seed)
+    return b"".join(
+        frame(build_message(i, observations, rng)) for i in range(messages)
+    )
+
+
+def legacy_parse(message):
+    result = {}
+    for segment in message.split("\r"):
+        fields = segment.split("|")
+        result[fields[0]] = fields[1:]
+    return result
+
+
+def bench_legacy(corpus):
+    count = 0
+    for data in corpus.split(b"\x1c\r"):
+        if not data:
+            continue
+        parsed = legacy_parse(data[1:].decode())
+        # القطاعات المتكررة تُفقد: يبقى آخر OBX فقط
+        count += 1 if "OBX" in parsed else 0
+    return count
+
+
+def bench_streaming(corpus):
+    count = 0
+    for data in iter_frames(BytesIO(corpus).read):
+        message = HL7Message(data)
+        for segment in message.iter_segments("OBX"):
+            segment.component(3)
+            segment.field(5)
+            count += 1
+    return count
+
+
+def bench_ingest(corpus, batch_size):
+    import django
+
+    django.setup()
+    from django.db import transaction
+
+    from laboratory.hl7_ingest import LabResultIngestor, iter_parsed
+
+    with transaction.atomic():
+        ingestor = LabResultIngestor(batch_size=batch_size)
+        stats = ingestor.ingest(iter_parsed(iter_frames(BytesIO(corpus).read)))
+        transaction.set_rollback(True)
+    return stats["results"]
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed:8.3f}s  {result:>10} items")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--observations", type=int, default=12)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--ingest", action="store_true")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages, args.observations)
+    print(f"corpus: {args.messages} messages, {len(corpus) / 1e6:.1f} MB")
+
+    legacy = timed("legacy", bench_legacy, corpus)
+    streaming = timed("streaming", bench_streaming, corpus)
+    print(f"messages/s (streaming): {args.messages / streaming:,.0f}")
+    print(f"streaming/legacy time ratio: {streaming / legacy:.2f}")
+    if args.ingest:
+        timed("ingest", bench_ingest, corpus, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Replay benchmark for the streaming vital-sign anomaly detectors.
+
+Replays recorded device readings through ``telemedicine.anomaly.AnomalyStream``
+in arrival order and reports throughput, alert counts per detector and the
+memory held per patient. Readings come from a CSV export
+(``patient_id,metric,time,value`` with ``time`` in epoch milliseconds or ISO
+8601), from the ``DeviceReading`` table with ``--from-db`` (requires
+``DJANGO_SETTINGS_MODULE``), or from a synthetic corpus by default.
+
+Usage:
+    python tests/performance/vital_stream_benchmark.py --patients 5000 --minutes 60
+    python tests/performance/vital_stream_benchmark.py --input readings.csv
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "doctor_syria"))
+
+from telemedicine.anomaly import AnomalyStream  # noqa: E402
+
+BASELINES = {"heart_rate": (75, 6), "spo2": (97, 1), "systolic": (120, 8)}
+
+
+def synthetic_readings(patients, minutes, interval, seed=0):
+    """قراءات مرتبة بالوقت مع نوبات شاذة نادرة"""
+    rng = random.Random(seed)
+    start = 1_700_000_000_000
+    for step in range(minutes * 60 // interval):
+        moment = start + step * interval * 1000
+        for patient in range(patients):
+            episode = rng.random() < 0.002
+            for metric, (mean, spread) in BASELINES.items():
+                value = rng.gauss(mean, spread)
+                if episode:
+                    value += spread * rng.choice((-8, 8))
+                yield patient, metric, moment, round(value, 1)
+
+
+def csv_readings(path):
+    with open(path, newline="") as handle:
+        for row in csv.DictReader(handle):
+            moment = row["time"]
+            moment = (
+                int(moment)
+                if moment.isdigit()
+                else int(datetime.fromisoformat(moment).timestamp() * 1000)
+            )
+            yield row["patient_id"], row["metric"], moment, float(row["value"])
+
+
+def database_readings():
+    import django
+
+    django.setup()
+    from telemedicine.models import DeviceReading
+    from telemedicine.timeseries import metrics_of, to_ms
+
+    rows = (
+        DeviceReading.objects.order_by("reading_time")
+        .values_list("device__patient_id", "reading_time", "reading_value")
+        .iterator(chunk_size=5000)
+    )
+    for patient, moment, value in rows:
+        for metric, number in metrics_of(value).items():
+            yield patient, metric, to_ms(moment), number
+
+
+def replay(stream, readings):
+    kinds = Counter()
+    count = 0
+    for patient, metric, moment, value in readings:
+        for alert in stream.observe(patient, metric, moment, value):
+            kinds[alert.kind] += 1
+        count += 1
+    return count, kinds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input")
+    parser.add_argument("--from-db", action="store_true")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--minutes", type=int, default=30)
+    parser.add_argument("--interval", type=int, default=5, help="seconds")
+    parser.add_argument("--window", type=int, default=64)
+    parser.add_argument("--max-patients", type=int, default=50000)
+    args = parser.parse_args()
+
+    if args.input:
+        readings = list(csv_readings(args.input))
+    elif args.from_db:
+        readings = list(database_readings())
+    else:
+        readings = list(synthetic_readings(args.patients, args.minutes, args.interval))
+    print(f"corpus: {len(readings):,} readings")
+
+    stream = AnomalyStream(window=args.window, max_patients=args.max_patients)
+    start = time.perf_counter()
+    count, kinds = replay(stream, readings)
+    elapsed = time.perf_counter() - start
+
+    patients = len(stream.patients)
+    print(f"replay       {elapsed:8.3f}s  {count:>10,} readings")
+    print(f"readings/s:  {count / elapsed:,.0f}")
+    for kind, total in sorted(kinds.items()):
+        print(f"alerts {kind:<16} {total:>8,}")
+    print(
+        f"patients: {patients:,}  state arrays: {stream.nbytes() / 1e6:.1f} MB "
+        f"({stream.nbytes() / max(patients, 1) / 1024:.1f} KiB/patient)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+اختبارات خط كتابة سجلات التدقيق
+Audit Pipeline Tests
+"""
+
+import json
+import os
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from security.audit_pipeline import (
+    AuditWriter,
+    build_event,
+    replay_spill,
+    spill,
+)
+from security.decorators import audit_log
+from security.models import SecurityAudit
+
+
+@pytest.mark.django_db
+class TestAuditPipeline:
+    @pytest.fixture(autouse=True)
+    def spill_dir(self, settings, tmp_path):
+        settings.AUDIT_SETTINGS = {"ASYNC": False, "SPILL_DIR": str(tmp_path)}
+        return tmp_path
+
+    def test_flush_writes_queued_events_in_batches(self):
+        writer = AuditWriter(batch_size=50, run_async=False)
+        for i in range(120):
+            writer.queue.put_nowait((build_event(f"action-{i}"), None))
+
+        with CaptureQueriesContext(connection) as queries:
+            assert writer.flush() == 120
+        inserts = [q for q in queries if q["sql"].startswith("INSERT")]
+        assert len(inserts) == 3
+        assert SecurityAudit.objects.count() == 120
+
+    def test_critical_events_spill_when_queue_is_full(self, spill_dir):
+        writer = AuditWriter(queue_size=1, run_async=True)
+        with mock.patch.object(writer, "_ensure_thread"):
+            writer.enqueue(build_event("first"))
+            writer.enqueue(build_event("dropped"))
+            writer.enqueue(build_event("threat", severity="HIGH"))
+
+        assert writer.dropped == 1
+        assert len(os.listdir(spill_dir)) == 1
+        assert replay_spill(older_than=0) == 1
+        assert SecurityAudit.objects.get().action == "threat"
+        assert os.listdir(spill_dir) == []
+
+    def test_queued_critical_events_are_on_disk_until_written(self, spill_dir):
+        writer = AuditWriter(run_async=True)
+        with mock.patch.object(writer, "_ensure_thread"):
+            writer.enqueue(build_event("threat", severity="CRITICAL"))
+            writer.enqueue(build_event("low"))
+
+        assert len(os.listdir(spill_dir)) == 1
+        # لا يُعاد إدخال ملف حديث قد يكون حدثه في الطابور
+        assert replay_spill() == 0
+
+        assert writer.flush() == 2
+        assert os.listdir(spill_dir) == []
+        assert SecurityAudit.objects.count() == 2
+
+    def test_bad_event_does_not_drop_its_batch(self, spill_dir):
+        writer = AuditWriter(run_async=False)
+        bad = build_event("bad", severity="HIGH")
+        bad["action"] = None
+
+        assert writer.write([build_event("a"), bad, build_event("b")]) == 2
+
+        assert set(SecurityAudit.objects.values_list("action", flat=True)) == {
+            "a",
+            "b",
+        }
+        assert len(os.listdir(spill_dir)) == 1
+
+    def test_invalid_ip_is_stored_as_null(self):
+        request = RequestFactory().get("/", REMOTE_ADDR="<script>")
+
+        assert build_event("x", request)["ip_address"] is None
+        assert build_event("x", RequestFactory().get("/"))["ip_address"] == (
+            "127.0.0.1"
+        )
+
+    def test_forwarded_for_is_trusted_only_behind_proxies(self, settings):
+        request = RequestFactory().get(
+            "/", HTTP_X_FORWARDED_FOR="1.2.3.4, 10.0.0.9", REMOTE_ADDR="10.0.0.2"
+        )
+
+        assert build_event("x", request)["ip_address"] == "10.0.0.2"
+        settings.RATELIMIT_TRUSTED_PROXIES = 1
+        # العنوان الأول يضعه العميل؛ المعتمد ما أضافه الوكيل الموثوق
+        assert build_event("x", request)["ip_address"] == "10.0.0.9"
+
+    def test_unreadable_spill_files_are_quarantined(self, spill_dir):
+        (spill_dir / "audit-0.ndjson").write_text("{not json\n", encoding="utf-8")
+        event = build_event("threat", severity="HIGH")
+        event["timestamp"] = event["timestamp"].isoformat()
+        (spill_dir / "audit-1.ndjson").write_text(
+            json.dumps(event) + "\n", encoding="utf-8"
+        )
+
+        assert replay_spill(older_than=0) == 1
+
+        assert SecurityAudit.objects.get().action == "threat"
+        assert sorted(os.listdir(spill_dir)) == ["quarantine"]
+        assert os.listdir(spill_dir / "quarantine") == ["audit-0.ndjson"]
+
+    def test_failed_write_spills_critical_events(self, spill_dir):
+        writer = AuditWriter(run_async=False)
+        events = [build_event("low"), build_event("critical", severity="CRITICAL")]
+
+        with mock.patch.object(
+            SecurityAudit.objects, "bulk_create", side_effect=RuntimeError("db down")
+        ), mock.patch.object(
+            SecurityAudit, "save", side_effect=RuntimeError("db down")
+        ):
+            assert writer.write(events) == 0
+
+        assert writer.dropped == 1
+        assert replay_spill(older_than=0) == 1
+
+    def test_audit_log_decorator_records_request(self):
+        view = audit_log("view_records")(lambda request: HttpResponse(status=201))
+        request = RequestFactory().post("/records/", REMOTE_ADDR="10.0.0.2")
+        request.user = mock.Mock(is_authenticated=False)
+
+        view(request)
+
+        audit = SecurityAudit.objects.get(action="view_records")
+        assert audit.ip_address == "10.0.0.2"
+        assert audit.details["status_code"] == 201
+
+    def test_spill_is_atomic(self, spill_dir):
+        path = spill([build_event("x", severity="HIGH")])
+
+        assert path.endswith(".ndjson")
+        assert not [name for name in os.listdir(spill_dir) if name.endswith(".tmp")]
@@ -0,0 +1,187 @@
+"""
+اختبارات إحصائيات لوحات التحكم
+Dashboard Stats Tests
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+from appointments.models import Appointment
+from core.dashboard_stats import GLOBAL_TENANT, DashboardStatsService
+from doctors.models import Doctor
+from patient_records.models import Patient
+
+User = get_user_model()
+
+
+class DashboardStatsHelpers:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+
+    def add_to_tenant(self, user, tenant, role):
+        if tenant is not None:
+            from saas_core.models import TenantUser
+
+            TenantUser.objects.create(user=user, tenant=tenant, role=role)
+
+    def make_doctor(self, tenant, username):
+        user = User.objects.create_user(username=username, password="testpass123")
+        self.add_to_tenant(user, tenant, "doctor")
+        return Doctor.objects.create(user=user, phone="1", address="a", bio="b")
+
+    def make_patient(self, tenant, username):
+        user = User.objects.create_user(username=username, password="testpass123")
+        self.add_to_tenant(user, tenant, "patient")
+        return Patient.objects.create(
+            user=user, date_of_birth=date(1990, 1, 1), gender="F"
+        )
+
+    def make_appointment(self, doctor, patient, status="pending"):
+        # bulk_create يتجاوز تحقق save() الخاص بجدول الطبيب
+        return Appointment.objects.bulk_create(
+            [
+                Appointment(
+                    doctor=doctor,
+                    patient=patient,
+                    appointment_date=timezone.now(),
+                    reason="فحص",
+                    status=status,
+                )
+            ]
+        )[0]
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    not apps.is_installed("saas_core"), reason="تطبيق المستأجرين غير مثبت"
+)
+class TestDashboardStats(DashboardStatsHelpers):
+    @pytest.fixture
+    def tenants(self):
+        from saas_core.models import Tenant
+
+        return (
+            Tenant.objects.create(name="A", subdomain="a"),
+            Tenant.objects.create(name="B", subdomain="b"),
+        )
+
+    def test_counters_are_computed_per_tenant(self, tenants):
+        tenant_a, tenant_b = tenants
+        doctor = self.make_doctor(tenant_a, "doc_a")
+        patient = self.make_patient(tenant_a, "pat_a")
+        self.make_patient(tenant_b, "pat_b")
+        self.make_appointment(doctor, patient)
+        self.make_appointment(doctor, patient, status="completed")
+
+        snapshots = DashboardStatsService.compute([tenant_a.id, tenant_b.id])
+
+        assert snapshots[tenant_a.id]["appointments"]["total"] == 2
+        assert snapshots[tenant_a.id]["appointments"]["pending"] == 1
+        assert snapshots[tenant_a.id]["appointments"]["today"] == 2
+        assert snapshots[tenant_a.id]["patients"]["total"] == 1
+        assert snapshots[tenant_b.id]["appointments"]["total"] == 0
+        assert snapshots[tenant_b.id]["patients"]["total"] == 1
+
+    def test_one_query_per_table(self, tenants, django_assert_num_queries):
+        tenant_a, tenant_b = tenants
+        self.make_patient(tenant_a, "pat_a")
+
+        # ثلاثة جداول + أحدث التقارير لكل مستأجر
+        with django_assert_num_queries(3 + 2):
+            DashboardStatsService.compute([tenant_a.id, tenant_b.id])
+
+    def test_signals_apply_incremental_deltas(self, tenants):
+        tenant_a, _ = tenants
+        self.make_patient(tenant_a, "pat_a")
+        DashboardStatsService.refresh([tenant_a.id])
+
+        self.make_patient(tenant_a, "pat_a2")
+
+        stats = DashboardStatsService.get_stats(tenant_a.id)
+        assert stats["patients"]["total"] == 2
+        assert stats["patients"]["new_this_month"] == 2
+
+    def test_refresh_keeps_deltas_arriving_during_compute(self, tenants, monkeypatch):
+        tenant_a, _ = tenants
+        self.make_patient(tenant_a, "pat_a")
+        DashboardStatsService.refresh([tenant_a.id])
+        self.make_patient(tenant_a, "pat_a2")
+        compute = DashboardStatsService.compute
+
+        def compute_then_create(*args, **kwargs):
+            snapshots = compute(*args, **kwargs)
+            # مريض يُنشأ بعد استعلام اللقطة وقبل كتابتها
+            self.make_patient(tenant_a, "pat_a3")
+            return snapshots
+
+        monkeypatch.setattr(DashboardStatsService, "compute", compute_then_create)
+        DashboardStatsService.refresh([tenant_a.id])
+
+        stats = DashboardStatsService.get_stats(tenant_a.id)
+        assert stats["patients"]["total"] == 3
+
+    def test_refresh_only_active_tenants(self, tenants):
+        tenant_a, tenant_b = tenants
+        DashboardStatsService.refresh([tenant_a.id, tenant_b.id])
+        since = timezone.now()
+        self.make_patient(tenant_b, "pat_b")
+
+        refreshed = DashboardStatsService.refresh_active_tenants(since=since)
+
+        assert refreshed == {tenant_b.id}
+
+    def test_snapshot_contains_no_model_instances(self, tenants):
+        tenant_a, _ = tenants
+        snapshot = DashboardStatsService.refresh([tenant_a.id])[tenant_a.id]
+
+        assert isinstance(snapshot["recent_reports"], list)
+        assert all(isinstance(value, (dict, list, float)) for value in snapshot.values())
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    apps.is_installed("saas_core"), reason="تطبيق المستأجرين مثبت"
+)
+class TestGlobalDashboardStats(DashboardStatsHelpers):
+    def test_refresh_task_computes_global_snapshot(self):
+        doctor = self.make_doctor(None, "doc")
+        patient = self.make_patient(None, "pat")
+        self.make_appointment(doctor, patient)
+
+        assert DashboardStatsService.refresh_active_tenants() == {GLOBAL_TENANT}
+
+        stats = DashboardStatsService.get_stats(GLOBAL_TENANT)
+        assert stats["patients"]["total"] == 1
+        assert stats["appointments"]["pending"] == 1
+        assert stats["reports"]["total"] == 0
+
+    def test_signals_apply_deltas_to_global_snapshot(self):
+        self.make_patient(None, "pat")
+        DashboardStatsService.refresh([GLOBAL_TENANT])
+
+        self.make_patient(None, "pat2")
+
+        stats = DashboardStatsService.get_stats(GLOBAL_TENANT)
+        assert stats["patients"]["total"] == 2
+        assert stats["patients"]["new_this_month"] == 2
+
+    def test_deleting_old_row_keeps_windowed_counters(self):
+        old = self.make_patient(None, "old")
+        self.make_patient(None, "new")
+        Patient.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=60)
+        )
+        old.refresh_from_db()
+        DashboardStatsService.refresh([GLOBAL_TENANT])
+
+        old.delete()
+
+        stats = DashboardStatsService.get_stats(GLOBAL_TENANT)
+        assert stats["patients"]["total"] == 1
+        assert stats["patients"]["new_this_month"] == 1
@@ -0,0 +1,106 @@
+import pytest
+from django.http import FileResponse
+from django.test import RequestFactory
+
+from core import tasks
+from doctor_syria.core import documents
+from doctor_syria.core.documents import (
+    DOCUMENT_TYPES,
+    PENDING,
+    READY,
+    DocumentRenderer,
+    DocumentType,
+    register,
+)
+from pharmacy.models import Medicine
+
+
+@pytest.mark.django_db
+class TestDocumentRenderer:
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.DOCUMENT_RENDERING_SETTINGS = {"ASYNC": False}
+        self.rendered = []
+
+        def fake_write_pdf(html, paths=None):
+            self.rendered.append(html)
+            return b"%PDF-" + html.encode()
+
+        monkeypatch.setattr(documents, "write_pdf", fake_write_pdf)
+        monkeypatch.setattr(documents, "render_to_string", lambda name, ctx: ctx["name"])
+        register(
+            DocumentType(
+                name="medicine",
+                model=Medicine,
+                template="unused.html",
+                context=lambda medicine: {"name": medicine.name},
+                filename=lambda medicine: f"medicine_{medicine.pk}.pdf",
+            )
+        )
+        yield
+        DOCUMENT_TYPES.pop("medicine")
+
+    @pytest.fixture
+    def medicine(self):
+        return Medicine.objects.create(
+            name="Paracetamol",
+            scientific_name="Acetaminophen",
+            manufacturer="Pharma Co",
+            description="",
+            dosage_form="tablet",
+            strength="500mg",
+            price=5,
+        )
+
+    def test_repeat_requests_served_from_storage(self, medicine):
+        first = DocumentRenderer.request("medicine", medicine)
+        second = DocumentRenderer.request("medicine", medicine)
+
+        assert first["status"] == second["status"] == READY
+        assert first["key"] == second["key"]
+        assert len(self.rendered) == 1
+        assert DocumentRenderer.read("medicine", medicine) == b"%PDF-Paracetamol"
+
+    def test_source_change_renders_new_version(self, medicine):
+        old = DocumentRenderer.request("medicine", medicine)
+        medicine.name = "Panadol"
+        medicine.save()
+        new = DocumentRenderer.request("medicine", medicine)
+
+        assert old["key"] != new["key"]
+        assert self.rendered == ["Paracetamol", "Panadol"]
+
+    def test_template_version_invalidates(self, medicine, settings):
+        old = DocumentRenderer.request("medicine", medicine)
+        settings.DOCUMENT_RENDERING_SETTINGS = {"ASYNC": False, "TEMPLATE_VERSION": "2"}
+        assert DocumentRenderer.request("medicine", medicine)["key"] != old["key"]
+
+    def test_async_request_enqueues_once(self, medicine, settings, monkeypatch):
+        settings.DOCUMENT_RENDERING_SETTINGS = {"ASYNC": True}
+        jobs = []
+        monkeypatch.setattr(tasks.render_document, "delay", lambda *args: jobs.append(args))
+
+        first = DocumentRenderer.request("medicine", medicine, user_id=None)
+        second = DocumentRenderer.request("medicine", medicine, user_id=None)
+        assert first["status"] == second["status"] == PENDING
+        assert len(jobs) == 1
+        assert self.rendered == []
+
+        assert DocumentRenderer.render_job(*jobs[0]) == READY
+        assert DocumentRenderer.request("medicine", medicine)["status"] == READY
+        assert len(self.rendered) == 1
+
+    def test_response(self, medicine, settings, monkeypatch):
+        request = RequestFactory().get("/")
+        request.user = type("User", (), {"pk": None})()
+
+        settings.DOCUMENT_RENDERING_SETTINGS = {"ASYNC": True}
+        monkeypatch.setattr(tasks.render_document, "delay", lambda *args: None)
+        assert DocumentRenderer.response("medicine", medicine, request).status_code == 202
+
+        settings.DOCUMENT_RENDERING_SETTINGS = {"ASYNC": False}
+        response = DocumentRenderer.response("medicine", medicine, request)
+        assert isinstance(response, FileResponse)
+        assert b"".join(response.streaming_content) == b"%PDF-Paracetamol"
+        assert f"medicine_{medicine.pk}.pdf" in response["Content-Disposition"]
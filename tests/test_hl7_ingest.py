@@ -0,0 +1,198 @@
+"""
+اختبارات استقبال رسائل HL7
+HL7 Ingestion Tests
+"""
+
+import socket
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+
+from laboratory import hl7_ingest
+from laboratory.hl7_ingest import LabResultIngestor, MLLPRequestHandler, iter_parsed
+from laboratory.models import LabResult, LabTest, UnmatchedLabResult
+from utils.hl7 import (
+    HL7Message,
+    HL7ParseError,
+    MLLPFrameBuffer,
+    build_ack,
+    frame,
+    iter_frames,
+)
+
+User = get_user_model()
+
+MESSAGE = "\r".join(
+    [
+        "MSH|^~\\&|ANALYZER|LAB|HIS|HOSP|20240101120000||ORU^R01|MSG1|P|2.5",
+        "PID|1||patient1^^^HOSP^MR||DOE^JOHN",
+        "OBR|1|ORD1||PANEL",
+        "OBX|1|NM|GLU^Glucose^LN||95|mg/dL|70-110|N|||F",
+        "OBX|2|NM|K^Potassium^LN||6.9|mmol/L|3.5-5.1|HH|||F",
+        "NTE|1||Hemolyzed sample",
+        "NTE|2||Repeat advised",
+        "OBX|3|NM|UNKNOWN^Unknown||1|||N|||F",
+    ]
+)
+
+
+class TestHL7Parser:
+    def test_keeps_repeated_segments_and_components(self):
+        message = HL7Message(MESSAGE)
+
+        observations = list(message.iter_segments("OBX"))
+        assert [obx.component(3) for obx in observations] == ["GLU", "K", "UNKNOWN"]
+        assert observations[1].component(3, 2) == "Potassium"
+        assert len(message.to_dict()["NTE"]) == 2
+        assert message.message_type == "ORU^R01"
+        assert message.control_id == "MSG1"
+
+    def test_mllp_frames_split_across_reads(self):
+        data = frame(MESSAGE) * 3
+        buffer = MLLPFrameBuffer()
+
+        frames = []
+        for i in range(0, len(data), 7):
+            frames.extend(buffer.feed(data[i : i + 7]))
+
+        assert len(frames) == 3
+        assert list(iter_frames(BytesIO(data).read, chunk_size=5)) == frames
+
+    def test_truncated_header_is_a_parse_error(self):
+        with pytest.raises(HL7ParseError):
+            HL7Message("MSH|^~\\&")
+
+        stats = {"invalid": 0}
+        frames = [b"MSH|^~\\&", frame(MESSAGE)[1:-2]]
+        assert len(list(iter_parsed(frames, stats=stats))) == 1
+        assert stats["invalid"] == 1
+
+    def test_ack_references_control_id(self):
+        ack = HL7Message(build_ack(HL7Message(MESSAGE)))
+
+        assert ack.segment("MSA").field(1) == "AA"
+        assert ack.segment("MSA").field(2) == "MSG1"
+        assert ack.header.field(3) == "HIS"
+
+
+@pytest.mark.django_db
+class TestLabResultIngestor:
+    @pytest.fixture
+    def patient(self):
+        return User.objects.create_user(username="patient1", password="testpass123")
+
+    @pytest.fixture(autouse=True)
+    def tests(self):
+        for code in ["GLU", "K"]:
+            LabTest.objects.create(
+                name=code, code=code, category="blood", price=10, unit="u"
+            )
+
+    def test_ingest_bulk_creates_results(self, patient, django_assert_max_num_queries):
+        frames = iter_frames(BytesIO(frame(MESSAGE) * 3).read)
+        ingestor = LabResultIngestor(batch_size=4, lookup_field="username")
+
+        # استعلامات ثابتة لكل دفعة بدل استعلامات لكل نتيجة
+        with django_assert_max_num_queries(12):
+            stats = ingestor.ingest(iter_parsed(frames))
+
+        assert stats["messages"] == 3
+        assert stats["results"] == 6
+        assert stats["unmatched"] == 3
+        unmatched = UnmatchedLabResult.objects.all()
+        assert {row.test_code for row in unmatched} == {"UNKNOWN"}
+        assert {row.reason for row in unmatched} == {"test"}
+        assert unmatched[0].message_control_id == "MSG1"
+        critical = LabResult.objects.filter(status="critical").first()
+        assert critical.patient == patient
+        assert critical.value == "6.9 mmol/L"
+        assert critical.notes == "Hemolyzed sample\nRepeat advised"
+        assert LabResult.objects.filter(status="critical").count() == 3
+        assert LabResult.objects.filter(status="normal").count() == 3
+
+    def test_non_result_messages_are_rejected(self, patient):
+        message = HL7Message(MESSAGE.replace("ORU^R01", "ADT^A01"))
+        ingestor = LabResultIngestor(lookup_field="username")
+
+        assert not ingestor.add_message(message)
+        assert ingestor.flush() == 0
+
+    def test_failed_flush_keeps_pending_results(self, patient, monkeypatch):
+        ingestor = LabResultIngestor(lookup_field="username")
+        ingestor.add_message(HL7Message(MESSAGE))
+
+        def fail(*args, **kwargs):
+            raise DatabaseError("connection lost")
+
+        monkeypatch.setattr(LabResult.objects, "bulk_create", fail)
+        with pytest.raises(DatabaseError):
+            ingestor.flush()
+        assert len(ingestor.pending) == 3
+
+        monkeypatch.undo()
+        assert ingestor.flush() == 2
+        assert ingestor.pending == []
+
+
+@pytest.mark.django_db
+class TestMLLPRequestHandler:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        User.objects.create_user(username="patient1", password="testpass123")
+        LabTest.objects.create(
+            name="GLU", code="GLU", category="blood", price=10, unit="u"
+        )
+        # إغلاق الاتصالات يُنهي معاملة الاختبار
+        monkeypatch.setattr(hl7_ingest, "close_old_connections", lambda: None)
+        monkeypatch.setattr(
+            hl7_ingest,
+            "get_hl7_setting",
+            lambda name, default=None: "username"
+            if name == "PATIENT_LOOKUP_FIELD"
+            else default,
+        )
+
+    def exchange(self, data):
+        """تشغيل المعالج على مقبس محلي وإرجاع رموز الإقرارات ونتائج كل إرسال"""
+        device, server_side = socket.socketpair()
+        saved = []
+
+        class Request:
+            def recv(self, size):
+                return server_side.recv(size)
+
+            def sendall(self, payload):
+                # عدد النتائج المحفوظة لحظة إرسال الإقرارات
+                saved.append(LabResult.objects.count())
+                server_side.sendall(payload)
+
+        with device:
+            device.sendall(data)
+            device.shutdown(socket.SHUT_WR)
+            server = SimpleNamespace(charset="utf-8", batch_size=100)
+            MLLPRequestHandler(Request(), ("analyzer", 0), server)
+            server_side.close()
+            codes = [
+                HL7Message(ack).segment("MSA").field(1)
+                for ack in iter_frames(device.makefile("rb").read)
+            ]
+        return codes, saved
+
+    def test_acks_after_results_are_committed(self):
+        codes, saved = self.exchange(frame(MESSAGE) * 2 + frame("MSH|^~\\&"))
+
+        assert codes == ["AA", "AA"]
+        assert saved == [2]
+
+    def test_database_error_is_negatively_acknowledged(self, monkeypatch):
+        def fail(*args, **kwargs):
+            raise DatabaseError("connection lost")
+
+        monkeypatch.setattr(LabResult.objects, "bulk_create", fail)
+        codes, _ = self.exchange(frame(MESSAGE))
+
+        assert codes == ["AE"]
+        assert not LabResult.objects.exists()
@@ -0,0 +1,81 @@
+"""
+اختبارات التوليد الجماعي للبطاقات التعريفية
+ID Card Batch Tests
+"""
+
+import zipfile
+from unittest import mock
+
+import pytest
+from PIL import Image
+from PIL.PdfParser import PdfParser
+
+from accounts.models import User
+from accounts.utils.id_card_generator import (
+    CARD_SIZE,
+    CardSheet,
+    IDCardBatch,
+    IDCardGenerator,
+)
+
+
+@pytest.mark.django_db
+class TestIDCardBatch:
+    @pytest.fixture(autouse=True)
+    def sync_audit(self, settings):
+        settings.AUDIT_SETTINGS = {"ASYNC": False}
+
+    @pytest.fixture
+    def users(self):
+        return [
+            User.objects.create_user(
+                username=f"staff{i}", email=f"staff{i}@example.com", role="nurse"
+            )
+            for i in range(12)
+        ]
+
+    def test_create_card_renders_png(self, users):
+        card = Image.open(IDCardGenerator().create_card(users[0]))
+        assert card.format == "PNG"
+        assert card.size == CARD_SIZE
+
+    def test_sheet_layout_fills_a4_page(self):
+        sheet = CardSheet(CARD_SIZE)
+        assert (sheet.columns, sheet.rows) == (2, 5)
+        last = sheet.position(sheet.per_page - 1)
+        assert last[0] + CARD_SIZE[0] <= sheet.page_size[0]
+        assert last[1] + CARD_SIZE[1] <= sheet.page_size[1]
+        assert sheet.position(sheet.per_page) == sheet.position(0)
+
+    def test_batch_writes_sheet_pdf_and_zip(self, users, tmp_path):
+        progress = mock.Mock()
+        results = IDCardBatch(
+            output_dir=str(tmp_path), workers=1, progress=progress
+        ).run(User.objects.order_by("pk"), name="cards")
+
+        assert results["success"] == 12
+        assert results["failed"] == 0
+        assert progress.call_args_list[-1] == mock.call(12, 12)
+        with zipfile.ZipFile(results["zip"]) as archive:
+            assert sorted(archive.namelist()) == sorted(
+                f"id_card_{user.pk}.png" for user in users
+            )
+        # 12 بطاقة بعشر بطاقات في الورقة
+        assert len(PdfParser(results["pdf"]).pages) == 2
+
+    def test_batch_reports_per_user_failures(self, users, tmp_path):
+        render_png = IDCardGenerator.render_png
+
+        def flaky(generator, data):
+            if data.username == "staff3":
+                raise ValueError("بيانات تالفة")
+            return render_png(generator, data)
+
+        with mock.patch.object(IDCardGenerator, "render_png", flaky):
+            results = IDCardBatch(
+                output_dir=str(tmp_path), workers=1, layout="cards"
+            ).run(users)
+
+        assert results["success"] == 11
+        assert results["errors"] == [{"user": "staff3", "error": "بيانات تالفة"}]
+        assert len(PdfParser(results["pdf"]).pages) == 11
@@ -0,0 +1,104 @@
+"""
+اختبارات خط معالجة الصور
+Image Pipeline Tests
+"""
+
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from PIL import Image
+
+from utils.image_pipeline import ImageManifest, ImagePipeline, render_variants
+
+SIZES = {"small": (100, 100), "medium": (300, 300), "large": (600, 600)}
+
+
+def make_jpeg(color, size=(1600, 1200)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class TestImagePipeline:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.fixture
+    def storage(self, tmp_path):
+        return FileSystemStorage(location=str(tmp_path), base_url="/media/")
+
+    @pytest.fixture
+    def pipeline(self, storage):
+        return ImagePipeline(sizes=SIZES, storage=storage)
+
+    def test_render_variants_generates_every_size(self):
+        outputs = render_variants(make_jpeg("red"), SIZES)
+
+        assert set(outputs) == set(SIZES)
+        for name, data in outputs.items():
+            image = Image.open(BytesIO(data))
+            assert image.format == "JPEG"
+            assert max(image.size) == SIZES[name][0]
+
+    def test_same_name_different_content_does_not_collide(self, pipeline, storage):
+        storage.save("a/photo.jpg", ContentFile(make_jpeg("red")))
+        storage.save("b/photo.jpg", ContentFile(make_jpeg("blue")))
+
+        first = pipeline.process("a/photo.jpg")
+        second = pipeline.process("b/photo.jpg")
+
+        assert first["digest"] != second["digest"]
+        assert first["variants"]["small"] != second["variants"]["small"]
+
+    def test_manifest_serves_urls_and_reuses_outputs(self, pipeline, storage):
+        storage.save("photo.jpg", ContentFile(make_jpeg("green")))
+        entry = pipeline.process("photo.jpg")
+
+        assert ImageManifest().get("photo.jpg") == entry
+        # نفس المحتوى تحت اسم آخر يعيد استخدام المخرجات دون إعادة المعالجة
+        storage.save("copy.jpg", ContentFile(make_jpeg("green")))
+        assert pipeline.missing_variants(entry["digest"]) == []
+        assert pipeline.process("copy.jpg")["variants"] == entry["variants"]
+
+    def test_process_many_uses_process_pool(self, pipeline, storage):
+        names = [
+            storage.save(f"photo_{i}.jpg", ContentFile(make_jpeg((i * 40, 0, 0))))
+            for i in range(3)
+        ]
+
+        results = pipeline.process_many(names, workers=2)
+
+        assert set(results) == set(names)
+        for name in names:
+            assert ImageManifest().get(name) == results[name]
+
+
+@pytest.mark.django_db
+class TestProfilePictureVariants:
+    def test_variants_are_scheduled_after_commit(
+        self, settings, tmp_path, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        from accounts import models
+
+        settings.MEDIA_ROOT = str(tmp_path)
+        scheduled = []
+        monkeypatch.setattr(models, "optimize_image", lambda path: None)
+        monkeypatch.setattr(models, "schedule_variants", scheduled.append)
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            user = models.User(username="photo")
+            user.profile_picture.save(
+                "photo.jpg", ContentFile(make_jpeg("red")), save=False
+            )
+            user.save()
+            assert scheduled == []
+
+        assert len(callbacks) == 1
+        assert scheduled == [user.profile_picture.name]
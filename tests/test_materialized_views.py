@@ -0,0 +1,130 @@
+"""
+اختبارات الجداول المادية
+Materialized Views Tests
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import NotSupportedError, connection
+from django.utils import timezone
+
+from appointments.models import Appointment
+from core.materialized_views import APPOINTMENT_STATS, refresh_view
+from core.models import (
+    AppointmentStats,
+    MaterializedViewDirtyBucket,
+    MaterializedViewState,
+)
+from doctors.models import Doctor
+from patient_records.models import Patient
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestMaterializedViews:
+    @pytest.fixture(autouse=True)
+    def emulated_view(self, settings):
+        settings.MATERIALIZED_VIEWS_EMULATE = True
+        APPOINTMENT_STATS.create(connection)
+        yield
+        APPOINTMENT_STATS.drop(connection)
+
+    @pytest.fixture
+    def doctor(self):
+        user = User.objects.create_user(username="doctor", password="testpass123")
+        return Doctor.objects.create(user=user, phone="1", address="a", bio="b")
+
+    @pytest.fixture
+    def patient(self):
+        user = User.objects.create_user(username="patient", password="testpass123")
+        return Patient.objects.create(
+            user=user, date_of_birth=date(1990, 1, 1), gender="M"
+        )
+
+    def make_appointments(self, doctor, patient, statuses, day_offset=0):
+        when = timezone.now() + timedelta(days=day_offset)
+        # bulk_create يتجاوز تحقق save() الخاص بجدول الطبيب
+        return Appointment.objects.bulk_create(
+            Appointment(
+                doctor=doctor,
+                patient=patient,
+                appointment_date=when,
+                reason="فحص",
+                status=status,
+            )
+            for status in statuses
+        )
+
+    def test_full_refresh_aggregates_per_doctor_and_day(self, doctor, patient):
+        self.make_appointments(doctor, patient, ["completed", "pending", "pending"])
+        self.make_appointments(doctor, patient, ["cancelled"], day_offset=1)
+
+        state = refresh_view("mv_appointment_stats", full=True)
+
+        assert state.last_refreshed_at is not None
+        assert not state.last_refresh_incremental
+        rows = list(AppointmentStats.objects.order_by("day"))
+        assert [row.total_appointments for row in rows] == [3, 1]
+        assert rows[0].completed_appointments == 1
+        assert rows[0].pending_appointments == 2
+        assert rows[1].cancelled_appointments == 1
+
+    def test_incremental_refresh_recomputes_changed_days(self, doctor, patient):
+        appointments = self.make_appointments(doctor, patient, ["pending"])
+        refresh_view("mv_appointment_stats", full=True)
+
+        Appointment.objects.filter(pk=appointments[0].pk).update(
+            status="completed", updated_at=timezone.now()
+        )
+        state = refresh_view("mv_appointment_stats")
+
+        assert state.last_refresh_incremental
+        row = AppointmentStats.objects.get()
+        assert row.completed_appointments == 1
+        assert row.pending_appointments == 0
+        assert MaterializedViewState.objects.filter(
+            name="mv_appointment_stats"
+        ).exists()
+
+    def test_incremental_refresh_recomputes_day_an_appointment_left(
+        self, doctor, patient
+    ):
+        appointment = self.make_appointments(doctor, patient, ["pending"])[0]
+        self.make_appointments(doctor, patient, ["completed"], day_offset=2)
+        refresh_view("mv_appointment_stats", full=True)
+
+        appointment.appointment_date += timedelta(days=2)
+        # save_base يرسل إشارات الحفظ دون تحقق جدول الطبيب
+        appointment.save_base(update_fields=["appointment_date", "updated_at"])
+        refresh_view("mv_appointment_stats")
+
+        row = AppointmentStats.objects.get()
+        assert row.total_appointments == 2
+        assert not MaterializedViewDirtyBucket.objects.exists()
+
+    def test_incremental_refresh_recomputes_day_of_deleted_appointment(
+        self, doctor, patient
+    ):
+        first, second = self.make_appointments(doctor, patient, ["pending"] * 2)
+        self.make_appointments(doctor, patient, ["pending"], day_offset=1)
+        refresh_view("mv_appointment_stats", full=True)
+
+        first.delete()
+        refresh_view("mv_appointment_stats")
+        rows = AppointmentStats.objects.order_by("day")
+        assert [row.total_appointments for row in rows] == [1, 1]
+
+        second.delete()
+        state = refresh_view("mv_appointment_stats")
+        assert state.last_refresh_incremental
+        assert AppointmentStats.objects.count() == 1
+
+    def test_stats_models_are_read_only(self, doctor, patient):
+        self.make_appointments(doctor, patient, ["pending"])
+        refresh_view("mv_appointment_stats", full=True)
+
+        with pytest.raises(NotSupportedError):
+            AppointmentStats.objects.get().save()
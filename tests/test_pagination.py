@@ -0,0 +1,114 @@
+import pytest
+from django.core.cache import cache
+from django.db.models import Count
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from doctor_syria.core.pagination import (
+    CountEstimator,
+    KeysetPagination,
+    KeysetPaginator,
+    encode_cursor,
+)
+from pharmacy.models import Medicine
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+    @pytest.fixture
+    def medicines(self):
+        # أسماء مكررة لاختبار كسر التعادل بالمفتاح الأساسي
+        return [
+            Medicine.objects.create(
+                name=f"Medicine {index // 3:02d}",
+                scientific_name="Generic",
+                manufacturer="Pharma Co",
+                description="",
+                dosage_form="tablet",
+                strength="500mg",
+                price=5,
+            )
+            for index in range(25)
+        ]
+
+    def walk(self, queryset, page_size):
+        pages, cursor = [], None
+        while True:
+            page = KeysetPaginator(queryset, page_size).page(cursor)
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def test_forward_pages_cover_queryset_in_order(self, medicines):
+        queryset = Medicine.objects.order_by("name")
+        pages = self.walk(queryset, 4)
+
+        seen = [medicine.pk for page in pages for medicine in page]
+        assert seen == list(queryset.order_by("name", "pk").values_list("pk", flat=True))
+        assert len(pages) == 7
+        assert not pages[0].has_previous()
+        assert all(page.has_previous() for page in pages[1:])
+
+    def test_previous_cursor_returns_same_page(self, medicines):
+        queryset = Medicine.objects.order_by("-name")
+        pages = self.walk(queryset, 5)
+
+        for earlier, later in zip(pages, pages[1:]):
+            back = KeysetPaginator(queryset, 5).page(later.previous_cursor)
+            assert [m.pk for m in back] == [m.pk for m in earlier]
+            assert back.has_next()
+
+    def test_explicit_ordering(self, medicines):
+        page = KeysetPaginator(Medicine.objects.all(), 10, ["-name"]).page()
+        names = [medicine.name for medicine in page]
+        assert names == sorted(names, reverse=True)
+
+    def test_page_fetch_is_single_query(self, medicines, django_assert_num_queries):
+        cursor = KeysetPaginator(Medicine.objects.all(), 5).page().next_cursor
+        with django_assert_num_queries(1):
+            KeysetPaginator(Medicine.objects.all(), 5).page(cursor)
+
+    def test_values_and_grouped_querysets_are_rejected(self):
+        with pytest.raises(TypeError):
+            KeysetPaginator(Medicine.objects.values("name"), 5)
+        with pytest.raises(TypeError):
+            KeysetPaginator(Medicine.objects.annotate(orders=Count("pk")), 5)
+
+    def test_invalid_cursor(self, medicines):
+        with pytest.raises(ValueError):
+            KeysetPaginator(Medicine.objects.all(), 5).page("not-a-cursor")
+        with pytest.raises(ValueError):
+            KeysetPaginator(Medicine.objects.all(), 5).page(encode_cursor([1]))
+        with pytest.raises(ValueError):
+            KeysetPaginator(Medicine.objects.all(), 5, ["-created_at"]).page(
+                encode_cursor(["yesterday", 1])
+            )
+
+    def test_count_is_cached(self, medicines, django_assert_num_queries):
+        cache.clear()
+        queryset = Medicine.objects.filter(name__startswith="Medicine 0")
+        assert CountEstimator.estimate(queryset) == 25
+        with django_assert_num_queries(0):
+            assert CountEstimator.estimate(queryset) == 25
+
+    def test_drf_pagination_response(self, medicines):
+        factory = APIRequestFactory()
+        paginator = KeysetPagination()
+        request = Request(factory.get("/medicines/", {"page_size": 10, "count": 1}))
+
+        rows = paginator.paginate_queryset(Medicine.objects.all(), request)
+        response = paginator.get_paginated_response([row.pk for row in rows])
+
+        assert len(response.data["results"]) == 10
+        assert response.data["previous"] is None
+        assert "cursor=" in response.data["next"]
+        assert response.data["count"] == 25
+
+        for cursor in ("broken", encode_cursor(["x", "y"])):
+            with pytest.raises(NotFound):
+                paginator.paginate_queryset(
+                    Medicine.objects.all(),
+                    Request(factory.get("/medicines/", {"cursor": cursor})),
+                )
@@ -0,0 +1,120 @@
+"""
+اختبارات حل الصلاحيات المخزن مؤقتاً
+Permission Resolution Tests
+"""
+
+import pytest
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from accounts.models import User
+from security.decorators import permission_required, role_required
+from security.permissions import HasRolePermission, PermissionResolver
+
+
+def fresh(user):
+    """نسخة جديدة من المستخدم كما في طلب جديد"""
+    return User.objects.get(pk=user.pk)
+
+
+@pytest.mark.django_db
+class TestPermissionResolver:
+    @pytest.fixture(autouse=True)
+    def permission_settings(self, settings):
+        settings.AUDIT_SETTINGS = {"ASYNC": False}
+        settings.ROLE_PERMISSIONS = {
+            "doctor": ["view_medical_records", "write_prescriptions"],
+            "nurse": ["view_medical_records"],
+        }
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.fixture
+    def doctor(self):
+        return User.objects.create_user(username="doctor", role="doctor")
+
+    def test_permissions_are_resolved_once_and_cached(
+        self, doctor, django_assert_num_queries
+    ):
+        user = fresh(doctor)
+        with django_assert_num_queries(2):
+            permissions = user.get_role_permissions()
+            assert user.get_role_permissions() is permissions
+        assert "write_prescriptions" in permissions
+
+        user = fresh(doctor)
+        with django_assert_num_queries(0):
+            assert user.get_role_permissions() == permissions
+            # has_perm يستخدم نفس الصلاحيات المخزنة
+            assert not user.has_perm("auth.add_group")
+
+    def test_role_change_invalidates_cache(self, doctor):
+        assert "write_prescriptions" in fresh(doctor).get_role_permissions()
+
+        doctor.role = "nurse"
+        doctor.save()
+
+        permissions = fresh(doctor).get_role_permissions()
+        assert "write_prescriptions" not in permissions
+        assert "view_medical_records" in permissions
+
+    def test_group_changes_invalidate_cache(self, doctor):
+        group = Group.objects.create(name="auditors")
+        fresh(doctor).get_role_permissions()
+
+        doctor.groups.add(group)
+        assert cache.get(PermissionResolver.cache_key(doctor.pk)) is None
+
+        permission = Permission.objects.get(codename="view_group")
+        group.permissions.add(permission)
+        assert "auth.view_group" in fresh(doctor).get_role_permissions()
+
+        group.user_set.clear()
+        assert "auth.view_group" not in fresh(doctor).get_role_permissions()
+
+    def test_decorators_use_resolved_permissions(self, doctor):
+        request = RequestFactory().get("/")
+        request.user = fresh(doctor)
+
+        view = permission_required(["write_prescriptions", "all"])(
+            lambda request: HttpResponse("ok")
+        )
+        assert view(request).status_code == 200
+
+        denied = permission_required("dispense_medications")(
+            lambda request: HttpResponse("ok")
+        )
+        with pytest.raises(PermissionDenied):
+            denied(request)
+
+        by_role = role_required(["nurse"])(lambda request: HttpResponse("ok"))
+        with pytest.raises(PermissionDenied):
+            by_role(request)
+
+    def test_drf_permission_class(self, doctor):
+        class RecordsView(APIView):
+            required_roles = ["doctor", "nurse"]
+            required_permissions = {
+                "list": ["view_medical_records"],
+                "destroy": ["delete_medical_records"],
+            }
+
+        request = APIRequestFactory().get("/")
+        request.user = fresh(doctor)
+        permission = HasRolePermission()
+
+        view = RecordsView()
+        view.action = "list"
+        assert permission.has_permission(request, view)
+        view.action = "destroy"
+        assert not permission.has_permission(request, view)
+
+        RecordsView.required_roles = ["pharmacist"]
+        view.action = "list"
+        assert not permission.has_permission(request, view)
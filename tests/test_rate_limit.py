@@ -0,0 +1,126 @@
+"""
+اختبارات تحديد معدل الطلبات
+Rate Limiting Tests
+"""
+
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from security.rate_limit import (
+    RateLimitMiddleware,
+    RateLimitPolicy,
+    get_rate_limiter,
+    parse_rate,
+)
+
+
+class TestRateLimit:
+    @pytest.fixture(autouse=True)
+    def rate_limit_settings(self, settings):
+        settings.RATELIMIT_ENABLE = True
+        settings.RATELIMIT_DEFAULT_LIMITS = {"api": "100/h", "api-anon": "3/1m"}
+        settings.RATELIMIT_GROUPS = {
+            "authentication": {"rate": "2/5m", "paths": ["/api/auth/*"]},
+        }
+        settings.RATELIMIT_EXEMPT_URLS = [r"^/static/.*$"]
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.fixture
+    def middleware(self):
+        return RateLimitMiddleware(lambda request: HttpResponse("ok"))
+
+    def request(self, path):
+        return RequestFactory().get(path, REMOTE_ADDR="10.0.0.1")
+
+    def test_parse_rate(self):
+        assert parse_rate("5/5m") == (5, 300)
+        assert parse_rate("1000/h") == (1000, 3600)
+        with pytest.raises(ValueError):
+            parse_rate("ten/h")
+
+    def test_group_paths_are_enforced_with_headers(self, middleware):
+        responses = [middleware(self.request("/api/auth/login/")) for _ in range(3)]
+
+        assert [r.status_code for r in responses] == [200, 200, 429]
+        assert responses[0]["X-RateLimit-Limit"] == "2"
+        assert responses[0]["X-RateLimit-Remaining"] == "1"
+        assert int(responses[2]["Retry-After"]) > 0
+
+    def test_anonymous_api_default_and_exempt_paths(self, middleware):
+        statuses = [
+            middleware(self.request("/api/doctors/")).status_code for _ in range(4)
+        ]
+        static = middleware(self.request("/static/app.js"))
+
+        assert statuses == [200, 200, 200, 429]
+        assert static.status_code == 200
+        assert "X-RateLimit-Limit" not in static
+
+    def test_sliding_window_weights_previous_window(self):
+        limiter = get_rate_limiter()
+        policy = RateLimitPolicy("test", 10, 60)
+        for _ in range(10):
+            limiter.hit(policy, "ip:1", now=59)
+
+        # بعد منتصف النافذة التالية يبقى نصف العدد السابق محسوباً
+        result = limiter.hit(policy, "ip:1", now=90)
+        assert result.allowed
+        assert result.remaining == 4
+        assert result.reset == 30
+
+    def test_forwarded_header_is_ignored_without_trusted_proxies(self, middleware):
+        statuses = [
+            middleware(
+                RequestFactory().get(
+                    "/api/auth/login/",
+                    REMOTE_ADDR="10.0.0.1",
+                    HTTP_X_FORWARDED_FOR=f"198.51.100.{index}",
+                )
+            ).status_code
+            for index in range(3)
+        ]
+
+        assert statuses == [200, 200, 429]
+
+    def test_client_address_from_trusted_proxy_hop(self, settings):
+        settings.RATELIMIT_TRUSTED_PROXIES = 1
+        limiter = get_rate_limiter()
+        spoofed = RequestFactory().get(
+            "/", REMOTE_ADDR="10.0.0.2", HTTP_X_FORWARDED_FOR="1.2.3.4, 203.0.113.9"
+        )
+        direct = RequestFactory().get("/", REMOTE_ADDR="10.0.0.2")
+
+        assert limiter.identity(spoofed) == "ip:203.0.113.9"
+        assert limiter.identity(direct) == "ip:10.0.0.2"
+
+    @pytest.mark.django_db
+    def test_bearer_token_gets_authenticated_api_policy(self, middleware):
+        from django.contrib.auth import get_user_model
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        user = get_user_model().objects.create_user(
+            username="api_user", email="api@example.com", password="testpass123"
+        )
+        request = RequestFactory().get(
+            "/api/doctors/",
+            REMOTE_ADDR="10.0.0.1",
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}",
+        )
+        limiter = get_rate_limiter()
+
+        assert limiter.policy_for(request).name == "api"
+        assert limiter.identity(request) == f"user:{user.pk}"
+        assert middleware(request)["X-RateLimit-Limit"] == "100"
+
+    def test_invalid_bearer_token_is_anonymous(self):
+        request = RequestFactory().get(
+            "/api/doctors/", REMOTE_ADDR="10.0.0.1", HTTP_AUTHORIZATION="Bearer junk"
+        )
+        limiter = get_rate_limiter()
+
+        assert limiter.policy_for(request).name == "api-anon"
+        assert limiter.identity(request) == "ip:10.0.0.1"
@@ -0,0 +1,71 @@
+"""
+اختبارات محرك فحص التهديدات
+Threat Scanner Tests
+"""
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory
+
+from security.threat_scanner import ThreatScanner
+
+
+class TestThreatScanner:
+    @pytest.fixture
+    def scanner(self):
+        return ThreatScanner(max_field_length=64)
+
+    @pytest.fixture
+    def factory(self):
+        return RequestFactory()
+
+    @pytest.mark.parametrize(
+        "value,rule",
+        [
+            ("1 UNION SELECT password", "sql_keyword"),
+            ("<script src=x>", "xss_script_tag"),
+            ("../../etc/passwd", "traversal_dot_dot"),
+            ("JavaScript:alert(1)", "xss_javascript_uri"),
+            ("صداع مستمر منذ ثلاثة أيام", None),
+        ],
+    )
+    def test_scan_value_reports_rule(self, scanner, value, rule):
+        assert scanner.scan_value(value) == rule
+
+    def test_scan_reports_source_and_field(self, scanner, factory):
+        request = factory.get("/patients/", {"q": "ali", "next": "/etc/passwd"})
+
+        match = scanner.scan(request)
+
+        assert match.rule == "traversal_passwd"
+        assert match.category == "path_traversal"
+        assert (match.source, match.field) == ("GET", "next")
+
+    def test_form_body_is_scanned(self, scanner, factory):
+        request = factory.post(
+            "/patients/",
+            data="name=ali&notes=%3Cscript%3E",
+            content_type="application/x-www-form-urlencoded",
+        )
+
+        assert scanner.scan(request).source == "POST"
+
+    def test_multipart_text_fields_are_scanned_but_files_are_not(
+        self, scanner, factory
+    ):
+        upload = SimpleUploadedFile("scan.dcm", b"<script>" * 10)
+        request = factory.post("/upload/", {"file": upload, "notes": "<script>"})
+        clean = factory.post(
+            "/upload/",
+            {"file": SimpleUploadedFile("scan.dcm", b"<script>"), "notes": "ok"},
+        )
+
+        match = scanner.scan(request)
+        assert (match.source, match.field) == ("POST", "notes")
+        assert scanner.scan(clean) is None
+        assert "file" in clean.FILES
+
+    def test_long_fields_are_skipped(self, scanner, factory):
+        padded = factory.get("/patients/", {"q": "a" * 64 + "<script>"})
+
+        assert scanner.scan(padded) is None
@@ -0,0 +1,85 @@
+"""
+اختبارات تتبع نشاط المستخدمين بالكتابة المؤجلة
+User Activity Tracking Tests
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from accounts.activity import ActivityTracker
+from accounts.models import User
+
+
+@pytest.mark.django_db
+class TestActivityTracker:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self, settings):
+        settings.ACTIVITY_SETTINGS = {"WRITE_INTERVAL": 60}
+        settings.AUDIT_SETTINGS = {"ASYNC": False}
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.fixture
+    def users(self):
+        return [
+            User.objects.create_user(username=f"user{i}", password="pass12345")
+            for i in range(3)
+        ]
+
+    def test_touch_does_not_write_until_flush(self, users, django_assert_num_queries):
+        user = users[0]
+        with django_assert_num_queries(0):
+            for _ in range(10):
+                user.update_last_activity()
+
+        user.refresh_from_db()
+        assert user.last_activity is None
+        assert ActivityTracker.pending_user_ids()[1] == {user.pk}
+
+    def test_flush_writes_all_pending_users_in_one_update(
+        self, users, django_assert_num_queries
+    ):
+        now = timezone.now()
+        for i, user in enumerate(users):
+            ActivityTracker.touch(user, now - timedelta(minutes=i))
+
+        with django_assert_num_queries(1):
+            assert ActivityTracker.flush() == 3
+
+        for i, user in enumerate(users):
+            user.refresh_from_db()
+            assert user.last_activity == now - timedelta(minutes=i)
+        assert ActivityTracker.flush() == 0
+
+    def test_devices_are_merged_with_stored_devices(self, users):
+        user = users[0]
+        User.objects.filter(pk=user.pk).update(
+            device_info={"laptop": {"device_id": "laptop"}}
+        )
+        user.refresh_from_db()
+
+        user.add_device_info({"device_id": "phone", "os": "android"})
+        assert set(ActivityTracker.get_devices(user)) == {"laptop", "phone"}
+
+        ActivityTracker.flush()
+        user.refresh_from_db()
+        assert set(user.device_info) == {"laptop", "phone"}
+
+    def test_failed_logins_lock_account_atomically(self, users):
+        user = users[0]
+        for _ in range(4):
+            user.increment_failed_login()
+        assert not user.is_locked()
+
+        user.increment_failed_login()
+        assert user.failed_login_attempts == 5
+        assert user.is_locked()
+
+        user.reset_failed_login()
+        user.refresh_from_db()
+        assert user.failed_login_attempts == 0
+        assert user.account_locked_until is None
@@ -1,15 +1,23 @@
 import logging
 import os
+import shutil
 import subprocess
 from datetime import datetime
 
 import boto3
 from botocore.exceptions import ClientError
 from django.conf import settings
-from django.core.management import call_command
-from django.core.management.base import CommandError
 from django.db import DatabaseError
 
+from .backup_engine import (
+    MANIFEST_NAME,
+    BackupEngine,
+    S3MultipartUploader,
+    get_backup_setting,
+    read_json,
+    write_json_atomic,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,42 +35,63 @@ class BackupService:
                 aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
                 aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
                 region_name=settings.AWS_S3_REGION_NAME,
+                # أي خدمة متوافقة مع S3 (MinIO وغيرها)
+                endpoint_url=getattr(settings, "AWS_S3_ENDPOINT_URL", None),
             )
             self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
         except (AttributeError, ClientError) as e:
             logger.error(f"خطأ في تهيئة خدمة S3: {str(e)}")
             raise BackupError("فشل في الاتصال بخدمة التخزين السحابي")
-
-    def create_database_backup(self):
-        """إنشاء نسخة احتياطية من قاعدة البيانات"""
+        self.uploader = S3MultipartUploader(self.s3, self.bucket_name)
+        self.backup_dir = get_backup_setting(
+            "BACKUP_DIR", getattr(settings, "BACKUP_DIR", "backups")
+        )
+
+    @property
+    def latest_path(self):
+        return os.path.join(self.backup_dir, "latest_database_backup.json")
+
+    def create_database_backup(self, incremental=False, resume=None):
+        """
+        إنشاء نسخة احتياطية مجزأة من قاعدة البيانات
+
+        النسخة التزايدية تشمل الصفوف المعدلة منذ آخر نسخة ناجحة. يمكن تمرير
+        ``resume`` (معرّف نسخة متوقفة) لإكمالها بدل البدء من جديد.
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"backup_db_{timestamp}.json"
-        filepath = os.path.join(settings.BACKUP_DIR, filename)
+        backup_id = resume or f"backup_db_{timestamp}"
+        backup_path = os.path.join(self.backup_dir, backup_id)
 
         try:
-            # إنشاء مجلد النسخ الاحتياطي إذا لم يكن موجوداً
-            os.makedirs(settings.BACKUP_DIR, exist_ok=True)
-
-            # إنشاء نسخة احتياطية من قاعدة البيانات
-            with open(filepath, "w") as f:
-                call_command(
-                    "dumpdata",
-                    exclude=["contenttypes", "auth.Permission"],
-                    output=f.name,
-                )
+            os.makedirs(self.backup_dir, exist_ok=True)
 
-            # رفع النسخة الاحتياطية إلى S3
-            self.upload_to_s3(filepath, f"database_backups/{filename}")
+            since = base = None
+            if incremental and os.path.exists(self.latest_path):
+                latest = read_json(self.latest_path)
+                since, base = latest["created_at"], latest["backup_id"]
 
-            logger.info(f"تم إنشاء نسخة احتياطية بنجاح: {filename}")
-            return True
+            engine = BackupEngine(backup_path)
+            manifest = engine.backup(since=since, base=base, resume=bool(resume))
+
+            # رفع النسخة إلى S3 على أجزاء متدفقة
+            self.uploader.upload_directory(
+                backup_path, f"database_backups/{backup_id}"
+            )
+            write_json_atomic(
+                self.latest_path,
+                {"backup_id": backup_id, "created_at": manifest["created_at"]},
+            )
+            shutil.rmtree(backup_path)
+
+            logger.info(f"تم إنشاء نسخة احتياطية بنجاح: {backup_id}")
+            return manifest
 
         except OSError as e:
             logger.error(f"خطأ في إنشاء مجلد النسخ الاحتياطي: {str(e)}")
             raise BackupError("فشل في إنشاء مجلد النسخ الاحتياطي")
-        except CommandError as e:
-            logger.error(f"خطأ في إنشاء نسخة احتياطية من قاعدة البيانات: {str(e)}")
-            raise BackupError("فشل في إنشاء نسخة احتياطية من قاعدة البيانات")
+        except ClientError as e:
+            logger.error(f"خطأ في رفع النسخة الاحتياطية إلى S3: {str(e)}")
+            raise BackupError("فشل في رفع الملف إلى خدمة التخزين السحابي")
         except DatabaseError as e:
             logger.error(f"خطأ في قاعدة البيانات: {str(e)}")
             raise BackupError("فشل في الوصول إلى قاعدة البيانات")
@@ -71,7 +100,7 @@ class BackupService:
         """إنشاء نسخة احتياطية من ملفات الوسائط"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"backup_media_{timestamp}.tar.gz"
-        filepath = os.path.join(settings.BACKUP_DIR, filename)
+        filepath = os.path.join(self.backup_dir, filename)
 
         try:
             # ضغط مجلد الوسائط
@@ -93,7 +122,7 @@ class BackupService:
     def upload_to_s3(self, file_path, s3_path):
         """رفع الملف إلى S3"""
         try:
-            self.s3.upload_file(file_path, self.bucket_name, s3_path)
+            self.uploader.upload_file(file_path, s3_path)
             # حذف الملف المحلي بعد الرفع
             os.remove(file_path)
             return True
@@ -104,34 +133,60 @@ class BackupService:
             logger.error(f"خطأ في حذف الملف المحلي: {str(e)}")
             raise BackupError("فشل في حذف الملف المحلي")
 
+    def download_backup_chain(self, local_path):
+        """تنزيل نسخة قاعدة البيانات ونسخها الأساسية حتى النسخة الكاملة"""
+        downloaded = []
+        while True:
+            backup_id = os.path.basename(local_path)
+            self.uploader.download_directory(
+                f"database_backups/{backup_id}", local_path
+            )
+            downloaded.append(local_path)
+            manifest = read_json(os.path.join(local_path, MANIFEST_NAME))
+            if manifest["type"] != "incremental" or not manifest.get("base"):
+                return downloaded
+            local_path = os.path.join(self.backup_dir, manifest["base"])
+
     def restore_from_backup(self, backup_file):
         """استعادة من نسخة احتياطية"""
         try:
-            # تنزيل النسخة الاحتياطية من S3
             local_path = os.path.join(
-                settings.BACKUP_DIR, os.path.basename(backup_file)
+                self.backup_dir, os.path.basename(backup_file.rstrip("/"))
             )
-            self.s3.download_file(self.bucket_name, backup_file, local_path)
 
-            # استعادة قاعدة البيانات
+            # استعادة قاعدة البيانات بالتوازي من الدفعات مع سلسلة نسخها الأساسية
             if backup_file.startswith("database_backups/"):
-                call_command("loaddata", local_path)
+                downloaded = self.download_backup_chain(local_path)
+                try:
+                    corrupted = [
+                        path
+                        for directory in downloaded
+                        for path in BackupEngine(directory).verify()
+                    ]
+                    if corrupted:
+                        raise BackupError(
+                            f"ملفات تالفة في النسخة: {', '.join(corrupted)}"
+                        )
+                    BackupEngine(local_path).restore_chain()
+                finally:
+                    for directory in downloaded:
+                        shutil.rmtree(directory, ignore_errors=True)
 
             # استعادة ملفات الوسائط
             elif backup_file.startswith("media_backups/"):
+                self.s3.download_file(self.bucket_name, backup_file, local_path)
                 subprocess.run(
                     ["tar", "-xzf", local_path, "-C", settings.MEDIA_ROOT], check=True
                 )
+                os.remove(local_path)
 
-            # حذف الملف المحلي بعد الاستعادة
-            os.remove(local_path)
             logger.info(f"تم استعادة النسخة الاحتياطية بنجاح: {backup_file}")
             return True
 
         except ClientError as e:
             logger.error(f"خطأ في تنزيل النسخة الاحتياطية من S3: {str(e)}")
             raise BackupError("فشل في تنزيل النسخة الاحتياطية")
-        except CommandError as e:
+        except (DatabaseError, ValueError) as e:
             logger.error(f"خطأ في استعادة قاعدة البيانات: {str(e)}")
             raise BackupError("فشل في استعادة قاعدة البيانات")
         except subprocess.CalledProcessError as e:
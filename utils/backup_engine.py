@@ -0,0 +1,560 @@
+"""
+محرك النسخ الاحتياطي المجزأ لقاعدة البيانات
+
+يُصدَّر كل نموذج على دفعات مرتبة حسب المفتاح الأساسي إلى ملفات NDJSON مضغوطة،
+مع ملف بيان (manifest) يحوي بصمة SHA-256 لكل دفعة. تعمل النماذج بالتوازي في
+عمليات منفصلة، ويمكن استئناف نسخة متوقفة، وأخذ نسخ تزايدية حسب ``updated_at``،
+والاستعادة بالتوازي حسب مستويات الاعتماد بين الجداول.
+
+النسخة التزايدية تحوي الصفوف المعدلة للنماذج ذات ``updated_at`` ونسخة كاملة
+لباقي النماذج، وتُستعاد فوق سلسلة نسخها الأساسية (``restore_chain``) بالدمج على
+المفتاح الأساسي. الصفوف المحذوفة من نماذج النسخة الكاملة تُحذف عند الدمج، أما
+حذف صفوف النماذج ذات ``updated_at`` فلا تسجله النسخ التزايدية ولا يظهر إلا في
+النسخة الكاملة التالية.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+STATE_NAME = "_state.json"
+MANIFEST_VERSION = 1
+DEFAULT_EXCLUDE = ("contenttypes", "auth.permission", "sessions")
+INCREMENTAL_FIELD = "updated_at"
+
+
+class BackupEncoder(DjangoJSONEncoder):
+    """ترميز JSON يدعم الحقول الثنائية"""
+
+    def default(self, o):
+        if isinstance(o, (bytes, memoryview)):
+            return base64.b64encode(bytes(o)).decode("ascii")
+        return super().default(o)
+
+
+def get_backup_setting(name, default=None):
+    return getattr(settings, "BACKUP_SETTINGS", {}).get(name, default)
+
+
+def file_checksum(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, cls=BackupEncoder, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_backup_models(exclude=DEFAULT_EXCLUDE):
+    """النماذج القابلة للنسخ (بما فيها جداول الربط التلقائية)"""
+    models = []
+    for model in apps.get_models(include_auto_created=True):
+        opts = model._meta
+        if opts.proxy or not opts.managed:
+            continue
+        if opts.app_label in exclude or opts.label_lower in exclude:
+            continue
+        models.append(model)
+    return models
+
+
+def dependency_levels(models):
+    """
+    تقسيم النماذج إلى مستويات بحيث يعتمد كل مستوى على ما قبله فقط
+
+    تُستعاد نماذج المستوى الواحد بالتوازي.
+    """
+    labels = {model._meta.label_lower: model for model in models}
+    dependencies = {}
+    for label, model in labels.items():
+        dependencies[label] = {
+            field.related_model._meta.concrete_model._meta.label_lower
+            for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model is not None
+        } & set(labels) - {label}
+
+    levels = []
+    done = set()
+    remaining = set(labels)
+    while remaining:
+        level = sorted(label for label in remaining if dependencies[label] <= done)
+        if not level:
+            # اعتماد دائري: تُستعاد البقية معاً
+            level = sorted(remaining)
+        levels.append([labels[label] for label in level])
+        done.update(level)
+        remaining.difference_update(level)
+    return levels
+
+
+class ModelDumper:
+    """تصدير نموذج واحد على دفعات مرتبة حسب المفتاح الأساسي"""
+
+    def __init__(self, model, backup_dir, chunk_size, since=None):
+        self.model = model
+        self.label = model._meta.label_lower
+        self.directory = os.path.join(backup_dir, self.label)
+        self.chunk_size = chunk_size
+        # الحقول المحلية فقط: جداول الوراثة متعددة الجداول تُنسخ كل على حدة
+        self.fields = [field.attname for field in model._meta.local_concrete_fields]
+        has_incremental_field = any(
+            field.name == INCREMENTAL_FIELD for field in model._meta.concrete_fields
+        )
+        self.since = since if has_incremental_field else None
+
+    @property
+    def state_path(self):
+        return os.path.join(self.directory, STATE_NAME)
+
+    def load_state(self):
+        """تحميل حالة نسخة سابقة متوقفة والتحقق من آخر دفعة"""
+        if not os.path.exists(self.state_path):
+            return None
+        state = read_json(self.state_path)
+        if state["chunks"]:
+            last = state["chunks"][-1]
+            path = os.path.join(self.directory, last["file"])
+            if not os.path.exists(path) or file_checksum(path) != last["sha256"]:
+                # دفعة تالفة: نعيد النموذج من البداية
+                return None
+        return state
+
+    def get_queryset(self):
+        queryset = self.model._base_manager.using(connection.alias)
+        if self.since is not None:
+            queryset = queryset.filter(**{f"{INCREMENTAL_FIELD}__gte": self.since})
+        return queryset.order_by("pk")
+
+    def write_chunk(self, number, rows):
+        filename = f"{number:06d}.ndjson.gz"
+        path = os.path.join(self.directory, filename)
+        with gzip.open(
+            path,
+            "wt",
+            encoding="utf-8",
+            compresslevel=get_backup_setting("COMPRESSION_LEVEL", 6),
+        ) as f:
+            for row in rows:
+                f.write(json.dumps(row, cls=BackupEncoder, ensure_ascii=False))
+                f.write("\n")
+        return {
+            "file": filename,
+            "rows": len(rows),
+            "first_pk": rows[0][self.pk_attname],
+            "last_pk": rows[-1][self.pk_attname],
+            "sha256": file_checksum(path),
+        }
+
+    @property
+    def pk_attname(self):
+        return self.model._meta.pk.attname
+
+    def dump(self, resume=False):
+        os.makedirs(self.directory, exist_ok=True)
+        state = self.load_state() if resume else None
+        if state is None:
+            state = {
+                "model": self.label,
+                "mode": "incremental" if self.since is not None else "full",
+                "chunks": [],
+                "complete": False,
+            }
+        if state["complete"]:
+            return state
+
+        queryset = self.get_queryset()
+        last_pk = state["chunks"][-1]["last_pk"] if state["chunks"] else None
+        while True:
+            page = queryset
+            if last_pk is not None:
+                page = page.filter(pk__gt=last_pk)
+            rows = list(page.values(*self.fields)[: self.chunk_size])
+            if not rows:
+                break
+            chunk = self.write_chunk(len(state["chunks"]) + 1, rows)
+            state["chunks"].append(chunk)
+            last_pk = chunk["last_pk"]
+            write_json_atomic(self.state_path, state)
+            if len(rows) < self.chunk_size:
+                break
+
+        state["complete"] = True
+        state["rows"] = sum(chunk["rows"] for chunk in state["chunks"])
+        write_json_atomic(self.state_path, state)
+        return state
+
+
+class ModelLoader:
+    """استعادة نموذج واحد من دفعاته"""
+
+    def __init__(self, model, backup_dir, entry, batch_size=1000, merge=False):
+        self.model = model
+        self.directory = os.path.join(backup_dir, model._meta.label_lower)
+        self.entry = entry
+        self.batch_size = batch_size
+        # الدمج فوق بيانات نسخة سابقة بدل الإدراج في جداول فارغة
+        self.merge = merge or entry["mode"] == "incremental"
+        self.fields = {
+            field.attname: field for field in model._meta.local_concrete_fields
+        }
+
+    def read_chunk(self, chunk):
+        path = os.path.join(self.directory, chunk["file"])
+        if file_checksum(path) != chunk["sha256"]:
+            raise ValueError(f"بصمة غير مطابقة للملف {path}")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def build(self, row):
+        values = {
+            attname: self.fields[attname].to_python(value)
+            if value is not None
+            else None
+            for attname, value in row.items()
+            if attname in self.fields
+        }
+        return self.model(**values)
+
+    def load(self):
+        """استعادة النموذج في معاملة واحدة"""
+        opts = self.model._meta
+        update_fields = [
+            field.name
+            for field in opts.local_concrete_fields
+            if not field.primary_key
+        ]
+        restored = 0
+        # النسخة الكاملة لنموذج داخل نسخة تزايدية تمثل الجدول بأكمله
+        prune = self.merge and self.entry["mode"] == "full"
+        pks = set()
+        with transaction.atomic(using=connection.alias):
+            for chunk in self.entry["chunks"]:
+                objects = [self.build(row) for row in self.read_chunk(chunk)]
+                if prune:
+                    pks.update(obj.pk for obj in objects)
+                if opts.parents:
+                    # bulk_create لا يدعم الوراثة متعددة الجداول
+                    for obj in objects:
+                        obj.save_base(raw=True)
+                elif self.merge and update_fields:
+                    self.model._base_manager.bulk_create(
+                        objects,
+                        batch_size=self.batch_size,
+                        update_conflicts=True,
+                        unique_fields=[opts.pk.name],
+                        update_fields=update_fields,
+                    )
+                else:
+                    self.model._base_manager.bulk_create(
+                        objects, batch_size=self.batch_size
+                    )
+                restored += len(objects)
+            if prune:
+                self.delete_missing(pks)
+        return restored
+
+    def delete_missing(self, pks):
+        """حذف الصفوف غير الموجودة في النسخة الكاملة للنموذج"""
+        manager = self.model._base_manager.using(connection.alias)
+        stale = [
+            pk
+            for pk in manager.values_list("pk", flat=True).iterator()
+            if pk not in pks
+        ]
+        for start in range(0, len(stale), self.batch_size):
+            manager.filter(pk__in=stale[start : start + self.batch_size]).delete()
+        return len(stale)
+
+
+def _init_worker():
+    """تهيئة عملية عاملة: إعداد Django وإغلاق الاتصالات الموروثة"""
+    import django
+
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _dump_model(label, backup_dir, chunk_size, since, resume):
+    dumper = ModelDumper(apps.get_model(label), backup_dir, chunk_size, since=since)
+    return dumper.dump(resume=resume)
+
+
+def _load_model(label, backup_dir, entry, merge=False):
+    loader = ModelLoader(apps.get_model(label), backup_dir, entry, merge=merge)
+    return label, loader.load()
+
+
+class BackupEngine:
+    """تنسيق النسخ الاحتياطي والاستعادة المتوازيين"""
+
+    def __init__(
+        self, backup_dir, chunk_size=None, workers=None, exclude=None, models=None
+    ):
+        self.backup_dir = backup_dir
+        # قصر النسخ على نماذج محددة (تسميات app_label.model)
+        self.models = models
+        self.chunk_size = chunk_size or get_backup_setting("CHUNK_SIZE", 5000)
+        self.workers = (
+            workers
+            if workers is not None
+            else get_backup_setting("WORKERS", os.cpu_count() or 1)
+        )
+        self.exclude = exclude or DEFAULT_EXCLUDE
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.backup_dir, MANIFEST_NAME)
+
+    def _map(self, func, calls):
+        """تنفيذ الاستدعاءات محلياً أو في مجمع عمليات"""
+        if self.workers <= 1 or len(calls) <= 1:
+            return [func(*args) for args in calls]
+
+        # لا يجوز مشاركة اتصالات قاعدة البيانات مع العمليات المتفرعة
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(calls)),
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+        ) as executor:
+            futures = [executor.submit(func, *args) for args in calls]
+            return [future.result() for future in futures]
+
+    def backup(self, since=None, base=None, resume=False):
+        """
+        إنشاء نسخة احتياطية كاملة أو تزايدية
+
+        ``since`` يقصر النسخ على الصفوف المعدلة بعد هذا الوقت للنماذج التي
+        تملك ``updated_at``، و``base`` هو معرّف النسخة التي تُبنى عليها.
+        """
+        os.makedirs(self.backup_dir, exist_ok=True)
+        started_at = timezone.now()
+        labels = [
+            model._meta.label_lower for model in get_backup_models(self.exclude)
+        ]
+        if self.models is not None:
+            selected = {label.lower() for label in self.models}
+            labels = [label for label in labels if label in selected]
+        states = self._map(
+            _dump_model,
+            [
+                (label, self.backup_dir, self.chunk_size, since, resume)
+                for label in labels
+            ],
+        )
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "backup_id": os.path.basename(os.path.normpath(self.backup_dir)),
+            "created_at": started_at,
+            "type": "incremental" if since is not None else "full",
+            "since": since,
+            "base": base,
+            "chunk_size": self.chunk_size,
+            "models": {state["model"]: state for state in states},
+        }
+        for state in states:
+            os.remove(os.path.join(self.backup_dir, state["model"], STATE_NAME))
+        write_json_atomic(self.manifest_path, manifest)
+        logger.info(
+            "تم إنشاء نسخة احتياطية %s: %s صف",
+            manifest["backup_id"],
+            sum(state["rows"] for state in states),
+        )
+        return manifest
+
+    def load_manifest(self):
+        manifest = read_json(self.manifest_path)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError("إصدار ملف البيان غير مدعوم")
+        return manifest
+
+    def verify(self):
+        """التحقق من بصمات جميع الدفعات"""
+        manifest = self.load_manifest()
+        corrupted = []
+        for label, entry in manifest["models"].items():
+            for chunk in entry["chunks"]:
+                path = os.path.join(self.backup_dir, label, chunk["file"])
+                if not os.path.exists(path) or file_checksum(path) != chunk["sha256"]:
+                    corrupted.append(path)
+        return corrupted
+
+    def restore(self):
+        """
+        استعادة النسخة بالتوازي حسب مستويات الاعتماد
+
+        النسخة التزايدية تُدمج فوق البيانات الحالية، فيجب أن تكون نسخها
+        الأساسية مستعادة قبلها (انظر ``restore_chain``).
+        """
+        manifest = self.load_manifest()
+        entries = manifest["models"]
+        merge = manifest["type"] == "incremental"
+        models = [
+            apps.get_model(label)
+            for label, entry in entries.items()
+            # نموذج بلا صفوف في نسخة كاملة داخل نسخة تزايدية يعني حذفها كلها
+            if entry["chunks"] or (merge and entry["mode"] == "full")
+        ]
+
+        restored = {}
+        for level in dependency_levels(models):
+            calls = [
+                (
+                    model._meta.label_lower,
+                    self.backup_dir,
+                    entries[model._meta.label_lower],
+                    merge,
+                )
+                for model in level
+            ]
+            restored.update(self._map(_load_model, calls))
+
+        self.reset_sequences(models)
+        return restored
+
+    def chain(self):
+        """
+        مجلدات سلسلة النسخ من النسخة الكاملة حتى هذه النسخة
+
+        النسخ الأساسية يُفترض وجودها بمعرفاتها بجوار مجلد هذه النسخة.
+        """
+        parent = os.path.dirname(os.path.normpath(self.backup_dir))
+        chain, directory = [], self.backup_dir
+        while True:
+            manifest = read_json(os.path.join(directory, MANIFEST_NAME))
+            chain.append(directory)
+            if manifest["type"] != "incremental":
+                return chain[::-1]
+            if not manifest.get("base"):
+                raise ValueError(f"نسخة تزايدية بلا نسخة أساسية: {directory}")
+            directory = os.path.join(parent, manifest["base"])
+            if directory in chain:
+                raise ValueError(f"سلسلة نسخ دائرية عند {manifest['base']}")
+
+    def restore_chain(self):
+        """استعادة النسخة الكاملة الأساسية ثم النسخ التزايدية بالترتيب"""
+        return [
+            (
+                os.path.basename(directory),
+                BackupEngine(directory, workers=self.workers).restore(),
+            )
+            for directory in self.chain()
+        ]
+
+    def reset_sequences(self, models):
+        """إعادة ضبط تسلسلات المفاتيح الأساسية بعد الاستعادة"""
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+
+class S3MultipartUploader:
+    """رفع وتنزيل النسخ عبر أي خدمة متوافقة مع S3 بأجزاء متدفقة"""
+
+    MIN_PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, client, bucket, part_size=None):
+        self.client = client
+        self.bucket = bucket
+        self.part_size = max(
+            part_size or get_backup_setting("PART_SIZE", 8 * 1024 * 1024),
+            self.MIN_PART_SIZE,
+        )
+
+    def upload_file(self, path, key):
+        """رفع ملف على أجزاء دون تحميله كاملاً في الذاكرة"""
+        if os.path.getsize(path) <= self.part_size:
+            with open(path, "rb") as f:
+                self.client.put_object(Bucket=self.bucket, Key=key, Body=f.read())
+            return
+
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)[
+            "UploadId"
+        ]
+        parts = []
+        try:
+            with open(path, "rb") as f:
+                for number, data in enumerate(
+                    iter(lambda: f.read(self.part_size), b""), start=1
+                ):
+                    response = self.client.upload_part(
+                        Bucket=self.bucket,
+                        Key=key,
+                        UploadId=upload_id,
+                        PartNumber=number,
+                        Body=data,
+                    )
+                    parts.append({"ETag": response["ETag"], "PartNumber": number})
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except Exception:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id
+            )
+            raise
+
+    def upload_directory(self, directory, prefix):
+        """رفع مجلد نسخة احتياطية مع رفع ملف البيان أخيراً"""
+        files = []
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                files.append((path, os.path.relpath(path, directory)))
+        # ملف البيان آخر ما يُرفع حتى لا تظهر نسخة ناقصة على أنها مكتملة
+        files.sort(key=lambda item: item[1] == MANIFEST_NAME)
+        for path, relative in files:
+            self.upload_file(path, f"{prefix.rstrip('/')}/{relative}")
+        return len(files)
+
+    def download_directory(self, prefix, directory):
+        """تنزيل مجلد نسخة احتياطية بالتدفق"""
+        prefix = prefix.rstrip("/") + "/"
+        count = 0
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                path = os.path.join(directory, item["Key"][len(prefix) :])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                body = self.client.get_object(Bucket=self.bucket, Key=item["Key"])[
+                    "Body"
+                ]
+                with open(path, "wb") as f:
+                    for data in iter(lambda: body.read(self.part_size), b""):
+                        f.write(data)
+                count += 1
+        return count
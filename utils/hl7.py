@@ -0,0 +1,214 @@
+"""
+محلل HL7 v2 تدفقي وقارئ إطارات MLLP
+
+يُقسم المحلل الرسالة إلى قطاعات نصية فقط، ولا تُقسم حقول القطاع إلا عند
+الوصول إليه، ولا تُقسم المكونات إلا عند طلبها. تُحفظ القطاعات المتكررة (OBX، NTE)
+بترتيبها. لا تعتمد الوحدة على Django حتى يمكن قياس أدائها بشكل مستقل.
+"""
+
+from datetime import datetime
+
+START_BLOCK = 0x0B
+END_BLOCK = b"\x1c\r"
+SEGMENT_SEPARATOR = "\r"
+
+
+class HL7ParseError(ValueError):
+    """رسالة HL7 غير صالحة"""
+
+    pass
+
+
+class Encoding:
+    """محارف الترميز المعرفة في MSH-1 و MSH-2"""
+
+    __slots__ = ("field", "component", "repetition", "escape", "subcomponent")
+
+    def __init__(self, field="|", characters="^~\\&"):
+        characters = characters.ljust(4)
+        self.field = field
+        self.component = characters[0]
+        self.repetition = characters[1]
+        self.escape = characters[2]
+        self.subcomponent = characters[3]
+
+
+class Segment:
+    """قطاع HL7 واحد (تُقسم حقوله مرة واحدة عند الإنشاء)"""
+
+    __slots__ = ("name", "fields", "encoding")
+
+    def __init__(self, raw, encoding):
+        self.fields = raw.split(encoding.field)
+        self.name = self.fields[0]
+        self.encoding = encoding
+
+    def __repr__(self):
+        return f"<Segment {self.name}>"
+
+    def field(self, index):
+        """الحقل رقم ``index`` بترقيم HL7 (يبدأ من 1)"""
+        if self.name == "MSH":
+            # MSH-1 هو فاصل الحقول نفسه
+            if index == 1:
+                return self.encoding.field
+            index -= 1
+        try:
+            return self.fields[index]
+        except IndexError:
+            return ""
+
+    def repetitions(self, index):
+        return self.field(index).split(self.encoding.repetition)
+
+    def components(self, index, repetition=0):
+        value = self.field(index)
+        if self.encoding.repetition in value:
+            repeats = value.split(self.encoding.repetition)
+            value = repeats[repetition] if repetition < len(repeats) else ""
+        return value.split(self.encoding.component)
+
+    def component(self, index, component=1, repetition=0):
+        """المكون رقم ``component`` من الحقل (يبدأ من 1)"""
+        components = self.components(index, repetition)
+        try:
+            return components[component - 1]
+        except IndexError:
+            return ""
+
+
+class HL7Message:
+    """رسالة HL7 v2 تُحلل قطاعاتها عند الطلب"""
+
+    __slots__ = ("raw", "encoding", "_segments")
+
+    def __init__(self, raw, charset="utf-8"):
+        if isinstance(raw, (bytes, bytearray, memoryview)):
+            raw = bytes(raw).decode(charset, errors="replace")
+        raw = raw.strip("\r\n")
+        if "\n" in raw:
+            raw = raw.replace("\r\n", "\r").replace("\n", "\r")
+        if not raw.startswith("MSH") or len(raw) < 8:
+            raise HL7ParseError("رسالة HL7 غير صالحة: لا يوجد قطاع MSH")
+
+        self.raw = raw
+        separator = raw[3]
+        end = raw.find(separator, 4)
+        if end == -1:
+            raise HL7ParseError("رسالة HL7 غير صالحة: قطاع MSH مقطوع")
+        self.encoding = Encoding(separator, raw[4:end])
+        self._segments = raw.split(SEGMENT_SEPARATOR)
+
+    def __repr__(self):
+        return f"<HL7Message {self.message_type} {self.control_id}>"
+
+    def __iter__(self):
+        return self.iter_segments()
+
+    def iter_segments(self, *names):
+        """القطاعات بترتيبها، مع تخطي القطاعات غير المطلوبة دون تقسيمها"""
+        prefixes = tuple(name + self.encoding.field for name in names)
+        for raw in self._segments:
+            if raw and (not prefixes or raw.startswith(prefixes)):
+                yield Segment(raw, self.encoding)
+
+    def segment(self, name):
+        return next(self.iter_segments(name), None)
+
+    @property
+    def header(self):
+        return Segment(self._segments[0], self.encoding)
+
+    @property
+    def message_type(self):
+        header = self.header
+        return "^".join(part for part in header.components(9)[:2] if part)
+
+    @property
+    def control_id(self):
+        return self.header.field(10)
+
+    def to_dict(self):
+        """تمثيل القطاعات كقاموس: اسم القطاع -> قائمة حقول كل تكرار"""
+        result = {}
+        for segment in self.iter_segments():
+            result.setdefault(segment.name, []).append(segment.fields[1:])
+        return result
+
+
+class MLLPFrameBuffer:
+    """تجميع البايتات المستلمة واستخراج إطارات MLLP الكاملة"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        self.buffer += data
+        frames = []
+        position = 0
+        while True:
+            start = self.buffer.find(START_BLOCK, position)
+            if start == -1:
+                # بايتات خارج أي إطار
+                position = len(self.buffer)
+                break
+            end = self.buffer.find(END_BLOCK, start + 1)
+            if end == -1:
+                position = start
+                break
+            frames.append(bytes(self.buffer[start + 1 : end]))
+            position = end + len(END_BLOCK)
+        del self.buffer[:position]
+        return frames
+
+
+def iter_frames(read, chunk_size=64 * 1024):
+    """قراءة إطارات MLLP من دالة قراءة (ملف أو ``socket.recv``)"""
+    frames = MLLPFrameBuffer()
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            return
+        yield from frames.feed(chunk)
+
+
+def iter_file_messages(path, chunk_size=64 * 1024, charset="utf-8"):
+    """قراءة رسائل HL7 من ملف بإطارات MLLP"""
+    with open(path, "rb") as f:
+        for frame in iter_frames(f.read, chunk_size):
+            yield HL7Message(frame, charset=charset)
+
+
+def frame(message, charset="utf-8"):
+    """تغليف رسالة بإطار MLLP"""
+    if isinstance(message, HL7Message):
+        message = message.raw
+    if isinstance(message, str):
+        message = message.encode(charset)
+    return bytes([START_BLOCK]) + message + END_BLOCK
+
+
+def build_ack(message, code="AA", text=""):
+    """بناء رسالة إقرار ACK لرسالة مستلمة"""
+    header = message.header
+    sep = message.encoding.field
+    characters = header.field(2)
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    msh = sep.join(
+        [
+            "MSH",
+            characters,
+            header.field(5),
+            header.field(6),
+            header.field(3),
+            header.field(4),
+            timestamp,
+            "",
+            f"ACK{message.encoding.component}{header.component(9, 2)}",
+            f"ACK{message.control_id}",
+            header.field(11) or "P",
+            header.field(12) or "2.5",
+        ]
+    )
+    msa = sep.join(["MSA", code, message.control_id, text])
+    return msh + SEGMENT_SEPARATOR + msa + SEGMENT_SEPARATOR
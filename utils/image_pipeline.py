@@ -0,0 +1,195 @@
+"""
+خط معالجة الصور المتوازي مع تخزين مؤقت معنون بالمحتوى
+
+تُفك الصورة مرة واحدة (مع ``Image.draft`` لتصغير JPEG أثناء فك الترميز) وتُولد
+منها جميع المقاسات المطلوبة، وتُحفظ المخرجات بمسار مشتق من بصمة المحتوى والمقاس
+حتى لا تتصادم الملفات ذات الأسماء المتشابهة. تُسجل روابط المقاسات في بيان
+(manifest) في الذاكرة المؤقتة، فتُخدم الروابط دون الوصول إلى نظام الملفات.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = {"small": (100, 100), "medium": (300, 300), "large": (600, 600)}
+DEFAULT_QUALITY = 85
+OUTPUT_FORMAT = "JPEG"
+OUTPUT_EXTENSION = "jpg"
+
+
+def get_sizes():
+    return getattr(settings, "IMAGE_THUMBNAIL_SIZES", DEFAULT_SIZES)
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def render_variants(data, sizes, quality=DEFAULT_QUALITY):
+    """
+    توليد جميع المقاسات من فك ترميز واحد
+
+    تُعاد قاموساً من اسم المقاس إلى بايتات الصورة. المقاسات تُولد من الأكبر إلى
+    الأصغر، وكل مقاس يُصغر من سابقه بدل الصورة الأصلية.
+    """
+    image = Image.open(BytesIO(data))
+    largest = max(max(box) for box in sizes.values())
+    if image.format == "JPEG":
+        # فك ترميز JPEG بدقة مخفضة مباشرة (مضاعفات 1/2، 1/4، 1/8)
+        image.draft("RGB", (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    outputs = {}
+    current = image
+    for name, box in sorted(
+        sizes.items(), key=lambda item: item[1][0] * item[1][1], reverse=True
+    ):
+        current = current.copy()
+        current.thumbnail(box, Image.LANCZOS, reducing_gap=3.0)
+        buffer = BytesIO()
+        current.save(buffer, format=OUTPUT_FORMAT, quality=quality, optimize=True)
+        outputs[name] = buffer.getvalue()
+    return outputs
+
+
+class ImageManifest:
+    """بيان المقاسات المولدة: اسم الملف المصدر -> روابط المقاسات"""
+
+    KEY_PREFIX = "image_manifest"
+
+    def key(self, name):
+        return f"{self.KEY_PREFIX}:{hashlib.md5(name.encode()).hexdigest()}"
+
+    def get(self, name):
+        return cache.get(self.key(name))
+
+    def set(self, name, entry):
+        # بلا انتهاء صلاحية: المخرجات معنونة بالمحتوى ولا تتقادم
+        cache.set(self.key(name), entry, None)
+
+    def delete(self, name):
+        cache.delete(self.key(name))
+
+
+class ImagePipeline:
+    """توليد مقاسات الصور وتخزينها بعنونة المحتوى"""
+
+    def __init__(self, sizes=None, quality=DEFAULT_QUALITY, storage=None, prefix="thumbnails"):
+        self.sizes = sizes or get_sizes()
+        self.quality = quality
+        self.storage = storage or default_storage
+        self.prefix = prefix
+        self.manifest = ImageManifest()
+
+    def variant_path(self, digest, name):
+        width, height = self.sizes[name]
+        return (
+            f"{self.prefix}/{digest[:2]}/{digest}_{name}_{width}x{height}"
+            f"_q{self.quality}.{OUTPUT_EXTENSION}"
+        )
+
+    def read_source(self, source_name):
+        with self.storage.open(source_name, "rb") as f:
+            return f.read()
+
+    def store_variants(self, source_name, digest, rendered):
+        """حفظ المقاسات المولدة وتسجيلها في البيان"""
+        variants = {}
+        for name in self.sizes:
+            path = self.variant_path(digest, name)
+            if not self.storage.exists(path):
+                path = self.storage.save(path, ContentFile(rendered[name]))
+            variants[name] = self.storage.url(path)
+        entry = {"digest": digest, "variants": variants}
+        self.manifest.set(source_name, entry)
+        return entry
+
+    def missing_variants(self, digest):
+        return [
+            name
+            for name in self.sizes
+            if not self.storage.exists(self.variant_path(digest, name))
+        ]
+
+    def process(self, source_name):
+        """توليد مقاسات صورة واحدة (يُتخطى العمل إذا كان المحتوى معالجاً سابقاً)"""
+        data = self.read_source(source_name)
+        digest = content_digest(data)
+        rendered = {}
+        if self.missing_variants(digest):
+            rendered = render_variants(data, self.sizes, self.quality)
+        return self.store_variants(source_name, digest, rendered)
+
+    def process_many(self, source_names, workers=None):
+        """توليد مقاسات عدة صور بالتوازي في مجمع عمليات"""
+        jobs = []
+        for source_name in source_names:
+            data = self.read_source(source_name)
+            digest = content_digest(data)
+            if self.missing_variants(digest):
+                jobs.append((source_name, digest, data))
+            else:
+                self.store_variants(source_name, digest, {})
+
+        if not jobs:
+            return {}
+
+        results = {}
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = {
+                executor.submit(render_variants, data, self.sizes, self.quality): (
+                    source_name,
+                    digest,
+                )
+                for source_name, digest, data in jobs
+            }
+            for future, (source_name, digest) in futures.items():
+                try:
+                    results[source_name] = self.store_variants(
+                        source_name, digest, future.result()
+                    )
+                except Exception as e:
+                    logger.error(f"خطأ في معالجة الصورة {source_name}: {str(e)}")
+        return results
+
+
+def schedule_variants(source_name):
+    """جدولة توليد المقاسات مرة واحدة لكل ملف"""
+    from core.tasks import generate_image_variants
+
+    lock_key = f"image_variants_pending:{hashlib.md5(source_name.encode()).hexdigest()}"
+    if cache.add(lock_key, True, timeout=300):
+        generate_image_variants.delay(source_name)
+
+
+def get_variant_url(image_field, size="medium"):
+    """
+    رابط مقاس الصورة من البيان دون الوصول إلى نظام الملفات
+
+    إذا لم تكن المقاسات مولدة بعد تُجدول في الخلفية ويُعاد رابط الصورة الأصلية.
+    """
+    if not image_field:
+        return None
+
+    entry = ImageManifest().get(image_field.name)
+    if entry is not None:
+        variants = entry["variants"]
+        return variants.get(size) or variants.get("medium") or image_field.url
+
+    schedule_variants(image_field.name)
+    return image_field.url
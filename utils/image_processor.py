@@ -23,8 +23,10 @@ class ImageProcessor:
             return None
 
         try:
-            # فتح الصورة
+            # فتح الصورة مع فك ترميز JPEG بدقة مخفضة
             image = Image.open(image_field)
+            if image.format == "JPEG":
+                image.draft("RGB", self.max_size)
 
             # تحويل الصورة إلى RGB إذا كانت RGBA
             if image.mode == "RGBA":
@@ -34,7 +36,7 @@ class ImageProcessor:
             image = ImageOps.exif_transpose(image)
 
             # تغيير حجم الصورة
-            image.thumbnail(self.max_size, Image.LANCZOS)
+            image.thumbnail(self.max_size, Image.LANCZOS, reducing_gap=3.0)
 
             # حفظ الصورة
             output = BytesIO()
@@ -58,8 +60,10 @@ class ImageProcessor:
             return None
 
         try:
-            # فتح الصورة
+            # فتح الصورة مع فك ترميز JPEG بدقة مخفضة
             image = Image.open(image_field)
+            if image.format == "JPEG":
+                image.draft("RGB", size)
 
             # تحويل الصورة إلى RGB إذا كانت RGBA
             if image.mode == "RGBA":
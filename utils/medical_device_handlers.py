@@ -9,6 +9,8 @@ from pydicom.dataset import Dataset
 from pynetdicom import AE
 from pynetdicom.status import code_to_category
 
+from utils.hl7 import HL7Message
+
 logger = logging.getLogger(__name__)
 
 
@@ -61,14 +63,9 @@ class HL7MessageHandler:
 
     @staticmethod
     def parse_message(message: str) -> Dict[str, Any]:
-        """تحليل رسالة HL7"""
+        """تحليل رسالة HL7 (اسم القطاع -> قائمة حقول كل تكرار)"""
         try:
-            result = {}
-            segments = message.split("\r")
-            for segment in segments:
-                fields = segment.split("|")
-                result[fields[0]] = fields[1:]
-            return result
+            return HL7Message(message).to_dict()
         except Exception as e:
             logger.error(f"خطأ في تحليل رسالة HL7: {str(e)}")
             raise MedicalDeviceError(f"فشل تحليل رسالة HL7: {str(e)}")